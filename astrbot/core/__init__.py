@@ -20,7 +20,7 @@ t2i_base_url = astrbot_config.get("t2i_endpoint", "https://t2i.soulter.top/text2
 html_renderer = HtmlRenderer(t2i_base_url)
 logger = LogManager.GetLogger(log_name="astrbot")
 db_helper = SQLiteDatabase(DB_PATH)
-# 简单的偏好设置存储, 这里后续应该存储到数据库中, 一些部分可以存储到配置中
+# 简单的偏好设置存储(SQLite, 写后置)
 sp = SharedPreferences()
 # 文件令牌服务
 file_token_service = FileTokenService()
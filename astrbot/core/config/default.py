@@ -46,6 +46,20 @@ DEFAULT_CONFIG = {
         "friend_message_needs_wake_prefix": False,
         "ignore_bot_self_message": False,
         "ignore_at_all": False,
+        "event_dispatch": {
+            "mode": "unbounded",  # unbounded, worker_pool
+            "worker_count": 8,
+            "queue_size": 1000,
+            "overflow_policy": "block",  # block, drop_oldest, drop_newest
+        },
+        "session_lane": {
+            "enable": False,
+            "coalesce_window": 0,
+        },
+        "media_transport": {
+            "by_reference": False,
+            "min_size_kb": 256,
+        },
     },
     "provider": [],
     "provider_settings": {
@@ -61,6 +75,42 @@ DEFAULT_CONFIG = {
         "prompt_prefix": "",
         "max_context_length": -1,
         "dequeue_context_length": 1,
+        "max_context_tokens": 0,
+        "rolling_summary": {
+            "enable": False,
+            "provider_id": "",
+            "min_messages": 6,
+        },
+        "tool_call": {
+            "parallel": True,
+            "max_concurrency_per_tool": 4,
+            "timeout": 0,
+            "cache_max_entries": 512,
+            "cache_persist": False,
+        },
+        "tool_routing": {
+            "enable": False,
+            "max_tools": 16,
+            "embedding_provider_id": "",
+            "keyword_rules": [],
+            "always_include": [],
+        },
+        "prompt_cache": True,
+        "response_cache": {
+            "enable": False,
+            "ttl": 3600,
+            "max_entries": 1024,
+            "scope": "persona",
+            "context_messages": 4,
+            "embedding_provider_id": "",
+            "similarity_threshold": 0.95,
+        },
+        "key_pool": {
+            "strategy": "least_loaded",
+            "qps_per_key": 0,
+            "max_cooldown": 60,
+            "max_wait": 30,
+        },
         "streaming_response": False,
         "show_tool_use_status": False,
         "streaming_segmented": False,
@@ -119,6 +169,17 @@ DEFAULT_CONFIG = {
     "persona": [],
     "timezone": "",
     "callback_api_base": "",
+    "media_cache": {
+        "max_size_mb": 1024,
+        "max_age_hours": 72,
+        "encoded_cache_mb": 64,
+    },
+    "media_executor": {
+        "mode": "thread",  # thread, process
+        "max_workers": 0,
+        "queue_size": 64,
+        "timeout": 120,
+    },
 }
 
 
@@ -375,6 +436,12 @@ CONFIG_METADATA_2 = {
                         "description": "是否自动将插件指令注册为 Discord 斜杠指令",
                         "type": "bool",
                     },
+                    "overflow_policy": {
+                        "description": "事件队列溢出策略",
+                        "type": "string",
+                        "options": ["", "block", "drop_oldest", "drop_newest"],
+                        "hint": "可选。事件分发为 worker_pool 模式且事件队列已满时，该平台消息的处理策略。为空时使用 平台设置->事件分发 中的全局策略。",
+                    },
                     "discord_activity_name": {
                         "description": "Discord 活动名称",
                         "type": "string",
@@ -439,6 +506,50 @@ CONFIG_METADATA_2 = {
                         "type": "bool",
                         "hint": "启用后，机器人会忽略 @ 全体成员 的消息事件。",
                     },
+                    "event_dispatch": {
+                        "description": "事件分发",
+                        "type": "object",
+                        "items": {
+                            "mode": {
+                                "description": "分发模式",
+                                "type": "string",
+                                "options": ["unbounded", "worker_pool"],
+                                "hint": "unbounded 为每条消息创建一个任务并发处理(不限制并发数)。worker_pool 为使用固定数量的 worker 处理消息，并限制事件队列的长度，可以在高负载下保持稳定的延迟。修改后需要重启 AstrBot。",
+                            },
+                            "worker_count": {
+                                "description": "worker 数量",
+                                "type": "int",
+                                "hint": "worker_pool 模式下同时处理消息的最大数量。",
+                            },
+                            "queue_size": {
+                                "description": "事件队列长度",
+                                "type": "int",
+                                "hint": "worker_pool 模式下事件队列的最大长度。0 表示不限制。",
+                            },
+                            "overflow_policy": {
+                                "description": "队列溢出策略",
+                                "type": "string",
+                                "options": ["block", "drop_oldest", "drop_newest"],
+                                "hint": "事件队列满时的处理策略。block 为阻塞消息平台直到队列有空位，drop_oldest 为丢弃最旧的消息，drop_newest 为丢弃新消息。可在消息平台配置中通过 overflow_policy 为单个平台单独设置。",
+                            },
+                        },
+                    },
+                    "session_lane": {
+                        "description": "会话顺序执行",
+                        "type": "object",
+                        "items": {
+                            "enable": {
+                                "description": "启用会话顺序执行",
+                                "type": "bool",
+                                "hint": "启用后，同一会话中的消息将按到达顺序依次处理，不同会话之间仍然并行处理。可以避免同一会话的多条消息同时请求 LLM 导致对话历史相互覆盖。",
+                            },
+                            "coalesce_window": {
+                                "description": "消息合并窗口(秒)",
+                                "type": "float",
+                                "hint": "启用会话顺序执行时有效。同一发送者在该时间内连续发送的非指令消息将被合并为一条消息处理，只请求一次 LLM。会使每条消息的响应延迟增加最多该时长。0 表示不合并。",
+                            },
+                        },
+                    },
                     "segmented_reply": {
                         "description": "分段回复",
                         "type": "object",
@@ -533,6 +644,22 @@ CONFIG_METADATA_2 = {
                         "items": {"type": "string"},
                         "hint": "此功能解决由于文件系统不一致导致路径不存在的问题。格式为 <原路径>:<映射路径>。如 `/app/.config/QQ:/var/lib/docker/volumes/xxxx/_data`。这样，当消息平台下发的事件中图片和语音路径以 `/app/.config/QQ` 开头时，开头被替换为 `/var/lib/docker/volumes/xxxx/_data`。这在 AstrBot 或者平台协议端使用 Docker 部署时特别有用。",
                     },
+                    "media_transport": {
+                        "description": "媒体传输",
+                        "type": "object",
+                        "items": {
+                            "by_reference": {
+                                "description": "以链接的形式发送图片和语音",
+                                "type": "bool",
+                                "hint": "启用后，较大的图片和语音将注册到文件服务，以链接的形式发送给协议端(目前支持 aiocqhttp)，由协议端分块下载，不再编码为 base64 放入消息中。需要配置对外可达的回调接口地址(callback_api_base)，并且协议端能够访问该地址。",
+                            },
+                            "min_size_kb": {
+                                "description": "以链接发送的最小文件大小(KB)",
+                                "type": "int",
+                                "hint": "小于该大小的文件仍然以 base64 的形式发送。",
+                            },
+                        },
+                    },
                 },
             },
             "content_safety": {
@@ -814,6 +941,18 @@ CONFIG_METADATA_2 = {
                         "variables": {},
                         "timeout": 60,
                     },
+                    "负载均衡路由": {
+                        "id": "router",
+                        "provider": "router",
+                        "type": "router",
+                        "provider_type": "chat_completion",
+                        "enable": True,
+                        "router_providers": [],
+                        "router_strategy": "weighted",
+                        "router_hedge_after": 0,
+                        "router_failure_threshold": 3,
+                        "router_recovery_time": 30,
+                    },
                     "FastGPT": {
                         "id": "fastgpt",
                         "provider": "fastgpt",
@@ -1013,6 +1152,8 @@ CONFIG_METADATA_2 = {
                         "embedding_api_base": "",
                         "embedding_model": "",
                         "embedding_dimensions": 1024,
+                        "embedding_batch_size": 32,
+                        "embedding_batch_wait_ms": 5,
                         "timeout": 20,
                     },
                     "Gemini Embedding": {
@@ -1025,6 +1166,8 @@ CONFIG_METADATA_2 = {
                         "embedding_api_base": "",
                         "embedding_model": "gemini-embedding-exp-03-07",
                         "embedding_dimensions": 768,
+                        "embedding_batch_size": 32,
+                        "embedding_batch_wait_ms": 5,
                         "timeout": 20,
                     },
                 },
@@ -1171,6 +1314,16 @@ CONFIG_METADATA_2 = {
                         "description": "API Base URL",
                         "type": "string",
                     },
+                    "embedding_batch_size": {
+                        "description": "合并请求的最大文本数量",
+                        "type": "int",
+                        "hint": "将并发的单条嵌入请求合并为一次批量请求，每批最多包含的文本数量。设置为 1 表示不合并。",
+                    },
+                    "embedding_batch_wait_ms": {
+                        "description": "合并请求的等待时间(毫秒)",
+                        "type": "int",
+                        "hint": "首条文本到达后等待其他文本的最长时间。",
+                    },
                     "volcengine_cluster": {
                         "type": "string",
                         "description": "火山引擎集群",
@@ -1510,6 +1663,11 @@ CONFIG_METADATA_2 = {
                         "type": "int",
                         "hint": "超时时间，单位为秒。",
                     },
+                    "max_context_tokens": {
+                        "description": "上下文 token 预算",
+                        "type": "int",
+                        "hint": "该提供商的上下文 token 预算，0 表示使用全局配置。",
+                    },
                     "openai-tts-voice": {
                         "description": "voice",
                         "type": "string",
@@ -1600,6 +1758,34 @@ CONFIG_METADATA_2 = {
                         "hint": "发送的消息文本内容对应的输入变量名。默认为 astrbot_text_query。",
                         "obvious": True,
                     },
+                    "router_providers": {
+                        "description": "路由的提供商",
+                        "type": "list",
+                        "items": {"type": "string"},
+                        "hint": "格式为 <提供商 ID> 或 <提供商 ID>=<权重>，如 `openai=2`。权重默认为 1。不能包含其他负载均衡路由。",
+                        "obvious": True,
+                    },
+                    "router_strategy": {
+                        "description": "负载均衡策略",
+                        "type": "string",
+                        "options": ["weighted", "latency"],
+                        "hint": "weighted: 按权重随机选择提供商。latency: 优先选择最近 p50 延迟最低的提供商。请求失败时依次尝试其他提供商。",
+                    },
+                    "router_hedge_after": {
+                        "description": "对冲请求阈值(秒)",
+                        "type": "float",
+                        "hint": "请求超过该时间未完成(流式请求为未收到首个输出)时，同时请求下一个提供商，使用先返回的结果。0 表示不启用。",
+                    },
+                    "router_failure_threshold": {
+                        "description": "熔断阈值",
+                        "type": "int",
+                        "hint": "提供商连续失败该次数后熔断，熔断期间不再向其发送请求。",
+                    },
+                    "router_recovery_time": {
+                        "description": "熔断时间(秒)",
+                        "type": "int",
+                        "hint": "熔断结束后，提供商会重新接收请求，再次失败时继续熔断。",
+                    },
                 },
             },
             "provider_settings": {
@@ -1671,6 +1857,169 @@ CONFIG_METADATA_2 = {
                         "type": "int",
                         "hint": "超出 最多携带对话数量(条) 时，丢弃多少条记录，用户和AI的一轮聊天记为 1 条。适宜的配置，可以提高超长上下文对话 deepseek 命中缓存效果，理想情况下计费将降低到1/3以下",
                     },
+                    "max_context_tokens": {
+                        "description": "上下文 token 预算",
+                        "type": "int",
+                        "hint": "上下文(包括系统提示词和本轮输入)估算的 token 数量超过预算时，从最旧的一轮对话开始丢弃。0 表示不限制。提供商配置中的 max_context_tokens 优先于此配置。",
+                    },
+                    "rolling_summary": {
+                        "description": "滚动摘要",
+                        "type": "object",
+                        "items": {
+                            "enable": {
+                                "description": "启用滚动摘要",
+                                "type": "bool",
+                                "hint": "启用后，超出上下文限制而被丢弃的旧对话会在后台被压缩为摘要，并附加到系统提示词中，使长对话保留早期的记忆。摘要在回复之后异步更新，不会增加回复延迟，但会额外消耗 token。",
+                            },
+                            "provider_id": {
+                                "description": "摘要提供商 ID",
+                                "type": "string",
+                                "hint": "用于生成摘要的提供商 ID，可以使用更便宜的模型。留空时使用当前对话的提供商。",
+                            },
+                            "min_messages": {
+                                "description": "最少摘要消息数",
+                                "type": "int",
+                                "hint": "新丢弃的消息达到该数量时才更新摘要，一轮对话至少包含 2 条消息。",
+                            },
+                        },
+                    },
+                    "tool_call": {
+                        "description": "函数调用",
+                        "type": "object",
+                        "items": {
+                            "parallel": {
+                                "description": "并行执行工具调用",
+                                "type": "bool",
+                                "hint": "启用后，模型在一轮中请求的多个 MCP 工具和声明了可以并行的插件工具调用将并行执行，结果仍按调用顺序返回。其他插件工具依次执行。",
+                            },
+                            "max_concurrency_per_tool": {
+                                "description": "单个工具最大并发数",
+                                "type": "int",
+                                "hint": "同一个工具同时执行的最大数量。0 表示不限制。",
+                            },
+                            "timeout": {
+                                "description": "工具调用超时时间(秒)",
+                                "type": "float",
+                                "hint": "单次工具调用超过该时间后将被取消，并将超时错误作为结果返回给模型。0 表示不限制(默认)。代码执行、图片生成等耗时较长的工具请设置足够长的时间。",
+                            },
+                            "cache_max_entries": {
+                                "description": "工具结果缓存容量",
+                                "type": "int",
+                                "hint": "内存中最多缓存的工具结果数量，超出后淘汰最久未使用的结果。只有声明了缓存时间(cache_ttl)的工具会被缓存。0 表示不缓存。",
+                            },
+                            "cache_persist": {
+                                "description": "持久化工具结果缓存",
+                                "type": "bool",
+                                "hint": "启用后，工具结果缓存同时保存到 data/tool_cache.db，重启后仍然有效。",
+                            },
+                        },
+                    },
+                    "tool_routing": {
+                        "description": "函数调用工具路由",
+                        "type": "object",
+                        "items": {
+                            "enable": {
+                                "description": "启用工具路由",
+                                "type": "bool",
+                                "hint": "启用后，每次请求只携带与用户输入相关的一部分函数调用工具，以减小请求体积和延迟。适用于安装了大量插件或 MCP 服务的情况。会话和人格的工具白名单不受该开关影响。",
+                            },
+                            "max_tools": {
+                                "description": "每次请求最多携带的工具数量",
+                                "type": "int",
+                                "hint": "工具总数不超过该值时不做筛选。",
+                            },
+                            "embedding_provider_id": {
+                                "description": "Embedding 提供商 ID",
+                                "type": "string",
+                                "hint": "用于计算用户输入与工具描述的向量相似度。不填写时使用基于文本重合度的相似度。",
+                            },
+                            "keyword_rules": {
+                                "description": "关键词规则",
+                                "type": "list",
+                                "items": {"type": "string"},
+                                "hint": "格式为 <关键词1>,<关键词2>=<工具1>,<工具2>。如 `天气,气温=get_weather`。用户输入包含任一关键词时，对应的工具一定会被携带。",
+                            },
+                            "always_include": {
+                                "description": "总是携带的工具",
+                                "type": "list",
+                                "items": {"type": "string"},
+                                "hint": "这些工具每次请求都会被携带。",
+                            },
+                        },
+                    },
+                    "prompt_cache": {
+                        "description": "提示词缓存",
+                        "type": "bool",
+                        "hint": "启用后，对 Anthropic 的请求在工具定义、系统提示词中不变的部分和对话历史上设置缓存断点，重复的前缀按缓存价格计费。OpenAI 和 Gemini 会自动缓存相同的前缀，无需设置。命中缓存的 token 数可以在统计页查看。",
+                    },
+                    "response_cache": {
+                        "description": "LLM 响应缓存",
+                        "type": "object",
+                        "items": {
+                            "enable": {
+                                "description": "启用 LLM 响应缓存",
+                                "type": "bool",
+                                "hint": "启用后，相同的请求(系统提示词、最近的上下文、可用的工具和用户输入均相同)直接返回之前的回复，不再请求 LLM。只缓存不含工具调用的纯文本回复。",
+                            },
+                            "ttl": {
+                                "description": "缓存时间(秒)",
+                                "type": "int",
+                            },
+                            "max_entries": {
+                                "description": "最多缓存的回复数量",
+                                "type": "int",
+                                "hint": "超过后按最近最少使用淘汰。",
+                            },
+                            "scope": {
+                                "description": "缓存共享范围",
+                                "type": "string",
+                                "options": ["global", "persona", "session"],
+                                "hint": "global: 所有会话共享。persona: 使用相同人格的会话共享。session: 每个会话独立。",
+                            },
+                            "context_messages": {
+                                "description": "参与匹配的上下文条数",
+                                "type": "int",
+                                "hint": "最近的多少条上下文需要相同才会命中缓存。0 表示只比较系统提示词和用户输入。",
+                            },
+                            "embedding_provider_id": {
+                                "description": "语义缓存 Embedding 提供商 ID",
+                                "type": "string",
+                                "hint": "填写后启用语义缓存: 精确匹配未命中时，查找用户输入语义相近的请求。需要安装 faiss。",
+                            },
+                            "similarity_threshold": {
+                                "description": "语义缓存相似度阈值",
+                                "type": "float",
+                                "hint": "用户输入的向量相似度不低于该值时命中语义缓存。",
+                            },
+                        },
+                    },
+                    "key_pool": {
+                        "description": "API Key 池",
+                        "type": "object",
+                        "items": {
+                            "strategy": {
+                                "description": "Key 选择策略",
+                                "type": "string",
+                                "options": ["least_loaded", "token_bucket"],
+                                "hint": "提供商配置了多个 API Key 时生效。least_loaded: 选择正在进行的请求最少的 Key。token_bucket: 按每个 Key 的 QPS 限制分配请求。",
+                            },
+                            "qps_per_key": {
+                                "description": "每个 Key 的 QPS 限制",
+                                "type": "float",
+                                "hint": "token_bucket 策略下每个 Key 每秒最多发起的请求数。0 表示不限制。",
+                            },
+                            "max_cooldown": {
+                                "description": "最长冷却时间(秒)",
+                                "type": "int",
+                                "hint": "Key 被限流(429)后进入冷却，优先使用响应中的 Retry-After，否则按指数退避，最长为该值。",
+                            },
+                            "max_wait": {
+                                "description": "最长等待时间(秒)",
+                                "type": "int",
+                                "hint": "所有 Key 都在冷却中时，请求最多等待的时间。超过后返回限流错误。",
+                            },
+                        },
+                    },
                     "streaming_response": {
                         "description": "启用流式回复",
                         "type": "bool",
@@ -1697,6 +2046,7 @@ CONFIG_METADATA_2 = {
                         "prompt": "",
                         "begin_dialogs": [],
                         "mood_imitation_dialogs": [],
+                        "tools": [],
                     }
                 },
                 "tmpl_display_title": "name",
@@ -1723,6 +2073,12 @@ CONFIG_METADATA_2 = {
                         "items": {"type": "string"},
                         "hint": "旨在让模型尽可能模仿学习到所填写的对话的语气风格。格式和 `预设对话` 一致。对话需要成对(用户和助手)，输入完一个角色的内容之后按【回车】。需要偶数个对话",
                     },
+                    "tools": {
+                        "description": "可用的函数调用工具",
+                        "type": "list",
+                        "items": {"type": "string"},
+                        "hint": "可选。使用该人格时只携带这些函数调用工具。`mcp:<服务名>` 表示该 MCP 服务的全部工具。为空时不限制。",
+                    },
                 },
             },
             "provider_stt_settings": {
@@ -1872,6 +2228,54 @@ CONFIG_METADATA_2 = {
                 "type": "string",
                 "hint": "外部服务可能会通过 AstrBot 生成的回调链接（如文件下载链接）访问 AstrBot 后端。由于 AstrBot 无法自动判断部署环境中对外可达的主机地址（host），因此需要通过此配置项显式指定 “外部服务如何访问 AstrBot” 的地址。如 http://localhost:6185，https://example.com 等。",
             },
+            "media_cache": {
+                "description": "媒体缓存",
+                "type": "object",
+                "items": {
+                    "max_size_mb": {
+                        "description": "磁盘缓存大小上限(MB)",
+                        "type": "float",
+                        "hint": "下载和解码得到的图片、语音保存在 data/media_cache 中，相同内容只保存一份。超过上限后删除最久未使用的文件。0 表示不限制。",
+                    },
+                    "max_age_hours": {
+                        "description": "文件保存时间(小时)",
+                        "type": "float",
+                        "hint": "超过该时间未被使用的缓存文件将被删除。0 表示不限制。",
+                    },
+                    "encoded_cache_mb": {
+                        "description": "编码缓存大小上限(MB)",
+                        "type": "float",
+                        "hint": "在内存中缓存图片、语音的 base64 编码，避免每次请求 LLM 或发送消息时重复读取和编码。0 表示不缓存。",
+                    },
+                },
+            },
+            "media_executor": {
+                "description": "媒体处理",
+                "type": "object",
+                "items": {
+                    "mode": {
+                        "description": "执行方式",
+                        "type": "string",
+                        "options": ["thread", "process"],
+                        "hint": "语音编解码、音频格式转换和图片编码等耗时操作在线程池(thread)或进程池(process)中执行，不阻塞消息处理。进程池可以避免占用主进程的 CPU，但启动和传输数据的开销更大。",
+                    },
+                    "max_workers": {
+                        "description": "最大并发数",
+                        "type": "int",
+                        "hint": "同时执行的媒体处理任务数量。0 表示自动(CPU 核心数，最多 4 个)。",
+                    },
+                    "queue_size": {
+                        "description": "队列长度",
+                        "type": "int",
+                        "hint": "最多等待执行的任务数量，超出后新的任务需要等待。",
+                    },
+                    "timeout": {
+                        "description": "超时时间(秒)",
+                        "type": "float",
+                        "hint": "单个媒体处理任务(包括排队时间)的超时时间。0 表示不限制。",
+                    },
+                },
+            },
             "log_level": {
                 "description": "控制台日志级别",
                 "type": "string",
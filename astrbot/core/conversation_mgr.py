@@ -1,5 +1,5 @@
 """
-AstrBot 会话-对话管理器, 维护两个本地存储, 其中一个是 json 格式的shared_preferences, 另外一个是数据库
+AstrBot 会话-对话管理器, 维护两个本地存储, 其中一个是偏好设置存储 shared_preferences, 另外一个是数据库
 
 在 AstrBot 中, 会话和对话是独立的, 会话用于标记对话窗口, 例如群聊"123456789"可以建立一个会话,
 在一个会话中可以建立多个对话, 并且支持对话的切换和删除
@@ -9,7 +9,7 @@ import uuid
 import json
 import asyncio
 from astrbot.core import sp
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from astrbot.core.db import BaseDatabase
 from astrbot.core.db.po import Conversation
 
@@ -47,7 +47,9 @@ class ConversationManager:
             conversation_id (str): 对话 ID, 是 uuid 格式的字符串
         """
         conversation_id = str(uuid.uuid4())
-        self.db.new_conversation(user_id=unified_msg_origin, cid=conversation_id)
+        await self.db.aio.new_conversation(
+            user_id=unified_msg_origin, cid=conversation_id
+        )
         self.session_conversations[unified_msg_origin] = conversation_id
         sp.put("session_conversation", self.session_conversations)
         return conversation_id
@@ -73,7 +75,9 @@ class ConversationManager:
         """
         conversation_id = self.session_conversations.get(unified_msg_origin)
         if conversation_id:
-            self.db.delete_conversation(user_id=unified_msg_origin, cid=conversation_id)
+            await self.db.aio.delete_conversation(
+                user_id=unified_msg_origin, cid=conversation_id
+            )
             del self.session_conversations[unified_msg_origin]
             sp.put("session_conversation", self.session_conversations)
 
@@ -92,23 +96,101 @@ class ConversationManager:
         unified_msg_origin: str,
         conversation_id: str,
         create_if_not_exists: bool = False,
+        with_history: bool = True,
     ) -> Conversation:
         """获取会话的对话
 
         Args:
             unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
             conversation_id (str): 对话 ID, 是 uuid 格式的字符串
+            with_history (bool): 是否加载全部历史记录。为 False 时 history 为 None, 可以通过 get_conversation_messages 按需获取
         Returns:
             conversation (Conversation): 对话对象
         """
-        conv = self.db.get_conversation_by_user_id(unified_msg_origin, conversation_id)
+        conv = await self.db.aio.get_conversation_by_user_id(
+            unified_msg_origin, conversation_id, with_history=with_history
+        )
         if not conv and create_if_not_exists:
             # 如果对话不存在且需要创建，则新建一个对话
             conversation_id = await self.new_conversation(unified_msg_origin)
-            return self.db.get_conversation_by_user_id(
-                unified_msg_origin, conversation_id
+            return await self.db.aio.get_conversation_by_user_id(
+                unified_msg_origin, conversation_id, with_history=with_history
             )
-        return self.db.get_conversation_by_user_id(unified_msg_origin, conversation_id)
+        return conv
+
+    async def get_conversation_messages(
+        self, unified_msg_origin: str, conversation_id: str, limit: int = -1
+    ) -> List[Dict]:
+        """按顺序获取对话最近的 limit 条消息
+
+        Args:
+            unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
+            conversation_id (str): 对话 ID, 是 uuid 格式的字符串
+            limit (int): 消息数量, 小于 0 时获取全部消息
+        """
+        return await self.db.aio.get_conversation_messages(
+            unified_msg_origin, conversation_id, limit
+        )
+
+    async def get_conversation_window(
+        self,
+        unified_msg_origin: str,
+        conversation_id: str,
+        limit: int = -1,
+        max_tokens: int = -1,
+    ) -> List[Tuple[Dict, int]]:
+        """按顺序获取对话最近的消息及其估算的 token 数量
+
+        Args:
+            unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
+            conversation_id (str): 对话 ID, 是 uuid 格式的字符串
+            limit (int): 最多获取的消息数量, 小于 0 表示不限制
+            max_tokens (int): 从最新的消息开始累计的 token 数量上限, 小于 0 表示不限制
+        """
+        return await self.db.aio.get_conversation_window(
+            unified_msg_origin, conversation_id, limit, max_tokens
+        )
+
+    async def get_conversation_message_span(
+        self, unified_msg_origin: str, conversation_id: str, start: int, end: int
+    ) -> List[Dict]:
+        """按顺序获取对话中序号在 [start, end) 之间的消息"""
+        return await self.db.aio.get_conversation_message_span(
+            unified_msg_origin, conversation_id, start, end
+        )
+
+    async def get_conversation_summary(
+        self, unified_msg_origin: str, conversation_id: str
+    ) -> Tuple[str | None, int]:
+        """获取对话的滚动摘要
+
+        Returns:
+            (摘要, 摘要覆盖的消息数量)。没有摘要时返回 (None, 0)
+        """
+        return await self.db.aio.get_conversation_summary(
+            unified_msg_origin, conversation_id
+        )
+
+    async def update_conversation_summary(
+        self,
+        unified_msg_origin: str,
+        conversation_id: str,
+        summary: str,
+        summary_seq: int,
+        prev_seq: int,
+    ) -> bool:
+        """更新对话的滚动摘要。只有摘要覆盖的消息数量仍然是 prev_seq 时才会更新"""
+        return await self.db.aio.update_conversation_summary(
+            unified_msg_origin, conversation_id, summary, summary_seq, prev_seq
+        )
+
+    async def count_conversation_messages(
+        self, unified_msg_origin: str, conversation_id: str
+    ) -> int:
+        """获取对话的消息数量"""
+        return await self.db.aio.count_conversation_messages(
+            unified_msg_origin, conversation_id
+        )
 
     async def get_conversations(self, unified_msg_origin: str) -> List[Conversation]:
         """获取会话的所有对话
@@ -118,12 +200,12 @@ class ConversationManager:
         Returns:
             conversations (List[Conversation]): 对话对象列表
         """
-        return self.db.get_conversations(unified_msg_origin)
+        return await self.db.aio.get_conversations(unified_msg_origin)
 
     async def update_conversation(
         self, unified_msg_origin: str, conversation_id: str, history: List[Dict]
     ):
-        """更新会话的对话
+        """使用 history 替换会话的对话的全部历史记录
 
         Args:
             unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
@@ -131,12 +213,50 @@ class ConversationManager:
             history (List[Dict]): 对话历史记录, 是一个字典列表, 每个字典包含 role 和 content 字段
         """
         if conversation_id:
-            self.db.update_conversation(
+            await self.db.aio.update_conversation(
                 user_id=unified_msg_origin,
                 cid=conversation_id,
                 history=json.dumps(history),
             )
 
+    async def append_conversation_messages(
+        self, unified_msg_origin: str, conversation_id: str, messages: List[Dict]
+    ):
+        """在对话末尾追加消息。与 update_conversation 不同, 只会写入新增的消息
+
+        Args:
+            unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
+            conversation_id (str): 对话 ID, 是 uuid 格式的字符串
+            messages (List[Dict]): 新增的消息, 是一个字典列表, 每个字典包含 role 和 content 字段
+        """
+        if conversation_id and messages:
+            await self.db.aio.append_conversation_messages(
+                user_id=unified_msg_origin, cid=conversation_id, messages=messages
+            )
+
+    async def replace_conversation_messages(
+        self,
+        unified_msg_origin: str,
+        conversation_id: str,
+        start: int,
+        messages: List[Dict],
+    ):
+        """使用 messages 替换对话中从第 start 条(从 0 开始)开始的消息，之前的消息保持不变
+
+        Args:
+            unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
+            conversation_id (str): 对话 ID, 是 uuid 格式的字符串
+            start (int): 被替换的第一条消息的序号
+            messages (List[Dict]): 新的消息, 是一个字典列表, 每个字典包含 role 和 content 字段
+        """
+        if conversation_id:
+            await self.db.aio.replace_conversation_messages(
+                user_id=unified_msg_origin,
+                cid=conversation_id,
+                start=start,
+                messages=messages,
+            )
+
     async def update_conversation_title(self, unified_msg_origin: str, title: str):
         """更新会话的对话标题
 
@@ -146,7 +266,7 @@ class ConversationManager:
         """
         conversation_id = self.session_conversations.get(unified_msg_origin)
         if conversation_id:
-            self.db.update_conversation_title(
+            await self.db.aio.update_conversation_title(
                 user_id=unified_msg_origin, cid=conversation_id, title=title
             )
 
@@ -161,7 +281,7 @@ class ConversationManager:
         """
         conversation_id = self.session_conversations.get(unified_msg_origin)
         if conversation_id:
-            self.db.update_conversation_persona_id(
+            await self.db.aio.update_conversation_persona_id(
                 user_id=unified_msg_origin, cid=conversation_id, persona_id=persona_id
             )
 
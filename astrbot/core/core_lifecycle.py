@@ -14,9 +14,8 @@ import asyncio
 import time
 import threading
 import os
-from .event_bus import EventBus
+from .event_bus import EventBus, EventQueue, DispatchMode
 from . import astrbot_config
-from asyncio import Queue
 from typing import List
 from astrbot.core.pipeline.scheduler import PipelineScheduler, PipelineContext
 from astrbot.core.star import PluginManager
@@ -31,6 +30,13 @@ from astrbot.core.config.default import VERSION
 from astrbot.core.conversation_mgr import ConversationManager
 from astrbot.core.star.star_handler import star_handlers_registry, EventType
 from astrbot.core.star.star_handler import star_map
+from astrbot.core.utils.metrics import metrics_aggregator, system_stats_sampler
+from astrbot.core.provider.tool_cache import tool_result_cache
+from astrbot.core.provider.response_cache import llm_response_cache
+from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.http_client import http_client
+from astrbot.core.utils.media_cache import media_cache
+from astrbot.core.utils.media_executor import media_executor
 
 
 class AstrBotCoreLifecycle:
@@ -67,7 +73,51 @@ class AstrBotCoreLifecycle:
             logger.setLevel(self.astrbot_config["log_level"])  # 设置日志级别
 
         # 初始化事件队列
-        self.event_queue = Queue()
+        dispatch_config = self.astrbot_config["platform_settings"]["event_dispatch"]
+        queue_size = 0
+        if dispatch_config.get("mode") == DispatchMode.WORKER_POOL.value:
+            queue_size = max(0, int(dispatch_config.get("queue_size", 0)))
+        self.event_queue = EventQueue(queue_size, self.astrbot_config)
+
+        # 初始化函数调用工具的结果缓存
+        tool_call_cfg = self.astrbot_config["provider_settings"].get("tool_call", {})
+        tool_result_cache.configure(
+            max_entries=tool_call_cfg.get("cache_max_entries", 512),
+            db_path=os.path.join(get_astrbot_data_path(), "tool_cache.db")
+            if tool_call_cfg.get("cache_persist", False)
+            else None,
+        )
+
+        # 初始化 LLM 响应缓存
+        response_cache_cfg = self.astrbot_config["provider_settings"].get(
+            "response_cache", {}
+        )
+        llm_response_cache.configure(
+            enable=response_cache_cfg.get("enable", False),
+            ttl=response_cache_cfg.get("ttl", 3600),
+            max_entries=response_cache_cfg.get("max_entries", 1024),
+            scope=response_cache_cfg.get("scope", "persona"),
+            context_messages=response_cache_cfg.get("context_messages", 4),
+            similarity_threshold=response_cache_cfg.get("similarity_threshold", 0.95),
+        )
+
+        # 初始化媒体缓存，并启动后台淘汰任务
+        media_cache_cfg = self.astrbot_config.get("media_cache", {})
+        media_cache.configure(
+            max_size_mb=media_cache_cfg.get("max_size_mb", 1024),
+            max_age_hours=media_cache_cfg.get("max_age_hours", 72),
+            encoded_cache_mb=media_cache_cfg.get("encoded_cache_mb", 64),
+        )
+        media_cache.start()
+
+        # 初始化媒体处理执行器
+        media_executor_cfg = self.astrbot_config.get("media_executor", {})
+        media_executor.configure(
+            mode=media_executor_cfg.get("mode", "thread"),
+            max_workers=media_executor_cfg.get("max_workers", 0),
+            queue_size=media_executor_cfg.get("queue_size", 64),
+            timeout=media_executor_cfg.get("timeout", 120),
+        )
 
         # 初始化供应商管理器
         self.provider_manager = ProviderManager(self.astrbot_config, self.db)
@@ -97,6 +147,18 @@ class AstrBotCoreLifecycle:
         # 根据配置实例化各个 Provider
         await self.provider_manager.initialize()
 
+        # 语义缓存依赖 Embedding 提供商
+        if response_cache_cfg.get("enable", False) and (
+            embedding_provider_id := response_cache_cfg.get("embedding_provider_id")
+        ):
+            try:
+                await llm_response_cache.init_semantic(
+                    self.provider_manager.inst_map.get(embedding_provider_id),
+                    os.path.join(get_astrbot_data_path(), "llm_response_cache"),
+                )
+            except Exception as e:
+                logger.error(f"初始化 LLM 语义缓存失败: {e}")
+
         # 初始化消息事件流水线调度器
         self.pipeline_scheduler = PipelineScheduler(
             PipelineContext(self.astrbot_config, self.plugin_manager)
@@ -107,7 +169,9 @@ class AstrBotCoreLifecycle:
         self.astrbot_updator = AstrBotUpdator()
 
         # 初始化事件总线
-        self.event_bus = EventBus(self.event_queue, self.pipeline_scheduler)
+        self.event_bus = EventBus(
+            self.event_queue, self.pipeline_scheduler, dispatch_config
+        )
 
         # 记录启动时间
         self.start_time = int(time.time())
@@ -130,12 +194,19 @@ class AstrBotCoreLifecycle:
             self.event_bus.dispatch(), name="event_bus"
         )
 
+        # 定期写入和上报聚合后的指标
+        metrics_task = asyncio.create_task(metrics_aggregator.run(), name="metrics")
+        # 在后台采样 CPU 和内存占用
+        sampler_task = asyncio.create_task(
+            system_stats_sampler.run(), name="system_stats_sampler"
+        )
+
         # 把插件中注册的所有协程函数注册到事件总线中并执行
         extra_tasks = []
         for task in self.star_context._register_tasks:
             extra_tasks.append(asyncio.create_task(task, name=task.__name__))
 
-        tasks_ = [event_bus_task, *extra_tasks]
+        tasks_ = [event_bus_task, metrics_task, sampler_task, *extra_tasks]
         for task in tasks_:
             self.curr_tasks.append(
                 asyncio.create_task(self._task_wrapper(task), name=task.get_name())
@@ -209,10 +280,21 @@ class AstrBotCoreLifecycle:
             except Exception as e:
                 logger.error(f"任务 {task.get_name()} 发生错误: {e}")
 
+        await metrics_aggregator.shutdown()
+        await media_cache.stop()
+        media_executor.shutdown()
+        await llm_response_cache.close()
+        await http_client.close()
+
     async def restart(self):
         """重启 AstrBot 核心生命周期管理类, 终止各个管理器并重新加载平台实例"""
         await self.provider_manager.terminate()
         await self.platform_manager.terminate()
+        await metrics_aggregator.shutdown()
+        await media_cache.stop()
+        media_executor.shutdown()
+        await llm_response_cache.close()
+        await http_client.close()
         self.dashboard_shutdown_event.set()
         threading.Thread(
             target=self.astrbot_updator._reboot, name="restart", daemon=True
@@ -1,42 +1,90 @@
 import abc
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import List, Dict, Any, Tuple
 from astrbot.core.db.po import Stats, LLMHistory, ATRIVision, Conversation
 
 
+class AsyncDatabase:
+    """数据库的异步视图。
+
+    在线程池中执行数据库的同名方法并等待结果，不会阻塞事件循环。例如:
+
+    ```
+    conv = await db.aio.get_conversation_by_user_id(user_id, cid)
+    ```
+    """
+
+    def __init__(self, db: "BaseDatabase", max_workers: int = 4):
+        self._db = db
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="astrbot_db"
+        )
+
+    def __getattr__(self, name: str):
+        func = getattr(self._db, name)
+        if not callable(func):
+            raise AttributeError(f"{name} 不是数据库的方法")
+
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs)
+            )
+
+        return wrapper
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
 @dataclass
 class BaseDatabase(abc.ABC):
     """
     数据库基类
+
+    所有方法都是同步的。在事件循环中请通过 `aio` 调用，如 `await db.aio.get_conversations(...)`。
     """
 
-    def __init__(self) -> None:
-        pass
+    def __init__(self, max_workers: int = 4) -> None:
+        self.aio = AsyncDatabase(self, max_workers)
+        """异步调用数据库方法"""
 
-    def insert_base_metrics(self, metrics: dict):
+    def insert_base_metrics(self, metrics: dict, timestamp: int = None):
         """插入基础指标数据"""
-        self.insert_platform_metrics(metrics["platform_stats"])
-        self.insert_plugin_metrics(metrics["plugin_stats"])
-        self.insert_command_metrics(metrics["command_stats"])
-        self.insert_llm_metrics(metrics["llm_stats"])
+        self.insert_platform_metrics(metrics["platform_stats"], timestamp)
+        self.insert_plugin_metrics(metrics["plugin_stats"], timestamp)
+        self.insert_command_metrics(metrics["command_stats"], timestamp)
+        self.insert_llm_metrics(metrics["llm_stats"], timestamp)
+
+    def insert_metrics_batch(self, batch: Dict[int, dict]):
+        """批量插入聚合后的指标数据
+
+        Args:
+            batch: 键为时间戳, 值为 insert_base_metrics 格式的指标数据
+        """
+        for timestamp, metrics in batch.items():
+            self.insert_base_metrics(metrics, timestamp)
 
     @abc.abstractmethod
-    def insert_platform_metrics(self, metrics: dict):
-        """插入平台指标数据"""
+    def insert_platform_metrics(self, metrics: dict, timestamp: int = None):
+        """插入平台指标数据。timestamp 为空时使用当前时间"""
         raise NotImplementedError
 
     @abc.abstractmethod
-    def insert_plugin_metrics(self, metrics: dict):
+    def insert_plugin_metrics(self, metrics: dict, timestamp: int = None):
         """插入插件指标数据"""
         raise NotImplementedError
 
     @abc.abstractmethod
-    def insert_command_metrics(self, metrics: dict):
+    def insert_command_metrics(self, metrics: dict, timestamp: int = None):
         """插入指令指标数据"""
         raise NotImplementedError
 
     @abc.abstractmethod
-    def insert_llm_metrics(self, metrics: dict):
+    def insert_llm_metrics(self, metrics: dict, timestamp: int = None):
         """插入 LLM 指标数据"""
         raise NotImplementedError
 
@@ -67,6 +115,32 @@ class BaseDatabase(abc.ABC):
         """获取基础统计数据(合并)"""
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_stat_series(
+        self, kind: str, start: int, bin_size: int
+    ) -> List[Tuple[int, int]]:
+        """从汇总数据中获取 start 之后按 bin_size 秒分组的统计时间序列
+
+        Args:
+            kind: 统计类型, 为 platform, llm 或 command
+            start: 开始时间戳
+            bin_size: 分组的时间间隔(秒)
+
+        Returns:
+            List[Tuple[int, int]]: (分组开始时间戳, 数量) 的列表, 按时间升序排序, 不包含数量为 0 的分组
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_stat_grouped(self, kind: str, start: int) -> Dict[str, int]:
+        """从汇总数据中获取 start 之后各名称的统计数量"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_stat_total(self, kind: str) -> int:
+        """获取某类统计数据的总数"""
+        raise NotImplementedError
+
     @abc.abstractmethod
     def insert_atri_vision_data(self, vision_data: ATRIVision):
         """插入 ATRI 视觉数据"""
@@ -85,8 +159,78 @@ class BaseDatabase(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_conversation_by_user_id(self, user_id: str, cid: str) -> Conversation:
-        """通过 user_id 和 cid 获取 Conversation"""
+    def get_conversation_by_user_id(
+        self, user_id: str, cid: str, with_history: bool = True
+    ) -> Conversation:
+        """通过 user_id 和 cid 获取 Conversation
+
+        Args:
+            with_history: 是否加载全部历史记录。为 False 时，返回的 Conversation 的 history 为 None
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_conversation_messages(
+        self, user_id: str, cid: str, limit: int = -1
+    ) -> List[Dict]:
+        """按顺序获取 Conversation 最近的 limit 条消息，limit 小于 0 时获取全部消息"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_conversation_window(
+        self, user_id: str, cid: str, limit: int = -1, max_tokens: int = -1
+    ) -> List[Tuple[Dict, int]]:
+        """按顺序获取 Conversation 最近的消息及其估算的 token 数量
+
+        Args:
+            limit: 最多获取的消息数量，小于 0 表示不限制
+            max_tokens: 从最新的消息开始累计 token 数量，累计超过 max_tokens 之前的消息都会被获取(包括刚好超出的一条)。小于 0 表示不限制
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_conversation_message_span(
+        self, user_id: str, cid: str, start: int, end: int
+    ) -> List[Dict]:
+        """按顺序获取 Conversation 中序号在 [start, end) 之间的消息"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_conversation_summary(self, user_id: str, cid: str) -> Tuple[str, int]:
+        """获取 Conversation 的滚动摘要
+
+        Returns:
+            (摘要, 摘要覆盖的消息数量)。序号小于该数量的消息都已经被压缩到摘要中。没有摘要时返回 (None, 0)
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def update_conversation_summary(
+        self, user_id: str, cid: str, summary: str, summary_seq: int, prev_seq: int
+    ) -> bool:
+        """更新 Conversation 的滚动摘要
+
+        只有当前摘要覆盖的消息数量仍然是 prev_seq 时才会更新，避免覆盖并发更新的结果。返回是否更新成功
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def count_conversation_messages(self, user_id: str, cid: str) -> int:
+        """获取 Conversation 的消息数量"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def append_conversation_messages(
+        self, user_id: str, cid: str, messages: List[Dict]
+    ):
+        """在 Conversation 末尾追加消息"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def replace_conversation_messages(
+        self, user_id: str, cid: str, start: int, messages: List[Dict]
+    ):
+        """使用 messages 替换 Conversation 中序号不小于 start 的消息，序号小于 start 的消息保持不变"""
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -100,7 +244,7 @@ class BaseDatabase(abc.ABC):
 
     @abc.abstractmethod
     def update_conversation(self, user_id: str, cid: str, history: str):
-        """更新 Conversation"""
+        """使用 history(JSON 字符串) 替换 Conversation 的全部消息"""
         raise NotImplementedError
 
     @abc.abstractmethod
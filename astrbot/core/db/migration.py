@@ -0,0 +1,276 @@
+"""
+SQLite 数据库的版本化迁移
+
+数据库的版本号记录在 `PRAGMA user_version` 中。启动时，版本号大于当前版本的迁移会按顺序执行，
+每个迁移在一个事务中执行，并在同一事务中更新版本号。
+
+新增表结构变更时，在本文件末尾追加一个迁移即可:
+
+```
+@migration(5, "新增 xxx 表")
+def _(c: sqlite3.Cursor):
+    c.execute("CREATE TABLE ...")
+```
+
+早于迁移机制创建的数据库版本号为 0，因此所有迁移都需要是幂等的。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Callable, List
+
+logger = logging.getLogger("astrbot")
+
+STAT_KINDS = ("platform", "llm", "command")
+"""需要汇总的统计数据表"""
+STAT_ROLLUPS = (
+    ("stat_rollup_minute", 60, 4 * 86400),
+    ("stat_rollup_hour", 3600, 60 * 86400),
+    ("stat_rollup_day", 86400, None),
+)
+"""统计数据汇总表: (表名, 时间桶大小(秒), 保留时长(秒), None 表示永久保留)"""
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[sqlite3.Cursor], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    """注册一个迁移。版本号必须递增"""
+
+    def decorator(func: Callable[[sqlite3.Cursor], None]):
+        if MIGRATIONS and MIGRATIONS[-1].version >= version:
+            raise ValueError(f"迁移版本号必须递增: {version}")
+        MIGRATIONS.append(Migration(version, description, func))
+        return func
+
+    return decorator
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """执行所有未执行的迁移，返回执行的迁移数量"""
+    current = get_schema_version(conn)
+    applied = 0
+    for m in MIGRATIONS:
+        if m.version <= current:
+            continue
+        logger.info(f"正在执行数据库迁移 v{m.version}: {m.description}")
+        c = conn.cursor()
+        try:
+            c.execute("BEGIN")
+            m.upgrade(c)
+            c.execute(f"PRAGMA user_version = {m.version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            logger.error(f"数据库迁移 v{m.version} 失败。")
+            raise
+        finally:
+            c.close()
+        applied += 1
+    return applied
+
+
+def _column_names(c: sqlite3.Cursor, table: str) -> List[str]:
+    c.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in c.fetchall()]
+
+
+@migration(1, "初始化数据表")
+def _init_tables(c: sqlite3.Cursor):
+    with open(
+        os.path.join(os.path.dirname(__file__), "sqlite_init.sql"),
+        "r",
+        encoding="utf-8",
+    ) as f:
+        # executescript 会先提交当前事务，sqlite_init.sql 中的语句都是幂等的
+        c.executescript(f.read())
+
+
+@migration(2, "webchat_conversation 新增 title 和 persona_id 字段")
+def _add_conversation_title_persona(c: sqlite3.Cursor):
+    columns = _column_names(c, "webchat_conversation")
+    if "title" not in columns:
+        c.execute("ALTER TABLE webchat_conversation ADD COLUMN title TEXT")
+    if "persona_id" not in columns:
+        c.execute("ALTER TABLE webchat_conversation ADD COLUMN persona_id TEXT")
+
+
+@migration(3, "对话历史逐条存储到 conversation_message 表")
+def _split_conversation_history(c: sqlite3.Cursor):
+    # seq 为消息在对话中的序号，从 0 开始
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS conversation_message(
+            user_id TEXT,
+            cid TEXT,
+            seq INTEGER,
+            content TEXT
+        )
+        """
+    )
+    c.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_conversation_message ON conversation_message(user_id, cid, seq)
+        """
+    )
+    c.execute(
+        """
+        SELECT user_id, cid, history FROM webchat_conversation WHERE history IS NOT NULL
+        """
+    )
+    rows = c.fetchall()
+    for user_id, cid, history in rows:
+        try:
+            messages = json.loads(history) if history else []
+            if not isinstance(messages, list):
+                raise ValueError("history 不是列表")
+        except ValueError as e:
+            logger.warning(f"对话 {user_id} {cid} 的历史记录无法解析，已忽略: {e}")
+            messages = []
+        c.execute(
+            """
+            DELETE FROM conversation_message WHERE user_id = ? AND cid = ?
+            """,
+            (user_id, cid),
+        )
+        c.executemany(
+            """
+            INSERT INTO conversation_message(user_id, cid, seq, content) VALUES (?, ?, ?, ?)
+            """,
+            [
+                (user_id, cid, seq, json.dumps(message))
+                for seq, message in enumerate(messages)
+            ],
+        )
+        c.execute(
+            """
+            UPDATE webchat_conversation SET history = NULL WHERE user_id = ? AND cid = ?
+            """,
+            (user_id, cid),
+        )
+    if rows:
+        logger.info(
+            f"已将 {len(rows)} 个对话的历史记录迁移到 conversation_message 表。"
+        )
+
+
+@migration(4, "为对话和统计数据表添加索引")
+def _add_indexes(c: sqlite3.Cursor):
+    # 旧版本可能存在重复的对话记录，保留每组中最后插入的一条
+    c.execute(
+        """
+        DELETE FROM webchat_conversation WHERE rowid NOT IN (
+            SELECT MAX(rowid) FROM webchat_conversation GROUP BY user_id, cid
+        )
+        """
+    )
+    c.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_webchat_conversation_user_cid ON webchat_conversation(user_id, cid)
+        """
+    )
+    c.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_webchat_conversation_user_updated ON webchat_conversation(user_id, updated_at)
+        """
+    )
+    c.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_webchat_conversation_updated ON webchat_conversation(updated_at)
+        """
+    )
+    for table in ("platform", "llm", "plugin", "command"):
+        c.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table}(timestamp)
+            """
+        )
+    c.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_llm_history_session ON llm_history(session_id, provider_type)
+        """
+    )
+
+
+@migration(5, "新增统计数据的分钟、小时、天汇总表和总计表")
+def _add_stat_rollups(c: sqlite3.Cursor):
+    now = int(time.time())
+    for table, size, retention in STAT_ROLLUPS:
+        c.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table}(
+                kind TEXT,
+                name TEXT,
+                bucket INTEGER,
+                count INTEGER,
+                PRIMARY KEY (kind, name, bucket)
+            )
+            """
+        )
+        c.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table}(bucket)
+            """
+        )
+        since = now - retention if retention else 0
+        for kind in STAT_KINDS:
+            c.execute(
+                f"""
+                INSERT OR REPLACE INTO {table}(kind, name, bucket, count)
+                SELECT ?, name, timestamp / {size} * {size} AS b, SUM(count) FROM {kind}
+                WHERE timestamp >= ? GROUP BY name, b
+                """,
+                (kind, since),
+            )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stat_total(
+            kind TEXT,
+            name TEXT,
+            count INTEGER,
+            PRIMARY KEY (kind, name)
+        )
+        """
+    )
+    for kind in STAT_KINDS:
+        c.execute(
+            f"""
+            INSERT OR REPLACE INTO stat_total(kind, name, count)
+            SELECT ?, name, SUM(count) FROM {kind} GROUP BY name
+            """,
+            (kind,),
+        )
+
+
+@migration(6, "conversation_message 新增 tokens 字段")
+def _add_message_tokens(c: sqlite3.Cursor):
+    # 旧消息的 tokens 为 NULL，在读取时再估算
+    if "tokens" not in _column_names(c, "conversation_message"):
+        c.execute("ALTER TABLE conversation_message ADD COLUMN tokens INTEGER")
+
+
+@migration(7, "webchat_conversation 新增滚动摘要字段")
+def _add_conversation_summary(c: sqlite3.Cursor):
+    # summary_seq 之前(不含)的消息已经被压缩到 summary 中
+    columns = _column_names(c, "webchat_conversation")
+    if "summary" not in columns:
+        c.execute("ALTER TABLE webchat_conversation ADD COLUMN summary TEXT")
+    if "summary_seq" not in columns:
+        c.execute(
+            "ALTER TABLE webchat_conversation ADD COLUMN summary_seq INTEGER DEFAULT 0"
+        )
@@ -82,7 +82,7 @@ class Conversation:
     user_id: str
     cid: str
     history: str = ""
-    """字符串格式的列表。"""
+    """字符串格式的列表。消息实际逐条存储在 conversation_message 表中，此处为其 JSON 序列化结果。"""
     created_at: int = 0
     updated_at: int = 0
     title: str = ""
@@ -1,135 +1,224 @@
 import sqlite3
-import os
 import time
+import json
+import logging
+import threading
+from contextlib import contextmanager
 from astrbot.core.db.po import Platform, Stats, LLMHistory, ATRIVision, Conversation
 from . import BaseDatabase
-from typing import Tuple, List, Dict, Any
+from .migration import run_migrations, STAT_KINDS, STAT_ROLLUPS
+from astrbot.core.utils.token_counter import count_message_tokens
+from typing import Tuple, List, Dict, Any, Iterator
+
+logger = logging.getLogger("astrbot")
 
 
 class SQLiteDatabase(BaseDatabase):
-    def __init__(self, db_path: str) -> None:
-        super().__init__()
+    """基于 SQLite 的数据库实现。
+
+    - 数据库使用 WAL 模式，读写互不阻塞。
+    - 所有写操作通过同一个写连接串行执行，每个方法是一个事务，可以通过 `transaction()` 将多个写操作合并为一个事务。
+    - 读操作使用每个线程独立的只读连接，因此通过 `aio` 在线程池中执行的查询可以并行进行。
+    - 连接是长期复用的，SQL 语句会被连接缓存，无需重复编译。
+    """
+
+    def __init__(self, db_path: str, readers: int = 4) -> None:
+        """
+        Args:
+            db_path: 数据库文件路径
+            readers: 异步调用时使用的线程(只读连接)数量
+        """
+        super().__init__(max_workers=readers)
         self.db_path = db_path
-
-        with open(
-            os.path.dirname(__file__) + "/sqlite_init.sql", "r", encoding="utf-8"
-        ) as f:
-            sql = f.read()
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        self._tx_depth = 0
 
         # 初始化数据库
         self.conn = self._get_conn(self.db_path)
-        c = self.conn.cursor()
-        c.executescript(sql)
-        self.conn.commit()
-
-        # 检查 webchat_conversation 的 title 字段是否存在
-        c.execute(
-            """
-            PRAGMA table_info(webchat_conversation)
-            """
-        )
-        res = c.fetchall()
-        has_title = False
-        has_persona_id = False
-        for row in res:
-            if row[1] == "title":
-                has_title = True
-            if row[1] == "persona_id":
-                has_persona_id = True
-        if not has_title:
-            c.execute(
-                """
-                ALTER TABLE webchat_conversation ADD COLUMN title TEXT;
-                """
-            )
-            self.conn.commit()
-        if not has_persona_id:
-            c.execute(
-                """
-                ALTER TABLE webchat_conversation ADD COLUMN persona_id TEXT;
-                """
-            )
-            self.conn.commit()
-
-        c.close()
+        """写连接"""
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self._write_lock:
+            run_migrations(self.conn)
 
     def _get_conn(self, db_path: str) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(
+            db_path, timeout=10, check_same_thread=False, cached_statements=256
+        )
         conn.text_factory = str
+        conn.execute("PRAGMA synchronous=NORMAL")
         return conn
 
-    def _exec_sql(self, sql: str, params: Tuple = None):
-        conn = self.conn
-        try:
-            c = self.conn.cursor()
-        except sqlite3.ProgrammingError:
-            conn = self._get_conn(self.db_path)
-            c = conn.cursor()
+    def _reader(self) -> sqlite3.Connection:
+        """获取当前线程的只读连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._get_conn(self.db_path)
+            conn.execute("PRAGMA query_only=ON")
+        return conn
 
-        if params:
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        c = self._reader().cursor()
+        try:
             c.execute(sql, params)
-            c.close()
-        else:
-            c.execute(sql)
+            return c.fetchall()
+        finally:
             c.close()
 
-        conn.commit()
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """在写连接上开启一个事务，正常退出时提交，出现异常时回滚。
 
-    def insert_platform_metrics(self, metrics: dict):
-        for k, v in metrics.items():
-            self._exec_sql(
-                """
-                INSERT INTO platform(name, count, timestamp) VALUES (?, ?, ?)
-                """,
-                (k, v, int(time.time())),
-            )
+        事务可以嵌套，嵌套的事务会合并到最外层的事务中，例如批量写入:
 
-    def insert_plugin_metrics(self, metrics: dict):
-        pass
+        ```
+        with db.transaction():
+            db.insert_platform_metrics(...)
+            db.insert_llm_metrics(...)
+        ```
+        """
+        with self._write_lock:
+            self._tx_depth += 1
+            c = self.conn.cursor()
+            try:
+                yield c
+                if self._tx_depth == 1:
+                    self.conn.commit()
+            except BaseException:
+                if self._tx_depth == 1:
+                    self.conn.rollback()
+                raise
+            finally:
+                c.close()
+                self._tx_depth -= 1
 
-    def insert_command_metrics(self, metrics: dict):
-        for k, v in metrics.items():
-            self._exec_sql(
-                """
-                INSERT INTO command(name, count, timestamp) VALUES (?, ?, ?)
+    def _exec_sql(self, sql: str, params: Tuple = None):
+        with self.transaction() as c:
+            if params:
+                c.execute(sql, params)
+            else:
+                c.execute(sql)
+
+    def _insert_counts(self, table: str, metrics: dict, timestamp: int = None):
+        """写入统计数据，并同时更新汇总表和总计"""
+        ts = timestamp or int(time.time())
+        with self.transaction() as c:
+            c.executemany(
+                f"""
+                INSERT INTO {table}(name, count, timestamp) VALUES (?, ?, ?)
                 """,
-                (k, v, int(time.time())),
+                [(k, v, ts) for k, v in metrics.items()],
             )
-
-    def insert_llm_metrics(self, metrics: dict):
-        for k, v in metrics.items():
-            self._exec_sql(
+            for rollup, size, _ in STAT_ROLLUPS:
+                c.executemany(
+                    f"""
+                    INSERT INTO {rollup}(kind, name, bucket, count) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(kind, name, bucket) DO UPDATE SET count = count + excluded.count
+                    """,
+                    [(table, k, ts // size * size, v) for k, v in metrics.items()],
+                )
+            c.executemany(
                 """
-                INSERT INTO llm(name, count, timestamp) VALUES (?, ?, ?)
+                INSERT INTO stat_total(kind, name, count) VALUES (?, ?, ?)
+                ON CONFLICT(kind, name) DO UPDATE SET count = count + excluded.count
                 """,
-                (k, v, int(time.time())),
+                [(table, k, v) for k, v in metrics.items()],
             )
 
+    def insert_platform_metrics(self, metrics: dict, timestamp: int = None):
+        self._insert_counts("platform", metrics, timestamp)
+
+    def insert_plugin_metrics(self, metrics: dict, timestamp: int = None):
+        pass
+
+    def insert_command_metrics(self, metrics: dict, timestamp: int = None):
+        self._insert_counts("command", metrics, timestamp)
+
+    def insert_llm_metrics(self, metrics: dict, timestamp: int = None):
+        self._insert_counts("llm", metrics, timestamp)
+
+    def insert_metrics_batch(self, batch: Dict[int, dict]):
+        # 在一个事务中写入，并顺便清理过期的汇总数据
+        now = int(time.time())
+        with self.transaction() as c:
+            super().insert_metrics_batch(batch)
+            for rollup, _, retention in STAT_ROLLUPS:
+                if retention:
+                    c.execute(
+                        f"""
+                        DELETE FROM {rollup} WHERE bucket < ?
+                        """,
+                        (now - retention,),
+                    )
+
+    def _pick_rollup(self, start: int, bin_size: int) -> Tuple[str, int]:
+        """选择能覆盖 start 之后的数据，并且时间桶能整除 bin_size 的最粗粒度的汇总表"""
+        now = int(time.time())
+        for rollup, size, retention in STAT_ROLLUPS[::-1]:
+            if bin_size % size == 0 and (not retention or start >= now - retention):
+                return rollup, size
+        return STAT_ROLLUPS[-1][:2]
+
+    def get_stat_series(
+        self, kind: str, start: int, bin_size: int
+    ) -> List[Tuple[int, int]]:
+        if kind not in STAT_KINDS:
+            raise ValueError(f"未知的统计类型: {kind}")
+        rollup, _ = self._pick_rollup(start, bin_size)
+        return self._query(
+            f"""
+            SELECT bucket / ? * ? AS b, SUM(count) FROM {rollup}
+            WHERE kind = ? AND bucket >= ? GROUP BY b ORDER BY b
+            """,
+            (bin_size, bin_size, kind, start // bin_size * bin_size),
+        )
+
+    def get_stat_grouped(self, kind: str, start: int) -> Dict[str, int]:
+        if kind not in STAT_KINDS:
+            raise ValueError(f"未知的统计类型: {kind}")
+        # 使用能覆盖 start 之后的数据的最细粒度的汇总表
+        now = int(time.time())
+        rollup, size = next(
+            (rollup, size)
+            for rollup, size, retention in STAT_ROLLUPS
+            if not retention or start >= now - retention
+        )
+        rows = self._query(
+            f"""
+            SELECT name, SUM(count) FROM {rollup} WHERE kind = ? AND bucket >= ? GROUP BY name
+            """,
+            (kind, start // size * size),
+        )
+        return dict(rows)
+
+    def get_stat_total(self, kind: str) -> int:
+        res = self._query(
+            """
+            SELECT SUM(count) FROM stat_total WHERE kind = ?
+            """,
+            (kind,),
+        )
+        return res[0][0] or 0
+
     def update_llm_history(self, session_id: str, content: str, provider_type: str):
-        res = self.get_llm_history(session_id, provider_type)
-        if res:
-            self._exec_sql(
+        with self.transaction() as c:
+            c.execute(
                 """
                 UPDATE llm_history SET content = ? WHERE session_id = ? AND provider_type = ?
                 """,
                 (content, session_id, provider_type),
             )
-        else:
-            self._exec_sql(
-                """
-                INSERT INTO llm_history(provider_type, session_id, content) VALUES (?, ?, ?)
-                """,
-                (provider_type, session_id, content),
-            )
+            if not c.rowcount:
+                c.execute(
+                    """
+                    INSERT INTO llm_history(provider_type, session_id, content) VALUES (?, ?, ?)
+                    """,
+                    (provider_type, session_id, content),
+                )
 
     def get_llm_history(
         self, session_id: str = None, provider_type: str = None
     ) -> Tuple:
-        try:
-            c = self.conn.cursor()
-        except sqlite3.ProgrammingError:
-            c = self._get_conn(self.db_path).cursor()
-
         conditions = []
         params = []
 
@@ -145,146 +234,236 @@ class SQLiteDatabase(BaseDatabase):
         if conditions:
             sql += " WHERE " + " AND ".join(conditions)
 
-        c.execute(sql, params)
-
-        res = c.fetchall()
-        histories = []
-        for row in res:
-            histories.append(LLMHistory(*row))
-        c.close()
-        return histories
+        return [LLMHistory(*row) for row in self._query(sql, tuple(params))]
 
     def get_base_stats(self, offset_sec: int = 86400) -> Stats:
         """获取 offset_sec 秒前到现在的基础统计数据"""
-        where_clause = f" WHERE timestamp >= {int(time.time()) - offset_sec}"
-
-        try:
-            c = self.conn.cursor()
-        except sqlite3.ProgrammingError:
-            c = self._get_conn(self.db_path).cursor()
-
-        c.execute(
-            """
-            SELECT * FROM platform
+        rows = self._query(
             """
-            + where_clause
+            SELECT * FROM platform WHERE timestamp >= ?
+            """,
+            (int(time.time()) - offset_sec,),
         )
-
-        platform = []
-        for row in c.fetchall():
-            platform.append(Platform(*row))
-
-        # c.execute(
-        #     '''
-        #     SELECT * FROM command
-        #     ''' + where_clause
-        # )
-
-        # command = []
-        # for row in c.fetchall():
-        #     command.append(Command(*row))
-
-        # c.execute(
-        #     '''
-        #     SELECT * FROM llm
-        #     ''' + where_clause
-        # )
-
-        # llm = []
-        # for row in c.fetchall():
-        #     llm.append(Provider(*row))
-
-        c.close()
-
+        platform = [Platform(*row) for row in rows]
         return Stats(platform, [], [])
 
     def get_total_message_count(self) -> int:
-        try:
-            c = self.conn.cursor()
-        except sqlite3.ProgrammingError:
-            c = self._get_conn(self.db_path).cursor()
+        return self.get_stat_total("platform")
 
-        c.execute(
-            """
-            SELECT SUM(count) FROM platform
+    def get_grouped_base_stats(self, offset_sec: int = 86400) -> Stats:
+        """获取 offset_sec 秒前到现在的基础统计数据(合并)"""
+        now = int(time.time())
+        grouped = self.get_stat_grouped("platform", now - offset_sec)
+        platform = [Platform(name, count, now) for name, count in grouped.items()]
+        return Stats(platform, [], [])
+
+    def get_conversation_by_user_id(
+        self, user_id: str, cid: str, with_history: bool = True
+    ) -> Conversation:
+        res = self._query(
             """
+            SELECT user_id, cid, created_at, updated_at, title, persona_id FROM webchat_conversation WHERE user_id = ? AND cid = ?
+            """,
+            (user_id, cid),
         )
-        res = c.fetchone()
-        c.close()
-        return res[0]
 
-    def get_grouped_base_stats(self, offset_sec: int = 86400) -> Stats:
-        """获取 offset_sec 秒前到现在的基础统计数据(合并)"""
-        where_clause = f" WHERE timestamp >= {int(time.time()) - offset_sec}"
+        if not res:
+            return
 
-        try:
-            c = self.conn.cursor()
-        except sqlite3.ProgrammingError:
-            c = self._get_conn(self.db_path).cursor()
+        user_id, cid, created_at, updated_at, title, persona_id = res[0]
+        history = None
+        if with_history:
+            history = json.dumps(self.get_conversation_messages(user_id, cid))
+        return Conversation(
+            user_id, cid, history, created_at, updated_at, title, persona_id
+        )
 
-        c.execute(
+    def get_conversation_messages(
+        self, user_id: str, cid: str, limit: int = -1
+    ) -> List[Dict]:
+        if limit is None or limit < 0:
+            rows = self._query(
+                """
+                SELECT content FROM conversation_message WHERE user_id = ? AND cid = ? ORDER BY seq
+                """,
+                (user_id, cid),
+            )
+        else:
+            # 倒序取出最近的 limit 条，再恢复为正序
+            rows = self._query(
+                """
+                SELECT content FROM conversation_message WHERE user_id = ? AND cid = ? ORDER BY seq DESC LIMIT ?
+                """,
+                (user_id, cid, limit),
+            )
+            rows.reverse()
+        return [json.loads(row[0]) for row in rows]
+
+    def get_conversation_window(
+        self, user_id: str, cid: str, limit: int = -1, max_tokens: int = -1
+    ) -> List[Tuple[Dict, int]]:
+        # 倒序累加 token 数量，只取出累计数量在 max_tokens 以内的消息(包括刚好超出的一条)
+        rows = self._query(
             """
-            SELECT name, SUM(count), timestamp FROM platform
+            SELECT content, tokens FROM (
+                SELECT seq, content, tokens, SUM(COALESCE(tokens, 0)) OVER (ORDER BY seq DESC) AS running
+                FROM conversation_message WHERE user_id = ? AND cid = ? ORDER BY seq DESC LIMIT ?
+            ) WHERE ? < 0 OR running - COALESCE(tokens, 0) < ? ORDER BY seq
+            """,
+            (
+                user_id,
+                cid,
+                -1 if limit is None else limit,
+                max_tokens,
+                max_tokens,
+            ),
+        )
+        window = []
+        for content, tokens in rows:
+            message = json.loads(content)
+            if tokens is None:
+                tokens = count_message_tokens(message)
+            window.append((message, tokens))
+        return window
+
+    def get_conversation_message_span(
+        self, user_id: str, cid: str, start: int, end: int
+    ) -> List[Dict]:
+        rows = self._query(
             """
-            + where_clause
-            + " GROUP BY name"
+            SELECT content FROM conversation_message WHERE user_id = ? AND cid = ? AND seq >= ? AND seq < ? ORDER BY seq
+            """,
+            (user_id, cid, start, end),
         )
+        return [json.loads(row[0]) for row in rows]
 
-        platform = []
-        for row in c.fetchall():
-            platform.append(Platform(*row))
-
-        c.close()
-
-        return Stats(platform, [], [])
+    def get_conversation_summary(self, user_id: str, cid: str) -> Tuple[str, int]:
+        res = self._query(
+            """
+            SELECT summary, summary_seq FROM webchat_conversation WHERE user_id = ? AND cid = ?
+            """,
+            (user_id, cid),
+        )
+        if not res:
+            return None, 0
+        return res[0][0], res[0][1] or 0
 
-    def get_conversation_by_user_id(self, user_id: str, cid: str) -> Conversation:
-        try:
-            c = self.conn.cursor()
-        except sqlite3.ProgrammingError:
-            c = self._get_conn(self.db_path).cursor()
+    def update_conversation_summary(
+        self, user_id: str, cid: str, summary: str, summary_seq: int, prev_seq: int
+    ) -> bool:
+        with self.transaction() as c:
+            c.execute(
+                """
+                UPDATE webchat_conversation SET summary = ?, summary_seq = ?
+                WHERE user_id = ? AND cid = ? AND COALESCE(summary_seq, 0) = ?
+                """,
+                (summary, summary_seq, user_id, cid, prev_seq),
+            )
+            return c.rowcount > 0
 
-        c.execute(
+    def count_conversation_messages(self, user_id: str, cid: str) -> int:
+        res = self._query(
             """
-            SELECT * FROM webchat_conversation WHERE user_id = ? AND cid = ?
+            SELECT COUNT(*) FROM conversation_message WHERE user_id = ? AND cid = ?
             """,
             (user_id, cid),
         )
+        return res[0][0]
 
-        res = c.fetchone()
-        c.close()
-
-        if not res:
-            return
+    def append_conversation_messages(
+        self, user_id: str, cid: str, messages: List[Dict]
+    ):
+        """在对话末尾追加消息，并且同时更新时间。对话不存在时不做任何操作"""
+        updated_at = int(time.time())
+        with self.transaction() as c:
+            c.execute(
+                """
+                UPDATE webchat_conversation SET updated_at = ? WHERE user_id = ? AND cid = ?
+                """,
+                (updated_at, user_id, cid),
+            )
+            if c.rowcount:
+                c.execute(
+                    """
+                    SELECT MAX(seq) FROM conversation_message WHERE user_id = ? AND cid = ?
+                    """,
+                    (user_id, cid),
+                )
+                last_seq = c.fetchone()[0]
+                start = 0 if last_seq is None else last_seq + 1
+                self._insert_messages(c, user_id, cid, start, messages)
+
+    def replace_conversation_messages(
+        self, user_id: str, cid: str, start: int, messages: List[Dict]
+    ):
+        """替换序号不小于 start 的消息，并且同时更新时间。滚动摘要只覆盖序号小于 start 的消息时保持不变"""
+        updated_at = int(time.time())
+        start = max(0, start)
+        with self.transaction() as c:
+            c.execute(
+                """
+                UPDATE webchat_conversation SET updated_at = ? WHERE user_id = ? AND cid = ?
+                """,
+                (updated_at, user_id, cid),
+            )
+            if c.rowcount:
+                c.execute(
+                    """
+                    UPDATE webchat_conversation SET summary = NULL, summary_seq = 0
+                    WHERE user_id = ? AND cid = ? AND COALESCE(summary_seq, 0) > ?
+                    """,
+                    (user_id, cid, start),
+                )
+                c.execute(
+                    """
+                    DELETE FROM conversation_message WHERE user_id = ? AND cid = ? AND seq >= ?
+                    """,
+                    (user_id, cid, start),
+                )
+                self._insert_messages(c, user_id, cid, start, messages)
 
-        return Conversation(*res)
+    def _insert_messages(
+        self,
+        c: sqlite3.Cursor,
+        user_id: str,
+        cid: str,
+        start: int,
+        messages: List[Dict],
+    ):
+        c.executemany(
+            """
+            INSERT INTO conversation_message(user_id, cid, seq, content, tokens) VALUES (?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    user_id,
+                    cid,
+                    start + i,
+                    json.dumps(message),
+                    count_message_tokens(message),
+                )
+                for i, message in enumerate(messages)
+            ],
+        )
 
     def new_conversation(self, user_id: str, cid: str):
-        history = "[]"
         updated_at = int(time.time())
         created_at = updated_at
         self._exec_sql(
             """
-            INSERT INTO webchat_conversation(user_id, cid, history, updated_at, created_at) VALUES (?, ?, ?, ?, ?)
+            INSERT INTO webchat_conversation(user_id, cid, updated_at, created_at) VALUES (?, ?, ?, ?)
             """,
-            (user_id, cid, history, updated_at, created_at),
+            (user_id, cid, updated_at, created_at),
         )
 
     def get_conversations(self, user_id: str) -> Tuple:
-        try:
-            c = self.conn.cursor()
-        except sqlite3.ProgrammingError:
-            c = self._get_conn(self.db_path).cursor()
-
-        c.execute(
+        res = self._query(
             """
             SELECT cid, created_at, updated_at, title, persona_id FROM webchat_conversation WHERE user_id = ? ORDER BY updated_at DESC
             """,
             (user_id,),
         )
 
-        res = c.fetchall()
-        c.close()
         conversations = []
         for row in res:
             cid = row[0]
@@ -298,14 +477,24 @@ class SQLiteDatabase(BaseDatabase):
         return conversations
 
     def update_conversation(self, user_id: str, cid: str, history: str):
-        """更新对话，并且同时更新时间"""
+        """使用 history 替换对话的全部消息，并且同时更新时间。消息的序号会变化，因此同时清空滚动摘要"""
+        messages = json.loads(history)
         updated_at = int(time.time())
-        self._exec_sql(
-            """
-            UPDATE webchat_conversation SET history = ?, updated_at = ? WHERE user_id = ? AND cid = ?
-            """,
-            (history, updated_at, user_id, cid),
-        )
+        with self.transaction() as c:
+            c.execute(
+                """
+                UPDATE webchat_conversation SET updated_at = ?, summary = NULL, summary_seq = 0 WHERE user_id = ? AND cid = ?
+                """,
+                (updated_at, user_id, cid),
+            )
+            if c.rowcount:
+                c.execute(
+                    """
+                    DELETE FROM conversation_message WHERE user_id = ? AND cid = ?
+                    """,
+                    (user_id, cid),
+                )
+                self._insert_messages(c, user_id, cid, 0, messages)
 
     def update_conversation_title(self, user_id: str, cid: str, title: str):
         self._exec_sql(
@@ -324,12 +513,19 @@ class SQLiteDatabase(BaseDatabase):
         )
 
     def delete_conversation(self, user_id: str, cid: str):
-        self._exec_sql(
-            """
-            DELETE FROM webchat_conversation WHERE user_id = ? AND cid = ?
-            """,
-            (user_id, cid),
-        )
+        with self.transaction() as c:
+            c.execute(
+                """
+                DELETE FROM conversation_message WHERE user_id = ? AND cid = ?
+                """,
+                (user_id, cid),
+            )
+            c.execute(
+                """
+                DELETE FROM webchat_conversation WHERE user_id = ? AND cid = ?
+                """,
+                (user_id, cid),
+            )
 
     def insert_atri_vision_data(self, vision: ATRIVision):
         ts = int(time.time())
@@ -352,66 +548,41 @@ class SQLiteDatabase(BaseDatabase):
         )
 
     def get_atri_vision_data(self) -> Tuple:
-        try:
-            c = self.conn.cursor()
-        except sqlite3.ProgrammingError:
-            c = self._get_conn(self.db_path).cursor()
-
-        c.execute(
+        res = self._query(
             """
             SELECT * FROM atri_vision
             """
         )
-
-        res = c.fetchall()
-        visions = []
-        for row in res:
-            visions.append(ATRIVision(*row))
-        c.close()
-        return visions
+        return [ATRIVision(*row) for row in res]
 
     def get_atri_vision_data_by_path_or_id(
         self, url_or_path: str, id: str
     ) -> ATRIVision:
-        try:
-            c = self.conn.cursor()
-        except sqlite3.ProgrammingError:
-            c = self._get_conn(self.db_path).cursor()
-
-        c.execute(
+        res = self._query(
             """
             SELECT * FROM atri_vision WHERE url_or_path = ? OR id = ?
             """,
             (url_or_path, id),
         )
-
-        res = c.fetchone()
-        c.close()
         if res:
-            return ATRIVision(*res)
+            return ATRIVision(*res[0])
         return None
 
     def get_all_conversations(
         self, page: int = 1, page_size: int = 20
     ) -> Tuple[List[Dict[str, Any]], int]:
         """获取所有对话，支持分页，按更新时间降序排序"""
-        try:
-            c = self.conn.cursor()
-        except sqlite3.ProgrammingError:
-            c = self._get_conn(self.db_path).cursor()
-
         try:
             # 获取总记录数
-            c.execute("""
+            total_count = self._query("""
                 SELECT COUNT(*) FROM webchat_conversation
-            """)
-            total_count = c.fetchone()[0]
+            """)[0][0]
 
             # 计算偏移量
             offset = (page - 1) * page_size
 
             # 获取分页数据，按更新时间降序排序
-            c.execute(
+            rows = self._query(
                 """
                 SELECT user_id, cid, created_at, updated_at, title, persona_id
                 FROM webchat_conversation
@@ -421,34 +592,32 @@ class SQLiteDatabase(BaseDatabase):
                 (page_size, offset),
             )
 
-            rows = c.fetchall()
-
-            conversations = []
-
-            for row in rows:
-                user_id, cid, created_at, updated_at, title, persona_id = row
-                # 确保 cid 是字符串类型且至少有8个字符，否则使用一个默认值
-                safe_cid = str(cid) if cid else "unknown"
-                display_cid = safe_cid[:8] if len(safe_cid) >= 8 else safe_cid
-
-                conversations.append(
-                    {
-                        "user_id": user_id or "",
-                        "cid": safe_cid,
-                        "title": title or f"对话 {display_cid}",
-                        "persona_id": persona_id or "",
-                        "created_at": created_at or 0,
-                        "updated_at": updated_at or 0,
-                    }
-                )
-
-            return conversations, total_count
+            return self._conversation_rows_to_dicts(rows), total_count
 
         except Exception as _:
             # 返回空列表和0，确保即使出错也有有效的返回值
             return [], 0
-        finally:
-            c.close()
+
+    def _conversation_rows_to_dicts(self, rows: List[Tuple]) -> List[Dict[str, Any]]:
+        conversations = []
+
+        for row in rows:
+            user_id, cid, created_at, updated_at, title, persona_id = row
+            # 确保 cid 是字符串类型且至少有8个字符，否则使用一个默认值
+            safe_cid = str(cid) if cid else "unknown"
+            display_cid = safe_cid[:8] if len(safe_cid) >= 8 else safe_cid
+
+            conversations.append(
+                {
+                    "user_id": user_id or "",
+                    "cid": safe_cid,
+                    "title": title or f"对话 {display_cid}",
+                    "persona_id": persona_id or "",
+                    "created_at": created_at or 0,
+                    "updated_at": updated_at or 0,
+                }
+            )
+        return conversations
 
     def get_filtered_conversations(
         self,
@@ -461,11 +630,6 @@ class SQLiteDatabase(BaseDatabase):
         exclude_platforms: List[str] = None,
     ) -> Tuple[List[Dict[str, Any]], int]:
         """获取筛选后的对话列表"""
-        try:
-            c = self.conn.cursor()
-        except sqlite3.ProgrammingError:
-            c = self._get_conn(self.db_path).cursor()
-
         try:
             # 构建查询条件
             where_clauses = []
@@ -495,7 +659,9 @@ class SQLiteDatabase(BaseDatabase):
             if search_query:
                 search_query = search_query.encode("unicode_escape").decode("utf-8")
                 where_clauses.append(
-                    "(title LIKE ? OR user_id LIKE ? OR cid LIKE ? OR history LIKE ?)"
+                    "(title LIKE ? OR user_id LIKE ? OR cid LIKE ? OR EXISTS ("
+                    "SELECT 1 FROM conversation_message m WHERE m.user_id = webchat_conversation.user_id "
+                    "AND m.cid = webchat_conversation.cid AND m.content LIKE ?))"
                 )
                 search_param = f"%{search_query}%"
                 params.extend([search_param, search_param, search_param, search_param])
@@ -519,8 +685,7 @@ class SQLiteDatabase(BaseDatabase):
             count_sql = f"SELECT COUNT(*) FROM webchat_conversation{where_sql}"
 
             # 获取总记录数
-            c.execute(count_sql, params)
-            total_count = c.fetchone()[0]
+            total_count = self._query(count_sql, tuple(params))[0][0]
 
             # 计算偏移量
             offset = (page - 1) * page_size
@@ -536,32 +701,10 @@ class SQLiteDatabase(BaseDatabase):
             query_params = params + [page_size, offset]
 
             # 获取分页数据
-            c.execute(data_sql, query_params)
-            rows = c.fetchall()
-
-            conversations = []
-
-            for row in rows:
-                user_id, cid, created_at, updated_at, title, persona_id = row
-                # 确保 cid 是字符串类型，否则使用一个默认值
-                safe_cid = str(cid) if cid else "unknown"
-                display_cid = safe_cid[:8] if len(safe_cid) >= 8 else safe_cid
-
-                conversations.append(
-                    {
-                        "user_id": user_id or "",
-                        "cid": safe_cid,
-                        "title": title or f"对话 {display_cid}",
-                        "persona_id": persona_id or "",
-                        "created_at": created_at or 0,
-                        "updated_at": updated_at or 0,
-                    }
-                )
+            rows = self._query(data_sql, tuple(query_params))
 
-            return conversations, total_count
+            return self._conversation_rows_to_dicts(rows), total_count
 
         except Exception as _:
             # 返回空列表和0，确保即使出错也有有效的返回值
             return [], 0
-        finally:
-            c.close()
@@ -47,4 +47,4 @@ CREATE TABLE IF NOT EXISTS webchat_conversation(
     persona_id TEXT
 );
 
-PRAGMA encoding = 'UTF-8';
\ No newline at end of file
+PRAGMA encoding = 'UTF-8';
@@ -37,6 +37,28 @@ class EmbeddingStorage:
         self.storage[id] = vector
         await self.save_index()
 
+    async def insert_many(self, vectors: np.ndarray, ids: list[int]):
+        """批量插入向量，只写入一次索引文件
+
+        Args:
+            vectors (np.ndarray): 要插入的向量，形状为 (n, dimension)
+            ids (list[int]): 向量的ID
+        Raises:
+            ValueError: 如果向量的维度与存储的维度不匹配
+        """
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"向量维度不匹配, 期望: {self.dimension}, 实际: {vectors.shape[-1]}"
+            )
+        if len(ids) != vectors.shape[0]:
+            raise ValueError(
+                f"向量数量与 ID 数量不匹配: {vectors.shape[0]} != {len(ids)}"
+            )
+        self.index.add_with_ids(vectors, np.array(ids, dtype=np.int64))
+        for vector, id in zip(vectors, ids):
+            self.storage[id] = vector
+        await self.save_index()
+
     async def search(self, vector: np.ndarray, k: int) -> tuple:
         """搜索最相似的向量
 
@@ -52,6 +52,68 @@ class FaissVecDB(BaseVecDB):
             await self.embedding_storage.insert(vector, int_id)
             return int_id
 
+    async def insert_many(
+        self,
+        contents: list[str],
+        metadatas: list[dict] = None,
+        ids: list[str] = None,
+        batch_size: int = 64,
+    ) -> list[int]:
+        """
+        批量插入文本和其对应向量。向量按 batch_size 条一批批量获取，文档在同一个事务中写入，索引只写入一次。
+
+        Args:
+            contents (list[str]): 文本
+            metadatas (list[dict]): 每条文本的元数据
+            ids (list[str]): 每条文本的 ID，不指定时自动生成
+            batch_size (int): 每次请求 Embedding 提供商的文本数量
+
+        Returns:
+            list[int]: 插入的文档的整数 ID，与 contents 顺序一致
+        """
+        if not contents:
+            return []
+        metadatas = metadatas or [{} for _ in contents]
+        str_ids = ids or [str(uuid.uuid4()) for _ in contents]
+        if len(metadatas) != len(contents) or len(str_ids) != len(contents):
+            raise ValueError("contents、metadatas 和 ids 的数量必须一致")
+
+        vectors = []
+        for i in range(0, len(contents), max(1, batch_size)):
+            vectors.extend(
+                await self.embedding_provider.get_embeddings(
+                    contents[i : i + batch_size]
+                )
+            )
+        vectors = np.array(vectors, dtype=np.float32)
+
+        connection = self.document_storage.connection
+        async with connection.cursor() as cursor:
+            await cursor.executemany(
+                "INSERT INTO documents (doc_id, text, metadata) VALUES (?, ?, ?)",
+                [
+                    (str_id, content, json.dumps(metadata or {}))
+                    for str_id, content, metadata in zip(str_ids, contents, metadatas)
+                ],
+            )
+            await connection.commit()
+            id_map = {}
+            # SQLite 限制单条语句中的参数数量
+            for i in range(0, len(str_ids), 500):
+                chunk = str_ids[i : i + 500]
+                await cursor.execute(
+                    "SELECT doc_id, id FROM documents WHERE doc_id IN ({})".format(
+                        ",".join("?" * len(chunk))
+                    ),
+                    chunk,
+                )
+                id_map.update(await cursor.fetchall())
+            int_ids = [id_map[str_id] for str_id in str_ids]
+
+        # 批量插入向量到 FAISS
+        await self.embedding_storage.insert_many(vectors, int_ids)
+        return int_ids
+
     async def retrieve(
         self, query: str, k: int = 5, fetch_k: int = 20, metadata_filters: dict = None
     ) -> list[Result]:
@@ -1,43 +1,199 @@
 """
 事件总线, 用于处理事件的分发和处理
 事件总线是一个异步队列, 用于接收各种消息事件, 并将其发送到Scheduler调度器进行处理
-其中包含了一个无限循环的调度函数, 用于从事件队列中获取新的事件, 并创建一个新的异步任务来执行管道调度器的处理逻辑
+其中包含了一个无限循环的调度函数, 用于从事件队列中获取新的事件, 并交由管道调度器处理
 
 class:
+    EventQueue: 事件队列, 支持容量上限以及按平台配置的溢出策略
     EventBus: 事件总线, 用于处理事件的分发和处理
 
 工作流程:
 1. 维护一个异步队列, 来接受各种消息事件
-2. 无限循环的调度函数, 从事件队列中获取新的事件, 打印日志并创建一个新的异步任务来执行管道调度器的处理逻辑
+2. 无限循环的调度函数, 从事件队列中获取新的事件, 打印日志并交由管道调度器处理
+    - unbounded 模式: 每个事件创建一个新的异步任务(旧版行为)
+    - worker_pool 模式: 最多同时处理固定数量(worker_count)的事件, 没有空闲 worker 时事件留在队列中, 队列满时按溢出策略处理
 """
 
 import asyncio
+import enum
+import traceback
 from asyncio import Queue
+from typing import Set
 from astrbot.core.pipeline.scheduler import PipelineScheduler
 from astrbot.core import logger
+from astrbot.core.utils.dispatch_slot import DispatchSlot, bind_dispatch_slot
+from astrbot.core.utils.session_waiter import is_session_waiting
 from .platform import AstrMessageEvent
 
 
+class DispatchMode(enum.Enum):
+    UNBOUNDED = "unbounded"
+    WORKER_POOL = "worker_pool"
+
+
+class OverflowPolicy(enum.Enum):
+    BLOCK = "block"
+    """阻塞适配器, 直到队列中有空位"""
+    DROP_OLDEST = "drop_oldest"
+    """丢弃队列中最旧的事件"""
+    DROP_NEWEST = "drop_newest"
+    """丢弃新到达的事件"""
+
+
+class EventQueue(Queue):
+    """带有溢出策略的事件队列
+
+    - maxsize 为 0 时与 asyncio.Queue 行为一致(无上限)。
+    - 队列满时, 根据事件所属平台配置的 `overflow_policy` 处理。未配置时使用全局默认策略。
+    - WebChat 的事件始终使用 block 策略, 因为管理面板会一直等待其回复。
+    - block 策略只对 `put`(Platform.commit_event_async) 生效。同步的 `put_nowait` 无法等待, 队列满时丢弃新事件。
+    """
+
+    def __init__(self, maxsize: int = 0, config: dict = None):
+        super().__init__(maxsize)
+        self._config = config or {}
+        self.dropped_count = 0
+        """因队列溢出而被丢弃的事件数量"""
+
+    def get_overflow_policy(self, event: AstrMessageEvent) -> OverflowPolicy:
+        """获取事件所属平台的溢出策略"""
+        if event.get_platform_name() == "webchat":
+            return OverflowPolicy.BLOCK
+        platform_id = event.get_platform_id()
+        policy = None
+        for platform in self._config.get("platform", []):
+            if platform.get("id") == platform_id:
+                policy = platform.get("overflow_policy")
+                break
+        if not policy:
+            policy = (
+                self._config.get("platform_settings", {})
+                .get("event_dispatch", {})
+                .get("overflow_policy", OverflowPolicy.BLOCK.value)
+            )
+        try:
+            return OverflowPolicy(policy)
+        except ValueError:
+            return OverflowPolicy.BLOCK
+
+    def _drop(self, event: AstrMessageEvent, reason: str):
+        self.dropped_count += 1
+        logger.warning(
+            f"事件队列已满({self.maxsize})，{reason}: [{event.get_platform_name()}] {event.get_sender_id()}: {event.get_message_outline()}"
+        )
+
+    def put_nowait(self, event: AstrMessageEvent):
+        if not self.full():
+            return super().put_nowait(event)
+
+        policy = self.get_overflow_policy(event)
+        if policy == OverflowPolicy.DROP_NEWEST:
+            self._drop(event, "已丢弃新事件")
+        elif policy == OverflowPolicy.DROP_OLDEST:
+            oldest = self.get_nowait()
+            self.task_done()
+            self._drop(oldest, "已丢弃最旧的事件")
+            super().put_nowait(event)
+        else:
+            # 同步调用方无法等待, 在后台入队会绕过队列上限, 因此直接丢弃
+            self._drop(
+                event, "同步提交无法等待，已丢弃新事件(请使用 commit_event_async)"
+            )
+
+    async def put(self, event: AstrMessageEvent):
+        if self.full() and self.get_overflow_policy(event) != OverflowPolicy.BLOCK:
+            self.put_nowait(event)
+            return
+        await super().put(event)
+
+
 class EventBus:
     """事件总线: 用于处理事件的分发和处理
 
     维护一个异步队列, 来接受各种消息事件
     """
 
-    def __init__(self, event_queue: Queue, pipeline_scheduler: PipelineScheduler):
+    def __init__(
+        self,
+        event_queue: Queue,
+        pipeline_scheduler: PipelineScheduler,
+        dispatch_config: dict = None,
+    ):
         self.event_queue = event_queue  # 事件队列
         self.pipeline_scheduler = pipeline_scheduler  # 管道调度器
 
+        dispatch_config = dispatch_config or {}
+        try:
+            self.mode = DispatchMode(
+                dispatch_config.get("mode", DispatchMode.UNBOUNDED.value)
+            )
+        except ValueError:
+            logger.warning(
+                f"未知的事件分发模式 {dispatch_config.get('mode')}，将使用 unbounded 模式。"
+            )
+            self.mode = DispatchMode.UNBOUNDED
+        self.worker_count = max(1, int(dispatch_config.get("worker_count", 8)))
+
+        self.in_flight = 0
+        """正在执行 pipeline 的事件数量"""
+        self._tasks: Set[asyncio.Task] = set()
+        self._slots: asyncio.Semaphore = None
+
     async def dispatch(self):
-        """无限循环的调度函数, 从事件队列中获取新的事件, 打印日志并创建一个新的异步任务来执行管道调度器的处理逻辑"""
+        """无限循环的调度函数, 从事件队列中获取新的事件, 打印日志并交由管道调度器处理"""
+        if self.mode == DispatchMode.WORKER_POOL:
+            logger.info(
+                f"事件总线以 worker_pool 模式运行，worker 数量: {self.worker_count}"
+            )
+            self._slots = asyncio.Semaphore(self.worker_count)
+
         while True:
             event: AstrMessageEvent = (
                 await self.event_queue.get()
             )  # 从事件队列中获取新的事件
             self._print_event(event)  # 打印日志
-            asyncio.create_task(
-                self.pipeline_scheduler.execute(event)
-            )  # 创建新的异步任务来执行管道调度器的处理逻辑
+            if self._slots and not is_session_waiting(event):
+                # 等待空闲的 worker。正在等待输入的会话的消息不占用 worker, 以免与等待方互相等待
+                await self._slots.acquire()
+                slot_acquired = True
+            else:
+                slot_acquired = False
+            # 创建新的异步任务来执行管道调度器的处理逻辑, 并保留引用以免被垃圾回收
+            task = asyncio.create_task(self._execute(event, slot_acquired))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, event: AstrMessageEvent, slot_acquired: bool = False):
+        slot = None
+        if slot_acquired:
+            slot = DispatchSlot(self._slots)
+            bind_dispatch_slot(slot)
+        self.in_flight += 1
+        try:
+            await self.pipeline_scheduler.execute(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"处理事件时发生错误: {e}")
+            logger.error(traceback.format_exc())
+        finally:
+            self.in_flight -= 1
+            self.event_queue.task_done()
+            if slot:
+                slot.release()
+
+    def get_stats(self) -> dict:
+        """获取事件总线的运行状态, 包括队列深度和正在处理的事件数量"""
+        return {
+            "mode": self.mode.value,
+            "queue_depth": self.event_queue.qsize(),
+            "queue_maxsize": self.event_queue.maxsize,
+            "in_flight": self.in_flight,
+            "worker_count": self.worker_count
+            if self.mode == DispatchMode.WORKER_POOL
+            else 0,
+            "dropped": getattr(self.event_queue, "dropped_count", 0),
+        }
 
     def _print_event(self, event: AstrMessageEvent):
         """用于记录事件信息
@@ -2,14 +2,21 @@ import asyncio
 import os
 import uuid
 import time
+from astrbot.core.utils.media_cache import media_cache
 
 
 class FileTokenService:
-    """维护一个简单的基于令牌的文件下载服务，支持超时和懒清除。"""
+    """维护一个简单的基于令牌的文件下载服务，支持超时和懒清除。
+
+    令牌在过期前可以多次使用，以支持协议端的 Range 分段下载和重试。
+    同一个文件(路径、修改时间和大小均相同)在令牌过期前重复注册时复用同一个令牌。
+    媒体缓存中的文件按内容命名、不会被修改，但每次使用都会更新修改时间，因此只比较路径和大小。
+    """
 
     def __init__(self, default_timeout: float = 300):
         self.lock = asyncio.Lock()
         self.staged_files = {}  # token: (file_path, expire_time)
+        self.file_tokens = {}  # (file_path, mtime_ns, size): token
         self.default_timeout = default_timeout
 
     async def _cleanup_expired_tokens(self):
@@ -18,6 +25,8 @@ class FileTokenService:
         expired_tokens = [token for token, (_, expire) in self.staged_files.items() if expire < now]
         for token in expired_tokens:
             self.staged_files.pop(token, None)
+        if expired_tokens:
+            self.file_tokens = {k: t for k, t in self.file_tokens.items() if t in self.staged_files}
 
     async def register_file(self, file_path: str, timeout: float = None) -> str:
         """向令牌服务注册一个文件。
@@ -27,7 +36,7 @@ class FileTokenService:
             timeout(float): 超时时间，单位秒（可选）
 
         Returns:
-            str: 一个单次令牌
+            str: 令牌，过期前可以多次使用
 
         Raises:
             FileNotFoundError: 当路径不存在时抛出
@@ -38,13 +47,25 @@ class FileTokenService:
             if not os.path.exists(file_path):
                 raise FileNotFoundError(f"文件不存在: {file_path}")
 
-            file_token = str(uuid.uuid4())
             expire_time = time.time() + (timeout if timeout is not None else self.default_timeout)
+            file_path = os.path.abspath(file_path)
+            stat = os.stat(file_path)
+            if media_cache.contains(file_path):
+                key = (file_path, 0, stat.st_size)
+            else:
+                key = (file_path, stat.st_mtime_ns, stat.st_size)
+            file_token = self.file_tokens.get(key)
+            if file_token in self.staged_files:
+                # 复用已有的令牌，并延长到两者中较晚的过期时间
+                expire_time = max(expire_time, self.staged_files[file_token][1])
+            else:
+                file_token = str(uuid.uuid4())
+                self.file_tokens[key] = file_token
             self.staged_files[file_token] = (file_path, expire_time)
             return file_token
 
     async def handle_file(self, file_token: str) -> str:
-        """根据令牌获取文件路径，使用后令牌失效。
+        """根据令牌获取文件路径。令牌在过期前保持有效。
 
         Args:
             file_token(str): 注册时返回的令牌
@@ -62,7 +83,7 @@ class FileTokenService:
             if file_token not in self.staged_files:
                 raise KeyError(f"无效或过期的文件 token: {file_token}")
 
-            file_path, _ = self.staged_files.pop(file_token)
+            file_path, _ = self.staged_files[file_token]
             if not os.path.exists(file_path):
                 raise FileNotFoundError(f"文件不存在: {file_path}")
             return file_path
@@ -34,7 +34,8 @@ from pydantic.v1 import BaseModel
 
 from astrbot.core import astrbot_config, file_token_service, logger
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
-from astrbot.core.utils.io import download_file, download_image_by_url, file_to_base64
+from astrbot.core.utils.io import download_file
+from astrbot.core.utils.media_cache import media_cache
 
 
 class ComponentType(Enum):
@@ -170,25 +171,7 @@ class Record(BaseMessageComponent):
         Returns:
             str: 语音的本地路径，以绝对路径表示。
         """
-        if self.file and self.file.startswith("file:///"):
-            file_path = self.file[8:]
-            return file_path
-        elif self.file and self.file.startswith("http"):
-            file_path = await download_image_by_url(self.file)
-            return os.path.abspath(file_path)
-        elif self.file and self.file.startswith("base64://"):
-            bs64_data = self.file.removeprefix("base64://")
-            image_bytes = base64.b64decode(bs64_data)
-            temp_dir = os.path.join(get_astrbot_data_path(), "temp")
-            file_path = os.path.join(temp_dir, f"{uuid.uuid4()}.jpg")
-            with open(file_path, "wb") as f:
-                f.write(image_bytes)
-            return os.path.abspath(file_path)
-        elif os.path.exists(self.file):
-            file_path = self.file
-            return os.path.abspath(file_path)
-        else:
-            raise Exception(f"not a valid file: {self.file}")
+        return await media_cache.get_path(self.file)
 
     async def convert_to_base64(self) -> str:
         """将语音统一转换为 base64 编码。这个方法避免了手动判断语音数据类型，直接返回语音数据的 base64 编码。
@@ -196,20 +179,7 @@ class Record(BaseMessageComponent):
         Returns:
             str: 语音的 base64 编码，不以 base64:// 或者 data:image/jpeg;base64, 开头。
         """
-        # convert to base64
-        if self.file and self.file.startswith("file:///"):
-            bs64_data = file_to_base64(self.file[8:])
-        elif self.file and self.file.startswith("http"):
-            file_path = await download_image_by_url(self.file)
-            bs64_data = file_to_base64(file_path)
-        elif self.file and self.file.startswith("base64://"):
-            bs64_data = self.file
-        elif os.path.exists(self.file):
-            bs64_data = file_to_base64(self.file)
-        else:
-            raise Exception(f"not a valid file: {self.file}")
-        bs64_data = bs64_data.removeprefix("base64://")
-        return bs64_data
+        return await media_cache.get_base64(self.file)
 
     async def register_to_file_service(self) -> str:
         """
@@ -465,25 +435,7 @@ class Image(BaseMessageComponent):
             str: 图片的本地路径，以绝对路径表示。
         """
         url = self.url if self.url else self.file
-        if url and url.startswith("file:///"):
-            image_file_path = url[8:]
-            return image_file_path
-        elif url and url.startswith("http"):
-            image_file_path = await download_image_by_url(url)
-            return os.path.abspath(image_file_path)
-        elif url and url.startswith("base64://"):
-            bs64_data = url.removeprefix("base64://")
-            image_bytes = base64.b64decode(bs64_data)
-            temp_dir = os.path.join(get_astrbot_data_path(), "temp")
-            image_file_path = os.path.join(temp_dir, f"{uuid.uuid4()}.jpg")
-            with open(image_file_path, "wb") as f:
-                f.write(image_bytes)
-            return os.path.abspath(image_file_path)
-        elif os.path.exists(url):
-            image_file_path = url
-            return os.path.abspath(image_file_path)
-        else:
-            raise Exception(f"not a valid file: {url}")
+        return await media_cache.get_path(url)
 
     async def convert_to_base64(self) -> str:
         """将这个图片统一转换为 base64 编码。这个方法避免了手动判断图片数据类型，直接返回图片数据的 base64 编码。
@@ -491,21 +443,8 @@ class Image(BaseMessageComponent):
         Returns:
             str: 图片的 base64 编码，不以 base64:// 或者 data:image/jpeg;base64, 开头。
         """
-        # convert to base64
         url = self.url if self.url else self.file
-        if url and url.startswith("file:///"):
-            bs64_data = file_to_base64(url[8:])
-        elif url and url.startswith("http"):
-            image_file_path = await download_image_by_url(url)
-            bs64_data = file_to_base64(image_file_path)
-        elif url and url.startswith("base64://"):
-            bs64_data = url
-        elif os.path.exists(url):
-            bs64_data = file_to_base64(url)
-        else:
-            raise Exception(f"not a valid file: {url}")
-        bs64_data = bs64_data.removeprefix("base64://")
-        return bs64_data
+        return await media_cache.get_base64(url)
 
     async def register_to_file_service(self) -> str:
         """
@@ -1,9 +1,14 @@
+import asyncio
+import contextlib
 import sys
 import traceback
 import typing as T
 from .base import BaseAgentRunner, AgentResponse, AgentResponseData, AgentState
 from ...context import PipelineContext
 from astrbot.core.provider.provider import Provider
+from astrbot.core.provider.func_tool_manager import FuncTool
+from astrbot.core.provider.tool_cache import tool_result_cache
+from astrbot.core.provider.response_cache import llm_response_cache
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.message.message_event_result import (
     MessageChain,
@@ -35,6 +40,19 @@ else:
 # 1. 处理平台不兼容的处理器
 
 
+class _ToolOutputs(list):
+    """一次工具调用的输出。设置了 on_message 时，需要发送的消息在产生时立即交给 on_message"""
+
+    def __init__(self, on_message: T.Callable[[MessageChain], None] | None = None):
+        super().__init__()
+        self.on_message = on_message
+
+    def append(self, item):
+        super().append(item)
+        if self.on_message and isinstance(item, MessageChain):
+            self.on_message(item)
+
+
 class ToolLoopAgent(BaseAgentRunner):
     def __init__(
         self, provider: Provider, event: AstrMessageEvent, pipeline_ctx: PipelineContext
@@ -47,6 +65,15 @@ class ToolLoopAgent(BaseAgentRunner):
         self.final_llm_resp = None
         self.streaming = False
 
+        tool_call_cfg = pipeline_ctx.astrbot_config["provider_settings"].get(
+            "tool_call", {}
+        )
+        self.parallel_tool_calls: bool = tool_call_cfg.get("parallel", True)
+        self.max_concurrency_per_tool: int = tool_call_cfg.get(
+            "max_concurrency_per_tool", 4
+        )
+        self.tool_call_timeout: float = tool_call_cfg.get("timeout", 0)
+
     @override
     async def reset(self, req: ProviderRequest, streaming: bool) -> None:
         self.req = req
@@ -62,12 +89,36 @@ class ToolLoopAgent(BaseAgentRunner):
 
     async def _iter_llm_responses(self) -> T.AsyncGenerator[LLMResponse, None]:
         """Yields chunks *and* a final LLMResponse."""
+        request = self.req.__dict__
+        cache_scope = {
+            "persona": self.req.conversation.persona_id or ""
+            if self.req.conversation
+            else "",
+            "session": self.event.unified_msg_origin,
+        }
+        cached = await llm_response_cache.get(self.provider, request, **cache_scope)
+        if cached is not None:
+            logger.debug("命中 LLM 响应缓存。")
+            if self.streaming:
+                yield LLMResponse(
+                    "assistant", completion_text=cached.completion_text, is_chunk=True
+                )
+            yield cached
+            return
+
+        # 调用方在收到最终结果后不再迭代，因此在返回最终结果前写入缓存
         if self.streaming:
-            stream = self.provider.text_chat_stream(**self.req.__dict__)
+            stream = self.provider.text_chat_stream(**request)
             async for resp in stream:  # type: ignore
+                if not resp.is_chunk:
+                    await llm_response_cache.put(
+                        self.provider, request, resp, **cache_scope
+                    )
                 yield resp
         else:
-            yield await self.provider.text_chat(**self.req.__dict__)
+            resp = await self.provider.text_chat(**request)
+            await llm_response_cache.put(self.provider, request, resp, **cache_scope)
+            yield resp
 
     @override
     async def step(self):
@@ -179,124 +230,289 @@ class ToolLoopAgent(BaseAgentRunner):
         req: ProviderRequest,
         llm_response: LLMResponse,
     ) -> T.AsyncGenerator[MessageChain | list[ToolCallMessageSegment], None]:
-        """处理函数工具调用。"""
+        """处理函数工具调用。
+
+        同一轮中连续的 MCP 工具和声明了 `parallel` 的插件工具会并行执行，结果按照工具调用的顺序返回。
+        其他插件工具共享同一个事件(通过 event.set_result 输出结果)，依次单独执行，其发送的消息(如进度提示)会立即返回。
+        """
         tool_call_result_blocks: list[ToolCallMessageSegment] = []
         logger.info(f"Agent 使用工具: {llm_response.tools_call_name}")
+        if not req.func_tool:
+            return
 
-        # 执行函数调用
-        for func_tool_name, func_tool_args, func_tool_id in zip(
+        # 按顺序分批: 连续的可以并行的工具调用为一批，需要顺序执行的工具调用单独为一批
+        batches: list[tuple[bool, list[tuple[str, dict, str]]]] = []
+        for call in zip(
             llm_response.tools_call_name,
             llm_response.tools_call_args,
             llm_response.tools_call_ids,
         ):
-            try:
-                if not req.func_tool:
-                    return
-                func_tool = req.func_tool.get_func(func_tool_name)
-                if func_tool.origin == "mcp":
+            func_tool = req.func_tool.get_func(call[0])
+            sequential = not (
+                self.parallel_tool_calls
+                and func_tool
+                and (func_tool.origin == "mcp" or func_tool.parallel)
+            )
+            if sequential or not batches or batches[-1][0]:
+                batches.append((sequential, [call]))
+            else:
+                batches[-1][1].append(call)
+
+        # 执行函数调用
+        for sequential, calls in batches:
+            if sequential:
+                async for output in self._stream_tool_call(req, *calls[0]):
+                    if isinstance(output, MessageChain):
+                        yield output
+                    else:
+                        tool_call_result_blocks.append(output)
+                continue
+            if len(calls) == 1:
+                results = [await self._call_tool(req, *calls[0])]
+            else:
+                results = await asyncio.gather(
+                    *(self._call_tool(req, *call) for call in calls)
+                )
+            for outputs in results:
+                for output in outputs:
+                    if isinstance(output, MessageChain):
+                        yield output
+                    else:
+                        tool_call_result_blocks.append(output)
+
+        # 处理函数调用响应
+        if tool_call_result_blocks:
+            yield tool_call_result_blocks
+
+    async def _stream_tool_call(
+        self, req: ProviderRequest, *call
+    ) -> T.AsyncGenerator[MessageChain | ToolCallMessageSegment, None]:
+        """执行一个工具调用，需要发送的消息在产生时立即返回，工具调用的结果在执行完成后返回"""
+        messages: asyncio.Queue[MessageChain] = asyncio.Queue()
+        task = asyncio.ensure_future(
+            self._call_tool(req, *call, on_message=messages.put_nowait)
+        )
+        try:
+            while not task.done():
+                getter = asyncio.ensure_future(messages.get())
+                await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+            while not messages.empty():
+                yield messages.get_nowait()
+            for output in task.result():
+                if not isinstance(output, MessageChain):
+                    yield output
+        finally:
+            if not task.done():
+                task.cancel()
+
+    def _tool_semaphore(
+        self, func_tool: FuncTool
+    ) -> asyncio.Semaphore | contextlib.nullcontext:
+        semaphore = func_tool.get_semaphore(self.max_concurrency_per_tool)
+        return semaphore or contextlib.nullcontext()
+
+    async def _call_tool(
+        self,
+        req: ProviderRequest,
+        func_tool_name: str,
+        func_tool_args: dict,
+        func_tool_id: str,
+        on_message: T.Callable[[MessageChain], None] | None = None,
+    ) -> list[MessageChain | ToolCallMessageSegment]:
+        """执行一个工具调用，返回需要发送的消息和工具调用的结果。异常和超时也会作为工具调用的结果返回
+
+        设置了 on_message 时，需要发送的消息在产生时立即交给 on_message。
+        """
+        outputs = _ToolOutputs(on_message)
+        try:
+            func_tool = req.func_tool.get_func(func_tool_name)
+            if not func_tool:
+                raise Exception(f"工具 {func_tool_name} 不存在")
+            if func_tool.cache_ttl > 0:
+                cached = await tool_result_cache.get(
+                    func_tool.name, func_tool_args, self._cache_scope(func_tool)
+                )
+                if cached is not None:
                     logger.info(
-                        f"从 MCP 服务 {func_tool.mcp_server_name} 调用工具函数：{func_tool.name}，参数：{func_tool_args}"
+                        f"工具 {func_tool.name} 命中缓存，参数：{func_tool_args}"
                     )
-                    client = req.func_tool.mcp_client_dict[func_tool.mcp_server_name]
-                    res = await client.session.call_tool(func_tool.name, func_tool_args)
-                    if not res:
-                        continue
-                    if isinstance(res.content[0], TextContent):
-                        tool_call_result_blocks.append(
-                            ToolCallMessageSegment(
-                                role="tool",
-                                tool_call_id=func_tool_id,
-                                content=res.content[0].text,
-                            )
-                        )
-                        yield MessageChain().message(res.content[0].text)
-                    elif isinstance(res.content[0], ImageContent):
-                        tool_call_result_blocks.append(
+                    for content in cached:
+                        outputs.append(
                             ToolCallMessageSegment(
-                                role="tool",
-                                tool_call_id=func_tool_id,
-                                content="返回了图片(已直接发送给用户)",
+                                role="tool", tool_call_id=func_tool_id, content=content
                             )
                         )
-                        yield MessageChain(type="tool_direct_result").base64_image(
-                            res.content[0].data
-                        )
-                    elif isinstance(res.content[0], EmbeddedResource):
-                        resource = res.content[0].resource
-                        if isinstance(resource, TextResourceContents):
-                            tool_call_result_blocks.append(
-                                ToolCallMessageSegment(
-                                    role="tool",
-                                    tool_call_id=func_tool_id,
-                                    content=resource.text,
-                                )
-                            )
-                            yield MessageChain().message(resource.text)
-                        elif (
-                            isinstance(resource, BlobResourceContents)
-                            and resource.mimeType
-                            and resource.mimeType.startswith("image/")
-                        ):
-                            tool_call_result_blocks.append(
-                                ToolCallMessageSegment(
-                                    role="tool",
-                                    tool_call_id=func_tool_id,
-                                    content="返回了图片(已直接发送给用户)",
-                                )
-                            )
-                            yield MessageChain(type="tool_direct_result").base64_image(
-                                res.content[0].data
-                            )
-                        else:
-                            tool_call_result_blocks.append(
-                                ToolCallMessageSegment(
-                                    role="tool",
-                                    tool_call_id=func_tool_id,
-                                    content="返回的数据类型不受支持",
-                                )
-                            )
-                            yield MessageChain().message("返回的数据类型不受支持。")
-                else:
-                    logger.info(f"使用工具：{func_tool_name}，参数：{func_tool_args}")
-                    # 尝试调用工具函数
-                    wrapper = self.pipeline_ctx.call_handler(
-                        self.event, func_tool.handler, **func_tool_args
+                        outputs.append(MessageChain().message(content))
+                    return outputs
+            async with self._tool_semaphore(func_tool):
+                await asyncio.wait_for(
+                    self._execute_tool(
+                        req, func_tool, func_tool_args, func_tool_id, outputs
+                    ),
+                    timeout=self.tool_call_timeout or None,
+                )
+            self.event.clear_result()
+            if func_tool.cache_ttl > 0:
+                await self._cache_outputs(func_tool, func_tool_args, outputs)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"工具 {func_tool_name} 调用超时({self.tool_call_timeout} 秒)。"
+            )
+            outputs.append(
+                ToolCallMessageSegment(
+                    role="tool",
+                    tool_call_id=func_tool_id,
+                    content=f"error: 工具调用超时({self.tool_call_timeout} 秒)",
+                )
+            )
+        except Exception as e:
+            logger.warning(traceback.format_exc())
+            outputs.append(
+                ToolCallMessageSegment(
+                    role="tool",
+                    tool_call_id=func_tool_id,
+                    content=f"error: {str(e)}",
+                )
+            )
+        return outputs
+
+    def _cache_scope(self, func_tool: FuncTool) -> str:
+        """插件工具的处理函数可以访问事件，结果可能与会话有关，缓存按会话隔离"""
+        if func_tool.origin == "mcp":
+            return ""
+        return self.event.unified_msg_origin
+
+    async def _cache_outputs(
+        self,
+        func_tool: FuncTool,
+        func_tool_args: dict,
+        outputs: list[MessageChain | ToolCallMessageSegment],
+    ):
+        """缓存工具返回的文本结果。直接发送给用户的结果(如图片)不会被缓存"""
+        contents = []
+        for output in outputs:
+            if isinstance(output, MessageChain):
+                if output.type == "tool_direct_result":
+                    return
+            elif isinstance(output.content, str):
+                contents.append(output.content)
+            else:
+                return
+        if contents and self._state != AgentState.DONE:
+            await tool_result_cache.put(
+                func_tool.name,
+                func_tool_args,
+                contents,
+                func_tool.cache_ttl,
+                self._cache_scope(func_tool),
+            )
+
+    async def _execute_tool(
+        self,
+        req: ProviderRequest,
+        func_tool: FuncTool,
+        func_tool_args: dict,
+        func_tool_id: str,
+        outputs: list[MessageChain | ToolCallMessageSegment],
+    ):
+        """执行工具，将需要发送的消息和工具调用的结果依次放入 outputs"""
+        if func_tool.origin == "mcp":
+            logger.info(
+                f"从 MCP 服务 {func_tool.mcp_server_name} 调用工具函数：{func_tool.name}，参数：{func_tool_args}"
+            )
+            client = req.func_tool.mcp_client_dict[func_tool.mcp_server_name]
+            res = await client.session.call_tool(func_tool.name, func_tool_args)
+            if not res:
+                return
+            if isinstance(res.content[0], TextContent):
+                outputs.append(
+                    ToolCallMessageSegment(
+                        role="tool",
+                        tool_call_id=func_tool_id,
+                        content=res.content[0].text,
                     )
-                    async for resp in wrapper:
-                        if resp is not None:
-                            # Tool 返回结果
-                            tool_call_result_blocks.append(
-                                ToolCallMessageSegment(
-                                    role="tool",
-                                    tool_call_id=func_tool_id,
-                                    content=resp,
-                                )
-                            )
-                            yield MessageChain().message(resp)
-                        else:
-                            # Tool 直接请求发送消息给用户
-                            # 这里我们将直接结束 Agent Loop。
-                            self._transition_state(AgentState.DONE)
-                            if res := self.event.get_result():
-                                if res.chain:
-                                    yield MessageChain(
-                                        chain=res.chain, type="tool_direct_result"
-                                    )
-
-                self.event.clear_result()
-            except Exception as e:
-                logger.warning(traceback.format_exc())
-                tool_call_result_blocks.append(
+                )
+                outputs.append(MessageChain().message(res.content[0].text))
+            elif isinstance(res.content[0], ImageContent):
+                outputs.append(
                     ToolCallMessageSegment(
                         role="tool",
                         tool_call_id=func_tool_id,
-                        content=f"error: {str(e)}",
+                        content="返回了图片(已直接发送给用户)",
                     )
                 )
-
-        # 处理函数调用响应
-        if tool_call_result_blocks:
-            yield tool_call_result_blocks
+                outputs.append(
+                    MessageChain(type="tool_direct_result").base64_image(
+                        res.content[0].data
+                    )
+                )
+            elif isinstance(res.content[0], EmbeddedResource):
+                resource = res.content[0].resource
+                if isinstance(resource, TextResourceContents):
+                    outputs.append(
+                        ToolCallMessageSegment(
+                            role="tool",
+                            tool_call_id=func_tool_id,
+                            content=resource.text,
+                        )
+                    )
+                    outputs.append(MessageChain().message(resource.text))
+                elif (
+                    isinstance(resource, BlobResourceContents)
+                    and resource.mimeType
+                    and resource.mimeType.startswith("image/")
+                ):
+                    outputs.append(
+                        ToolCallMessageSegment(
+                            role="tool",
+                            tool_call_id=func_tool_id,
+                            content="返回了图片(已直接发送给用户)",
+                        )
+                    )
+                    outputs.append(
+                        MessageChain(type="tool_direct_result").base64_image(
+                            res.content[0].data
+                        )
+                    )
+                else:
+                    outputs.append(
+                        ToolCallMessageSegment(
+                            role="tool",
+                            tool_call_id=func_tool_id,
+                            content="返回的数据类型不受支持",
+                        )
+                    )
+                    outputs.append(MessageChain().message("返回的数据类型不受支持。"))
+        else:
+            logger.info(f"使用工具：{func_tool.name}，参数：{func_tool_args}")
+            # 尝试调用工具函数
+            wrapper = self.pipeline_ctx.call_handler(
+                self.event, func_tool.handler, **func_tool_args
+            )
+            async for resp in wrapper:
+                if resp is not None:
+                    # Tool 返回结果
+                    outputs.append(
+                        ToolCallMessageSegment(
+                            role="tool",
+                            tool_call_id=func_tool_id,
+                            content=resp,
+                        )
+                    )
+                    outputs.append(MessageChain().message(resp))
+                else:
+                    # Tool 直接请求发送消息给用户
+                    # 这里我们将直接结束 Agent Loop。
+                    self._transition_state(AgentState.DONE)
+                    if res := self.event.get_result():
+                        if res.chain:
+                            outputs.append(
+                                MessageChain(chain=res.chain, type="tool_direct_result")
+                            )
 
     def done(self) -> bool:
         """检查 Agent 是否已完成工作"""
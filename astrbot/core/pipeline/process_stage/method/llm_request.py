@@ -8,6 +8,7 @@ import json
 import traceback
 from typing import AsyncGenerator, Union
 from astrbot.core import logger
+from astrbot.core.db.po import Conversation
 from astrbot.core.message.components import Image
 from astrbot.core.message.message_event_result import (
     MessageChain,
@@ -16,15 +17,22 @@ from astrbot.core.message.message_event_result import (
 )
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.provider import Provider
+from astrbot.core.provider.context_window import ContextWindow
 from astrbot.core.provider.entities import (
     LLMResponse,
     ProviderRequest,
 )
+from astrbot.core.provider.func_tool_manager import FuncCall
+from astrbot.core.provider.provider import EmbeddingProvider
+from astrbot.core.provider.response_cache import llm_response_cache
+from astrbot.core.provider.tool_router import ToolRouter
 from astrbot.core.star.session_llm_manager import SessionServiceManager
 from astrbot.core.star.star_handler import EventType
 from astrbot.core.utils.metrics import Metric
+from astrbot.core.utils.token_counter import IMAGE_TOKENS, get_tokenizer
 from ...context import PipelineContext
 from ..agent_runner.tool_loop_agent import ToolLoopAgent
+from ..summarizer import RollingSummarizer
 from ..stage import Stage
 
 
@@ -40,6 +48,7 @@ class LLMRequestSubStage(Stage):
             max(1, settings["dequeue_context_length"]),
             self.max_context_length - 1,
         )
+        self.max_context_tokens: int = settings.get("max_context_tokens", 0)
         self.streaming_response: bool = settings["streaming_response"]
         self.max_step: int = settings.get("max_agent_step", 10)
         self.show_tool_use: bool = settings.get("show_tool_use_status", True)
@@ -53,6 +62,29 @@ class LLMRequestSubStage(Stage):
 
         self.conv_manager = ctx.plugin_manager.context.conversation_manager
 
+        # 滚动摘要
+        summary_cfg = settings.get("rolling_summary", {})
+        self.summary_enabled: bool = summary_cfg.get("enable", False)
+        self.summary_provider_id: str = summary_cfg.get("provider_id", "")
+        self.summarizer = RollingSummarizer(
+            self.conv_manager,
+            min_messages=max(1, summary_cfg.get("min_messages", 6)),
+        )
+
+        # 工具路由。未启用时仍然应用会话和人格的工具白名单
+        routing_cfg = settings.get("tool_routing", {})
+        self.tool_routing_enabled: bool = routing_cfg.get("enable", False)
+        self.tool_routing_embedding_provider_id: str = routing_cfg.get(
+            "embedding_provider_id", ""
+        )
+        self.tool_router = ToolRouter(
+            max_tools=routing_cfg.get("max_tools", 16)
+            if self.tool_routing_enabled
+            else 0,
+            keyword_rules=routing_cfg.get("keyword_rules", []),
+            always_include=routing_cfg.get("always_include", []),
+        )
+
     def _select_provider(self, event: AstrMessageEvent) -> Provider | None:
         """选择使用的 LLM 提供商"""
         sel_provider = event.get_extra("selected_provider")
@@ -69,6 +101,7 @@ class LLMRequestSubStage(Stage):
         self, event: AstrMessageEvent, _nested: bool = False
     ) -> Union[None, AsyncGenerator[None, None]]:
         req: ProviderRequest | None = None
+        loaded_contexts: list[dict] = []
 
         if not self.ctx.astrbot_config["provider_settings"]["enable"]:
             logger.debug("未启用 LLM 能力，跳过处理。")
@@ -82,6 +115,7 @@ class LLMRequestSubStage(Stage):
         provider = self._select_provider(event)
         if provider is None:
             return
+        window = self._create_context_window(provider)
 
         if event.get_extra("provider_request"):
             req = event.get_extra("provider_request")
@@ -90,7 +124,8 @@ class LLMRequestSubStage(Stage):
             )
 
             if req.conversation:
-                req.contexts = json.loads(req.conversation.history)
+                req.contexts = await self._load_contexts(req.conversation, window)
+                loaded_contexts = copy.deepcopy(req.contexts)
 
         else:
             req = ProviderRequest(prompt="", image_urls=[])
@@ -115,27 +150,40 @@ class LLMRequestSubStage(Stage):
                     event.unified_msg_origin
                 )
             conversation = await self.conv_manager.get_conversation(
-                event.unified_msg_origin, conversation_id
+                event.unified_msg_origin, conversation_id, with_history=False
             )
             if not conversation:
                 conversation_id = await self.conv_manager.new_conversation(
                     event.unified_msg_origin
                 )
                 conversation = await self.conv_manager.get_conversation(
-                    event.unified_msg_origin, conversation_id
+                    event.unified_msg_origin, conversation_id, with_history=False
                 )
             req.conversation = conversation
-            req.contexts = json.loads(conversation.history)
+            req.contexts = await self._load_contexts(conversation, window)
+            loaded_contexts = copy.deepcopy(req.contexts)
 
             event.set_extra("provider_request", req)
 
         if not req.prompt and not req.image_urls:
             return
 
+        # 被丢弃的旧消息的摘要
+        summary = None
+        if self.summary_enabled and req.conversation and window.offset > 0:
+            summary, _ = await self.conv_manager.get_conversation_summary(
+                req.conversation.user_id, req.conversation.cid
+            )
+
         # 执行请求 LLM 前事件钩子。
         if await self.ctx.call_event_hook(event, EventType.OnLLMRequestEvent, req):
             return
 
+        if summary:
+            req.system_prompt += (
+                f"\nHere is a summary of the earlier conversation:\n{summary}\n"
+            )
+
         if isinstance(req.contexts, str):
             req.contexts = json.loads(req.contexts)
 
@@ -160,12 +208,31 @@ class LLMRequestSubStage(Stage):
             if index is not None and index > 0:
                 req.contexts = req.contexts[index:]
 
+        # token 预算
+        if window.enabled:
+            reserved = (
+                window.count_text(req.system_prompt)
+                + window.count_text(req.prompt)
+                + len(req.image_urls or []) * IMAGE_TOKENS
+            )
+            fitted = window.fit(req.contexts, reserved)
+            if len(fitted) < len(req.contexts):
+                logger.debug(
+                    f"上下文超过 token 预算 {window.max_tokens}，丢弃了最旧的 {len(req.contexts) - len(fitted)} 条消息。"
+                )
+                req.contexts = fitted
+
+        # 为本次请求选择工具子集
+        if req.func_tool and not req.func_tool.empty():
+            req.func_tool = await self._route_tools(event, req)
+
         # session_id
         if not req.session_id:
             req.session_id = event.unified_msg_origin
 
         # fix messages
         req.contexts = self.fix_messages(req.contexts)
+        dropped = self._dropped_message_count(req, loaded_contexts, window)
 
         # Call Agent
         tool_loop_agent = ToolLoopAgent(
@@ -273,23 +340,155 @@ class LLMRequestSubStage(Stage):
         if event.get_platform_name() == "webchat":
             asyncio.create_task(self._handle_webchat(event, req, provider))
 
-        await self._save_to_history(event, req, tool_loop_agent.get_final_llm_resp())
+        await self._save_to_history(
+            event,
+            req,
+            tool_loop_agent.get_final_llm_resp(),
+            loaded_contexts,
+            window.offset,
+        )
+
+        # 在后台将这次没有发送给 LLM 的旧消息合并到摘要中
+        if self.summary_enabled and dropped:
+            summary_provider = provider
+            if self.summary_provider_id:
+                summary_provider = (
+                    self.ctx.plugin_manager.context.get_provider_by_id(
+                        self.summary_provider_id
+                    )
+                    or provider
+                )
+            self.summarizer.schedule(
+                summary_provider,
+                req.conversation.user_id,
+                req.conversation.cid,
+                dropped,
+            )
+
+    def _context_window_size(self, total: int) -> int:
+        """计算有 total 条消息的对话在截断后会保留的消息数量。
+
+        与按轮次截断的效果一致: 超过 max_context_length 轮时一次性丢弃 dequeue_context_length 轮。
+        """
+        if self.max_context_length == -1 or total // 2 <= self.max_context_length:
+            return total
+        keep = (self.max_context_length - self.dequeue_context_length + 1) * 2
+        if self.dequeue_context_length < 1:
+            return min(total, keep)
+        return keep + (total - keep) % (self.dequeue_context_length * 2)
+
+    async def _route_tools(
+        self, event: AstrMessageEvent, req: ProviderRequest
+    ) -> FuncCall:
+        """根据会话和人格的工具白名单以及工具路由配置，筛选本次请求携带的工具"""
+        allowlists = []
+        session_tools = SessionServiceManager.get_session_tool_allowlist(
+            event.unified_msg_origin
+        )
+        if session_tools is not None:
+            allowlists.append(session_tools)
+        persona = self._get_persona(req.conversation)
+        if persona and persona.get("tools"):
+            allowlists.append(persona["tools"])
+
+        embedding_provider = None
+        if self.tool_routing_enabled and self.tool_routing_embedding_provider_id:
+            embedding_provider = self.ctx.plugin_manager.context.get_provider_by_id(
+                self.tool_routing_embedding_provider_id
+            )
+            if not isinstance(embedding_provider, EmbeddingProvider):
+                embedding_provider = None
+
+        func_tool = await self.tool_router.select(
+            req.func_tool, req.prompt, allowlists, embedding_provider
+        )
+        if func_tool is not req.func_tool:
+            logger.debug(
+                f"工具路由: 从 {len(req.func_tool.func_list)} 个工具中选择了 {[f.name for f in func_tool.func_list]}"
+            )
+        return func_tool
+
+    def _get_persona(self, conversation: Conversation | None) -> dict | None:
+        """获取对话使用的人格。[%None] 表示用户取消了人格"""
+        provider_manager = self.ctx.plugin_manager.context.provider_manager
+        persona_id = conversation.persona_id if conversation else None
+        if persona_id == "[%None]":
+            return None
+        if not persona_id:
+            return provider_manager.selected_default_persona
+        return next(
+            (p for p in provider_manager.personas if p["name"] == persona_id), None
+        )
+
+    def _create_context_window(self, provider: Provider) -> ContextWindow:
+        """提供商配置中的 max_context_tokens 优先于全局配置"""
+        max_tokens = (
+            provider.provider_config.get("max_context_tokens")
+            or self.max_context_tokens
+        )
+        return ContextWindow(
+            max_tokens, get_tokenizer(provider.provider_config.get("type", ""))
+        )
+
+    def _dropped_message_count(
+        self, req: ProviderRequest, loaded_contexts: list[dict], window: ContextWindow
+    ) -> int:
+        """计算对话中有多少条最旧的消息没有被发送给 LLM。上下文被插件修改过时返回 0"""
+        if not req.conversation:
+            return 0
+        contexts = [item for item in req.contexts if "_no_save" not in item]
+        if not contexts and loaded_contexts:
+            # 上下文被插件清空，对话历史会被重置
+            return 0
+        if contexts != loaded_contexts[len(loaded_contexts) - len(contexts) :]:
+            return 0
+        return window.offset + len(loaded_contexts) - len(contexts)
+
+    async def _load_contexts(
+        self, conversation: Conversation, window: ContextWindow
+    ) -> list[dict]:
+        """从数据库中只加载截断后会保留的最近消息作为上下文"""
+        total = await self.conv_manager.count_conversation_messages(
+            conversation.user_id, conversation.cid
+        )
+        limit = self._context_window_size(total)
+        rows = await self.conv_manager.get_conversation_window(
+            conversation.user_id,
+            conversation.cid,
+            limit,
+            window.max_tokens if window.enabled else -1,
+        )
+        contexts = []
+        for message, tokens in rows:
+            window.remember(message, tokens)
+            contexts.append(message)
+        if len(contexts) < total:
+            # 找到第一个role 为 user 的索引，确保上下文格式正确
+            index = next(
+                (i for i, item in enumerate(contexts) if item.get("role") == "user"),
+                None,
+            )
+            if index is not None and index > 0:
+                contexts = contexts[index:]
+        window.offset = total - len(contexts)
+        # 兼容通过 req.conversation.history 读取上下文的插件
+        conversation.history = json.dumps(contexts)
+        return contexts
 
     async def _handle_webchat(
         self, event: AstrMessageEvent, req: ProviderRequest, prov: Provider
     ):
         """处理 WebChat 平台的特殊情况，包括第一次 LLM 对话时总结对话内容生成 title"""
-        conversation = await self.conv_manager.get_conversation(
-            event.unified_msg_origin, req.conversation.cid
-        )
-        if conversation and not req.conversation.title:
-            messages = json.loads(conversation.history)
-            latest_pair = messages[-2:]
+        if not req.conversation.title:
+            latest_pair = await self.conv_manager.get_conversation_messages(
+                event.unified_msg_origin, req.conversation.cid, limit=2
+            )
             if not latest_pair:
                 return
             cleaned_text = "User: " + latest_pair[0].get("content", "").strip()
             logger.debug(f"WebChat 对话标题生成请求，清理后的文本: {cleaned_text}")
-            llm_resp = await prov.text_chat(
+            llm_resp = await llm_response_cache.text_chat(
+                prov,
                 system_prompt="You are expert in summarizing user's query.",
                 prompt=(
                     f"Please summarize the following query of user:\n"
@@ -315,7 +514,7 @@ class LLMRequestSubStage(Stage):
                 if event.session_id:
                     username, cid = event.session_id.split("!")[1:3]
                     db_helper = self.ctx.plugin_manager.context._db
-                    db_helper.update_conversation_title(
+                    await db_helper.aio.update_conversation_title(
                         user_id=username,
                         cid=cid,
                         title=title,
@@ -326,7 +525,17 @@ class LLMRequestSubStage(Stage):
         event: AstrMessageEvent,
         req: ProviderRequest,
         llm_response: LLMResponse | None,
+        loaded_contexts: list[dict],
+        offset: int = 0,
     ):
+        """保存这一轮对话。
+
+        loaded_contexts 是从数据库中加载的最近消息，offset 是其中第一条消息在对话中的序号。
+
+        - 上下文相比加载时没有被修改(允许被截断)时，只追加这一轮新增的消息。
+        - 上下文被插件清空时，使用这一轮新增的消息重置对话历史。
+        - 上下文被插件修改时，只用上下文与新增的消息替换从 offset 开始的消息，更早的消息不受影响。
+        """
         if (
             not req
             or not req.conversation
@@ -335,10 +544,8 @@ class LLMRequestSubStage(Stage):
         ):
             return
 
-        # 历史上下文
-        messages = copy.deepcopy(req.contexts)
         # 这一轮对话请求的用户输入
-        messages.append(await req.assemble_context())
+        messages = [await req.assemble_context()]
         # 这一轮对话的 LLM 响应
         if req.tool_calls_result:
             if not isinstance(req.tool_calls_result, list):
@@ -348,9 +555,23 @@ class LLMRequestSubStage(Stage):
                     messages.extend(tcr.to_openai_messages())
         messages.append({"role": "assistant", "content": llm_response.completion_text})
         messages = list(filter(lambda item: "_no_save" not in item, messages))
-        await self.conv_manager.update_conversation(
-            event.unified_msg_origin, req.conversation.cid, history=messages
-        )
+        # 历史上下文
+        contexts = list(filter(lambda item: "_no_save" not in item, req.contexts))
+        if not contexts and loaded_contexts:
+            await self.conv_manager.update_conversation(
+                event.unified_msg_origin, req.conversation.cid, history=messages
+            )
+        elif contexts == loaded_contexts[len(loaded_contexts) - len(contexts) :]:
+            await self.conv_manager.append_conversation_messages(
+                event.unified_msg_origin, req.conversation.cid, messages
+            )
+        else:
+            await self.conv_manager.replace_conversation_messages(
+                event.unified_msg_origin,
+                req.conversation.cid,
+                offset,
+                contexts + messages,
+            )
 
     def fix_messages(self, messages: list[dict]) -> list[dict]:
         """验证并且修复上下文"""
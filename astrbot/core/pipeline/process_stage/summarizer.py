@@ -0,0 +1,136 @@
+"""
+对话的滚动摘要
+
+对话超过上下文限制后，被丢弃的旧消息会在后台被压缩为一段摘要，和对话存储在一起。
+摘要是增量更新的: 每次只将上一次摘要之后新丢弃的消息与已有的摘要合并，不会从头重新总结。
+请求 LLM 时，摘要会被附加到系统提示词中。
+"""
+
+import asyncio
+from typing import List, Set, Tuple
+from astrbot.core import logger
+from astrbot.core.conversation_mgr import ConversationManager
+from astrbot.core.provider import Provider
+
+SUMMARY_SYSTEM_PROMPT = "You are an expert in summarizing conversations."
+SUMMARY_PROMPT = (
+    "Below is the summary of the earlier part of a conversation between a user and an AI assistant, "
+    "followed by the messages that came after it.\n"
+    "Update the summary so that it covers both. Keep the facts, names, preferences, decisions and open "
+    "questions that may matter later, and drop greetings and small talk.\n"
+    "Only output the updated summary within {max_length} words, DO NOT INCLUDE any other text. "
+    "Use the same language as the conversation.\n\n"
+    "<summary>\n{summary}\n</summary>\n\n"
+    "<messages>\n{messages}\n</messages>"
+)
+MAX_MESSAGE_CHARS = 1000
+"""每条消息最多保留的字符数"""
+
+
+def format_messages(messages: List[dict]) -> str:
+    """将 OpenAI 格式的消息转换为便于总结的纯文本"""
+    lines = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(
+                part.get("text", "")
+                for part in content
+                if isinstance(part, dict) and part.get("type") == "text"
+            )
+        content = (content or "").strip()
+        if not content:
+            continue
+        if len(content) > MAX_MESSAGE_CHARS:
+            content = content[:MAX_MESSAGE_CHARS] + "..."
+        role = message.get("role", "")
+        lines.append(f"{role.capitalize()}: {content}")
+    return "\n".join(lines)
+
+
+class RollingSummarizer:
+    def __init__(
+        self,
+        conv_manager: ConversationManager,
+        min_messages: int = 6,
+        max_batch: int = 40,
+        max_length: int = 300,
+    ):
+        """
+        Args:
+            conv_manager: 对话管理器
+            min_messages: 新丢弃的消息达到该数量时才更新摘要
+            max_batch: 每次调用 LLM 最多合并的消息数量
+            max_length: 摘要的最大长度(词)
+        """
+        self.conv_manager = conv_manager
+        self.min_messages = min_messages
+        self.max_batch = max_batch
+        self.max_length = max_length
+        self._running: Set[Tuple[str, str]] = set()
+        """正在更新摘要的 (user_id, cid)"""
+
+    def schedule(
+        self, provider: Provider, user_id: str, cid: str, upto: int
+    ) -> asyncio.Task | None:
+        """在后台将序号小于 upto 的消息合并到摘要中。同一个对话同时只会有一个更新任务"""
+        key = (user_id, cid)
+        if key in self._running:
+            return None
+        self._running.add(key)
+        task = asyncio.create_task(self._run(provider, user_id, cid, upto))
+        task.add_done_callback(lambda _: self._running.discard(key))
+        return task
+
+    async def _run(self, provider: Provider, user_id: str, cid: str, upto: int):
+        try:
+            await self.summarize(provider, user_id, cid, upto)
+        except Exception as e:
+            logger.warning(f"更新对话 {cid} 的滚动摘要失败: {e}")
+
+    async def summarize(
+        self, provider: Provider, user_id: str, cid: str, upto: int
+    ) -> bool:
+        """将序号小于 upto 的消息合并到摘要中，返回摘要是否被更新"""
+        summary, seq = await self.conv_manager.get_conversation_summary(user_id, cid)
+        if upto - seq < self.min_messages:
+            return False
+        updated = False
+        while seq < upto:
+            end = min(upto, seq + self.max_batch)
+            messages = await self.conv_manager.get_conversation_message_span(
+                user_id, cid, seq, end
+            )
+            if not messages:
+                break
+            text = format_messages(messages)
+            if text:
+                new_summary = await self._merge(provider, summary, text)
+                if not new_summary:
+                    break
+            else:
+                # 只有工具调用等没有文本的消息
+                new_summary = summary or ""
+            if not await self.conv_manager.update_conversation_summary(
+                user_id, cid, new_summary, end, seq
+            ):
+                # 对话被重置或者摘要已被其他任务更新
+                break
+            summary, seq = new_summary, end
+            updated = True
+        if updated:
+            logger.debug(f"对话 {cid} 的滚动摘要已更新，覆盖 {seq} 条消息。")
+        return updated
+
+    async def _merge(self, provider: Provider, summary: str | None, text: str) -> str:
+        llm_resp = await provider.text_chat(
+            system_prompt=SUMMARY_SYSTEM_PROMPT,
+            prompt=SUMMARY_PROMPT.format(
+                max_length=self.max_length,
+                summary=summary or "(empty)",
+                messages=text,
+            ),
+        )
+        if not llm_resp or not llm_resp.completion_text:
+            return ""
+        return llm_resp.completion_text.strip()
@@ -4,6 +4,7 @@ from .context import PipelineContext
 from typing import AsyncGenerator
 from astrbot.core.platform import AstrMessageEvent
 from astrbot.core import logger
+from .session_lane import SessionLaneScheduler
 
 
 class PipelineScheduler:
@@ -15,6 +16,18 @@ class PipelineScheduler:
         )  # 按照顺序排序
         self.ctx = context  # 上下文对象
 
+        lane_config = context.astrbot_config["platform_settings"].get(
+            "session_lane", {}
+        )
+        self.session_lanes = None
+        """会话通道。启用后，同一会话的事件按到达顺序依次执行"""
+        if lane_config.get("enable", False):
+            self.session_lanes = SessionLaneScheduler(
+                self._execute,
+                coalesce_window=lane_config.get("coalesce_window", 0),
+                wake_prefixes=context.astrbot_config["wake_prefix"],
+            )
+
     async def initialize(self):
         """初始化管道调度器时, 初始化所有阶段"""
         for stage in registered_stages:
@@ -65,11 +78,17 @@ class PipelineScheduler:
                     break
 
     async def execute(self, event: AstrMessageEvent):
-        """执行 pipeline
+        """执行 pipeline。如果启用了会话通道，同一会话的事件会按到达顺序依次执行。
 
         Args:
             event (AstrMessageEvent): 事件对象
         """
+        if self.session_lanes:
+            await self.session_lanes.submit(event)
+        else:
+            await self._execute(event)
+
+    async def _execute(self, event: AstrMessageEvent):
         await self._process_stages(event)
 
         # 如果没有发送操作, 则发送一个空消息, 以便于后续的处理
@@ -0,0 +1,147 @@
+"""
+会话通道(Session Lane)
+
+为每个活跃的会话(unified_msg_origin)维护一个先进先出的通道:
+
+- 同一会话内的事件按照到达顺序依次执行 pipeline, 避免并发读写对话历史导致的覆盖问题。
+- 不同会话之间互不阻塞, 仍然并行执行。
+- 可选地, 在 `coalesce_window` 秒内由同一发送者连续发送的普通消息会被合并为一个事件, 只执行一次 pipeline。
+
+通道在会话没有待处理的事件时会被自动回收。
+"""
+
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Tuple
+from astrbot.core import logger
+from astrbot.core.message.components import Plain
+from astrbot.core.platform.astr_message_event import AstrMessageEvent
+from astrbot.core.utils.dispatch_slot import yield_dispatch_slot
+from astrbot.core.utils.session_waiter import is_session_waiting
+
+
+class _Lane:
+    def __init__(self):
+        self.waiters: Deque[Tuple[AstrMessageEvent, asyncio.Future]] = deque()
+        """排队中的事件。future 的结果为 True 表示已被合并, False 表示轮到该事件执行"""
+        self.arrived = asyncio.Event()
+
+
+class SessionLaneScheduler:
+    """按会话分片的有序执行器
+
+    事件在提交它的任务中执行, 排队期间会让出 EventBus 的分发槽位, 避免一个繁忙的会话占满所有槽位。
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[AstrMessageEvent], Awaitable[None]],
+        coalesce_window: float = 0,
+        wake_prefixes: List[str] = None,
+    ):
+        self._runner = runner
+        self.coalesce_window = max(0.0, float(coalesce_window or 0))
+        self.wake_prefixes = wake_prefixes or []
+        self._lanes: Dict[str, _Lane] = {}
+        self.coalesced_count = 0
+        """被合并到其他事件中的事件数量"""
+
+    @property
+    def active_lanes(self) -> int:
+        return len(self._lanes)
+
+    async def submit(self, event: AstrMessageEvent):
+        """在事件所属会话的通道中执行事件。同一会话中, 先提交的事件执行完毕后才会执行后提交的事件。"""
+        if is_session_waiting(event):
+            # 该会话有正在等待输入的 SessionWaiter, 等待方本身占据了通道,
+            # 因此这条消息需要绕过通道立即执行, 否则会互相等待。
+            await self._runner(event)
+            return
+
+        key = event.unified_msg_origin
+        lane = self._lanes.get(key)
+        if lane is None:
+            self._lanes[key] = lane = _Lane()
+        else:
+            future = asyncio.get_running_loop().create_future()
+            lane.waiters.append((event, future))
+            lane.arrived.set()
+            try:
+                async with yield_dispatch_slot():
+                    merged = await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled() and not future.result():
+                    # 已经轮到该事件, 但在执行前被取消, 需要交给下一个事件
+                    self._handoff(key, lane)
+                raise
+            if merged:
+                return
+
+        try:
+            if self.coalesce_window and self._can_coalesce(event):
+                await self._coalesce(event, lane)
+            await self._runner(event)
+        finally:
+            self._handoff(key, lane)
+
+    def _handoff(self, key: str, lane: _Lane):
+        """唤醒通道中的下一个事件, 没有事件时回收通道"""
+        while lane.waiters:
+            _, future = lane.waiters.popleft()
+            if not future.done():
+                future.set_result(False)
+                return
+        if self._lanes.get(key) is lane:
+            self._lanes.pop(key)
+
+    async def _coalesce(self, event: AstrMessageEvent, lane: _Lane):
+        """在合并窗口内, 将同一发送者后续的普通消息合并到 event 中"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.coalesce_window
+        while True:
+            while lane.waiters and self._can_merge(event, lane.waiters[0][0]):
+                other, future = lane.waiters.popleft()
+                if future.done():
+                    continue
+                self._merge(event, other)
+                future.set_result(True)
+            if lane.waiters:
+                # 下一条消息无法合并, 保持顺序, 不再等待
+                return
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            lane.arrived.clear()
+            try:
+                await asyncio.wait_for(lane.arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    def _can_coalesce(self, event: AstrMessageEvent) -> bool:
+        if event.get_platform_name() == "webchat":
+            # WebChat 的每条消息都需要独立的回复
+            return False
+        message_str = event.message_str.strip()
+        if not message_str:
+            return False
+        # 指令消息不参与合并
+        return not any(
+            prefix and message_str.startswith(prefix) for prefix in self.wake_prefixes
+        )
+
+    def _can_merge(self, event: AstrMessageEvent, other: AstrMessageEvent) -> bool:
+        return (
+            other.get_sender_id() == event.get_sender_id()
+            and other.get_message_type() == event.get_message_type()
+            and self._can_coalesce(other)
+        )
+
+    def _merge(self, event: AstrMessageEvent, other: AstrMessageEvent):
+        event.message_str = f"{event.message_str}\n{other.message_str}"
+        event.message_obj.message_str = event.message_str
+        event.message_obj.message.append(Plain("\n"))
+        event.message_obj.message.extend(other.get_messages())
+        self.coalesced_count += 1
+        logger.debug(
+            f"会话 {event.unified_msg_origin} 的消息已合并: {other.get_message_outline()}"
+        )
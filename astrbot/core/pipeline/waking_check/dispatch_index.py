@@ -0,0 +1,145 @@
+"""
+Handler 分发索引
+
+唤醒检查阶段需要找出所有 filter 通过的 AdapterMessageEvent Handler。逐个执行所有 Handler 的 filter
+在插件和指令较多时开销很大，因此预先编译一个索引，只对可能通过的候选 Handler 执行完整的 filter:
+
+- 带有指令(CommandFilter)或指令组(CommandGroupFilter)的 Handler，按照完整指令名(包括别名和父指令组)
+  的第一个词建立哈希表。消息的第一个词不在表中时，这些 Handler 一定不会通过。
+- 带有正则(RegexFilter)的 Handler，将所有正则合并为一个正则，一次匹配得到所有可能通过的 Handler。
+- 其他 Handler 每次都需要执行完整的 filter。
+
+索引在 `star_handlers_registry.generation` 变化(插件载入、卸载、启用、禁用)时重新构建。
+候选 Handler 按照原有的优先级顺序返回。
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from astrbot.core.platform.astr_message_event import AstrMessageEvent
+from astrbot.core.star.filter.command import CommandFilter
+from astrbot.core.star.filter.command_group import CommandGroupFilter
+from astrbot.core.star.filter.regex import RegexFilter
+from astrbot.core.star.star_handler import (
+    EventType,
+    StarHandlerMetadata,
+    StarHandlerRegistry,
+    star_handlers_registry,
+)
+
+_DEFAULT_FLAGS = re.compile("").flags
+_BACKREF = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def _first_token(text: str) -> str:
+    parts = text.split(None, 1)
+    return parts[0] if parts else ""
+
+
+def _command_names(f: CommandFilter | CommandGroupFilter) -> List[str]:
+    """返回指令的所有完整指令名"""
+    if isinstance(f, CommandGroupFilter):
+        return f.get_complete_command_names()
+    names = []
+    for candidate in [f.command_name] + list(f.alias):
+        for parent_command_name in f.parent_command_names:
+            if parent_command_name:
+                names.append(f"{parent_command_name} {candidate}")
+            else:
+                names.append(candidate)
+    return names
+
+
+def _can_merge(regex: re.Pattern) -> bool:
+    """合并后组号会变化，且不能有重名的命名组，因此含有反向引用、命名组或内联 flag 的正则不参与合并"""
+    return (
+        regex.flags == _DEFAULT_FLAGS
+        and not regex.groupindex
+        and not _BACKREF.search(regex.pattern)
+    )
+
+
+class HandlerDispatchIndex:
+    def __init__(self, registry: StarHandlerRegistry = star_handlers_registry):
+        self.registry = registry
+        self._generation = -1
+        self._handlers: List[StarHandlerMetadata] = []
+        self._commands: Dict[str, List[int]] = {}
+        """完整指令名的第一个词 -> Handler 序号"""
+        self._regex: re.Pattern | None = None
+        self._regex_groups: List[Tuple[str, int]] = []
+        """合并后的正则中的组名 -> Handler 序号"""
+        self._always: List[int] = []
+        """每次都需要执行完整 filter 的 Handler 序号"""
+
+    def _build(self):
+        handlers = [
+            h
+            for h in self.registry.get_handlers_by_event_type(
+                EventType.AdapterMessageEvent
+            )
+            if h.event_filters
+        ]
+        commands: Dict[str, List[int]] = defaultdict(list)
+        patterns: List[str] = []
+        regex_groups: List[Tuple[str, int]] = []
+        always: List[int] = []
+
+        for i, handler in enumerate(handlers):
+            key_filter = None
+            for f in handler.event_filters:
+                if isinstance(f, (CommandFilter, CommandGroupFilter)):
+                    key_filter = f
+                    break
+            if key_filter is None:
+                for f in handler.event_filters:
+                    if isinstance(f, RegexFilter):
+                        key_filter = f
+                        break
+
+            if isinstance(key_filter, (CommandFilter, CommandGroupFilter)):
+                for token in {
+                    _first_token(name) for name in _command_names(key_filter)
+                }:
+                    commands[token].append(i)
+            elif isinstance(key_filter, RegexFilter) and _can_merge(key_filter.regex):
+                name = f"h{len(regex_groups)}"
+                # 每个正则都在开头的位置独立尝试匹配，和 re.match 的语义相同
+                patterns.append(f"(?:(?=(?P<{name}>{key_filter.regex_str}))|)")
+                regex_groups.append((name, i))
+            else:
+                always.append(i)
+
+        regex = None
+        if patterns:
+            try:
+                regex = re.compile("".join(patterns))
+            except (re.error, RecursionError, OverflowError):
+                # 合并失败时退化为逐个匹配
+                always.extend(i for _, i in regex_groups)
+                regex_groups = []
+
+        self._handlers = handlers
+        self._commands = dict(commands)
+        self._regex = regex
+        self._regex_groups = regex_groups
+        self._always = always
+        self._generation = self.registry.generation
+
+    def get_candidates(self, event: AstrMessageEvent) -> List[StarHandlerMetadata]:
+        """返回可能通过 filter 的 Handler，按优先级排序"""
+        if self._generation != self.registry.generation:
+            self._build()
+
+        indexes = set(self._always)
+        # 指令只在唤醒时生效
+        if event.is_at_or_wake_command:
+            indexes.update(
+                self._commands.get(_first_token(event.get_message_str()), ())
+            )
+        if self._regex is not None:
+            m = self._regex.match(event.get_message_str().strip())
+            for name, i in self._regex_groups:
+                if m.group(name) is not None:
+                    indexes.add(i)
+        return [self._handlers[i] for i in sorted(indexes)]
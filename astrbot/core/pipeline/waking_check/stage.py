@@ -7,10 +7,10 @@ from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.star.filter.permission import PermissionTypeFilter
 from astrbot.core.star.session_plugin_manager import SessionPluginManager
 from astrbot.core.star.star import star_map
-from astrbot.core.star.star_handler import EventType, star_handlers_registry
 
 from ..context import PipelineContext
 from ..stage import Stage, register_stage
+from .dispatch_index import HandlerDispatchIndex
 
 
 @register_stage
@@ -45,6 +45,7 @@ class WakingCheckStage(Stage):
         self.ignore_at_all = self.ctx.astrbot_config["platform_settings"].get(
             "ignore_at_all", False
         )
+        self.dispatch_index = HandlerDispatchIndex()
 
     async def process(
         self, event: AstrMessageEvent
@@ -112,15 +113,12 @@ class WakingCheckStage(Stage):
         activated_handlers = []
         handlers_parsed_params = {}  # 注册了指令的 handler
 
-        for handler in star_handlers_registry.get_handlers_by_event_type(
-            EventType.AdapterMessageEvent
-        ):
+        # 只对索引中可能通过的 Handler 执行完整的 filter
+        for handler in self.dispatch_index.get_candidates(event):
             # filter 需满足 AND 逻辑关系
             passed = True
             permission_not_pass = False
             permission_filter_raise_error = False
-            if len(handler.event_filters) == 0:
-                continue
 
             for filter in handler.event_filters:
                 try:
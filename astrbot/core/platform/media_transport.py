@@ -0,0 +1,36 @@
+"""
+媒体传输
+
+发送图片和语音时，默认将文件以 base64 编码后放入消息中。对于较大的文件，这会使内存占用增加约三分之一，
+并且整条消息都要经过事件循环和与协议端之间的连接。
+
+在 `platform_settings.media_transport` 中启用按引用发送并配置了 `callback_api_base` 后，
+不小于 `min_size_kb` 的文件会注册到文件服务，以 `{callback_api_base}/api/file/<token>` 链接的形式发送，
+由协议端从 AstrBot 流式下载(支持 Range 请求)。相同的文件复用同一个令牌。
+"""
+
+import asyncio
+import os
+
+from astrbot.core import astrbot_config, file_token_service, logger
+from astrbot.core.message.components import Image, Record
+
+
+async def resolve_media_file(segment: Image | Record) -> str:
+    """获取发送图片或语音时使用的 file 字段
+
+    Returns:
+        str: 文件服务的链接，或者以 base64:// 开头的数据
+    """
+    cfg = astrbot_config.get("platform_settings", {}).get("media_transport", {})
+    callback_host = astrbot_config.get("callback_api_base")
+    if cfg.get("by_reference", False) and callback_host:
+        try:
+            file_path = await segment.convert_to_file_path()
+            size = await asyncio.to_thread(os.path.getsize, file_path)
+            if size >= cfg.get("min_size_kb", 256) * 1024:
+                token = await file_token_service.register_file(file_path)
+                return f"{callback_host}/api/file/{token}"
+        except Exception as e:
+            logger.warning(f"按引用发送媒体文件失败，将使用 base64 发送: {e}")
+    return f"base64://{await segment.convert_to_base64()}"
@@ -49,9 +49,19 @@ class Platform(abc.ABC):
     def commit_event(self, event: AstrMessageEvent):
         """
         提交一个事件到事件队列。
+
+        同步方法无法等待，事件队列已满时事件会被丢弃(即使溢出策略为 block)。请优先使用 commit_event_async。
         """
         self._event_queue.put_nowait(event)
 
+    async def commit_event_async(self, event: AstrMessageEvent):
+        """
+        提交一个事件到事件队列。
+
+        当事件队列已满且该平台的溢出策略为 block 时，会等待队列腾出空位，从而对消息平台形成背压。
+        """
+        await self._event_queue.put(event)
+
     def get_client(self):
         """
         获取平台的客户端对象。
@@ -14,6 +14,7 @@ from astrbot.api.message_components import (
     BaseMessageComponent,
 )
 from astrbot.api.platform import Group, MessageMember
+from astrbot.core.platform.media_transport import resolve_media_file
 
 
 class AiocqhttpMessageEvent(AstrMessageEvent):
@@ -27,12 +28,11 @@ class AiocqhttpMessageEvent(AstrMessageEvent):
     async def _from_segment_to_dict(segment: BaseMessageComponent) -> dict:
         """修复部分字段"""
         if isinstance(segment, (Image, Record)):
-            # For Image and Record segments, we convert them to base64
-            bs64 = await segment.convert_to_base64()
+            # 图片和语音以 base64 或文件服务链接的形式发送
             return {
                 "type": segment.type.lower(),
                 "data": {
-                    "file": f"base64://{bs64}",
+                    "file": await resolve_media_file(segment),
                 },
             }
         elif isinstance(segment, File):
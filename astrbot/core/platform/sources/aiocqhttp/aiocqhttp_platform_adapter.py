@@ -386,7 +386,7 @@ class AiocqhttpAdapter(Platform):
             bot=self.bot,
         )
 
-        self.commit_event(message_event)
+        await self.commit_event_async(message_event)
 
     def get_client(self) -> CQHttp:
         return self.bot
@@ -1,7 +1,6 @@
 import asyncio
 import os
 import uuid
-import aiohttp
 import dingtalk_stream
 import threading
 
@@ -21,6 +20,7 @@ from astrbot import logger
 from dingtalk_stream import AckMessage
 from astrbot.core.utils.io import download_file
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.http_client import http_client
 
 
 class MyEventHandler(dingtalk_stream.EventHandler):
@@ -156,7 +156,7 @@ class DingtalkPlatformAdapter(Platform):
         }
         temp_dir = os.path.join(get_astrbot_data_path(), "temp")
         f_path = os.path.join(temp_dir, f"dingtalk_file_{uuid.uuid4()}.{ext}")
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session(direct=True) as session:
             async with session.post(
                 "https://api.dingtalk.com/v1.0/robot/messageFiles/download",
                 headers=headers,
@@ -177,7 +177,7 @@ class DingtalkPlatformAdapter(Platform):
             "appKey": self.client_id,
             "appSecret": self.client_secret,
         }
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session(direct=True) as session:
             async with session.post(
                 "https://api.dingtalk.com/v1.0/oauth2/accessToken",
                 json=payload,
@@ -198,7 +198,7 @@ class DingtalkPlatformAdapter(Platform):
             client=self.client,
         )
 
-        self._event_queue.put_nowait(event)
+        await self.commit_event_async(event)
 
     async def run(self):
         # await self.client_.start()
@@ -279,7 +279,7 @@ class DiscordPlatformAdapter(Platform):
             message_event.is_wake = True
             message_event.is_at_or_wake_command = True
 
-        self.commit_event(message_event)
+        await self.commit_event_async(message_event)
 
     @override
     async def terminate(self):
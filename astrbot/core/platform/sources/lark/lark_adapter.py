@@ -218,7 +218,7 @@ class LarkPlatformAdapter(Platform):
             bot=self.lark_api,
         )
 
-        self._event_queue.put_nowait(event)
+        await self.commit_event_async(event)
 
     async def run(self):
         # self.client.start()
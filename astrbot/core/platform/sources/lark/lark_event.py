@@ -7,7 +7,7 @@ from io import BytesIO
 from typing import List
 from astrbot.api.event import AstrMessageEvent, MessageChain
 from astrbot.api.message_components import Plain, Image as AstrBotImage, At
-from astrbot.core.utils.io import download_image_by_url
+from astrbot.core.utils.media_cache import media_cache
 from lark_oapi.api.im.v1 import *
 from astrbot import logger
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
@@ -36,7 +36,7 @@ class LarkMessageEvent(AstrMessageEvent):
                 if comp.file and comp.file.startswith("file:///"):
                     file_path = comp.file.replace("file:///", "")
                 elif comp.file and comp.file.startswith("http"):
-                    image_file_path = await download_image_by_url(comp.file)
+                    image_file_path = await media_cache.get_path(comp.file)
                     file_path = image_file_path
                 elif comp.file and comp.file.startswith("base64://"):
                     base64_str = comp.file.removeprefix("base64://")
@@ -3,7 +3,7 @@ import botpy.message
 import botpy.types
 import botpy.types.message
 import asyncio
-from astrbot.core.utils.io import file_to_base64, download_image_by_url
+from astrbot.core.utils.media_cache import media_cache
 from astrbot.api.event import AstrMessageEvent, MessageChain
 from astrbot.api.platform import AstrBotMessage, PlatformMetadata
 from astrbot.api.message_components import Plain, Image
@@ -196,16 +196,13 @@ class QQOfficialMessageEvent(AstrMessageEvent):
                 plain_text += i.text
             elif isinstance(i, Image) and not image_base64:
                 if i.file and i.file.startswith("file:///"):
-                    image_base64 = file_to_base64(i.file[8:])
+                    image_base64 = await media_cache.get_base64(i.file)
                     image_file_path = i.file[8:]
                 elif i.file and i.file.startswith("http"):
-                    image_file_path = await download_image_by_url(i.file)
-                    image_base64 = file_to_base64(image_file_path)
-                elif i.file and i.file.startswith("base64://"):
-                    image_base64 = i.file
+                    image_file_path = await media_cache.get_path(i.file)
+                    image_base64 = await media_cache.get_base64(image_file_path)
                 else:
-                    image_base64 = file_to_base64(i.file)
-                image_base64 = image_base64.removeprefix("base64://")
+                    image_base64 = await media_cache.get_base64(i.file)
             else:
                 logger.debug(f"qq_official 忽略 {i.type}")
         return plain_text, image_base64, image_file_path
@@ -44,7 +44,7 @@ class botClient(Client):
         abm.session_id = (
             abm.sender.user_id if self.platform.unique_session else message.group_openid
         )
-        self._commit(abm)
+        await self._commit(abm)
 
     # 收到频道消息
     async def on_at_message_create(self, message: botpy.message.Message):
@@ -54,7 +54,7 @@ class botClient(Client):
         abm.session_id = (
             abm.sender.user_id if self.platform.unique_session else message.channel_id
         )
-        self._commit(abm)
+        await self._commit(abm)
 
     # 收到私聊消息
     async def on_direct_message_create(self, message: botpy.message.DirectMessage):
@@ -62,7 +62,7 @@ class botClient(Client):
             message, MessageType.FRIEND_MESSAGE
         )
         abm.session_id = abm.sender.user_id
-        self._commit(abm)
+        await self._commit(abm)
 
     # 收到 C2C 消息
     async def on_c2c_message_create(self, message: botpy.message.C2CMessage):
@@ -70,10 +70,10 @@ class botClient(Client):
             message, MessageType.FRIEND_MESSAGE
         )
         abm.session_id = abm.sender.user_id
-        self._commit(abm)
+        await self._commit(abm)
 
-    def _commit(self, abm: AstrBotMessage):
-        self.platform.commit_event(
+    async def _commit(self, abm: AstrBotMessage):
+        await self.platform.commit_event_async(
             QQOfficialMessageEvent(
                 abm.message_str,
                 abm,
@@ -1,7 +1,6 @@
 import time
 import asyncio
 import uuid
-import aiohttp
 import re
 import base64
 from typing import Awaitable, Any
@@ -20,6 +19,7 @@ from .client import SlackWebhookClient, SlackSocketClient
 from astrbot.api.message_components import *  # noqa: F403
 from astrbot.api import logger
 from astrbot.core.platform.astr_message_event import MessageSesion
+from astrbot.core.utils.http_client import http_client
 from ...register import register_platform_adapter
 
 
@@ -301,7 +301,7 @@ class SlackAdapter(Platform):
     async def get_file_base64(self, url: str) -> str:
         """下载 Slack 文件并返回 Base64 编码的内容"""
         headers = {"Authorization": f"Bearer {self.bot_token}"}
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session(direct=True) as session:
             async with session.get(url, headers=headers) as resp:
                 if resp.status == 200:
                     content = await resp.read()
@@ -390,7 +390,7 @@ class SlackAdapter(Platform):
             web_client=self.web_client,
         )
 
-        self.commit_event(message_event)
+        await self.commit_event_async(message_event)
 
     def get_client(self):
         return self.web_client
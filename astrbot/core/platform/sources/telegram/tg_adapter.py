@@ -349,7 +349,7 @@ class TelegramPlatformAdapter(Platform):
             session_id=message.session_id,
             client=self.client,
         )
-        self.commit_event(message_event)
+        await self.commit_event_async(message_event)
 
     def get_client(self) -> ExtBot:
         return self.client
@@ -155,7 +155,7 @@ class WebChatAdapter(Platform):
         message_event.set_extra("selected_provider", payload.get("selected_provider"))
         message_event.set_extra("selected_model", payload.get("selected_model"))
 
-        self.commit_event(message_event)
+        await self.commit_event_async(message_event)
 
     async def terminate(self):
         # Do nothing
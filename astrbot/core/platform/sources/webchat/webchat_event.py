@@ -1,16 +1,29 @@
+import asyncio
 import os
+import shutil
 import uuid
-import base64
 from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent, MessageChain
 from astrbot.api.message_components import Plain, Image, Record
-from astrbot.core.utils.io import download_image_by_url
+from astrbot.core.utils.io import link_or_copy
+from astrbot.core.utils.media_cache import media_cache
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
 from .webchat_queue_mgr import webchat_queue_mgr
 
 imgs_dir = os.path.join(get_astrbot_data_path(), "webchat", "imgs")
 
 
+def _save_file(src: str, dst: str):
+    """将图片或语音保存到聊天记录目录，不将文件读入内存。
+
+    媒体缓存中的文件按内容寻址、不会被修改，可以创建硬链接；其他文件(如插件生成的文件)可能被原地覆盖，必须复制。
+    """
+    if media_cache.contains(src):
+        link_or_copy(src, dst)
+    else:
+        shutil.copyfile(src, dst)
+
+
 class WebChatMessageEvent(AstrMessageEvent):
     def __init__(self, message_str, message_obj, platform_meta, session_id):
         super().__init__(message_str, message_obj, platform_meta, session_id)
@@ -47,22 +60,8 @@ class WebChatMessageEvent(AstrMessageEvent):
                 # save image to local
                 filename = str(uuid.uuid4()) + ".jpg"
                 path = os.path.join(imgs_dir, filename)
-                if comp.file and comp.file.startswith("file:///"):
-                    ph = comp.file[8:]
-                    with open(path, "wb") as f:
-                        with open(ph, "rb") as f2:
-                            f.write(f2.read())
-                elif comp.file.startswith("base64://"):
-                    base64_str = comp.file[9:]
-                    image_data = base64.b64decode(base64_str)
-                    with open(path, "wb") as f:
-                        f.write(image_data)
-                elif comp.file and comp.file.startswith("http"):
-                    await download_image_by_url(comp.file, path=path)
-                else:
-                    with open(path, "wb") as f:
-                        with open(comp.file, "rb") as f2:
-                            f.write(f2.read())
+                src = await media_cache.get_path(comp.file)
+                await asyncio.to_thread(_save_file, src, path)
                 data = f"[IMAGE]{filename}"
                 await web_chat_back_queue.put(
                     {
@@ -76,17 +75,8 @@ class WebChatMessageEvent(AstrMessageEvent):
                 # save record to local
                 filename = str(uuid.uuid4()) + ".wav"
                 path = os.path.join(imgs_dir, filename)
-                if comp.file and comp.file.startswith("file:///"):
-                    ph = comp.file[8:]
-                    with open(path, "wb") as f:
-                        with open(ph, "rb") as f2:
-                            f.write(f2.read())
-                elif comp.file and comp.file.startswith("http"):
-                    await download_image_by_url(comp.file, path=path)
-                else:
-                    with open(path, "wb") as f:
-                        with open(comp.file, "rb") as f2:
-                            f.write(f2.read())
+                src = await media_cache.get_path(comp.file)
+                await asyncio.to_thread(_save_file, src, path)
                 data = f"[RECORD]{filename}"
                 await web_chat_back_queue.put(
                     {
@@ -20,6 +20,7 @@ from astrbot.core.platform.astrbot_message import (
 )
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
 from astrbot.core.platform.astr_message_event import MessageSesion
+from astrbot.core.utils.http_client import http_client
 
 from ...register import register_platform_adapter
 from .wechatpadpro_message_event import WeChatPadProMessageEvent
@@ -171,7 +172,7 @@ class WeChatPadProAdapter(Platform):
         url = f"{self.base_url}/login/GetLoginStatus"
         params = {"key": self.auth_key}
 
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session(direct=True) as session:
             try:
                 async with session.get(url, params=params) as response:
                     response_data = await response.json()
@@ -230,7 +231,7 @@ class WeChatPadProAdapter(Platform):
 
         self.auth_key = None  # Reset auth_key before generating a new one
 
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session(direct=True) as session:
             try:
                 async with session.post(url, params=params, json=payload) as response:
                     if response.status != 200:
@@ -261,7 +262,7 @@ class WeChatPadProAdapter(Platform):
         params = {"key": self.auth_key}
         payload = {}  # 根据文档，这个接口的 body 可以为空
 
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session(direct=True) as session:
             try:
                 async with session.post(url, params=params, json=payload) as response:
                     response_data = await response.json()
@@ -309,7 +310,7 @@ class WeChatPadProAdapter(Platform):
         countdown = 180  # 倒计时时长
         logger.info(f"请在 {countdown} 秒内扫码登录。")
         while attempts < max_attempts:
-            async with aiohttp.ClientSession() as session:
+            async with http_client.session(direct=True) as session:
                 try:
                     async with session.get(url, params=params) as response:
                         response_data = await response.json()
@@ -427,7 +428,7 @@ class WeChatPadProAdapter(Platform):
                         adapter=self,
                     )
                     # 提交事件到事件队列
-                    self.commit_event(message_event)
+                    await self.commit_event_async(message_event)
             else:
                 logger.warning(f"收到未知结构的 WebSocket 消息: {message_data}")
 
@@ -546,7 +547,7 @@ class WeChatPadProAdapter(Platform):
             "ChatRoomName": group_id,
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session(direct=True) as session:
             try:
                 async with session.post(url, params=params, json=payload) as response:
                     response_data = await response.json()
@@ -589,7 +590,7 @@ class WeChatPadProAdapter(Platform):
             "ToUserName": to_user_name,
             "TotalLen": 0,
         }
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session(direct=True) as session:
             try:
                 async with session.post(url, params=params, json=payload) as response:
                     if response.status == 200:
@@ -616,7 +617,7 @@ class WeChatPadProAdapter(Platform):
             "NewMsgId": new_msg_id,
             "Length": length,
         }
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session(direct=True) as session:
             try:
                 async with session.post(url, params=params, json=payload) as response:
                     if response.status == 200:
@@ -866,7 +867,7 @@ class WeChatPadProAdapter(Platform):
         url = f"{self.base_url}/friend/GetContactList"
         params = {"key": self.auth_key}
         payload = {"CurrentChatRoomContactSeq": 0, "CurrentWxcontactSeq": 0}
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session(direct=True) as session:
             try:
                 async with session.post(url, params=params, json=payload) as response:
                     if response.status != 200:
@@ -903,7 +904,7 @@ class WeChatPadProAdapter(Platform):
         url = f"{self.base_url}/friend/GetContactDetailsList"
         params = {"key": self.auth_key}
         payload = {"RoomWxIDList": room_wx_id_list, "UserNames": user_names}
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session(direct=True) as session:
             try:
                 async with session.post(url, params=params, json=payload) as response:
                     if response.status != 200:
@@ -18,6 +18,8 @@ from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.platform.astrbot_message import AstrBotMessage, MessageType
 from astrbot.core.platform.platform_metadata import PlatformMetadata
 from astrbot.core.utils.tencent_record_helper import audio_to_tencent_silk_base64
+from astrbot.core.utils.media_executor import media_executor
+from astrbot.core.utils.http_client import http_client
 
 if TYPE_CHECKING:
     from .wechatpadpro_adapter import WeChatPadProAdapter
@@ -37,7 +39,7 @@ class WeChatPadProMessageEvent(AstrMessageEvent):
         self.adapter = adapter  # Save the adapter instance
 
     async def send(self, message: MessageChain):
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session(direct=True) as session:
             for comp in message.chain:
                 await asyncio.sleep(1)
                 if isinstance(comp, Plain):
@@ -53,7 +55,9 @@ class WeChatPadProMessageEvent(AstrMessageEvent):
     async def _send_image(self, session: aiohttp.ClientSession, comp: Image):
         b64 = await comp.convert_to_base64()
         raw = self._validate_base64(b64)
-        b64c = self._compress_image(raw)
+        b64c = await media_executor.run(
+            self._compress_image, raw, name="image_compress"
+        )
         payload = {
             "MsgItem": [
                 {"ImageContent": b64c, "MsgType": 3, "ToUserName": self.session_id}
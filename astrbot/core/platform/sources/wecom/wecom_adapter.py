@@ -24,6 +24,8 @@ from astrbot.api.platform import (
 from astrbot.core import logger
 from astrbot.core.platform.astr_message_event import MessageSesion
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.media_executor import media_executor
+from astrbot.core.utils.tencent_record_helper import pydub_convert
 
 from .wecom_event import WecomPlatformEvent
 from .wecom_kf import WeChatKF
@@ -263,11 +265,10 @@ class WecomPlatformAdapter(Platform):
                 f.write(resp.content)
 
             try:
-                from pydub import AudioSegment
-
                 path_wav = os.path.join(temp_dir, f"wecom_{msg.media_id}.wav")
-                audio = AudioSegment.from_file(path)
-                audio.export(path_wav, format="wav")
+                await media_executor.run(
+                    pydub_convert, path, path_wav, "wav", name="pydub"
+                )
             except Exception as e:
                 logger.error(f"转换音频失败: {e}。如果没有安装 ffmpeg 请先安装。")
                 path_wav = path
@@ -329,11 +330,10 @@ class WecomPlatformAdapter(Platform):
                 f.write(resp.content)
 
             try:
-                from pydub import AudioSegment
-
                 path_wav = os.path.join(temp_dir, f"weixinkefu_{media_id}.wav")
-                audio = AudioSegment.from_file(path)
-                audio.export(path_wav, format="wav")
+                await media_executor.run(
+                    pydub_convert, path, path_wav, "wav", name="pydub"
+                )
             except Exception as e:
                 logger.error(f"转换音频失败: {e}。如果没有安装 ffmpeg 请先安装。")
                 path_wav = path
@@ -353,7 +353,7 @@ class WecomPlatformAdapter(Platform):
             session_id=message.session_id,
             client=self.client,
         )
-        self.commit_event(message_event)
+        await self.commit_event_async(message_event)
 
     def get_client(self) -> WeChatClient:
         return self.client
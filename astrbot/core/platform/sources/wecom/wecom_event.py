@@ -9,9 +9,11 @@ from .wecom_kf_message import WeChatKFMessage
 
 from astrbot.api import logger
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.media_executor import media_executor
+from astrbot.core.utils.tencent_record_helper import pydub_convert
 
 try:
-    import pydub
+    import pydub  # noqa: F401
 except Exception:
     logger.warning(
         "检测到 pydub 库未安装，企业微信将无法语音收发。如需使用语音，请前往管理面板 -> 控制台 -> 安装 Pip 库安装 pydub。"
@@ -125,8 +127,12 @@ class WecomPlatformEvent(AstrMessageEvent):
                     # 转成amr
                     temp_dir = os.path.join(get_astrbot_data_path(), "temp")
                     record_path_amr = os.path.join(temp_dir, f"{uuid.uuid4()}.amr")
-                    pydub.AudioSegment.from_wav(record_path).export(
-                        record_path_amr, format="amr"
+                    await media_executor.run(
+                        pydub_convert,
+                        record_path,
+                        record_path_amr,
+                        "amr",
+                        name="pydub",
                     )
 
                     with open(record_path_amr, "rb") as f:
@@ -180,8 +186,12 @@ class WecomPlatformEvent(AstrMessageEvent):
                     # 转成amr
                     temp_dir = os.path.join(get_astrbot_data_path(), "temp")
                     record_path_amr = os.path.join(temp_dir, f"{uuid.uuid4()}.amr")
-                    pydub.AudioSegment.from_wav(record_path).export(
-                        record_path_amr, format="amr"
+                    await media_executor.run(
+                        pydub_convert,
+                        record_path,
+                        record_path_amr,
+                        "amr",
+                        name="pydub",
                     )
 
                     with open(record_path_amr, "rb") as f:
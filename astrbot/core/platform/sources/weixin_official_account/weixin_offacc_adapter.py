@@ -15,6 +15,8 @@ from astrbot.api.message_components import Plain, Image, Record
 from astrbot.core.platform.astr_message_event import MessageSesion
 from astrbot.api.platform import register_platform_adapter
 from astrbot.core import logger
+from astrbot.core.utils.media_executor import media_executor
+from astrbot.core.utils.tencent_record_helper import pydub_convert
 from requests import Response
 
 from wechatpy.utils import check_signature
@@ -228,11 +230,10 @@ class WeixinOfficialAccountPlatformAdapter(Platform):
                 f.write(resp.content)
 
             try:
-                from pydub import AudioSegment
-
                 path_wav = f"data/temp/wecom_{msg.media_id}.wav"
-                audio = AudioSegment.from_file(path)
-                audio.export(path_wav, format="wav")
+                await media_executor.run(
+                    pydub_convert, path, path_wav, "wav", name="pydub"
+                )
             except Exception as e:
                 logger.error(
                     f"转换音频失败: {e}。如果没有安装 pydub 和 ffmpeg 请先安装。"
@@ -272,7 +273,7 @@ class WeixinOfficialAccountPlatformAdapter(Platform):
             session_id=message.session_id,
             client=self.client,
         )
-        self.commit_event(message_event)
+        await self.commit_event_async(message_event)
 
     def get_client(self) -> WeChatClient:
         return self.client
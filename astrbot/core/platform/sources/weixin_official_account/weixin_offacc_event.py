@@ -8,9 +8,11 @@ from wechatpy.replies import TextReply, ImageReply, VoiceReply
 
 
 from astrbot.api import logger
+from astrbot.core.utils.media_executor import media_executor
+from astrbot.core.utils.tencent_record_helper import pydub_convert
 
 try:
-    import pydub
+    import pydub  # noqa: F401
 except Exception:
     logger.warning(
         "检测到 pydub 库未安装，微信公众平台将无法语音收发。如需使用语音，请前往管理面板 -> 控制台 -> 安装 Pip 库安装 pydub。"
@@ -135,8 +137,8 @@ class WeixinOfficialAccountPlatformEvent(AstrMessageEvent):
                 record_path = await comp.convert_to_file_path()
                 # 转成amr
                 record_path_amr = f"data/temp/{uuid.uuid4()}.amr"
-                pydub.AudioSegment.from_wav(record_path).export(
-                    record_path_amr, format="amr"
+                await media_executor.run(
+                    pydub_convert, record_path, record_path_amr, "amr", name="pydub"
                 )
 
                 with open(record_path_amr, "rb") as f:
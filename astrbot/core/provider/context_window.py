@@ -0,0 +1,74 @@
+"""
+按 token 预算截断上下文
+
+上下文按轮次截断: 每一轮从一条 user 消息开始，包括之后的 assistant(含 tool_calls) 和 tool 消息，
+因此截断后不会出现没有对应 tool_calls 的 tool 消息。
+
+从数据库中加载的消息自带写入时估算的 token 数量，无需重新计算。
+"""
+
+from typing import Dict, List, Tuple
+from astrbot.core.utils.token_counter import (
+    Tokenizer,
+    count_message_tokens,
+    estimate_tokens,
+)
+
+
+class ContextWindow:
+    def __init__(self, max_tokens: int = 0, tokenizer: Tokenizer | None = None):
+        """
+        Args:
+            max_tokens: 上下文的 token 预算，小于等于 0 表示不限制
+            tokenizer: 分词器。为 None 时使用默认的估算，并且可以复用数据库中缓存的 token 数量
+        """
+        self.max_tokens = max_tokens
+        self.tokenizer = tokenizer or estimate_tokens
+        self.use_cached = tokenizer is None
+        self.offset = 0
+        """加载的第一条消息在对话中的序号，即加载时被丢弃的旧消息数量"""
+        self._known: Dict[int, Tuple[dict, int]] = {}
+        """消息对象的 id -> (消息, token 数量)。同时持有消息对象，避免 id 被复用"""
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_tokens > 0
+
+    def remember(self, message: dict, tokens: int | None):
+        """记录从数据库中加载的消息的 token 数量"""
+        if self.use_cached and tokens is not None:
+            self._known[id(message)] = (message, tokens)
+
+    def count(self, message: dict) -> int:
+        known = self._known.get(id(message))
+        if known is not None and known[0] is message:
+            return known[1]
+        tokens = count_message_tokens(message, self.tokenizer)
+        self._known[id(message)] = (message, tokens)
+        return tokens
+
+    def count_text(self, text: str | None) -> int:
+        return self.tokenizer(text) if text else 0
+
+    def fit(self, contexts: List[dict], reserved: int = 0) -> List[dict]:
+        """从最旧的轮次开始丢弃，直到上下文的 token 数量不超过预算
+
+        Args:
+            contexts: 上下文
+            reserved: 为系统提示词、本轮输入等预留的 token 数量
+
+        Returns:
+            截断后的上下文，是 contexts 的后缀
+        """
+        if not self.enabled:
+            return contexts
+        budget = self.max_tokens - reserved
+        total = 0
+        cut = len(contexts)
+        for i in range(len(contexts) - 1, -1, -1):
+            total += self.count(contexts[i])
+            if total > budget:
+                return contexts[cut:]
+            if contexts[i].get("role") == "user":
+                cut = i
+        return contexts
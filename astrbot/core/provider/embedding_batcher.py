@@ -0,0 +1,96 @@
+"""
+Embedding 请求合并
+
+将短时间内并发的单条 get_embedding 调用合并为一次批量请求(get_embeddings)，减少请求次数，降低被限流的概率。
+
+- 首条文本到达后最多等待 max_wait 秒，期间到达的文本合并到同一批次；批次达到 max_batch_size 条时立即发送。
+- 同一批次中相同的文本只请求一次。
+- 批量请求失败时，批次中的所有调用都会收到同一个异常。
+"""
+
+import asyncio
+from typing import Awaitable, Callable
+
+
+class EmbeddingBatcher:
+    def __init__(
+        self,
+        embed_batch: Callable[[list[str]], Awaitable[list[list[float]]]],
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+    ):
+        """
+        Args:
+            embed_batch: 批量获取向量的函数，通常为 EmbeddingProvider.get_embeddings
+            max_batch_size: 每批最多合并的文本数量。小于等于 1 时不合并
+            max_wait: 首条文本到达后等待其他文本的最长时间(秒)
+        """
+        self._embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.requests = 0
+        """合并前的调用次数"""
+        self.batches = 0
+        """实际发送的批量请求次数"""
+
+    async def embed(self, text: str) -> list[float]:
+        """获取单条文本的向量，与其他并发调用合并请求"""
+        self.requests += 1
+        if self.max_batch_size <= 1:
+            self.batches += 1
+            return (await self._embed_batch([text]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[str, asyncio.Future]]):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self.batches += 1
+        try:
+            vectors = await self._embed_batch(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(
+                    f"批量获取向量返回的数量不匹配, 期望: {len(texts)}, 实际: {len(vectors)}"
+                )
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        result = dict(zip(texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(result[text])
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 2)
+            if self.batches
+            else 0,
+        }
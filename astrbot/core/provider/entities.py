@@ -1,8 +1,7 @@
 import enum
-import base64
 import json
 from mimetypes import guess_type
-from astrbot.core.utils.io import download_image_by_url
+from astrbot.core.utils.media_cache import media_cache
 from astrbot import logger
 from dataclasses import dataclass, field
 from typing import List, Dict, Type
@@ -114,6 +113,9 @@ class ProviderRequest:
     model: str | None = None
     """模型名称，为 None 时使用提供商的默认模型"""
 
+    stable_system_prompt_len: int = 0
+    """system_prompt 开头在多轮对话中保持不变的部分的长度。提供商可以对这部分启用提示词缓存"""
+
     def __repr__(self):
         return f"ProviderRequest(prompt={self.prompt}, session_id={self.session_id}, image_urls={self.image_urls}, func_tool={self.func_tool}, contexts={self._print_friendly_context()}, system_prompt={self.system_prompt.strip()}, tool_calls_result={self.tool_calls_result})"
 
@@ -174,7 +176,7 @@ class ProviderRequest:
             }
             for image_url in self.image_urls:
                 if image_url.startswith("http"):
-                    image_path = await download_image_by_url(image_url)
+                    image_path = await media_cache.get_path(image_url)
                     image_data = await self._encode_image_bs64(image_path)
                 elif image_url.startswith("file:///"):
                     image_path = image_url.replace("file:///", "")
@@ -210,15 +212,25 @@ class ProviderRequest:
         # 其他类型保持检测到的MIME类型
 
         try:
-            with open(image_url, "rb") as f:
-                file_content = f.read()
-                image_bs64 = base64.b64encode(file_content).decode("utf-8")
-                return f"data:{mime_type};base64,{image_bs64}"
+            image_bs64 = await media_cache.get_base64(image_url)
+            return f"data:{mime_type};base64,{image_bs64}"
         except Exception as e:
             logger.warning(f"读取文件 {image_url} 失败: {e}")
             return ""
 
 
+@dataclass
+class TokenUsage:
+    input_tokens: int = 0
+    """输入的 token 数，包括命中提示词缓存的部分"""
+    cached_tokens: int = 0
+    """命中提供商提示词缓存的输入 token 数"""
+    cache_write_tokens: int = 0
+    """写入提示词缓存的输入 token 数(仅 Anthropic)"""
+    output_tokens: int = 0
+    """输出的 token 数"""
+
+
 @dataclass
 class LLMResponse:
     role: str
@@ -240,6 +252,9 @@ class LLMResponse:
     is_chunk: bool = False
     """是否是流式输出的单个 Chunk"""
 
+    usage: TokenUsage | None = None
+    """本次请求的 token 用量，提供商未返回时为 None"""
+
     def __init__(
         self,
         role: str,
@@ -251,6 +266,7 @@ class LLMResponse:
         raw_completion: ChatCompletion = None,
         _new_record: Dict[str, any] = None,
         is_chunk: bool = False,
+        usage: TokenUsage | None = None,
     ):
         """初始化 LLMResponse
 
@@ -261,6 +277,7 @@ class LLMResponse:
             tools_call_args (List[Dict[str, any]], optional): 工具调用参数. Defaults to None.
             tools_call_name (List[str], optional): 工具调用名称. Defaults to None.
             raw_completion (ChatCompletion, optional): 原始响应, OpenAI 格式. Defaults to None.
+            usage (TokenUsage, optional): token 用量. Defaults to None.
         """
         if tools_call_args is None:
             tools_call_args = []
@@ -278,6 +295,7 @@ class LLMResponse:
         self.raw_completion = raw_completion
         self._new_record = _new_record
         self.is_chunk = is_chunk
+        self.usage = usage
 
     @property
     def completion_text(self):
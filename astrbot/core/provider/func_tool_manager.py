@@ -6,14 +6,15 @@ import asyncio
 import logging
 from datetime import timedelta
 
-from typing import Dict, List, Awaitable, Literal, Any
-from dataclasses import dataclass
+from typing import Dict, List, Awaitable, Literal, Any, Callable, Tuple
+from dataclasses import dataclass, field
 from typing import Optional
 from contextlib import AsyncExitStack
 from astrbot import logger
 from astrbot.core.utils.log_pipe import LogPipe
 
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.http_client import http_client
 
 try:
     import mcp
@@ -30,6 +31,11 @@ except (ModuleNotFoundError, ImportError):
 
 DEFAULT_MCP_CONFIG = {"mcpServers": {}}
 
+_SCHEMA_FIELDS = {"name", "parameters", "description", "active"}
+"""影响工具描述的 FuncTool 字段"""
+_schema_version = [0]
+"""任意 FuncTool 的上述字段被修改时递增，用于使 FuncCall 缓存的工具描述失效"""
+
 SUPPORTED_TYPES = [
     "string",
     "number",
@@ -45,6 +51,7 @@ def _prepare_config(config: dict) -> dict:
         first_key = next(iter(config["mcpServers"]))
         config = config["mcpServers"][first_key]
     config.pop("active", None)
+    config.pop("cache_ttl", None)
     return config
 
 
@@ -59,7 +66,7 @@ async def _quick_test_mcp_connection(config: dict) -> tuple[bool, str]:
     timeout = cfg.get("timeout", 10)
 
     try:
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session(direct=True) as session:
             if cfg.get("transport") == "streamable_http":
                 test_payload = {
                     "jsonrpc": "2.0",
@@ -124,6 +131,21 @@ class FuncTool:
     active: bool = True
     """是否激活"""
 
+    parallel: bool = False
+    """为 True 时，该工具可以与同一轮中的其他工具调用并行执行。
+
+    插件工具共享同一个事件对象，默认顺序执行；声明并行的工具应只通过返回值输出结果，不应使用 event.set_result 或 event.send。
+    MCP 工具不依赖事件，总是可以并行执行。
+    """
+    max_concurrency: int = 0
+    """该工具同时执行的最大数量，0 表示使用全局配置"""
+    _semaphore: Tuple[int, asyncio.Semaphore] | None = field(
+        default=None, repr=False, compare=False
+    )
+    """(并发上限, 信号量)"""
+    cache_ttl: float = 0
+    """工具结果的缓存时间(秒)，0 表示不缓存。只应为幂等、无副作用的工具设置。缓存由 Agent 在调用工具时按会话使用，execute() 不使用缓存"""
+
     origin: Literal["local", "mcp"] = "local"
     """函数工具的来源, local 为本地函数工具, mcp 为 MCP 服务"""
 
@@ -133,6 +155,23 @@ class FuncTool:
     mcp_client: MCPClient = None
     """MCP 客户端，当 origin 为 mcp 时有效"""
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in _SCHEMA_FIELDS:
+            _schema_version[0] += 1
+
+    def get_semaphore(self, default_limit: int) -> asyncio.Semaphore | None:
+        """限制该工具同时执行数量的信号量。max_concurrency 为 0 时使用 default_limit，上限小于等于 0 时返回 None
+
+        信号量保存在工具上，工具被重新载入后随之重建。
+        """
+        limit = self.max_concurrency or default_limit
+        if limit <= 0:
+            return None
+        if self._semaphore is None or self._semaphore[0] != limit:
+            self._semaphore = (limit, asyncio.Semaphore(limit))
+        return self._semaphore[1]
+
     def __repr__(self):
         return f"FuncTool(name={self.name}, parameters={self.parameters}, description={self.description}, active={self.active}, origin={self.origin})"
 
@@ -278,12 +317,52 @@ class MCPClient:
 
 class FuncCall:
     def __init__(self) -> None:
-        self.func_list: List[FuncTool] = []
-        """内部加载的 func tools"""
+        self._func_list: List[FuncTool] = []
         self.mcp_client_dict: Dict[str, MCPClient] = {}
         """MCP 服务列表"""
         self.mcp_client_event: Dict[str, asyncio.Event] = {}
 
+        self._version = 0
+        """工具列表被修改时递增"""
+        self._cache_state: Tuple[int, int, int] | None = None
+        """构建下面两个缓存时的 (工具列表版本, FuncTool 字段版本, 工具数量)"""
+        self._func_dict: Dict[str, FuncTool] = {}
+        """工具名 -> 工具。同名的工具以列表中靠前的为准"""
+        self._schema_cache: Dict[tuple, Any] = {}
+        """(API 风格, 参数) -> 已经激活的工具描述"""
+
+    @property
+    def func_list(self) -> List[FuncTool]:
+        """内部加载的 func tools"""
+        return self._func_list
+
+    @func_list.setter
+    def func_list(self, func_list: List[FuncTool]) -> None:
+        self._func_list = func_list
+        self._invalidate()
+
+    def _invalidate(self) -> None:
+        """工具被添加、删除，或者 MCP 服务变化后调用。工具的激活状态等字段的修改会被自动感知"""
+        self._version += 1
+
+    def _ensure_cache(self) -> None:
+        state = (self._version, _schema_version[0], len(self._func_list))
+        if state == self._cache_state:
+            return
+        self._func_dict = {}
+        for f in self._func_list:
+            self._func_dict.setdefault(f.name, f)
+        self._schema_cache.clear()
+        self._cache_state = state
+
+    def _cached_desc(self, key: tuple, build: Callable[[], Any]) -> Any:
+        self._ensure_cache()
+        if key not in self._schema_cache:
+            self._schema_cache[key] = build()
+        desc = self._schema_cache[key]
+        # 返回浅拷贝，避免调用方修改缓存的列表
+        return dict(desc) if isinstance(desc, dict) else list(desc)
+
     def empty(self) -> bool:
         return len(self.func_list) == 0
 
@@ -293,6 +372,9 @@ class FuncCall:
         func_args: list,
         desc: str,
         handler: Awaitable,
+        parallel: bool = False,
+        max_concurrency: int = 0,
+        cache_ttl: float = 0,
     ) -> None:
         """添加函数调用工具
 
@@ -300,6 +382,9 @@ class FuncCall:
         @param func_args: 函数参数列表，格式为 [{"type": "string", "name": "arg_name", "description": "arg_description"}, ...]
         @param desc: 函数描述
         @param func_obj: 处理函数
+        @param parallel: 是否可以与其他工具调用并行执行
+        @param max_concurrency: 该工具同时执行的最大数量，0 表示使用全局配置
+        @param cache_ttl: 工具结果的缓存时间(秒)，0 表示不缓存
         """
         # check if the tool has been added before
         self.remove_func(name)
@@ -318,24 +403,30 @@ class FuncCall:
             parameters=params,
             description=desc,
             handler=handler,
+            parallel=parallel,
+            max_concurrency=max_concurrency,
+            cache_ttl=cache_ttl,
         )
         self.func_list.append(_func)
+        self._invalidate()
         logger.info(f"添加函数调用工具: {name}")
 
     def remove_func(self, name: str) -> None:
         """
         删除一个函数调用工具。
         """
+        func_tool = self.get_func(name)
+        if not func_tool:
+            return
         for i, f in enumerate(self.func_list):
-            if f.name == name:
+            if f is func_tool:
                 self.func_list.pop(i)
                 break
+        self._invalidate()
 
     def get_func(self, name) -> FuncTool:
-        for f in self.func_list:
-            if f.name == name:
-                return f
-        return None
+        self._ensure_cache()
+        return self._func_dict.get(name)
 
     async def init_mcp_clients(self) -> None:
         """从项目根目录读取 mcp_server.json 文件，初始化 MCP 服务列表。文件格式如下：
@@ -425,7 +516,11 @@ class FuncCall:
         ]
 
         # 将 MCP 工具转换为 FuncTool 并添加到 func_list
+        # 服务配置了 cache_ttl 时缓存其工具的结果，声明了 readOnlyHint 为 False 的工具除外
+        cache_ttl = float(config.get("cache_ttl", 0) or 0)
         for tool in mcp_client.tools:
+            annotations = getattr(tool, "annotations", None)
+            read_only = getattr(annotations, "readOnlyHint", None)
             func_tool = FuncTool(
                 name=tool.name,
                 parameters=tool.inputSchema,
@@ -433,8 +528,10 @@ class FuncCall:
                 origin="mcp",
                 mcp_server_name=name,
                 mcp_client=mcp_client,
+                cache_ttl=0 if read_only is False else cache_ttl,
             )
             self.func_list.append(func_tool)
+        self._invalidate()
 
         logger.info(f"已连接 MCP 服务 {name}, Tools: {tool_names}")
 
@@ -556,6 +653,12 @@ class FuncCall:
         """
         获得 OpenAI API 风格的**已经激活**的工具描述
         """
+        return self._cached_desc(
+            ("openai", bool(omit_empty_parameter_field)),
+            lambda: self._build_func_desc_openai_style(omit_empty_parameter_field),
+        )
+
+    def _build_func_desc_openai_style(self, omit_empty_parameter_field: bool) -> list:
         _l = []
         # 处理所有工具（包括本地和MCP工具）
         for f in self.func_list:
@@ -580,6 +683,9 @@ class FuncCall:
         """
         获得 Anthropic API 风格的**已经激活**的工具描述
         """
+        return self._cached_desc(("anthropic",), self._build_func_desc_anthropic_style)
+
+    def _build_func_desc_anthropic_style(self) -> list:
         tools = []
         for f in self.func_list:
             if not f.active:
@@ -603,6 +709,11 @@ class FuncCall:
         """
         获得 Google GenAI API 风格的**已经激活**的工具描述
         """
+        return self._cached_desc(
+            ("google_genai",), self._build_func_desc_google_genai_style
+        )
+
+    def _build_func_desc_google_genai_style(self) -> dict:
 
         # Gemini API 支持的数据类型和格式
         supported_types = {
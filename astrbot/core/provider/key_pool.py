@@ -0,0 +1,255 @@
+"""
+API Key 池
+
+提供商配置了多个 API Key 时，由 Key 池为每次请求选择 Key:
+
+- least_loaded: 选择正在进行的请求最少的 Key，相同时选择最久未使用的 Key。
+- token_bucket: 每个 Key 以 qps_per_key 的速率获得令牌，选择剩余令牌最多的 Key；所有 Key 的令牌都用完时等待。
+
+请求被限流(429)时，Key 进入冷却而不是被移除。冷却时间优先使用响应中的 Retry-After，
+否则从 base_cooldown 开始按指数退避，最长 max_cooldown，请求成功后重置。
+所有 Key 都在冷却中时，最多等待 max_wait 秒。
+
+每个 Key 的请求数、错误数、限流次数和最近一分钟的 QPS 可以通过 stats() 获取。
+"""
+
+import asyncio
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Iterable, List
+
+
+class NoAvailableKeyError(Exception):
+    """没有可用的 API Key"""
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """判断异常是否为限流错误(429)"""
+    for attr in ("status_code", "code", "status"):
+        if getattr(e, attr, None) == 429:
+            return True
+    text = str(e)
+    return "429" in text or "RESOURCE_EXHAUSTED" in text
+
+
+def get_retry_after(e: Exception) -> float | None:
+    """从异常中获取服务端建议的重试等待时间(秒)"""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        try:
+            if value := headers.get("retry-after-ms"):
+                return float(value) / 1000
+            if value := headers.get("retry-after"):
+                try:
+                    return float(value)
+                except ValueError:
+                    return max(
+                        0.0, parsedate_to_datetime(value).timestamp() - time.time()
+                    )
+        except (TypeError, ValueError):
+            pass
+    # Gemini 在错误详情中返回 retryDelay
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"](\d+(?:\.\d+)?)s", str(e))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class _KeyState:
+    def __init__(self, key: str, qps: float):
+        self.key = key
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.last_used = 0.0
+        self.cooldown_until = 0.0
+        self.backoff = 0.0
+        self.tokens = qps
+        self.token_time = time.monotonic()
+        self.recent: deque[float] = deque()
+        """最近一分钟内请求的时间"""
+
+    def refill(self, qps: float, now: float):
+        self.tokens = min(qps, self.tokens + (now - self.token_time) * qps)
+        self.token_time = now
+
+
+class KeyPool:
+    def __init__(
+        self,
+        keys: Iterable[str],
+        strategy: str = "least_loaded",
+        qps_per_key: float = 0,
+        base_cooldown: float = 1,
+        max_cooldown: float = 60,
+        max_wait: float = 30,
+    ):
+        """
+        Args:
+            keys: API Key 列表
+            strategy: least_loaded 或 token_bucket
+            qps_per_key: token_bucket 策略下每个 Key 每秒允许的请求数，小于等于 0 时不限制
+            base_cooldown: 限流后的初始冷却时间(秒)
+            max_cooldown: 最长冷却时间(秒)
+            max_wait: 所有 Key 都不可用时最多等待的时间(秒)
+        """
+        self.strategy = strategy
+        self.qps_per_key = qps_per_key
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.max_wait = max_wait
+        self._states: dict[str, _KeyState] = {}
+        for key in keys:
+            if key and key not in self._states:
+                self._states[key] = _KeyState(key, qps_per_key)
+
+    @classmethod
+    def from_config(cls, keys: Iterable[str], config: dict | None) -> "KeyPool":
+        """根据 provider_settings.key_pool 配置创建 Key 池"""
+        config = config or {}
+        return cls(
+            keys,
+            strategy=config.get("strategy", "least_loaded"),
+            qps_per_key=config.get("qps_per_key", 0),
+            max_cooldown=config.get("max_cooldown", 60),
+            max_wait=config.get("max_wait", 30),
+        )
+
+    @property
+    def keys(self) -> List[str]:
+        return list(self._states)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def _use_bucket(self) -> bool:
+        return self.strategy == "token_bucket" and self.qps_per_key > 0
+
+    def _wait_time(self, state: _KeyState, now: float) -> float:
+        """Key 需要等待多久才可以使用"""
+        wait = max(0.0, state.cooldown_until - now)
+        if self._use_bucket() and state.tokens < 1:
+            wait = max(wait, (1 - state.tokens) / self.qps_per_key)
+        return wait
+
+    def next_available_in(self, exclude: Iterable[str] = ()) -> float:
+        """距离下一个 Key 可用的时间(秒)。没有 Key 时返回 inf"""
+        exclude = set(exclude)
+        now = time.monotonic()
+        waits = []
+        for state in self._states.values():
+            if state.key in exclude:
+                continue
+            if self._use_bucket():
+                state.refill(self.qps_per_key, now)
+            waits.append(self._wait_time(state, now))
+        return min(waits, default=float("inf"))
+
+    def _pick(self, exclude: set) -> _KeyState | None:
+        now = time.monotonic()
+        candidates = []
+        for state in self._states.values():
+            if state.key in exclude:
+                continue
+            if self._use_bucket():
+                state.refill(self.qps_per_key, now)
+            if self._wait_time(state, now) == 0:
+                candidates.append(state)
+        if not candidates:
+            return None
+        if self._use_bucket():
+            return max(candidates, key=lambda s: (s.tokens, -s.in_flight, -s.last_used))
+        return min(candidates, key=lambda s: (s.in_flight, s.last_used))
+
+    async def acquire(self, exclude: Iterable[str] = ()) -> str:
+        """选择一个 Key。所有 Key 都不可用时等待，最多等待 max_wait 秒
+
+        Raises:
+            NoAvailableKeyError: 没有 Key，或者等待超过 max_wait 秒
+        """
+        exclude = set(exclude)
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            state = self._pick(exclude)
+            if state is not None:
+                now = time.monotonic()
+                if self._use_bucket():
+                    state.tokens -= 1
+                state.in_flight += 1
+                state.requests += 1
+                state.last_used = now
+                state.recent.append(now)
+                while state.recent and now - state.recent[0] > 60:
+                    state.recent.popleft()
+                return state.key
+            wait = self.next_available_in(exclude)
+            if wait == float("inf") or time.monotonic() + wait > deadline:
+                raise NoAvailableKeyError("没有可用的 API Key，所有 Key 均处于冷却中")
+            await asyncio.sleep(wait)
+
+    def release(self, key: str, error: Exception | None = None):
+        """归还 Key，并根据请求结果更新 Key 的状态"""
+        state = self._states.get(key)
+        if state is None:
+            return
+        state.in_flight = max(0, state.in_flight - 1)
+        if error is None:
+            state.backoff = 0.0
+        elif is_rate_limit_error(error):
+            state.rate_limited += 1
+            self.cooldown(key, get_retry_after(error))
+        else:
+            state.errors += 1
+
+    def cooldown(self, key: str, seconds: float | None = None):
+        """让 Key 进入冷却。未指定时间时按指数退避"""
+        state = self._states.get(key)
+        if state is None:
+            return
+        if seconds is None:
+            state.backoff = min(
+                self.max_cooldown,
+                state.backoff * 2 if state.backoff else self.base_cooldown,
+            )
+            seconds = state.backoff
+        state.cooldown_until = max(state.cooldown_until, time.monotonic() + seconds)
+
+    @asynccontextmanager
+    async def lease(self, exclude: Iterable[str] = ()) -> AsyncIterator[str]:
+        """以 `async with` 的方式使用 Key，退出时根据是否发生异常归还 Key"""
+        key = await self.acquire(exclude)
+        try:
+            yield key
+        except Exception as e:
+            self.release(key, e)
+            raise
+        except BaseException:
+            # 请求被取消，不影响 Key 的状态
+            self._states[key].in_flight -= 1
+            raise
+        else:
+            self.release(key)
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        result = []
+        for state in self._states.values():
+            while state.recent and now - state.recent[0] > 60:
+                state.recent.popleft()
+            result.append(
+                {
+                    "key": state.key[:8],
+                    "in_flight": state.in_flight,
+                    "requests": state.requests,
+                    "errors": state.errors,
+                    "rate_limited": state.rate_limited,
+                    "qps": round(len(state.recent) / 60, 3),
+                    "cooldown": round(max(0.0, state.cooldown_until - now), 1),
+                }
+            )
+        return result
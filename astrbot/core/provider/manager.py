@@ -198,6 +198,10 @@ class ProviderManager:
                     from .sources.dashscope_source import (
                         ProviderDashscope as ProviderDashscope,
                     )
+                case "router":
+                    from .sources.router_source import (
+                        ProviderRouter as ProviderRouter,
+                    )
                 case "googlegenai_chat_completion":
                     from .sources.gemini_source import (
                         ProviderGoogleGenAI as ProviderGoogleGenAI,
@@ -332,6 +336,8 @@ class ProviderManager:
 
                 if getattr(inst, "initialize", None):
                     await inst.initialize()
+                if getattr(inst, "set_provider_manager", None):
+                    inst.set_provider_manager(self)
 
                 self.provider_insts.append(inst)
                 if (
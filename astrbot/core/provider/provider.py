@@ -2,7 +2,12 @@ import abc
 from typing import List
 from typing import TypedDict, AsyncGenerator
 from astrbot.core.provider.func_tool_manager import FuncCall
-from astrbot.core.provider.entities import LLMResponse, ToolCallsResult, ProviderType
+from astrbot.core.provider.entities import (
+    LLMResponse,
+    ToolCallsResult,
+    ProviderType,
+    TokenUsage,
+)
 from astrbot.core.provider.register import provider_cls_map
 from dataclasses import dataclass
 
@@ -12,6 +17,8 @@ class Personality(TypedDict):
     name: str = ""
     begin_dialogs: List[str] = []
     mood_imitation_dialogs: List[str] = []
+    tools: List[str] = []
+    """可用的函数调用工具，为空时不限制"""
 
     # cache
     _begin_dialogs_processed: List[dict] = []
@@ -67,6 +74,25 @@ class Provider(AbstractProvider):
         self.curr_personality = default_persona
         """维护了当前的使用的 persona，即人格。可能为 None"""
 
+        self.token_usage = {
+            "requests": 0,
+            "input_tokens": 0,
+            "cached_tokens": 0,
+            "cache_write_tokens": 0,
+            "output_tokens": 0,
+        }
+        """累计的 token 用量"""
+
+    def record_usage(self, usage: TokenUsage | None):
+        """累计一次请求的 token 用量"""
+        if usage is None:
+            return
+        self.token_usage["requests"] += 1
+        self.token_usage["input_tokens"] += usage.input_tokens
+        self.token_usage["cached_tokens"] += usage.cached_tokens
+        self.token_usage["cache_write_tokens"] += usage.cache_write_tokens
+        self.token_usage["output_tokens"] += usage.output_tokens
+
     @abc.abstractmethod
     def get_current_key(self) -> str:
         raise NotImplementedError()
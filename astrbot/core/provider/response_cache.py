@@ -0,0 +1,283 @@
+"""
+LLM 响应缓存
+
+启用后，相同的请求直接返回之前的回复，不再请求 LLM。适用于帮助、常见问题、对话标题生成和图片转述等重复度高的请求。
+
+- 缓存的键由提供商、模型、系统提示词、最近 context_messages 条上下文、可用的工具、图片和用户输入组成。
+  比较前会合并空白字符、忽略大小写。系统提示词中的当前时间只保留到小时，与时间有关的问题不会得到过时的回复。
+  本地图片按文件内容计算摘要，临时路径被复用时不会命中其他图片的结果。
+- scope 决定缓存的共享范围: global 为所有会话共享，persona 为使用相同人格的会话共享，session 为每个会话独立。
+- 只缓存不含工具调用的纯文本回复，携带工具调用结果的请求(工具调用的后续轮次)不使用缓存。
+- 缓存在 ttl 秒后过期，超过 max_entries 条时按最近最少使用(LRU)淘汰。
+- 配置了 Embedding 提供商时启用语义缓存: 精确匹配未命中时，在其余部分完全相同的缓存中查找与用户输入的向量相似度
+  不低于 similarity_threshold 的请求。语义索引使用 FaissVecDB，每次启动时重建。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+import astrbot.core.message.components as Comp
+from astrbot.core.provider.entities import LLMResponse
+from astrbot.core.provider.provider import EmbeddingProvider, Provider
+
+logger = logging.getLogger("astrbot")
+
+_DATETIME_RE = re.compile(
+    r"^(Current datetime: \d{4}-\d{2}-\d{2} \d{2}):\d{2}(.*)$", re.MULTILINE
+)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _normalize(text) -> str:
+    if not isinstance(text, str):
+        text = json.dumps(text, ensure_ascii=False, sort_keys=True, default=str)
+    return _SPACE_RE.sub(" ", text).strip().casefold()
+
+
+def _image_digest(image_url: str) -> str:
+    """本地图片和 base64 图片按内容计算摘要，其他图片(如 http URL)使用其地址"""
+    if image_url.startswith("base64://"):
+        return hashlib.sha256(image_url.encode()).hexdigest()
+    path = image_url[8:] if image_url.startswith("file:///") else image_url
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                digest.update(chunk)
+    except OSError:
+        return image_url
+    return digest.hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self):
+        self.enable = False
+        self.ttl = 3600.0
+        self.max_entries = 1024
+        self.scope = "persona"
+        self.context_messages = 4
+        self.similarity_threshold = 0.95
+        self._entries: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+        """键 -> (过期时间, 回复文本)"""
+        self._vec_db = None
+        self._vec_dir: str | None = None
+        self._semantic_keys: set[str] = set()
+        """已经写入语义索引的键"""
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(
+        self,
+        enable: bool = False,
+        ttl: float = 3600,
+        max_entries: int = 1024,
+        scope: str = "persona",
+        context_messages: int = 4,
+        similarity_threshold: float = 0.95,
+    ):
+        if scope not in ("global", "persona", "session"):
+            logger.warning(f"未知的 LLM 响应缓存范围: {scope}，将使用 persona")
+            scope = "persona"
+        self.enable = enable
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.scope = scope
+        self.context_messages = max(0, context_messages)
+        self.similarity_threshold = similarity_threshold
+        self._entries.clear()
+
+    async def init_semantic(self, embedding_provider: EmbeddingProvider, data_dir: str):
+        """使用 Embedding 提供商启用语义缓存"""
+        await self.close()
+        if not isinstance(embedding_provider, EmbeddingProvider):
+            logger.warning("LLM 响应缓存: 未找到 Embedding 提供商，不启用语义缓存。")
+            return
+        from astrbot.core.db.vec_db.faiss_impl import FaissVecDB
+
+        os.makedirs(data_dir, exist_ok=True)
+        self._vec_dir = data_dir
+        doc_path = os.path.join(data_dir, "response_cache.db")
+        index_path = os.path.join(data_dir, "response_cache.index")
+        # 缓存的回复只保存在内存中，语义索引每次启动时重建
+        for path in (doc_path, index_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._vec_db = FaissVecDB(doc_path, index_path, embedding_provider)
+        await self._vec_db.initialize()
+        self._semantic_keys.clear()
+
+    async def close(self):
+        if self._vec_db is not None:
+            await self._vec_db.close()
+            self._vec_db = None
+
+    def _scope_key(self, persona: str, session: str) -> str:
+        if self.scope == "session":
+            return f"session:{session}"
+        if self.scope == "persona":
+            return f"persona:{persona}"
+        return "global"
+
+    async def make_keys(
+        self, provider: Provider, request: dict, persona: str = "", session: str = ""
+    ) -> Tuple[str, str, str] | None:
+        """计算请求的缓存键。请求不可缓存时返回 None
+
+        Returns:
+            (精确匹配的键, 除用户输入外其余部分的键, 规范化后的用户输入)
+        """
+        if request.get("tool_calls_result"):
+            return None
+        prompt = _normalize(request.get("prompt") or "")
+        if not prompt and not request.get("image_urls"):
+            return None
+        contexts = request.get("contexts") or []
+        tail = contexts[-self.context_messages :] if self.context_messages else []
+        func_tool = request.get("func_tool")
+        tools = (
+            sorted(f.name for f in func_tool.func_list if f.active) if func_tool else []
+        )
+        system_prompt = _DATETIME_RE.sub(r"\1\2", request.get("system_prompt") or "")
+        images = [
+            await asyncio.to_thread(_image_digest, str(image_url))
+            for image_url in request.get("image_urls") or []
+        ]
+        parts = [
+            self._scope_key(persona, session),
+            provider.meta().id,
+            request.get("model") or provider.get_model(),
+            _normalize(system_prompt),
+            [
+                [m.get("role"), _normalize(m.get("content") or "")]
+                for m in tail
+                if isinstance(m, dict)
+            ],
+            tools,
+            images,
+        ]
+        ctx_key = hashlib.sha256(
+            json.dumps(parts, ensure_ascii=False, default=str).encode()
+        ).hexdigest()
+        key = hashlib.sha256(f"{ctx_key}:{prompt}".encode()).hexdigest()
+        return key, ctx_key, prompt
+
+    def _lookup(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def get(
+        self, provider: Provider, request: dict, persona: str = "", session: str = ""
+    ) -> LLMResponse | None:
+        """获取缓存的回复，未命中时返回 None"""
+        if not self.enable or self.max_entries <= 0:
+            return None
+        keys = await self.make_keys(provider, request, persona, session)
+        if keys is None:
+            return None
+        key, ctx_key, prompt = keys
+        text = self._lookup(key)
+        if text is None and self._vec_db is not None and prompt:
+            try:
+                results = await self._vec_db.retrieve(
+                    prompt, k=1, fetch_k=20, metadata_filters={"ctx": ctx_key}
+                )
+                if results and results[0].similarity >= self.similarity_threshold:
+                    metadata = json.loads(results[0].data["metadata"])
+                    text = self._lookup(metadata["key"])
+                    if text is not None:
+                        self.semantic_hits += 1
+            except Exception as e:
+                logger.warning(f"LLM 响应缓存: 语义缓存查询失败: {e}")
+        if text is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return LLMResponse("assistant", completion_text=text)
+
+    async def put(
+        self,
+        provider: Provider,
+        request: dict,
+        response: LLMResponse,
+        persona: str = "",
+        session: str = "",
+    ):
+        """缓存回复。只缓存不含工具调用的纯文本回复"""
+        if not self.enable or self.max_entries <= 0 or self.ttl <= 0:
+            return
+        if (
+            response is None
+            or response.role != "assistant"
+            or response.tools_call_name
+            or not response.completion_text
+        ):
+            return
+        if response.result_chain and any(
+            not isinstance(comp, Comp.Plain) for comp in response.result_chain.chain
+        ):
+            return
+        keys = await self.make_keys(provider, request, persona, session)
+        if keys is None:
+            return
+        key, ctx_key, prompt = keys
+        self._entries[key] = (time.time() + self.ttl, response.completion_text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+        if self._vec_db is not None and prompt and key not in self._semantic_keys:
+            self._semantic_keys.add(key)
+            try:
+                await self._vec_db.insert(
+                    prompt, metadata={"ctx": ctx_key, "key": key}, id=key
+                )
+            except Exception as e:
+                logger.warning(f"LLM 响应缓存: 写入语义缓存失败: {e}")
+            if len(self._semantic_keys) > self.max_entries * 2:
+                # 语义索引中大部分条目已经被淘汰，重建索引
+                await self.init_semantic(self._vec_db.embedding_provider, self._vec_dir)
+
+    async def text_chat(
+        self, provider: Provider, persona: str = "", session: str = "", **kwargs
+    ) -> LLMResponse:
+        """带缓存的 Provider.text_chat"""
+        cached = await self.get(provider, kwargs, persona, session)
+        if cached is not None:
+            return cached
+        response = await provider.text_chat(**kwargs)
+        await self.put(provider, kwargs, response, persona, session)
+        return response
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enable": self.enable,
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+
+llm_response_cache = LLMResponseCache()
@@ -1,21 +1,28 @@
 import json
 import anthropic
-import base64
 from typing import List
 from mimetypes import guess_type
 
 from anthropic import AsyncAnthropic
 from anthropic.types import Message
 
-from astrbot.core.utils.io import download_image_by_url
+from astrbot.core.utils.media_cache import media_cache
 from astrbot.api.provider import Provider
 from astrbot import logger
 from astrbot.core.provider.func_tool_manager import FuncCall
+from astrbot.core.provider.key_pool import (
+    KeyPool,
+    NoAvailableKeyError,
+    is_rate_limit_error,
+)
 from ..register import register_provider_adapter
-from astrbot.core.provider.entities import LLMResponse
+from astrbot.core.provider.entities import LLMResponse, TokenUsage
 from typing import AsyncGenerator
 
 
+_CACHE_CONTROL = {"type": "ephemeral"}
+
+
 @register_provider_adapter(
     "anthropic_chat_completion", "Anthropic Claude API 提供商适配器"
 )
@@ -40,19 +47,45 @@ class ProviderAnthropic(Provider):
         if isinstance(self.timeout, str):
             self.timeout = int(self.timeout)
 
-        self.client = AsyncAnthropic(
-            api_key=self.chosen_api_key, timeout=self.timeout, base_url=self.base_url
+        self.key_pool = KeyPool.from_config(
+            self.api_keys, provider_settings.get("key_pool")
         )
+        # 每个 Key 使用独立的客户端，并发请求之间不会互相修改 Key
+        self._clients: dict = {}
+        self.client = self._get_client(self.chosen_api_key)
+
+        self.prompt_cache: bool = provider_settings.get("prompt_cache", True)
 
         self.set_model(provider_config["model_config"]["model"])
 
-    def _prepare_payload(self, messages: list[dict]):
+    def _get_client(self, key: str) -> AsyncAnthropic:
+        if key not in self._clients:
+            self._clients[key] = AsyncAnthropic(
+                api_key=key, timeout=self.timeout, base_url=self.base_url
+            )
+        return self._clients[key]
+
+    async def _acquire_key(self, last_exception: Exception | None) -> str:
+        """从 Key 池中选择本次请求使用的 Key。没有配置 Key 时返回默认 Key"""
+        if not len(self.key_pool):
+            return self.chosen_api_key
+        try:
+            return await self.key_pool.acquire()
+        except NoAvailableKeyError:
+            if last_exception is not None:
+                raise last_exception
+            raise
+
+    def _prepare_payload(self, messages: list[dict], stable_system_prompt_len: int = 0):
         """准备 Anthropic API 的请求 payload
 
+        启用提示词缓存时，在系统提示词的稳定部分末尾和最后一条消息上设置缓存断点(cache_control)。
+
         Args:
             messages: OpenAI 格式的消息列表，包含用户输入和系统提示等信息
+            stable_system_prompt_len: 系统提示词开头在多轮对话中保持不变的部分的长度
         Returns:
-            system_prompt: 系统提示内容
+            system_prompt: 系统提示内容，设置了缓存断点时为内容块列表
             new_messages: 处理后的消息列表，去除系统提示
         """
         system_prompt = ""
@@ -98,14 +131,64 @@ class ProviderAnthropic(Provider):
             else:
                 new_messages.append(message)
 
+        if self.prompt_cache:
+            if new_messages:
+                new_messages[-1] = self._with_cache_control(new_messages[-1])
+            stable = system_prompt[:stable_system_prompt_len]
+            volatile = system_prompt[stable_system_prompt_len:]
+            if stable.strip():
+                system_prompt = [
+                    {"type": "text", "text": stable, "cache_control": _CACHE_CONTROL}
+                ]
+                if volatile.strip():
+                    system_prompt.append({"type": "text", "text": volatile})
+
         return system_prompt, new_messages
 
-    async def _query(self, payloads: dict, tools: FuncCall) -> LLMResponse:
+    @staticmethod
+    def _with_cache_control(message: dict) -> dict:
+        """返回在最后一个内容块上设置了缓存断点的消息副本，不修改原消息"""
+        content = message.get("content")
+        if isinstance(content, str):
+            blocks = [{"type": "text", "text": content}] if content else []
+        else:
+            blocks = list(content or [])
+        if not blocks or blocks[-1].get("type") == "text" and not blocks[-1]["text"]:
+            return message
+        blocks[-1] = {**blocks[-1], "cache_control": _CACHE_CONTROL}
+        return {**message, "content": blocks}
+
+    def _prepare_tools(self, tools: FuncCall) -> list[dict]:
+        tool_list = tools.get_func_desc_anthropic_style()
+        if tool_list and self.prompt_cache:
+            tool_list[-1] = {**tool_list[-1], "cache_control": _CACHE_CONTROL}
+        return tool_list
+
+    def _parse_usage(self, usage) -> TokenUsage | None:
+        """解析 token 用量。Anthropic 的 input_tokens 不包括读取和写入缓存的部分"""
+        if usage is None:
+            return None
+        cached = getattr(usage, "cache_read_input_tokens", 0) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+        token_usage = TokenUsage(
+            input_tokens=(usage.input_tokens or 0) + cached + cache_write,
+            cached_tokens=cached,
+            cache_write_tokens=cache_write,
+            output_tokens=usage.output_tokens or 0,
+        )
+        self.record_usage(token_usage)
+        return token_usage
+
+    async def _query(
+        self, payloads: dict, tools: FuncCall, client: AsyncAnthropic = None
+    ) -> LLMResponse:
         if tools:
-            if tool_list := tools.get_func_desc_anthropic_style():
+            if tool_list := self._prepare_tools(tools):
                 payloads["tools"] = tool_list
 
-        completion = await self.client.messages.create(**payloads, stream=False)
+        completion = await (client or self.client).messages.create(
+            **payloads, stream=False
+        )
 
         assert isinstance(completion, Message)
         logger.debug(f"completion: {completion}")
@@ -128,13 +211,14 @@ class ProviderAnthropic(Provider):
         if not llm_response.completion_text and not llm_response.tools_call_args:
             raise Exception(f"Anthropic API 返回的 completion 无法解析：{completion}。")
 
+        llm_response.usage = self._parse_usage(completion.usage)
         return llm_response
 
     async def _query_stream(
-        self, payloads: dict, tools: FuncCall
+        self, payloads: dict, tools: FuncCall, client: AsyncAnthropic = None
     ) -> AsyncGenerator[LLMResponse, None]:
         if tools:
-            if tool_list := tools.get_func_desc_anthropic_style():
+            if tool_list := self._prepare_tools(tools):
                 payloads["tools"] = tool_list
 
         # 用于累积工具调用信息
@@ -143,7 +227,7 @@ class ProviderAnthropic(Provider):
         final_text = ""
         final_tool_calls = []
 
-        async with self.client.messages.stream(**payloads) as stream:
+        async with (client or self.client).messages.stream(**payloads) as stream:
             assert isinstance(stream, anthropic.AsyncMessageStream)
             async for event in stream:
                 if event.type == "content_block_start":
@@ -212,9 +296,14 @@ class ProviderAnthropic(Provider):
                         # 清理缓冲区
                         del tool_use_buffer[event.index]
 
+            final_message = await stream.get_final_message()
+
         # 返回最终的完整结果
         final_response = LLMResponse(
-            role="assistant", completion_text=final_text, is_chunk=False
+            role="assistant",
+            completion_text=final_text,
+            is_chunk=False,
+            usage=self._parse_usage(final_message.usage),
         )
 
         if final_tool_calls:
@@ -257,7 +346,9 @@ class ProviderAnthropic(Provider):
                 for tcr in tool_calls_result:
                     context_query.extend(tcr.to_openai_messages())
 
-        system_prompt, new_messages = self._prepare_payload(context_query)
+        system_prompt, new_messages = self._prepare_payload(
+            context_query, kwargs.get("stable_system_prompt_len", 0)
+        )
 
         model_config = self.provider_config.get("model_config", {})
         model_config["model"] = model or self.get_model()
@@ -269,11 +360,29 @@ class ProviderAnthropic(Provider):
             payloads["system"] = system_prompt
 
         llm_response = None
-        try:
-            llm_response = await self._query(payloads, func_tool)
-        except Exception as e:
-            logger.error(f"发生了错误。Provider 配置如下: {model_config}")
-            raise e
+        last_exception = None
+        for _ in range(10):
+            chosen_key = await self._acquire_key(last_exception)
+            error = None
+            try:
+                llm_response = await self._query(
+                    payloads, func_tool, self._get_client(chosen_key)
+                )
+                break
+            except Exception as e:
+                last_exception = error = e
+                if is_rate_limit_error(e) and len(self.key_pool):
+                    # Key 池会让该 Key 进入冷却，下次重试时选择其他 Key
+                    logger.warning(
+                        f"API 调用过于频繁，尝试使用其他 Key 重试。当前 Key: {chosen_key[:12]}"
+                    )
+                    continue
+                logger.error(f"发生了错误。Provider 配置如下: {model_config}")
+                raise e
+            finally:
+                self.key_pool.release(chosen_key, error)
+        else:
+            raise last_exception
 
         return llm_response
 
@@ -308,7 +417,9 @@ class ProviderAnthropic(Provider):
                 for tcr in tool_calls_result:
                     context_query.extend(tcr.to_openai_messages())
 
-        system_prompt, new_messages = self._prepare_payload(context_query)
+        system_prompt, new_messages = self._prepare_payload(
+            context_query, kwargs.get("stable_system_prompt_len", 0)
+        )
 
         model_config = self.provider_config.get("model_config", {})
         model_config["model"] = model or self.get_model()
@@ -319,8 +430,29 @@ class ProviderAnthropic(Provider):
         if system_prompt:
             payloads["system"] = system_prompt
 
-        async for llm_response in self._query_stream(payloads, func_tool):
-            yield llm_response
+        last_exception = None
+        for _ in range(10):
+            chosen_key = await self._acquire_key(last_exception)
+            error = None
+            yielded = False
+            try:
+                async for llm_response in self._query_stream(
+                    payloads, func_tool, self._get_client(chosen_key)
+                ):
+                    yielded = True
+                    yield llm_response
+                return
+            except Exception as e:
+                last_exception = error = e
+                # 已经输出了部分内容时不再重试
+                if yielded or not is_rate_limit_error(e) or not len(self.key_pool):
+                    raise
+                logger.warning(
+                    f"API 调用过于频繁，尝试使用其他 Key 重试。当前 Key: {chosen_key[:12]}"
+                )
+            finally:
+                self.key_pool.release(chosen_key, error)
+        raise last_exception
 
     async def assemble_context(self, text: str, image_urls: List[str] = None):
         """组装上下文，支持文本和图片"""
@@ -332,7 +464,7 @@ class ProviderAnthropic(Provider):
 
         for image_url in image_urls:
             if image_url.startswith("http"):
-                image_path = await download_image_by_url(image_url)
+                image_path = await media_cache.get_path(image_url)
                 image_data = await self.encode_image_bs64(image_path)
             elif image_url.startswith("file:///"):
                 image_path = image_url.replace("file:///", "")
@@ -383,10 +515,8 @@ class ProviderAnthropic(Provider):
         # 其他类型保持检测到的MIME类型
 
         try:
-            with open(image_url, "rb") as f:
-                file_content = f.read()
-                image_bs64 = base64.b64encode(file_content).decode("utf-8")
-                return f"data:{mime_type};base64,{image_bs64}"
+            image_bs64 = await media_cache.get_base64(image_url)
+            return f"data:{mime_type};base64,{image_bs64}"
         except Exception as e:
             logger.warning(f"读取文件 {image_url} 失败: {e}")
             return ""
@@ -404,3 +534,4 @@ class ProviderAnthropic(Provider):
 
     def set_key(self, key: str):
         self.chosen_api_key = key
+        self.client = self._get_client(key)
@@ -8,6 +8,8 @@ from ..entities import ProviderType
 from ..register import register_provider_adapter
 from astrbot.core import logger
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.media_executor import media_executor
+from astrbot.core.utils.tencent_record_helper import pyffmpeg_convert
 
 """
 edge_tts 方式，能够免费、快速生成语音，使用需要先安装edge-tts库
@@ -59,10 +61,9 @@ class ProviderEdgeTTS(TTSProvider):
             await communicate.save(mp3_path)
 
             try:
-                from pyffmpeg import FFmpeg
-
-                ff = FFmpeg()
-                ff.convert(input=mp3_path, output=wav_path)
+                await media_executor.run(
+                    pyffmpeg_convert, mp3_path, wav_path, name="pyffmpeg"
+                )
             except Exception as e:
                 logger.debug(f"pyffmpeg 转换失败: {e}, 尝试使用 ffmpeg 命令行进行转换")
                 # use ffmpeg command line
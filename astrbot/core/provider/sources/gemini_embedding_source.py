@@ -1,6 +1,7 @@
 from google import genai
 from google.genai import types
 from google.genai.errors import APIError
+from ..embedding_batcher import EmbeddingBatcher
 from ..provider import EmbeddingProvider
 from ..register import register_provider_adapter
 from ..entities import ProviderType
@@ -33,18 +34,17 @@ class GeminiEmbeddingProvider(EmbeddingProvider):
             "embedding_model", "gemini-embedding-exp-03-07"
         )
         self.dimension = provider_config.get("embedding_dimensions", 768)
+        self.batcher = EmbeddingBatcher(
+            self.get_embeddings,
+            max_batch_size=int(provider_config.get("embedding_batch_size", 32)),
+            max_wait=int(provider_config.get("embedding_batch_wait_ms", 5)) / 1000,
+        )
 
     async def get_embedding(self, text: str) -> list[float]:
         """
-        获取文本的嵌入
+        获取文本的嵌入。并发的调用会被合并为批量请求
         """
-        try:
-            result = await self.client.models.embed_content(
-                model=self.model, contents=text
-            )
-            return result.embeddings[0].values
-        except APIError as e:
-            raise Exception(f"Gemini Embedding API请求失败: {e.message}")
+        return await self.batcher.embed(text)
 
     async def get_embeddings(self, texts: list[str]) -> list[list[float]]:
         """
@@ -1,8 +1,6 @@
-import asyncio
 import base64
 import json
 import logging
-import random
 from typing import Optional
 from collections.abc import AsyncGenerator
 from mimetypes import guess_type
@@ -15,9 +13,10 @@ import astrbot.core.message.components as Comp
 from astrbot import logger
 from astrbot.api.provider import Provider
 from astrbot.core.message.message_event_result import MessageChain
-from astrbot.core.provider.entities import LLMResponse
+from astrbot.core.provider.entities import LLMResponse, TokenUsage
 from astrbot.core.provider.func_tool_manager import FuncCall
-from astrbot.core.utils.io import download_image_by_url
+from astrbot.core.provider.key_pool import KeyPool, NoAvailableKeyError
+from astrbot.core.utils.media_cache import media_cache
 
 from ..register import register_provider_adapter
 
@@ -69,19 +68,38 @@ class ProviderGoogleGenAI(Provider):
         if self.api_base and self.api_base.endswith("/"):
             self.api_base = self.api_base[:-1]
 
+        self.key_pool = KeyPool.from_config(
+            self.api_keys, provider_settings.get("key_pool")
+        )
+        # 每个 Key 使用独立的客户端，并发请求之间不会互相修改 Key
+        self._clients: dict = {}
         self._init_client()
         self.set_model(provider_config["model_config"]["model"])
         self._init_safety_settings()
 
     def _init_client(self) -> None:
         """初始化Gemini客户端"""
-        self.client = genai.Client(
-            api_key=self.chosen_api_key,
-            http_options=types.HttpOptions(
-                base_url=self.api_base,
-                timeout=self.timeout * 1000,  # 毫秒
-            ),
-        ).aio
+        self.client = self._get_client(self.chosen_api_key)
+
+    def _get_client(self, key: Optional[str]):
+        if key not in self._clients:
+            self._clients[key] = genai.Client(
+                api_key=key,
+                http_options=types.HttpOptions(
+                    base_url=self.api_base,
+                    timeout=self.timeout * 1000,  # 毫秒
+                ),
+            ).aio
+        return self._clients[key]
+
+    async def _acquire_key(self) -> Optional[str]:
+        """从 Key 池中选择本次请求使用的 Key。没有配置 Key 时返回 None"""
+        if not len(self.key_pool):
+            return self.chosen_api_key
+        try:
+            return await self.key_pool.acquire()
+        except NoAvailableKeyError:
+            raise Exception("达到了 Gemini 速率限制, 请稍后再试...")
 
     def _init_safety_settings(self) -> None:
         """初始化安全设置"""
@@ -95,22 +113,16 @@ class ProviderGoogleGenAI(Provider):
             and threshold_str in self.THRESHOLD_MAPPING
         ]
 
-    async def _handle_api_error(self, e: APIError, keys: list[str]) -> bool:
+    async def _handle_api_error(self, e: APIError, key: Optional[str]) -> bool:
         """处理API错误，返回是否需要重试"""
         if e.code == 429 or "API key not valid" in e.message:
-            keys.remove(self.chosen_api_key)
-            if len(keys) > 0:
-                self.set_key(random.choice(keys))
-                logger.info(
-                    f"检测到 Key 异常({e.message})，正在尝试更换 API Key 重试... 当前 Key: {self.chosen_api_key[:12]}..."
-                )
-                await asyncio.sleep(1)
-                return True
-            else:
-                logger.error(
-                    f"检测到 Key 异常({e.message})，且已没有可用的 Key。 当前 Key: {self.chosen_api_key[:12]}..."
-                )
-                raise Exception("达到了 Gemini 速率限制, 请稍后再试...")
+            # 被限流的 Key 由 Key 池按 Retry-After 或指数退避冷却，无效的 Key 长时间冷却
+            if "API key not valid" in e.message:
+                self.key_pool.cooldown(key, 600)
+            logger.info(
+                f"检测到 Key 异常({e.message})，正在尝试更换 API Key 重试... 当前 Key: {(key or '')[:12]}..."
+            )
+            return True
         else:
             logger.error(
                 f"发生了错误(gemini_source)。Provider 配置如下: {self.provider_config}"
@@ -371,8 +383,24 @@ class ProviderGoogleGenAI(Provider):
                 chain.append(Comp.Image.fromBytes(part.inline_data.data))
         return MessageChain(chain=chain)
 
-    async def _query(self, payloads: dict, tools: FuncCall) -> LLMResponse:
+    def _parse_usage(
+        self, result: types.GenerateContentResponse
+    ) -> Optional[TokenUsage]:
+        """解析 token 用量。Gemini 会对相同的前缀隐式缓存，命中的部分计入 cached_content_token_count"""
+        usage = result.usage_metadata
+        if not usage:
+            return None
+        token_usage = TokenUsage(
+            input_tokens=usage.prompt_token_count or 0,
+            cached_tokens=usage.cached_content_token_count or 0,
+            output_tokens=usage.candidates_token_count or 0,
+        )
+        self.record_usage(token_usage)
+        return token_usage
+
+    async def _query(self, payloads: dict, tools: FuncCall, client=None) -> LLMResponse:
         """非流式请求 Gemini API"""
+        client = client or self.client
         system_instruction = next(
             (msg["content"] for msg in payloads["messages"] if msg["role"] == "system"),
             None,
@@ -391,7 +419,7 @@ class ProviderGoogleGenAI(Provider):
                 config = await self._prepare_query_config(
                     payloads, tools, system_instruction, modalities, temperature
                 )
-                result = await self.client.models.generate_content(
+                result = await client.models.generate_content(
                     model=self.get_model(),
                     contents=conversation,
                     config=config,
@@ -433,12 +461,14 @@ class ProviderGoogleGenAI(Provider):
 
         llm_response = LLMResponse("assistant")
         llm_response.result_chain = self._process_content_parts(result, llm_response)
+        llm_response.usage = self._parse_usage(result)
         return llm_response
 
     async def _query_stream(
-        self, payloads: dict, tools: FuncCall
+        self, payloads: dict, tools: FuncCall, client=None
     ) -> AsyncGenerator[LLMResponse, None]:
         """流式请求 Gemini API"""
+        client = client or self.client
         system_instruction = next(
             (msg["content"] for msg in payloads["messages"] if msg["role"] == "system"),
             None,
@@ -452,7 +482,7 @@ class ProviderGoogleGenAI(Provider):
                 config = await self._prepare_query_config(
                     payloads, tools, system_instruction
                 )
-                result = await self.client.models.generate_content_stream(
+                result = await client.models.generate_content_stream(
                     model=self.get_model(),
                     contents=conversation,
                     config=config,
@@ -481,6 +511,7 @@ class ProviderGoogleGenAI(Provider):
                 llm_response.result_chain = self._process_content_parts(
                     chunk, llm_response
                 )
+                llm_response.usage = self._parse_usage(chunk)
                 yield llm_response
                 break
 
@@ -496,6 +527,7 @@ class ProviderGoogleGenAI(Provider):
                     llm_response.result_chain = self._process_content_parts(
                         chunk, llm_response
                     )
+                llm_response.usage = self._parse_usage(chunk)
                 yield llm_response
                 break
 
@@ -536,15 +568,19 @@ class ProviderGoogleGenAI(Provider):
         payloads = {"messages": context_query, **model_config}
 
         retry = 10
-        keys = self.api_keys.copy()
 
         for _ in range(retry):
+            key = await self._acquire_key()
+            error = None
             try:
-                return await self._query(payloads, func_tool)
+                return await self._query(payloads, func_tool, self._get_client(key))
             except APIError as e:
-                if await self._handle_api_error(e, keys):
+                error = e
+                if await self._handle_api_error(e, key):
                     continue
                 break
+            finally:
+                self.key_pool.release(key, error)
 
     async def text_chat_stream(
         self,
@@ -583,17 +619,23 @@ class ProviderGoogleGenAI(Provider):
         payloads = {"messages": context_query, **model_config}
 
         retry = 10
-        keys = self.api_keys.copy()
 
         for _ in range(retry):
+            key = await self._acquire_key()
+            error = None
             try:
-                async for response in self._query_stream(payloads, func_tool):
+                async for response in self._query_stream(
+                    payloads, func_tool, self._get_client(key)
+                ):
                     yield response
                 break
             except APIError as e:
-                if await self._handle_api_error(e, keys):
+                error = e
+                if await self._handle_api_error(e, key):
                     continue
                 break
+            finally:
+                self.key_pool.release(key, error)
 
     async def get_models(self):
         try:
@@ -627,7 +669,7 @@ class ProviderGoogleGenAI(Provider):
             }
             for image_url in image_urls:
                 if image_url.startswith("http"):
-                    image_path = await download_image_by_url(image_url)
+                    image_path = await media_cache.get_path(image_url)
                     image_data = await self.encode_image_bs64(image_path)
                 elif image_url.startswith("file:///"):
                     image_path = image_url.replace("file:///", "")
@@ -666,10 +708,8 @@ class ProviderGoogleGenAI(Provider):
         # 其他类型保持检测到的MIME类型
 
         try:
-            with open(image_url, "rb") as f:
-                file_content = f.read()
-                image_bs64 = base64.b64encode(file_content).decode("utf-8")
-                return f"data:{mime_type};base64,{image_bs64}"
+            image_bs64 = await media_cache.get_base64(image_url)
+            return f"data:{mime_type};base64,{image_bs64}"
         except Exception as e:
             logger.warning(f"读取文件 {image_url} 失败: {e}")
             return ""
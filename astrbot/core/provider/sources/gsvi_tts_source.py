@@ -1,11 +1,11 @@
 import os
 import uuid
-import aiohttp
 import urllib.parse
 from ..provider import TTSProvider
 from ..entities import ProviderType
 from ..register import register_provider_adapter
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.http_client import http_client
 
 
 @register_provider_adapter(
@@ -41,7 +41,7 @@ class ProviderGSVITTS(TTSProvider):
 
         url = f"{self.api_base}/tts?{'&'.join(query_parts)}"
 
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session(direct=True) as session:
             async with session.get(url) as response:
                 if response.status == 200:
                     with open(path, "wb") as f:
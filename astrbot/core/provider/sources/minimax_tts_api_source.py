@@ -5,6 +5,7 @@ import aiohttp
 from typing import Dict, List, Union, AsyncIterator
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
 from astrbot.api import logger
+from astrbot.core.utils.http_client import http_client
 from ..entities import ProviderType
 from ..provider import TTSProvider
 from ..register import register_provider_adapter
@@ -82,7 +83,7 @@ class ProviderMiniMaxTTSAPI(TTSProvider):
     async def _call_tts_stream(self, text: str) -> AsyncIterator[bytes]:
         """进行流式请求"""
         try:
-            async with aiohttp.ClientSession() as session:
+            async with http_client.session(direct=True) as session:
                 async with session.post(
                     self.concat_base_url,
                     headers=self.headers,
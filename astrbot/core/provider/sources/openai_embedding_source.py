@@ -1,4 +1,5 @@
 from openai import AsyncOpenAI
+from ..embedding_batcher import EmbeddingBatcher
 from ..provider import EmbeddingProvider
 from ..register import register_provider_adapter
 from ..entities import ProviderType
@@ -23,13 +24,17 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
         )
         self.model = provider_config.get("embedding_model", "text-embedding-3-small")
         self.dimension = provider_config.get("embedding_dimensions", 1024)
+        self.batcher = EmbeddingBatcher(
+            self.get_embeddings,
+            max_batch_size=int(provider_config.get("embedding_batch_size", 32)),
+            max_wait=int(provider_config.get("embedding_batch_wait_ms", 5)) / 1000,
+        )
 
     async def get_embedding(self, text: str) -> list[float]:
         """
-        获取文本的嵌入
+        获取文本的嵌入。并发的调用会被合并为批量请求
         """
-        embedding = await self.client.embeddings.create(input=text, model=self.model)
-        return embedding.data[0].embedding
+        return await self.batcher.embed(text)
 
     async def get_embeddings(self, texts: list[str]) -> list[list[float]]:
         """
@@ -1,9 +1,6 @@
-import base64
 import json
 import os
 import inspect
-import random
-import asyncio
 import astrbot.core.message.components as Comp
 from mimetypes import guess_type
 
@@ -12,7 +9,12 @@ from openai.types.chat.chat_completion import ChatCompletion
 
 from openai._exceptions import NotFoundError, UnprocessableEntityError
 from openai.lib.streaming.chat._completions import ChatCompletionStreamState
-from astrbot.core.utils.io import download_image_by_url
+from astrbot.core.utils.media_cache import media_cache
+from astrbot.core.provider.key_pool import (
+    KeyPool,
+    NoAvailableKeyError,
+    is_rate_limit_error,
+)
 from astrbot.core.message.message_event_result import MessageChain
 
 from astrbot.api.provider import Provider
@@ -20,7 +22,7 @@ from astrbot import logger
 from astrbot.core.provider.func_tool_manager import FuncCall
 from typing import List, AsyncGenerator
 from ..register import register_provider_adapter
-from astrbot.core.provider.entities import LLMResponse, ToolCallsResult
+from astrbot.core.provider.entities import LLMResponse, ToolCallsResult, TokenUsage
 
 
 @register_provider_adapter(
@@ -44,22 +46,12 @@ class ProviderOpenAIOfficial(Provider):
         self.timeout = provider_config.get("timeout", 120)
         if isinstance(self.timeout, str):
             self.timeout = int(self.timeout)
-        # 适配 azure openai #332
-        if "api_version" in provider_config:
-            # 使用 azure api
-            self.client = AsyncAzureOpenAI(
-                api_key=self.chosen_api_key,
-                api_version=provider_config.get("api_version", None),
-                base_url=provider_config.get("api_base", None),
-                timeout=self.timeout,
-            )
-        else:
-            # 使用 openai api
-            self.client = AsyncOpenAI(
-                api_key=self.chosen_api_key,
-                base_url=provider_config.get("api_base", None),
-                timeout=self.timeout,
-            )
+        self.key_pool = KeyPool.from_config(
+            self.api_keys, provider_settings.get("key_pool")
+        )
+        # 每个 Key 使用独立的客户端，并发请求之间不会互相修改 Key
+        self._clients: dict = {}
+        self.client = self._get_client(self.chosen_api_key)
 
         self.default_params = inspect.signature(
             self.client.chat.completions.create
@@ -69,6 +61,37 @@ class ProviderOpenAIOfficial(Provider):
         model = model_config.get("model", "unknown")
         self.set_model(model)
 
+    def _get_client(self, key: str | None):
+        if key not in self._clients:
+            # 适配 azure openai #332
+            if "api_version" in self.provider_config:
+                # 使用 azure api
+                self._clients[key] = AsyncAzureOpenAI(
+                    api_key=key,
+                    api_version=self.provider_config.get("api_version", None),
+                    base_url=self.provider_config.get("api_base", None),
+                    timeout=self.timeout,
+                )
+            else:
+                # 使用 openai api
+                self._clients[key] = AsyncOpenAI(
+                    api_key=key,
+                    base_url=self.provider_config.get("api_base", None),
+                    timeout=self.timeout,
+                )
+        return self._clients[key]
+
+    async def _acquire_key(self, last_exception: Exception | None) -> str | None:
+        """从 Key 池中选择本次请求使用的 Key。没有配置 Key 时返回 None"""
+        if not len(self.key_pool):
+            return self.chosen_api_key
+        try:
+            return await self.key_pool.acquire()
+        except NoAvailableKeyError:
+            if last_exception is not None:
+                raise last_exception
+            raise
+
     async def get_models(self):
         try:
             models_str = []
@@ -80,7 +103,9 @@ class ProviderOpenAIOfficial(Provider):
         except NotFoundError as e:
             raise Exception(f"获取模型列表失败：{e}")
 
-    async def _query(self, payloads: dict, tools: FuncCall) -> LLMResponse:
+    async def _query(
+        self, payloads: dict, tools: FuncCall, client: AsyncOpenAI = None
+    ) -> LLMResponse:
         if tools:
             model = payloads.get("model", "").lower()
             omit_empty_param_field = "gemini" in model
@@ -100,7 +125,7 @@ class ProviderOpenAIOfficial(Provider):
         for key in to_del:
             del payloads[key]
 
-        completion = await self.client.chat.completions.create(
+        completion = await (client or self.client).chat.completions.create(
             **payloads, stream=False, extra_body=extra_body
         )
 
@@ -116,7 +141,7 @@ class ProviderOpenAIOfficial(Provider):
         return llm_response
 
     async def _query_stream(
-        self, payloads: dict, tools: FuncCall
+        self, payloads: dict, tools: FuncCall, client: AsyncOpenAI = None
     ) -> AsyncGenerator[LLMResponse, None]:
         """流式查询API，逐步返回结果"""
         if tools:
@@ -138,7 +163,7 @@ class ProviderOpenAIOfficial(Provider):
         for key in to_del:
             del payloads[key]
 
-        stream = await self.client.chat.completions.create(
+        stream = await (client or self.client).chat.completions.create(
             **payloads, stream=True, extra_body=extra_body
         )
 
@@ -191,16 +216,15 @@ class ProviderOpenAIOfficial(Provider):
                 if isinstance(tool_call, str):
                     # workaround for #1359
                     tool_call = json.loads(tool_call)
-                for tool in tools.func_list:
-                    if tool.name == tool_call.function.name:
-                        # workaround for #1454
-                        if isinstance(tool_call.function.arguments, str):
-                            args = json.loads(tool_call.function.arguments)
-                        else:
-                            args = tool_call.function.arguments
-                        args_ls.append(args)
-                        func_name_ls.append(tool_call.function.name)
-                        tool_call_ids.append(tool_call.id)
+                if tools.get_func(tool_call.function.name):
+                    # workaround for #1454
+                    if isinstance(tool_call.function.arguments, str):
+                        args = json.loads(tool_call.function.arguments)
+                    else:
+                        args = tool_call.function.arguments
+                    args_ls.append(args)
+                    func_name_ls.append(tool_call.function.name)
+                    tool_call_ids.append(tool_call.id)
             llm_response.role = "tool"
             llm_response.tools_call_args = args_ls
             llm_response.tools_call_name = func_name_ls
@@ -217,6 +241,19 @@ class ProviderOpenAIOfficial(Provider):
 
         llm_response.raw_completion = completion
 
+        if usage := completion.usage:
+            details = getattr(usage, "prompt_tokens_details", None)
+            # DeepSeek 等兼容接口使用 prompt_cache_hit_tokens
+            cached_tokens = getattr(details, "cached_tokens", None) or getattr(
+                usage, "prompt_cache_hit_tokens", 0
+            )
+            llm_response.usage = TokenUsage(
+                input_tokens=usage.prompt_tokens or 0,
+                cached_tokens=cached_tokens or 0,
+                output_tokens=usage.completion_tokens or 0,
+            )
+            self.record_usage(llm_response.usage)
+
         return llm_response
 
     async def _prepare_chat_payload(
@@ -263,31 +300,21 @@ class ProviderOpenAIOfficial(Provider):
         context_query: list,
         func_tool: FuncCall,
         chosen_key: str,
-        available_api_keys: List[str],
         retry_cnt: int,
         max_retries: int,
     ) -> tuple:
         """处理API错误并尝试恢复"""
-        if "429" in str(e):
+        if is_rate_limit_error(e):
+            # Key 池会让该 Key 进入冷却，下次重试时选择其他 Key
             logger.warning(
-                f"API 调用过于频繁，尝试使用其他 Key 重试。当前 Key: {chosen_key[:12]}"
+                f"API 调用过于频繁，尝试使用其他 Key 重试。当前 Key: {(chosen_key or '')[:12]}"
+            )
+            return (
+                False,
+                payloads,
+                context_query,
+                func_tool,
             )
-            # 最后一次不等待
-            if retry_cnt < max_retries - 1:
-                await asyncio.sleep(1)
-            available_api_keys.remove(chosen_key)
-            if len(available_api_keys) > 0:
-                chosen_key = random.choice(available_api_keys)
-                return (
-                    False,
-                    chosen_key,
-                    available_api_keys,
-                    payloads,
-                    context_query,
-                    func_tool,
-                )
-            else:
-                raise e
         elif "maximum context length" in str(e):
             logger.warning(
                 f"上下文长度超过限制。尝试弹出最早的记录然后重试。当前记录条数: {len(context_query)}"
@@ -296,8 +323,6 @@ class ProviderOpenAIOfficial(Provider):
             payloads["messages"] = context_query
             return (
                 False,
-                chosen_key,
-                available_api_keys,
                 payloads,
                 context_query,
                 func_tool,
@@ -309,8 +334,6 @@ class ProviderOpenAIOfficial(Provider):
             context_query = new_contexts
             return (
                 False,
-                chosen_key,
-                available_api_keys,
                 payloads,
                 context_query,
                 func_tool,
@@ -326,7 +349,7 @@ class ProviderOpenAIOfficial(Provider):
             )
             if "tools" in payloads:
                 del payloads["tools"]
-            return False, chosen_key, available_api_keys, payloads, context_query, None
+            return False, payloads, context_query, None
         else:
             logger.error(f"发生了错误。Provider 配置如下: {self.provider_config}")
 
@@ -366,28 +389,28 @@ class ProviderOpenAIOfficial(Provider):
 
         llm_response = None
         max_retries = 10
-        available_api_keys = self.api_keys.copy()
-        chosen_key = random.choice(available_api_keys)
 
         last_exception = None
         retry_cnt = 0
         for retry_cnt in range(max_retries):
+            chosen_key = await self._acquire_key(last_exception)
+            error = None
             try:
-                self.client.api_key = chosen_key
-                llm_response = await self._query(payloads, func_tool)
+                llm_response = await self._query(
+                    payloads, func_tool, self._get_client(chosen_key)
+                )
                 break
             except UnprocessableEntityError as e:
+                error = e
                 logger.warning(f"不可处理的实体错误：{e}，尝试删除图片。")
                 # 尝试删除所有 image
                 new_contexts = await self._remove_image_from_context(context_query)
                 payloads["messages"] = new_contexts
                 context_query = new_contexts
             except Exception as e:
-                last_exception = e
+                last_exception = error = e
                 (
                     success,
-                    chosen_key,
-                    available_api_keys,
                     payloads,
                     context_query,
                     func_tool,
@@ -397,12 +420,13 @@ class ProviderOpenAIOfficial(Provider):
                     context_query,
                     func_tool,
                     chosen_key,
-                    available_api_keys,
                     retry_cnt,
                     max_retries,
                 )
                 if success:
                     break
+            finally:
+                self.key_pool.release(chosen_key, error)
 
         if retry_cnt == max_retries - 1:
             logger.error(f"API 调用失败，重试 {max_retries} 次仍然失败。")
@@ -435,29 +459,29 @@ class ProviderOpenAIOfficial(Provider):
         )
 
         max_retries = 10
-        available_api_keys = self.api_keys.copy()
-        chosen_key = random.choice(available_api_keys)
 
         last_exception = None
         retry_cnt = 0
         for retry_cnt in range(max_retries):
+            chosen_key = await self._acquire_key(last_exception)
+            error = None
             try:
-                self.client.api_key = chosen_key
-                async for response in self._query_stream(payloads, func_tool):
+                async for response in self._query_stream(
+                    payloads, func_tool, self._get_client(chosen_key)
+                ):
                     yield response
                 break
             except UnprocessableEntityError as e:
+                error = e
                 logger.warning(f"不可处理的实体错误：{e}，尝试删除图片。")
                 # 尝试删除所有 image
                 new_contexts = await self._remove_image_from_context(context_query)
                 payloads["messages"] = new_contexts
                 context_query = new_contexts
             except Exception as e:
-                last_exception = e
+                last_exception = error = e
                 (
                     success,
-                    chosen_key,
-                    available_api_keys,
                     payloads,
                     context_query,
                     func_tool,
@@ -467,12 +491,13 @@ class ProviderOpenAIOfficial(Provider):
                     context_query,
                     func_tool,
                     chosen_key,
-                    available_api_keys,
                     retry_cnt,
                     max_retries,
                 )
                 if success:
                     break
+            finally:
+                self.key_pool.release(chosen_key, error)
 
         if retry_cnt == max_retries - 1:
             logger.error(f"API 调用失败，重试 {max_retries} 次仍然失败。")
@@ -502,13 +527,15 @@ class ProviderOpenAIOfficial(Provider):
         return new_contexts
 
     def get_current_key(self) -> str:
-        return self.client.api_key
+        return self.chosen_api_key
 
     def get_keys(self) -> List[str]:
         return self.api_keys
 
     def set_key(self, key):
-        self.client.api_key = key
+        """设置默认客户端使用的 Key。对话请求的 Key 由 Key 池选择"""
+        self.chosen_api_key = key
+        self.client = self._get_client(key)
 
     async def assemble_context(self, text: str, image_urls: List[str] = None) -> dict:
         """组装成符合 OpenAI 格式的 role 为 user 的消息段"""
@@ -521,7 +548,7 @@ class ProviderOpenAIOfficial(Provider):
                 # 确定实际的文件路径用于MIME类型检测
                 actual_file_path = image_url
                 if image_url.startswith("http"):
-                    image_path = await download_image_by_url(image_url)
+                    image_path = await media_cache.get_path(image_url)
                     actual_file_path = image_path
                     image_data = await self.encode_image_bs64(image_path, actual_file_path)
                 elif image_url.startswith("file:///"):
@@ -578,10 +605,8 @@ class ProviderOpenAIOfficial(Provider):
         # 其他类型保持检测到的MIME类型
 
         try:
-            with open(image_url, "rb") as f:
-                file_content = f.read()
-                image_bs64 = base64.b64encode(file_content).decode("utf-8")
-                return f"data:{mime_type};base64,{image_bs64}"
+            image_bs64 = await media_cache.get_base64(image_url)
+            return f"data:{mime_type};base64,{image_bs64}"
         except Exception as e:
             logger.warning(f"读取文件 {image_url} 失败: {e}")
             return ""
@@ -0,0 +1,300 @@
+import asyncio
+import random
+import statistics
+import time
+from collections import deque
+from typing import AsyncGenerator, Callable
+
+from astrbot import logger
+from astrbot.core.provider.entities import LLMResponse
+from astrbot.core.provider.func_tool_manager import FuncCall
+from astrbot.core.provider.provider import Provider
+
+from ..register import register_provider_adapter
+
+
+class _BackendHealth:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.hedged = 0
+        """作为对冲请求被发起的次数"""
+        self.failures = 0
+        """连续失败次数"""
+        self.open_until = 0.0
+        """熔断结束的时间"""
+        self.latencies: deque[float] = deque(maxlen=50)
+        """最近成功请求的延迟(流式请求为首个 Chunk 的延迟)"""
+
+    def p50(self) -> float:
+        return statistics.median(self.latencies) if self.latencies else 0.0
+
+
+@register_provider_adapter("router", "多提供商负载均衡路由")
+class ProviderRouter(Provider):
+    """将请求分发到多个已配置的对话提供商
+
+    - router_strategy 为 weighted 时按权重随机选择提供商，为 latency 时优先选择 p50 延迟最低的提供商。
+    - 请求超过 router_hedge_after 秒未完成(流式请求为未收到首个 Chunk)时，同时向下一个提供商发起请求，使用先返回的结果。
+    - 提供商连续失败 router_failure_threshold 次后熔断 router_recovery_time 秒，期间不再向其发送请求。
+    - 请求失败时依次尝试其他提供商。流式请求只在尚未输出任何内容时切换提供商。
+    - 成员不能是其他路由，否则互相包含的路由会无限递归。这样的成员会被忽略。
+    """
+
+    def __init__(
+        self,
+        provider_config,
+        provider_settings,
+        default_persona=None,
+    ) -> None:
+        super().__init__(
+            provider_config,
+            provider_settings,
+            default_persona,
+        )
+        self.members: list[tuple[str, float]] = []
+        """(提供商 ID, 权重)"""
+        for item in provider_config.get("router_providers", []):
+            provider_id, _, weight = str(item).partition("=")
+            provider_id = provider_id.strip()
+            try:
+                weight = float(weight) if weight.strip() else 1.0
+            except ValueError:
+                logger.warning(f"路由 {provider_config['id']}: 无效的权重 {item}")
+                weight = 1.0
+            if provider_id and weight > 0:
+                self.members.append((provider_id, weight))
+
+        self.strategy: str = provider_config.get("router_strategy", "weighted")
+        self.hedge_after = float(provider_config.get("router_hedge_after", 0))
+        self.failure_threshold = int(provider_config.get("router_failure_threshold", 3))
+        self.recovery_time = float(provider_config.get("router_recovery_time", 30))
+
+        self._health: dict[str, _BackendHealth] = {}
+        self._resolve: Callable[[str], Provider | None] = lambda _: None
+        self._ignored: set[str] = set()
+        """已经提示过被忽略的成员"""
+
+    def set_provider_manager(self, provider_manager):
+        """由 ProviderManager 在载入后调用。提供商在每次请求时查找，因此不受载入顺序和重载的影响"""
+        self._resolve = provider_manager.inst_map.get
+
+    def _candidates(self) -> list[tuple[str, Provider]]:
+        """按策略排序的可用提供商。所有提供商都被熔断时，按熔断结束的先后返回全部提供商"""
+        now = time.monotonic()
+        available, broken = [], []
+        for provider_id, weight in self.members:
+            provider = self._resolve(provider_id)
+            if provider is None or provider is self:
+                continue
+            if isinstance(provider, ProviderRouter):
+                if provider_id not in self._ignored:
+                    self._ignored.add(provider_id)
+                    logger.warning(
+                        f"路由 {self.provider_config['id']}: 成员 {provider_id} 也是负载均衡路由，已忽略。"
+                    )
+                continue
+            health = self._health.setdefault(provider_id, _BackendHealth())
+            if health.open_until <= now:
+                available.append((provider_id, provider, weight))
+            else:
+                broken.append((provider_id, provider, weight))
+
+        if self.strategy == "latency":
+            # 没有延迟数据的提供商排在前面，以便获得数据
+            available.sort(key=lambda m: (self._health[m[0]].p50(), -m[2]))
+        else:
+            # 按权重随机排序
+            available.sort(key=lambda m: random.random() ** (1 / m[2]), reverse=True)
+
+        if not available:
+            broken.sort(key=lambda m: self._health[m[0]].open_until)
+            available = broken
+        return [(provider_id, provider) for provider_id, provider, _ in available]
+
+    def _record_success(self, provider_id: str, latency: float):
+        health = self._health[provider_id]
+        health.latencies.append(latency)
+        health.failures = 0
+        health.open_until = 0.0
+
+    def _record_failure(self, provider_id: str, e: BaseException):
+        health = self._health[provider_id]
+        health.errors += 1
+        health.failures += 1
+        if health.failures >= self.failure_threshold:
+            health.open_until = time.monotonic() + self.recovery_time
+            logger.warning(
+                f"路由 {self.provider_config['id']}: 提供商 {provider_id} 连续失败 {health.failures} 次，熔断 {self.recovery_time} 秒。最近的错误: {e}"
+            )
+        else:
+            logger.warning(
+                f"路由 {self.provider_config['id']}: 提供商 {provider_id} 请求失败: {e}"
+            )
+
+    async def _race(self, open_request: Callable) -> tuple:
+        """依次请求各个提供商，超过对冲阈值时同时请求下一个提供商
+
+        Args:
+            open_request: 接收 Provider，返回 (等待首个结果的 awaitable, 流式生成器或 None)
+
+        Returns:
+            (提供商 ID, 首个结果, 流式生成器或 None)。流式请求没有输出任何内容时首个结果为 None
+        """
+        candidates = deque(self._candidates())
+        if not candidates:
+            raise Exception(
+                f"路由 {self.provider_config['id']} 没有可用的提供商，请检查 router_providers 配置。"
+            )
+
+        racing: dict[asyncio.Future, tuple] = {}
+        last_exception = None
+
+        def launch():
+            provider_id, provider = candidates.popleft()
+            awaitable, stream = open_request(provider)
+            task = asyncio.ensure_future(awaitable)
+            racing[task] = (provider_id, stream, time.perf_counter())
+            self._health[provider_id].requests += 1
+
+        launch()
+        try:
+            while racing:
+                hedge = self.hedge_after > 0 and candidates and len(racing) < 2
+                done, _ = await asyncio.wait(
+                    racing,
+                    timeout=self.hedge_after if hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    logger.info(
+                        f"路由 {self.provider_config['id']}: 请求超过 {self.hedge_after} 秒未响应，同时请求提供商 {candidates[0][0]}"
+                    )
+                    self._health[candidates[0][0]].hedged += 1
+                    launch()
+                    continue
+                for task in done:
+                    provider_id, stream, start = racing.pop(task)
+                    e = task.exception()
+                    if e is None or isinstance(e, StopAsyncIteration):
+                        self._record_success(provider_id, time.perf_counter() - start)
+                        return provider_id, None if e else task.result(), stream
+                    self._record_failure(provider_id, e)
+                    last_exception = e
+                if not racing and candidates:
+                    launch()
+            raise last_exception
+        finally:
+            # 取消未完成的请求
+            for task in racing:
+                task.cancel()
+            if racing:
+                await asyncio.gather(*racing, return_exceptions=True)
+                for _, stream, _ in racing.values():
+                    if stream is not None:
+                        await stream.aclose()
+
+    async def text_chat(
+        self,
+        prompt: str,
+        session_id: str = None,
+        image_urls: list[str] = None,
+        func_tool: FuncCall = None,
+        contexts: list = None,
+        system_prompt: str = None,
+        tool_calls_result=None,
+        model: str | None = None,
+        **kwargs,
+    ) -> LLMResponse:
+        call_kwargs = dict(
+            prompt=prompt,
+            session_id=session_id,
+            image_urls=image_urls,
+            func_tool=func_tool,
+            contexts=contexts,
+            system_prompt=system_prompt,
+            tool_calls_result=tool_calls_result,
+            model=model,
+            **kwargs,
+        )
+        _, llm_response, _ = await self._race(
+            lambda provider: (provider.text_chat(**call_kwargs), None)
+        )
+        return llm_response
+
+    async def text_chat_stream(
+        self,
+        prompt: str,
+        session_id: str = None,
+        image_urls: list[str] = None,
+        func_tool: FuncCall = None,
+        contexts: list = None,
+        system_prompt: str = None,
+        tool_calls_result=None,
+        model: str | None = None,
+        **kwargs,
+    ) -> AsyncGenerator[LLMResponse, None]:
+        call_kwargs = dict(
+            prompt=prompt,
+            session_id=session_id,
+            image_urls=image_urls,
+            func_tool=func_tool,
+            contexts=contexts,
+            system_prompt=system_prompt,
+            tool_calls_result=tool_calls_result,
+            model=model,
+            **kwargs,
+        )
+
+        def open_stream(provider: Provider):
+            stream = provider.text_chat_stream(**call_kwargs)
+            return stream.__anext__(), stream
+
+        provider_id, first, stream = await self._race(open_stream)
+        if first is None:
+            return
+        try:
+            yield first
+            async for llm_response in stream:
+                yield llm_response
+        except Exception as e:
+            # 已经输出了部分内容，无法切换提供商
+            self._record_failure(provider_id, e)
+            raise
+        finally:
+            await stream.aclose()
+
+    def stats(self) -> dict:
+        """各个提供商的请求数、错误数、对冲次数、p50 延迟和熔断状态"""
+        now = time.monotonic()
+        return {
+            provider_id: {
+                "requests": health.requests,
+                "errors": health.errors,
+                "hedged": health.hedged,
+                "p50_ms": round(health.p50() * 1000, 2),
+                "circuit_open": health.open_until > now,
+            }
+            for provider_id, health in self._health.items()
+        }
+
+    def get_model(self) -> str:
+        if self.model_name:
+            return self.model_name
+        for provider_id, _ in self.members:
+            provider = self._resolve(provider_id)
+            if provider is not None and not isinstance(provider, ProviderRouter):
+                return provider.get_model()
+        return ""
+
+    async def get_models(self) -> list[str]:
+        return [provider.get_model() for _, provider in self._candidates()]
+
+    def get_current_key(self) -> str:
+        return ""
+
+    def set_key(self, key):
+        raise Exception("负载均衡路由不支持设置 Key，请在其包含的提供商中设置。")
+
+    async def terminate(self):
+        logger.info(f"负载均衡路由 {self.provider_config['id']} 已终止。")
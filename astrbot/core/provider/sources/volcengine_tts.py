@@ -4,11 +4,11 @@ import json
 import os
 import traceback
 import asyncio
-import aiohttp
 from ..provider import TTSProvider
 from ..entities import ProviderType
 from ..register import register_provider_adapter
 from astrbot import logger
+from astrbot.core.utils.http_client import http_client
 
 
 @register_provider_adapter(
@@ -66,7 +66,7 @@ class ProviderVolcengineTTS(TTSProvider):
         logger.debug(f"请求体: {json.dumps(payload, ensure_ascii=False)[:100]}...")
 
         try:
-            async with aiohttp.ClientSession() as session:
+            async with http_client.session(direct=True) as session:
                 async with session.post(
                     self.api_base,
                     data=json.dumps(payload),
@@ -0,0 +1,171 @@
+"""
+函数调用工具的结果缓存
+
+只有声明了缓存时间(`cache_ttl`)的工具才会被缓存，适用于查询天气、搜索等幂等的只读工具。
+缓存的键为工具名和规范化后的参数(按键排序的 JSON)，因此参数顺序不同的相同调用会命中同一条缓存。
+插件工具的处理函数可以访问事件，结果可能与会话有关，因此其缓存按会话(unified_msg_origin)隔离。
+
+内存中的缓存按最近最少使用(LRU)淘汰。启用持久化后，缓存同时写入 SQLite，重启后仍然有效。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Tuple
+
+logger = logging.getLogger("astrbot")
+
+
+class ToolResultCache:
+    def __init__(self, max_entries: int = 512, db_path: str | None = None):
+        """
+        Args:
+            max_entries: 内存中最多缓存的结果数量，小于等于 0 表示不缓存
+            db_path: 持久化缓存的 SQLite 数据库路径，为 None 时只缓存在内存中
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Tuple[float, List[str]]] = OrderedDict()
+        """键 -> (过期时间, 工具返回的文本列表)"""
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        """连接会在多个线程中使用，同一时间只允许一个线程访问"""
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.configure(max_entries, db_path)
+
+    def configure(self, max_entries: int = 512, db_path: str | None = None):
+        self.max_entries = max_entries
+        while len(self._entries) > max(max_entries, 0):
+            self._entries.popitem(last=False)
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+            if db_path:
+                os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+                self._conn = sqlite3.connect(db_path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS tool_cache ("
+                    "key TEXT PRIMARY KEY, contents TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._conn.execute(
+                    "DELETE FROM tool_cache WHERE expires_at <= ?", (time.time(),)
+                )
+                self._conn.commit()
+
+    @staticmethod
+    def make_key(name: str, args: dict | None, scope: str = "") -> str:
+        """scope 不为空时，缓存只在相同的 scope(如会话)中共享"""
+        return (
+            (f"{scope}|" if scope else "")
+            + name
+            + ":"
+            + json.dumps(
+                args or {},
+                sort_keys=True,
+                ensure_ascii=False,
+                separators=(",", ":"),
+                default=str,
+            )
+        )
+
+    async def get(
+        self, name: str, args: dict | None, scope: str = ""
+    ) -> List[str] | None:
+        """获取缓存的工具结果，未命中或已过期时返回 None"""
+        key = self.make_key(name, args, scope)
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[1])
+            self._entries.pop(key, None)
+        if self._conn:
+            row = await asyncio.to_thread(self._disk_get, key, now)
+            if row is not None:
+                expires_at, contents = row
+                self._remember(key, expires_at, contents)
+                self.hits += 1
+                self.disk_hits += 1
+                return list(contents)
+        self.misses += 1
+        return None
+
+    async def put(
+        self,
+        name: str,
+        args: dict | None,
+        contents: List[str],
+        ttl: float,
+        scope: str = "",
+    ):
+        """缓存工具结果 ttl 秒"""
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        key = self.make_key(name, args, scope)
+        expires_at = time.time() + ttl
+        self._remember(key, expires_at, list(contents))
+        if self._conn:
+            try:
+                await asyncio.to_thread(self._disk_put, key, contents, expires_at)
+            except Exception as e:
+                logger.warning(f"写入工具结果缓存失败: {e}")
+
+    def _remember(self, key: str, expires_at: float, contents: List[str]):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (expires_at, contents)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key: str, now: float) -> Tuple[float, List[str]] | None:
+        with self._lock:
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT expires_at, contents FROM tool_cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _disk_put(self, key: str, contents: List[str], expires_at: float):
+        with self._lock:
+            if self._conn is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, contents, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(contents, ensure_ascii=False), expires_at),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        self._entries.clear()
+        with self._lock:
+            if self._conn:
+                self._conn.execute("DELETE FROM tool_cache")
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+
+tool_result_cache = ToolResultCache()
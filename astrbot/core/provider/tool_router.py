@@ -0,0 +1,199 @@
+"""
+函数调用工具路由
+
+插件和 MCP 服务较多时，每次请求都携带全部工具的描述会显著增加请求体积和延迟。
+工具路由在请求 LLM 前为本次请求挑选一个相关的工具子集:
+
+1. 会话和人格的工具白名单: 只保留白名单中的工具。`mcp:<服务名>` 表示该 MCP 服务的全部工具。
+2. 关键词规则: 用户输入包含规则中的关键词时，对应的工具一定会被选中。
+3. 相似度: 其余工具按照与用户输入的相似度排序。配置了 Embedding 提供商时使用向量相似度，
+   否则使用基于词项重合的文本相似度。
+
+工具总数不超过 max_tools 时不做筛选。
+"""
+
+import math
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from astrbot.core import logger
+from astrbot.core.provider.func_tool_manager import FuncCall, FuncTool
+from astrbot.core.provider.provider import EmbeddingProvider
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+
+def _terms(text: str) -> set:
+    """英文按单词(下划线、驼峰拆分后)，中文按相邻两个字切分"""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text or "").lower()
+    terms = set(_WORD_RE.findall(text))
+    for run in _CJK_RE.findall(text):
+        if len(run) == 1:
+            terms.add(run)
+        terms.update(run[i : i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def parse_keyword_rules(rules: Iterable[str]) -> List[Tuple[List[str], List[str]]]:
+    """解析关键词规则。每条规则的格式为 `关键词1,关键词2=工具1,工具2`"""
+    parsed = []
+    for rule in rules or []:
+        if "=" not in rule:
+            logger.warning(f"工具路由关键词规则格式错误，已忽略: {rule}")
+            continue
+        keywords, tools = rule.split("=", 1)
+        keywords = [k.strip().lower() for k in keywords.split(",") if k.strip()]
+        tools = [t.strip() for t in tools.split(",") if t.strip()]
+        if keywords and tools:
+            parsed.append((keywords, tools))
+    return parsed
+
+
+def _tool_text(tool: FuncTool) -> str:
+    return f"{tool.name}: {tool.description or ''}"
+
+
+def _allowed(tool: FuncTool, allowlist: set) -> bool:
+    return tool.name in allowlist or (
+        tool.origin == "mcp" and f"mcp:{tool.mcp_server_name}" in allowlist
+    )
+
+
+class ToolRouter:
+    def __init__(
+        self,
+        max_tools: int = 16,
+        keyword_rules: Iterable[str] = (),
+        always_include: Iterable[str] = (),
+    ):
+        """
+        Args:
+            max_tools: 每次请求最多携带的工具数量，小于等于 0 表示不限制(仍然应用白名单)
+            keyword_rules: 关键词规则，格式见 parse_keyword_rules
+            always_include: 总是携带的工具
+        """
+        self.max_tools = max_tools
+        self.keyword_rules = parse_keyword_rules(keyword_rules)
+        self.always_include = list(always_include or [])
+        self._vectors: Dict[str, Tuple[str, np.ndarray]] = {}
+        """工具名 -> (计算向量时的工具描述, 归一化后的向量)"""
+        self._vector_provider = None
+        self._tool_terms: Dict[str, set] = {}
+        """工具描述 -> 词项"""
+        self._subsets: OrderedDict[tuple, FuncCall] = OrderedDict()
+        """缓存的工具子集，使相同的子集可以复用 FuncCall 中缓存的工具描述"""
+
+    async def select(
+        self,
+        func_call: FuncCall,
+        query: str,
+        allowlists: Iterable[Iterable[str]] = (),
+        embedding_provider: EmbeddingProvider | None = None,
+    ) -> FuncCall:
+        """为本次请求选择工具子集
+
+        Args:
+            func_call: 全部工具
+            query: 用户输入
+            allowlists: 工具白名单(如会话和人格的白名单)，只保留所有白名单都允许的工具
+            embedding_provider: 用于计算相似度的 Embedding 提供商
+
+        Returns:
+            只包含被选中工具的 FuncCall。没有筛选时返回 func_call 本身
+        """
+        tools = [f for f in func_call.func_list if f.active]
+        allowsets = [set(allowlist) for allowlist in allowlists]
+        for allowset in allowsets:
+            tools = [f for f in tools if _allowed(f, allowset)]
+        if self.max_tools <= 0 or len(tools) <= self.max_tools:
+            if not allowsets:
+                return func_call
+            return self._subset(func_call, tools)
+
+        # 关键词规则和总是携带的工具优先
+        query_lower = (query or "").lower()
+        pinned = list(self.always_include)
+        for keywords, names in self.keyword_rules:
+            if any(k in query_lower for k in keywords):
+                pinned.extend(names)
+        by_name = {f.name: f for f in tools}
+        selected: Dict[str, FuncTool] = {}
+        for name in pinned:
+            if name in by_name and len(selected) < self.max_tools:
+                selected[name] = by_name[name]
+
+        rest = [f for f in tools if f.name not in selected]
+        scores = None
+        if embedding_provider and query:
+            try:
+                scores = await self._embedding_scores(embedding_provider, query, rest)
+            except Exception as e:
+                logger.warning(f"工具路由计算向量相似度失败，将使用文本相似度: {e}")
+        if scores is None:
+            scores = self._lexical_scores(query, rest)
+        ranked = sorted(range(len(rest)), key=lambda i: -scores[i])
+        for i in ranked[: self.max_tools - len(selected)]:
+            selected[rest[i].name] = rest[i]
+
+        # 保持工具原有的顺序
+        return self._subset(func_call, [f for f in tools if f.name in selected])
+
+    def _subset(self, func_call: FuncCall, tools: List[FuncTool]) -> FuncCall:
+        key = (id(func_call), func_call._version, tuple(id(f) for f in tools))
+        if key in self._subsets:
+            self._subsets.move_to_end(key)
+            return self._subsets[key]
+        subset = FuncCall()
+        subset.func_list = tools
+        subset.mcp_client_dict = func_call.mcp_client_dict
+        subset.mcp_client_event = func_call.mcp_client_event
+        self._subsets[key] = subset
+        while len(self._subsets) > 64:
+            self._subsets.popitem(last=False)
+        return subset
+
+    def _lexical_scores(self, query: str, tools: List[FuncTool]) -> List[float]:
+        query_terms = _terms(query)
+        scores = []
+        for tool in tools:
+            text = _tool_text(tool)
+            tool_terms = self._tool_terms.get(text)
+            if tool_terms is None:
+                tool_terms = self._tool_terms[text] = _terms(text)
+            overlap = len(query_terms & tool_terms)
+            scores.append(overlap / math.sqrt(len(tool_terms)) if overlap else 0.0)
+        return scores
+
+    async def _embedding_scores(
+        self, provider: EmbeddingProvider, query: str, tools: List[FuncTool]
+    ) -> List[float]:
+        if provider is not self._vector_provider:
+            self._vectors.clear()
+            self._vector_provider = provider
+        # 只为新增或描述发生变化的工具计算向量
+        missing = [
+            f
+            for f in tools
+            if f.name not in self._vectors or self._vectors[f.name][0] != _tool_text(f)
+        ]
+        texts = [_tool_text(f) for f in missing] + [query]
+        # 按提供商的批量大小分批请求，避免超过单次请求的数量上限(如 Gemini 为 100)
+        batch_size = max(
+            1, int(provider.provider_config.get("embedding_batch_size", 32))
+        )
+        vectors = []
+        for i in range(0, len(texts), batch_size):
+            vectors.extend(await provider.get_embeddings(texts[i : i + batch_size]))
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        for tool, text, vector in zip(missing, texts, vectors):
+            self._vectors[tool.name] = (text, vector)
+        if not tools:
+            return []
+        matrix = np.stack([self._vectors[f.name][1] for f in tools])
+        return (matrix @ vectors[-1]).tolist()
@@ -306,7 +306,12 @@ def register_on_llm_response(**kwargs):
     return decorator
 
 
-def register_llm_tool(name: str = None):
+def register_llm_tool(
+    name: str = None,
+    parallel: bool = False,
+    max_concurrency: int = 0,
+    cache_ttl: float = 0,
+):
     """为函数调用（function-calling / tools-use）添加工具。
 
     请务必按照以下格式编写一个工具（包括函数注释，AstrBot 会尝试解析该函数注释）
@@ -330,6 +335,12 @@ def register_llm_tool(name: str = None):
 
     可以使用 yield 发送消息、终止事件。
 
+    同一轮中的多个工具调用默认依次执行，因为它们共享同一个事件。只通过返回值输出结果、不使用 `event.set_result`
+    或 `event.send` 的工具可以设置 `parallel=True`，与其他声明并行的工具同时执行；
+    `max_concurrency` 用于限制该工具同时执行的数量，0 表示使用全局配置。
+
+    对于查询类等幂等、无副作用的工具，可以设置 `cache_ttl`(秒)，在这段时间内参数相同的调用会直接返回缓存的结果。
+
     发送消息：请参考文档。
 
     终止事件：
@@ -359,7 +370,13 @@ def register_llm_tool(name: str = None):
             )
         md = get_handler_or_create(awaitable, EventType.OnCallingFuncToolEvent)
         llm_tools.add_func(
-            llm_tool_name, args, docstring.description.strip(), md.handler
+            llm_tool_name,
+            args,
+            docstring.description.strip(),
+            md.handler,
+            parallel=parallel,
+            max_concurrency=max_concurrency,
+            cache_ttl=cache_ttl,
         )
         return awaitable
 
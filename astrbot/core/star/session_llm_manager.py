@@ -2,7 +2,7 @@
 会话服务管理器 - 负责管理每个会话的LLM、TTS等服务的启停状态
 """
 
-from typing import Dict
+from typing import Dict, List
 
 from astrbot.core import logger, sp
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
@@ -73,6 +73,47 @@ class SessionServiceManager:
         session_id = event.unified_msg_origin
         return SessionServiceManager.is_llm_enabled_for_session(session_id)
 
+    # =============================================================================
+    # 函数调用工具相关方法
+    # =============================================================================
+
+    @staticmethod
+    def get_session_tool_allowlist(session_id: str) -> List[str] | None:
+        """获取会话可以使用的函数调用工具
+
+        Args:
+            session_id: 会话ID (unified_msg_origin)
+
+        Returns:
+            List[str] | None: 工具名列表，`mcp:<服务名>` 表示该 MCP 服务的全部工具。None 表示不限制
+        """
+        session_config = sp.get("session_service_config", {}) or {}
+        session_services = session_config.get(session_id, {})
+        return session_services.get("tool_allowlist")
+
+    @staticmethod
+    def set_session_tool_allowlist(session_id: str, tools: List[str] | None) -> None:
+        """设置会话可以使用的函数调用工具
+
+        Args:
+            session_id: 会话ID (unified_msg_origin)
+            tools: 工具名列表，None 表示不限制
+        """
+        session_config = sp.get("session_service_config", {}) or {}
+        if session_id not in session_config:
+            session_config[session_id] = {}
+
+        if tools is None:
+            session_config[session_id].pop("tool_allowlist", None)
+        else:
+            session_config[session_id]["tool_allowlist"] = list(tools)
+
+        sp.put("session_service_config", session_config)
+
+        logger.info(
+            f"会话 {session_id} 的函数调用工具白名单已更新为: {tools if tools is not None else '不限制'}"
+        )
+
     # =============================================================================
     # TTS 相关方法
     # =============================================================================
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import bisect
 import enum
 from dataclasses import dataclass, field
 from typing import Awaitable, List, Dict, TypeVar, Generic
@@ -11,15 +12,26 @@ class StarHandlerRegistry(Generic[T]):
     def __init__(self):
         self.star_handlers_map: Dict[str, StarHandlerMetadata] = {}
         self._handlers: List[StarHandlerMetadata] = []
+        self.generation = 0
+        """Handler 或插件状态每次变化时递增，用于使依赖 Handler 列表的缓存失效"""
+        self._buckets: Dict[tuple, List[StarHandlerMetadata]] = {}
+        """(事件类型, 是否只返回已激活的, 平台 ID) -> 按优先级排序的 Handler 列表"""
+        self._buckets_generation = 0
+
+    def invalidate(self):
+        """标记 Handler 列表已经变化。插件被启用、禁用、重载，或者平台兼容性变化时需要调用"""
+        self.generation += 1
 
     def append(self, handler: StarHandlerMetadata):
-        """添加一个 Handler，并保持按优先级有序"""
+        """添加一个 Handler，并保持按优先级有序。同优先级的 Handler 保持注册顺序"""
         if "priority" not in handler.extras_configs:
             handler.extras_configs["priority"] = 0
 
         self.star_handlers_map[handler.handler_full_name] = handler
-        self._handlers.append(handler)
-        self._handlers.sort(key=lambda h: -h.extras_configs["priority"])
+        bisect.insort_right(
+            self._handlers, handler, key=lambda h: -h.extras_configs["priority"]
+        )
+        self.invalidate()
 
     def _print_handlers(self):
         for handler in self._handlers:
@@ -27,6 +39,25 @@ class StarHandlerRegistry(Generic[T]):
 
     def get_handlers_by_event_type(
         self, event_type: EventType, only_activated=True, platform_id=None
+    ) -> List[StarHandlerMetadata]:
+        """获取某个事件类型的 Handler，按优先级排序。
+
+        结果按 (事件类型, 是否只返回已激活的, 平台 ID) 缓存，`generation` 变化后重新计算。返回的列表请勿修改。
+        """
+        if event_type == EventType.OnAstrBotLoadedEvent or not platform_id:
+            platform_id = None
+        if self._buckets_generation != self.generation:
+            self._buckets = {}
+            self._buckets_generation = self.generation
+        key = (event_type, only_activated, platform_id)
+        handlers = self._buckets.get(key)
+        if handlers is None:
+            handlers = self._filter_handlers(event_type, only_activated, platform_id)
+            self._buckets[key] = handlers
+        return handlers
+
+    def _filter_handlers(
+        self, event_type: EventType, only_activated: bool, platform_id: str | None
     ) -> List[StarHandlerMetadata]:
         handlers = []
         for handler in self._handlers:
@@ -36,7 +67,7 @@ class StarHandlerRegistry(Generic[T]):
                 plugin = star_map.get(handler.handler_module_path)
                 if not (plugin and plugin.activated):
                     continue
-            if platform_id and event_type != EventType.OnAstrBotLoadedEvent:
+            if platform_id:
                 if not handler.is_enabled_for_platform(platform_id):
                     continue
             handlers.append(handler)
@@ -56,10 +87,12 @@ class StarHandlerRegistry(Generic[T]):
     def clear(self):
         self.star_handlers_map.clear()
         self._handlers.clear()
+        self.invalidate()
 
     def remove(self, handler: StarHandlerMetadata):
         self.star_handlers_map.pop(handler.handler_full_name, None)
         self._handlers = [h for h in self._handlers if h != handler]
+        self.invalidate()
 
     def __iter__(self):
         return iter(self._handlers)
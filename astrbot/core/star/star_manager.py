@@ -357,6 +357,7 @@ class PluginManager:
             logger.debug(
                 f"插件 {plugin.name} 支持的平台: {list(plugin.supported_platforms.keys())}"
             )
+        star_handlers_registry.invalidate()
 
         return True
 
@@ -556,6 +557,7 @@ class PluginManager:
                 # 禁用/启用插件
                 if metadata.module_path in inactivated_plugins:
                     metadata.activated = False
+                star_handlers_registry.invalidate()
 
                 assert metadata.module_path is not None, (
                     f"插件 {metadata.name} 的模块路径为空。"
@@ -764,7 +766,7 @@ class PluginManager:
         """
         禁用一个插件。
         调用插件的 terminate() 方法，
-        将插件的 module_path 加入到 data/shared_preferences.json 的 inactivated_plugins 列表中。
+        将插件的 module_path 加入到偏好设置的 inactivated_plugins 列表中。
         并且同时将插件启用的 llm_tool 禁用。
         """
         async with self._pm_lock:
@@ -795,6 +797,7 @@ class PluginManager:
             sp.put("inactivated_llm_tools", inactivated_llm_tools)
 
             plugin.activated = False
+            star_handlers_registry.invalidate()
 
     @staticmethod
     async def _terminate_plugin(star_metadata: StarMetadata):
@@ -3,7 +3,7 @@ import psutil
 import sys
 import time
 from .zip_updator import ReleaseInfo, RepoZipUpdator
-from astrbot.core import logger
+from astrbot.core import logger, sp
 from astrbot.core.config.default import VERSION
 from astrbot.core.utils.io import download_file
 from astrbot.core.utils.astrbot_path import get_astrbot_path
@@ -47,6 +47,8 @@ class AstrBotUpdator(RepoZipUpdator):
         这里只能使用 os.exec* 来重启程序
         """
         time.sleep(delay)
+        # os.exec* 不会执行 atexit, 需要先写入未保存的偏好设置
+        sp.flush()
         self.terminate_child_processes()
         if os.name == "nt":
             py = f'"{sys.executable}"'
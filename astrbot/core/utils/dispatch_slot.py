@@ -0,0 +1,56 @@
+"""
+事件分发槽位
+
+EventBus 在 worker_pool 模式下通过信号量限制同时执行的 pipeline 数量, 每个 pipeline 占据一个槽位。
+当 pipeline 挂起等待用户的下一条消息时(如 SessionWaiter), 需要暂时让出槽位。
+否则当所有槽位都被等待方占据时, 用于唤醒等待方的消息将永远得不到执行。
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+
+class DispatchSlot:
+    def __init__(self, semaphore: asyncio.Semaphore):
+        self._semaphore = semaphore
+        self._owner = asyncio.current_task()
+        self.held = True
+
+    def release(self):
+        if self.held:
+            self.held = False
+            self._semaphore.release()
+
+    async def acquire(self):
+        if not self.held:
+            await self._semaphore.acquire()
+            self.held = True
+
+
+_current_slot: ContextVar[Optional[DispatchSlot]] = ContextVar(
+    "astrbot_dispatch_slot", default=None
+)
+
+
+def bind_dispatch_slot(slot: DispatchSlot):
+    """将槽位绑定到当前任务"""
+    _current_slot.set(slot)
+
+
+@asynccontextmanager
+async def yield_dispatch_slot():
+    """在上下文中暂时让出当前任务占据的槽位, 退出时重新获取。
+
+    由 pipeline 中派生出的其他任务会继承上下文, 但它们并不占据槽位, 因此只有槽位的所有者才会让出。
+    """
+    slot = _current_slot.get()
+    if slot is None or slot._owner is not asyncio.current_task() or not slot.held:
+        yield
+        return
+    slot.release()
+    try:
+        yield
+    finally:
+        await slot.acquire()
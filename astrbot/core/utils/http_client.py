@@ -0,0 +1,137 @@
+"""
+进程内共享的 HTTP 客户端
+
+所有对外的 HTTP 请求(下载图片和文件、文转图、指标上报、网页搜索、平台适配器的接口调用等)共用同一个
+aiohttp.ClientSession，从而复用连接池(按主机限制连接数)、TLS 会话、DNS 缓存和 certifi 的 SSL 上下文，
+避免每次请求都重新建立连接、握手和解析 CA 证书。
+
+代理: 默认的会话启用了 trust_env，每次请求都会读取 http_proxy/https_proxy/no_proxy 环境变量，
+因此配置中的代理在修改后立即生效。访问本地或内网服务(如协议端、自部署的 TTS)时应使用 `direct=True`
+的会话，它不使用代理，但与默认的会话共用同一个连接池。
+
+用法:
+```
+from astrbot.core.utils.http_client import http_client
+
+async with http_client.session() as session:
+    async with session.get(url) as resp:
+        ...
+```
+
+共享的会话在 AstrBot 停止时由 `AstrBotCoreLifecycle.stop` 关闭，调用方不要自行关闭。
+"""
+
+import asyncio
+import logging
+import ssl
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import aiohttp
+import certifi
+
+logger = logging.getLogger("astrbot")
+
+
+class HttpClientManager:
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 16,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30,
+    ):
+        """
+        Args:
+            limit: 连接池的最大连接数
+            limit_per_host: 每个主机的最大连接数
+            dns_cache_ttl: DNS 缓存时间(秒)
+            keepalive_timeout: 空闲连接的保持时间(秒)
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self._ssl_context: ssl.SSLContext | None = None
+        self._fallback_ssl_context: ssl.SSLContext | None = None
+        self._pools: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop,
+            tuple[aiohttp.TCPConnector, dict[bool, aiohttp.ClientSession]],
+        ] = weakref.WeakKeyDictionary()
+        """事件循环 -> (连接池, 是否直连 -> 会话)。aiohttp 的会话只能在创建它的事件循环中使用"""
+
+    @property
+    def ssl_context(self) -> ssl.SSLContext:
+        """使用 certifi 根证书的 SSL 上下文"""
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context(cafile=certifi.where())
+        return self._ssl_context
+
+    @property
+    def fallback_ssl_context(self) -> ssl.SSLContext:
+        """使用系统根证书、兼容旧的加密套件的 SSL 上下文。用于 certifi 证书校验失败时重试"""
+        if self._fallback_ssl_context is None:
+            ctx = ssl.create_default_context()
+            ctx.set_ciphers("DEFAULT")
+            self._fallback_ssl_context = ctx
+        return self._fallback_ssl_context
+
+    def get_session(self, direct: bool = False) -> aiohttp.ClientSession:
+        """获取当前事件循环的共享会话，不存在或已关闭时创建
+
+        Args:
+            direct: 为 True 时不使用环境变量中的代理
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None or pool[0].closed:
+            connector = aiohttp.TCPConnector(
+                ssl=self.ssl_context,
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            pool = (connector, {})
+            self._pools[loop] = pool
+        connector, sessions = pool
+        session = sessions.get(direct)
+        if session is None or session.closed:
+            # 共享会话被不相关的调用方使用，不保存 Cookie，避免一个调用方的 Cookie 被发送给其他调用方
+            session = aiohttp.ClientSession(
+                connector=connector,
+                connector_owner=False,
+                trust_env=not direct,
+                cookie_jar=aiohttp.DummyCookieJar(),
+            )
+            sessions[direct] = session
+        return session
+
+    @asynccontextmanager
+    async def session(
+        self, direct: bool = False
+    ) -> AsyncIterator[aiohttp.ClientSession]:
+        """以 `async with` 的方式使用共享会话。退出时不会关闭会话"""
+        yield self.get_session(direct)
+
+    async def close(self):
+        """关闭当前事件循环的共享会话和连接池"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        pool = self._pools.pop(loop, None)
+        if pool is None:
+            return
+        connector, sessions = pool
+        try:
+            for session in sessions.values():
+                await session.close()
+            await connector.close()
+        except Exception as e:
+            logger.warning(f"关闭 HTTP 会话失败: {e}")
+
+
+http_client = HttpClientManager()
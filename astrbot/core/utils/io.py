@@ -1,5 +1,4 @@
 import os
-import ssl
 import shutil
 import socket
 import time
@@ -9,12 +8,11 @@ import zipfile
 import uuid
 import psutil
 
-import certifi
-
 from typing import Union
 
 from PIL import Image
 from .astrbot_path import get_astrbot_data_path
+from .http_client import http_client
 
 
 def on_error(func, path, exc_info):
@@ -81,13 +79,7 @@ async def download_image_by_url(
     下载图片, 返回 path
     """
     try:
-        ssl_context = ssl.create_default_context(
-            cafile=certifi.where()
-        )  # 使用 certifi 提供的 CA 证书
-        connector = aiohttp.TCPConnector(ssl=ssl_context)  # 使用 certifi 的根证书
-        async with aiohttp.ClientSession(
-            trust_env=True, connector=connector
-        ) as session:
+        async with http_client.session() as session:
             if post:
                 async with session.post(url, json=post_data) as resp:
                     if not path:
@@ -106,9 +98,8 @@ async def download_image_by_url(
                         return path
     except (aiohttp.ClientConnectorSSLError, aiohttp.ClientConnectorCertificateError):
         # 关闭SSL验证
-        ssl_context = ssl.create_default_context()
-        ssl_context.set_ciphers("DEFAULT")
-        async with aiohttp.ClientSession() as session:
+        ssl_context = http_client.fallback_ssl_context
+        async with http_client.session() as session:
             if post:
                 async with session.get(url, ssl=ssl_context) as resp:
                     return save_temp_img(await resp.read())
@@ -124,13 +115,7 @@ async def download_file(url: str, path: str, show_progress: bool = False):
     从指定 url 下载文件到指定路径 path
     """
     try:
-        ssl_context = ssl.create_default_context(
-            cafile=certifi.where()
-        )  # 使用 certifi 提供的 CA 证书
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-        async with aiohttp.ClientSession(
-            trust_env=True, connector=connector
-        ) as session:
+        async with http_client.session() as session:
             async with session.get(url, timeout=1800) as resp:
                 if resp.status != 200:
                     raise Exception(f"下载文件失败: {resp.status}")
@@ -155,9 +140,8 @@ async def download_file(url: str, path: str, show_progress: bool = False):
                             )
     except (aiohttp.ClientConnectorSSLError, aiohttp.ClientConnectorCertificateError):
         # 关闭SSL验证
-        ssl_context = ssl.create_default_context()
-        ssl_context.set_ciphers("DEFAULT")
-        async with aiohttp.ClientSession() as session:
+        ssl_context = http_client.fallback_ssl_context
+        async with http_client.session() as session:
             async with session.get(url, ssl=ssl_context, timeout=120) as resp:
                 total_size = int(resp.headers.get("content-length", 0))
                 downloaded_size = 0
@@ -182,6 +166,19 @@ async def download_file(url: str, path: str, show_progress: bool = False):
         print()
 
 
+def link_or_copy(src: str, dst: str) -> str:
+    """将 src 放到 dst。优先创建硬链接(不复制数据)，跨文件系统等无法链接时复制文件。
+
+    复制使用 shutil.copyfile，在 Linux 上由内核完成(copy_file_range/sendfile)，不会将整个文件读入内存。
+    硬链接与 src 共享数据，src 被原地修改时 dst 也会随之改变，因此只应用于不会被修改的文件(如媒体缓存中按内容寻址的文件)。
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+    return dst
+
+
 def file_to_base64(file_path: str) -> str:
     with open(file_path, "rb") as f:
         data_bytes = f.read()
@@ -0,0 +1,356 @@
+"""
+按内容寻址的媒体缓存
+
+图片、语音和文件在一次对话中会被多次使用: 组件转换为本地路径或 base64、每次请求 LLM 时组装上下文、
+平台适配器发送消息。媒体缓存让这些调用方共享同一份下载结果和编码结果:
+
+1. 磁盘: 下载或解码得到的文件以内容的 sha256 命名，保存在 data/media_cache 下，相同内容只保存一份。
+   并发下载同一个 URL 时共享同一次下载。URL 的内容可能会变化(如随机图片、动态生成的图表)，
+   因此下载结果只在响应头 Cache-Control 的 max-age 内复用(最长 max_url_ttl 秒)；
+   没有 max-age 或带有 no-store/no-cache 时每次重新下载，相同的内容仍然只保存一份。
+2. 内存: 文件的 base64 编码保存在按总大小限制的 LRU 中，避免重复读取和编码。
+3. 淘汰: 后台任务定期删除超过保存时间的文件，并在总大小超过上限时删除最久未使用的文件，
+   同时清理 data/temp 中超过 12 小时的临时文件。
+
+用法:
+```
+from astrbot.core.utils.media_cache import media_cache
+
+path = await media_cache.get_path(url)  # 支持 http(s)、file:///、base64:// 和本地路径
+bs64 = await media_cache.get_base64(url)  # 不带 base64:// 前缀
+data_uri = await media_cache.get_data_uri(url, "image/jpeg")
+```
+
+缓存中的文件可能在超过保存时间后被删除，调用方需要长期保存时应自行复制。
+"""
+
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+
+import aiohttp
+
+from .astrbot_path import get_astrbot_data_path
+from .http_client import http_client
+
+logger = logging.getLogger("astrbot")
+
+TEMP_FILE_MAX_AGE = 3600 * 12
+"""data/temp 中临时文件的保存时间(秒)"""
+
+_MAX_AGE_RE = re.compile(r"(?:^|[,\s])max-age=(\d+)")
+
+
+def _url_ttl(cache_control: str | None, max_ttl: float) -> float:
+    """根据 Cache-Control 计算下载结果可以复用的时间(秒)"""
+    if not cache_control:
+        return 0
+    cache_control = cache_control.lower()
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0
+    match = _MAX_AGE_RE.search(cache_control)
+    if not match:
+        return 0
+    return min(float(match.group(1)), max_ttl)
+
+
+class MediaCache:
+    def __init__(
+        self,
+        root: str | None = None,
+        max_size_mb: float = 1024,
+        max_age_hours: float = 72,
+        encoded_cache_mb: float = 64,
+        cleanup_interval: float = 600,
+        max_urls: int = 4096,
+        max_url_ttl: float = 3600,
+    ):
+        """
+        Args:
+            root: 缓存目录，默认为 data/media_cache
+            max_size_mb: 磁盘缓存的总大小上限(MB)，小于等于 0 表示不限制
+            max_age_hours: 文件的保存时间(小时)，从最后一次使用开始计算，小于等于 0 表示不限制
+            encoded_cache_mb: 内存中 base64 编码缓存的总大小上限(MB)，0 表示不缓存
+            cleanup_interval: 后台淘汰的间隔(秒)
+            max_urls: 内存中最多保存的 URL 映射数量
+            max_url_ttl: URL 下载结果的最长复用时间(秒)，实际复用时间由响应头 Cache-Control 的 max-age 决定
+        """
+        self._root = root
+        self.cleanup_interval = cleanup_interval
+        self.max_urls = max_urls
+        self.max_url_ttl = max_url_ttl
+        self.configure(max_size_mb, max_age_hours, encoded_cache_mb)
+        self._urls: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        """URL -> (缓存文件路径, 过期时间)"""
+        self._downloading: dict[str, asyncio.Future] = {}
+        self._encoded: OrderedDict[tuple, str] = OrderedDict()
+        """(文件路径, 修改时间, 大小) -> base64 编码。缓存中的文件只以 (文件路径,) 作为键"""
+        self._encoded_bytes = 0
+        self._task: asyncio.Task | None = None
+        self.url_hits = 0
+        self.downloads = 0
+        self.encoded_hits = 0
+        self.encoded_misses = 0
+        self.evicted_files = 0
+
+    @property
+    def root(self) -> str:
+        if self._root is None:
+            self._root = os.path.join(get_astrbot_data_path(), "media_cache")
+        return self._root
+
+    def configure(
+        self,
+        max_size_mb: float = 1024,
+        max_age_hours: float = 72,
+        encoded_cache_mb: float = 64,
+    ):
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.max_age = max_age_hours * 3600
+        self.max_encoded_bytes = int(encoded_cache_mb * 1024 * 1024)
+        if hasattr(self, "_encoded"):
+            self._shrink_encoded()
+
+    def store_bytes(self, data: bytes, suffix: str = ".jpg") -> str:
+        """将数据保存到缓存目录，返回以内容哈希命名的文件的绝对路径。相同的内容只保存一份"""
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256(data).hexdigest()
+        path = os.path.abspath(os.path.join(self.root, digest + suffix))
+        if os.path.exists(path):
+            self._touch(path)
+            return path
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def contains(self, path: str) -> bool:
+        """path 是否为缓存目录中以内容哈希命名的文件。这些文件不会被原地修改，可以安全地创建硬链接"""
+        root = os.path.abspath(self.root)
+        return os.path.dirname(os.path.abspath(path)) == root
+
+    async def put_bytes(self, data: bytes, suffix: str = ".jpg") -> str:
+        """在线程中执行 store_bytes"""
+        return await asyncio.to_thread(self.store_bytes, data, suffix)
+
+    async def get_path(self, source: str, suffix: str = ".jpg") -> str:
+        """获取媒体的本地绝对路径
+
+        Args:
+            source: http(s) URL、file:/// 路径、base64:// 数据或本地路径
+            suffix: 下载或解码得到的文件的扩展名
+        """
+        if source and source.startswith("file:///"):
+            return source[8:]
+        elif source and source.startswith("http"):
+            return await self._get_url(source, suffix)
+        elif source and source.startswith("base64://"):
+            return await asyncio.to_thread(
+                self._store_base64, source.removeprefix("base64://"), suffix
+            )
+        elif source and os.path.exists(source):
+            return os.path.abspath(source)
+        else:
+            raise Exception(f"not a valid file: {source}")
+
+    async def get_base64(self, source: str, suffix: str = ".jpg") -> str:
+        """获取媒体的 base64 编码，不以 base64:// 开头。参数同 get_path"""
+        if source and source.startswith("base64://"):
+            return source.removeprefix("base64://")
+        path = await self.get_path(source, suffix)
+        if self.contains(path):
+            # 缓存中的文件按内容命名、不会被修改，其修改时间会在每次使用时更新，因此只以路径作为键
+            key = (path,)
+        else:
+            stat = os.stat(path)
+            key = (path, stat.st_mtime_ns, stat.st_size)
+        encoded = self._encoded.get(key)
+        if encoded is not None:
+            self._encoded.move_to_end(key)
+            self.encoded_hits += 1
+            return encoded
+        self.encoded_misses += 1
+        encoded = await asyncio.to_thread(_read_base64, path)
+        if len(encoded) <= self.max_encoded_bytes:
+            self._encoded[key] = encoded
+            self._encoded_bytes += len(encoded)
+            self._shrink_encoded()
+        return encoded
+
+    async def get_data_uri(self, source: str, mime_type: str = "image/jpeg") -> str:
+        """获取媒体的 data URI，如 `data:image/jpeg;base64,...`"""
+        return f"data:{mime_type};base64,{await self.get_base64(source)}"
+
+    async def _get_url(self, url: str, suffix: str) -> str:
+        entry = self._urls.get(url)
+        if entry is not None:
+            path, expires = entry
+            if expires > time.time() and os.path.exists(path):
+                self._urls.move_to_end(url)
+                self.url_hits += 1
+                self._touch(path)
+                return path
+            self._urls.pop(url, None)
+        # 同一个 URL 的并发下载共享同一次下载
+        future = self._downloading.get(url)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._downloading[url] = future
+        try:
+            data, cache_control = await self._download(url)
+            path = await self.put_bytes(data, suffix)
+            self.downloads += 1
+            ttl = _url_ttl(cache_control, self.max_url_ttl)
+            if ttl > 0:
+                self._urls[url] = (path, time.time() + ttl)
+                self._urls.move_to_end(url)
+                while len(self._urls) > self.max_urls:
+                    self._urls.popitem(last=False)
+            future.set_result(path)
+            return path
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "Future exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._downloading.pop(url, None)
+
+    async def _download(self, url: str) -> tuple[bytes, str | None]:
+        """下载文件，返回 (内容, Cache-Control 响应头)"""
+        try:
+            async with http_client.session() as session:
+                async with session.get(url) as resp:
+                    if resp.status != 200:
+                        raise Exception(f"下载文件失败: {resp.status}")
+                    return await resp.read(), resp.headers.get("Cache-Control")
+        except (
+            aiohttp.ClientConnectorSSLError,
+            aiohttp.ClientConnectorCertificateError,
+        ):
+            # 使用兼容的 SSL 上下文重试
+            async with http_client.session() as session:
+                async with session.get(
+                    url, ssl=http_client.fallback_ssl_context
+                ) as resp:
+                    if resp.status != 200:
+                        raise Exception(f"下载文件失败: {resp.status}")
+                    return await resp.read(), resp.headers.get("Cache-Control")
+
+    def _store_base64(self, bs64_data: str, suffix: str) -> str:
+        return self.store_bytes(base64.b64decode(bs64_data), suffix)
+
+    def _touch(self, path: str):
+        """更新文件的修改时间，淘汰时以此作为最后一次使用的时间"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _shrink_encoded(self):
+        while self._encoded and self._encoded_bytes > self.max_encoded_bytes:
+            _, encoded = self._encoded.popitem(last=False)
+            self._encoded_bytes -= len(encoded)
+
+    def evict(self) -> int:
+        """删除超过保存时间的文件，并在总大小超过上限时删除最久未使用的文件。返回删除的文件数量"""
+        removed = 0
+        now = time.time()
+        files = []
+        if os.path.isdir(self.root):
+            for entry in os.scandir(self.root):
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in files:
+            expired = self.max_age > 0 and now - mtime > self.max_age
+            oversize = self.max_size > 0 and total > self.max_size
+            if not expired and not oversize:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        temp_dir = os.path.join(get_astrbot_data_path(), "temp")
+        if os.path.isdir(temp_dir):
+            for entry in os.scandir(temp_dir):
+                try:
+                    if (
+                        entry.is_file()
+                        and now - entry.stat().st_ctime > TEMP_FILE_MAX_AGE
+                    ):
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError:
+                    continue
+
+        if removed:
+            self.evicted_files += removed
+            self._urls = OrderedDict(
+                (url, entry)
+                for url, entry in self._urls.items()
+                if os.path.exists(entry[0])
+            )
+        return removed
+
+    def start(self):
+        """启动后台淘汰任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._evict_loop(), name="media_cache")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _evict_loop(self):
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.evict)
+                if removed:
+                    logger.debug(f"媒体缓存: 已清理 {removed} 个文件")
+            except Exception as e:
+                logger.warning(f"清理媒体缓存失败: {e}")
+            await asyncio.sleep(self.cleanup_interval)
+
+    def stats(self) -> dict:
+        return {
+            "url_hits": self.url_hits,
+            "downloads": self.downloads,
+            "encoded_hits": self.encoded_hits,
+            "encoded_misses": self.encoded_misses,
+            "encoded_bytes": self._encoded_bytes,
+            "evicted_files": self.evicted_files,
+        }
+
+
+def _read_base64(path: str) -> str:
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode()
+
+
+media_cache = MediaCache()
@@ -0,0 +1,196 @@
+"""
+媒体处理执行器
+
+语音编解码(silk、wav、mp3)、音频格式转换和图片编码、压缩等都是阻塞的 CPU 密集型操作。
+直接在事件循环中执行时，处理一条语音消息就会让所有平台的连接停顿。媒体处理执行器在线程池或进程池中执行这些操作:
+
+- mode 为 thread 时使用线程池。pysilk、pilk 和 PIL 的大部分操作会释放 GIL，线程池的开销最小。
+- mode 为 process 时使用进程池，可以完全避免占用主进程的 CPU。此时提交的函数和参数必须可以被 pickle
+  (模块级的函数、静态方法，参数为路径、bytes 或 PIL 图片等)。
+- 等待执行的任务数量超过 max_workers + queue_size 时，新的任务需要等待空位，等待时间计入超时时间。
+- 任务超过 timeout 秒未完成时抛出 asyncio.TimeoutError。线程无法被强制终止，超时的任务会在后台继续运行直到结束，
+  期间仍然占用执行位，并在统计中计入 in_flight。
+
+用法:
+```
+from astrbot.core.utils.media_executor import media_executor
+
+await media_executor.run(func, *args, name="silk_to_wav")
+```
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import time
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger("astrbot")
+
+
+class MediaExecutor:
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: int = 0,
+        queue_size: int = 64,
+        timeout: float = 120,
+    ):
+        """
+        Args:
+            mode: thread 或 process
+            max_workers: 同时执行的最大任务数量，小于等于 0 时为 min(4, CPU 核心数)
+            queue_size: 最多等待执行的任务数量
+            timeout: 默认的任务超时时间(秒)，小于等于 0 表示不限制
+        """
+        self._executor: Executor | None = None
+        self._slots: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Semaphore
+        ] = weakref.WeakKeyDictionary()
+        """事件循环 -> 限制执行和等待中任务总数的信号量"""
+        self._stats: dict[str, dict] = {}
+        self.configure(mode, max_workers, queue_size, timeout)
+
+    def configure(
+        self,
+        mode: str = "thread",
+        max_workers: int = 0,
+        queue_size: int = 64,
+        timeout: float = 120,
+    ):
+        if mode not in ("thread", "process"):
+            logger.warning(f"未知的媒体处理执行器模式: {mode}，将使用 thread")
+            mode = "thread"
+        if max_workers <= 0:
+            max_workers = min(4, os.cpu_count() or 1)
+        self.mode = mode
+        self.max_workers = max_workers
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        self.shutdown()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                # 主进程中有事件循环、线程池和数据库连接，fork 可能继承被占用的锁而死锁，因此使用 spawn
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="media"
+                )
+        return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = asyncio.Semaphore(self.max_workers + self.queue_size)
+            self._slots[loop] = slots
+        return slots
+
+    async def run(self, func, *args, name: str = None, timeout: float = None, **kwargs):
+        """在执行器中执行 func(*args, **kwargs) 并返回结果
+
+        Args:
+            name: 任务名称，用于统计。默认为函数名
+            timeout: 超时时间(秒)，默认使用执行器的 timeout
+        """
+        name = name or getattr(func, "__name__", "media")
+        timeout = self.timeout if timeout is None else timeout
+        stat = self._stats.setdefault(
+            name,
+            {
+                "count": 0,
+                "errors": 0,
+                "timeouts": 0,
+                "total_time": 0.0,
+                "max_time": 0.0,
+                "wait_time": 0.0,
+                "in_flight": 0,
+            },
+        )
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(
+                self._run(func, args, kwargs, stat, start),
+                timeout if timeout > 0 else None,
+            )
+        except asyncio.TimeoutError:
+            stat["timeouts"] += 1
+            logger.warning(f"媒体处理任务 {name} 超时({timeout}s)")
+            raise
+        except Exception:
+            stat["errors"] += 1
+            raise
+        finally:
+            cost = time.perf_counter() - start
+            stat["count"] += 1
+            stat["total_time"] += cost
+            stat["max_time"] = max(stat["max_time"], cost)
+
+    async def _run(self, func, args, kwargs, stat: dict, start: float):
+        slots = self._get_slots()
+        await slots.acquire()
+        stat["wait_time"] += time.perf_counter() - start
+        try:
+            future = self._get_executor().submit(
+                functools.partial(func, *args, **kwargs)
+            )
+        except BaseException:
+            slots.release()
+            raise
+        # 执行位在任务真正结束时才释放，而不是在等待被超时取消时
+        stat["in_flight"] += 1
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(
+            lambda _: self._call_in_loop(loop, self._release, slots, stat)
+        )
+        return await asyncio.wrap_future(future)
+
+    @staticmethod
+    def _call_in_loop(loop: asyncio.AbstractEventLoop, callback, *args):
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    @staticmethod
+    def _release(slots: asyncio.Semaphore, stat: dict):
+        stat["in_flight"] -= 1
+        slots.release()
+
+    def stats(self) -> dict:
+        """各类任务的执行次数、错误和超时次数、平均和最大耗时、平均排队时间(毫秒)，以及仍在执行的任务数量(包括已超时的任务)"""
+        return {
+            name: {
+                "count": s["count"],
+                "errors": s["errors"],
+                "timeouts": s["timeouts"],
+                "avg_ms": round(s["total_time"] / s["count"] * 1000, 2)
+                if s["count"]
+                else 0,
+                "max_ms": round(s["max_time"] * 1000, 2),
+                "avg_wait_ms": round(s["wait_time"] / s["count"] * 1000, 2)
+                if s["count"]
+                else 0,
+                "in_flight": s["in_flight"],
+            }
+            for name, s in self._stats.items()
+        }
+
+    def shutdown(self):
+        """关闭执行器。正在执行的任务会继续运行直到结束"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._slots.clear()
+
+
+media_executor = MediaExecutor()
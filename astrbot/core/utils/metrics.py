@@ -1,10 +1,159 @@
 import aiohttp
+import asyncio
+import psutil
 import sys
 import os
 import socket
+import time
 import uuid
+from collections import defaultdict
+from typing import Dict, Tuple
 from astrbot.core.config import VERSION
 from astrbot.core import db_helper, logger
+from astrbot.core.db import BaseDatabase
+from astrbot.core.utils.http_client import http_client
+
+METRIC_URL = "https://tickstats.soulter.top/api/metric/90a6c2a1"
+
+
+class MetricsAggregator:
+    """指标聚合器
+
+    - 本地指标按 (类型, 名称, 时间桶) 在内存中累加，定期在一个事务中写入数据库，每个时间桶每个名称只产生一行数据。
+    - 上报的指标将除 `*_tick` 以外的字段相同的数据合并(tick 累加)，定期通过同一个 HTTP 会话上报。
+    """
+
+    def __init__(
+        self,
+        db: BaseDatabase = None,
+        bucket_size: int = 60,
+        flush_interval: float = 60,
+    ):
+        self.db = db or db_helper
+        self.bucket_size = bucket_size
+        self.flush_interval = flush_interval
+        self._local: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        """(类型, 名称, 时间桶) -> 计数。类型为 platform_stats, llm_stats 等"""
+        self._remote: Dict[Tuple, Dict[str, int]] = {}
+        """上报数据中非 tick 字段 -> tick 字段的累加值"""
+        self._lock = asyncio.Lock()
+
+    def record(self, kind: str, name: str, count: int = 1):
+        """记录一个本地指标"""
+        bucket = int(time.time()) // self.bucket_size * self.bucket_size
+        self._local[(kind, name, bucket)] += count
+
+    def record_remote(self, data: dict):
+        """记录一个需要上报的指标"""
+        ticks = {}
+        fields = []
+        for k, v in data.items():
+            if k.endswith("_tick") and isinstance(v, int):
+                ticks[k] = v
+            else:
+                fields.append((k, v))
+        key = tuple(sorted(fields, key=lambda item: item[0]))
+        merged = self._remote.setdefault(key, {})
+        for k, v in ticks.items():
+            merged[k] = merged.get(k, 0) + v
+
+    async def run(self):
+        """定期写入和上报指标"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            await self._flush_local()
+            await self._flush_remote()
+
+    async def _flush_local(self):
+        if not self._local:
+            return
+        local, self._local = self._local, defaultdict(int)
+        batch: Dict[int, dict] = {}
+        for (kind, name, bucket), count in local.items():
+            metrics = batch.setdefault(
+                bucket,
+                {
+                    "platform_stats": {},
+                    "plugin_stats": {},
+                    "command_stats": {},
+                    "llm_stats": {},
+                },
+            )
+            metrics[kind][name] = count
+        try:
+            await self.db.aio.insert_metrics_batch(batch)
+        except Exception as e:
+            logger.error(f"保存指标到数据库失败: {e}")
+            # 放回内存，下次重试
+            for key, count in local.items():
+                self._local[key] += count
+
+    async def _flush_remote(self):
+        if not self._remote:
+            return
+        remote, self._remote = self._remote, {}
+        session = http_client.get_session()
+        timeout = aiohttp.ClientTimeout(total=3)
+        common = {"v": VERSION, "os": sys.platform}
+        try:
+            common["hn"] = socket.gethostname()
+        except Exception:
+            pass
+        try:
+            common["iid"] = Metric.get_installation_id()
+        except Exception:
+            pass
+        for key, ticks in remote.items():
+            payload = {"metrics_data": {**dict(key), **ticks, **common}}
+            try:
+                async with session.post(
+                    METRIC_URL, json=payload, timeout=timeout
+                ) as response:
+                    if response.status != 200:
+                        pass
+            except Exception:
+                pass
+
+    async def shutdown(self):
+        """写入剩余的指标"""
+        await self.flush()
+
+
+metrics_aggregator = MetricsAggregator()
+
+
+class SystemStatsSampler:
+    """在后台定期采样 CPU 和内存占用。读取采样结果不会阻塞事件循环"""
+
+    def __init__(self, interval: float = 5):
+        self.interval = interval
+        self.sampled = False
+        self.cpu_percent = 0.0
+        """上一个采样周期内的系统 CPU 占用率"""
+        self.process_memory = 0
+        """进程占用的内存(MB)"""
+        self.system_memory = 0
+        """系统总内存(MB)"""
+        self._process = psutil.Process()
+
+    def sample(self):
+        # interval=None 时返回距上次调用以来的 CPU 占用率，不会阻塞
+        self.cpu_percent = psutil.cpu_percent(interval=None)
+        self.process_memory = self._process.memory_info().rss >> 20
+        self.system_memory = psutil.virtual_memory().total >> 20
+        self.sampled = True
+
+    async def run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+
+system_stats_sampler = SystemStatsSampler()
 
 
 class Metric:
@@ -42,33 +191,12 @@ class Metric:
         """
         上传相关非敏感的指标以更好地了解 AstrBot 的使用情况。上传的指标不会包含任何有关消息文本、用户信息等敏感信息。
 
+        指标会先在内存中聚合，由 `metrics_aggregator` 定期写入数据库和上报。
+
         Powered by TickStats.
         """
-        base_url = "https://tickstats.soulter.top/api/metric/90a6c2a1"
-        kwargs["v"] = VERSION
-        kwargs["os"] = sys.platform
-        payload = {"metrics_data": kwargs}
-        try:
-            kwargs["hn"] = socket.gethostname()
-        except Exception:
-            pass
-        try:
-            kwargs["iid"] = Metric.get_installation_id()
-        except Exception:
-            pass
-        try:
-            if "adapter_name" in kwargs:
-                db_helper.insert_platform_metrics({kwargs["adapter_name"]: 1})
-            if "llm_name" in kwargs:
-                db_helper.insert_llm_metrics({kwargs["llm_name"]: 1})
-        except Exception as e:
-            logger.error(f"保存指标到数据库失败: {e}")
-            pass
-
-        try:
-            async with aiohttp.ClientSession(trust_env=True) as session:
-                async with session.post(base_url, json=payload, timeout=3) as response:
-                    if response.status != 200:
-                        pass
-        except Exception:
-            pass
+        if "adapter_name" in kwargs:
+            metrics_aggregator.record("platform_stats", kwargs["adapter_name"])
+        if "llm_name" in kwargs:
+            metrics_aggregator.record("llm_stats", kwargs["llm_name"])
+        metrics_aggregator.record_remote(kwargs)
@@ -10,6 +10,7 @@ import copy
 import astrbot.core.message.components as Comp
 from typing import Dict, Any, Callable, Awaitable, List
 from astrbot.core.platform import AstrMessageEvent
+from astrbot.core.utils.dispatch_slot import yield_dispatch_slot
 
 USER_SESSIONS: Dict[str, "SessionWaiter"] = {}  # 存储 SessionWaiter 实例
 FILTERS: List["SessionFilter"] = []  # 存储 SessionFilter 实例
@@ -101,6 +102,15 @@ class DefaultSessionFilter(SessionFilter):
         return event.unified_msg_origin
 
 
+def is_session_waiting(event: AstrMessageEvent) -> bool:
+    """事件所属的会话是否有正在等待外部输入的 SessionWaiter"""
+    for session_filter in FILTERS:
+        session = USER_SESSIONS.get(session_filter.filter(event))
+        if session and not session.session_controller.future.done():
+            return True
+    return False
+
+
 class SessionWaiter:
     def __init__(
         self,
@@ -130,7 +140,9 @@ class SessionWaiter:
         self.session_controller.keep(timeout, reset_timeout=True)
 
         try:
-            return await self.session_controller.future
+            # 等待期间让出分发槽位, 以便唤醒本会话的消息能够被处理
+            async with yield_dispatch_slot():
+                return await self.session_controller.future
         except Exception as e:
             self._cleanup(e)
             raise e
@@ -1,43 +1,190 @@
+import asyncio
+import atexit
 import json
+import logging
 import os
-from typing import TypeVar
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar, Dict, List, Tuple, Optional
 from .astrbot_path import get_astrbot_data_path
 
 _VT = TypeVar("_VT")
 
+logger = logging.getLogger("astrbot")
+
+
 class SharedPreferences:
-    def __init__(self, path=None):
+    """简单的键值对偏好设置存储。
+
+    - 数据常驻内存，`get` 不会访问磁盘。
+    - 存储引擎为 WAL 模式下的 SQLite，每个键单独一行。
+    - `put`/`remove` 只标记脏数据，并在 `flush_interval` 秒后批量、原子地写入磁盘（写后置）。
+      在事件循环中调用时，序列化在事件循环线程中进行，磁盘写入在单独的线程中顺序进行，不会阻塞事件循环。
+    - 首次启动时会自动从旧版的 shared_preferences.json 迁移数据。
+    """
+
+    def __init__(self, path=None, flush_interval: float = 1.0):
         if path is None:
-            path = os.path.join(get_astrbot_data_path(), "shared_preferences.json")
+            path = os.path.join(get_astrbot_data_path(), "shared_preferences.db")
         self.path = path
+        self.json_path = os.path.splitext(path)[0] + ".json"
+        """旧版 JSON 存储的路径，仅用于迁移"""
+        self.flush_interval = flush_interval
+
+        self._dirty: Dict[str, bool] = {}
+        """待写入的键。值为 False 表示该键已被删除"""
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._write_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="shared_preferences"
+        )
+
+        self._conn = self._connect()
         self._data = self._load_preferences()
+        self._migrate_from_json()
+        atexit.register(self.flush)
+
+    def _connect(self) -> sqlite3.Connection:
+        try:
+            conn = self._open(self.path)
+            conn.execute("SELECT count(*) FROM preferences").fetchone()
+            return conn
+        except sqlite3.DatabaseError as e:
+            # 数据库损坏，移走后重新创建，以免无法启动
+            broken_path = self.path + ".broken"
+            logger.error(
+                f"偏好设置数据库 {self.path} 已损坏: {e}，已将其移动到 {broken_path} 并重新创建。"
+            )
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(self.path + suffix):
+                    os.replace(self.path + suffix, broken_path + suffix)
+            return self._open(self.path)
 
-    def _load_preferences(self):
-        if os.path.exists(self.path):
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS preferences (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        conn.commit()
+        return conn
+
+    def _load_preferences(self) -> dict:
+        data = {}
+        with self._write_lock:
+            rows = self._conn.execute("SELECT key, value FROM preferences").fetchall()
+        for key, value in rows:
             try:
-                with open(self.path, "r") as f:
-                    return json.load(f)
+                data[key] = json.loads(value)
             except json.JSONDecodeError:
-                os.remove(self.path)
-        return {}
+                logger.warning(f"偏好设置 {key} 的值无法解析，已忽略。")
+        return data
+
+    def _migrate_from_json(self):
+        """从旧版的 JSON 文件迁移数据"""
+        if not os.path.exists(self.json_path):
+            return
+        try:
+            # 旧版使用系统默认编码写入
+            with open(self.json_path, "r") as f:
+                legacy = json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError, OSError) as e:
+            logger.warning(f"旧版偏好设置文件 {self.json_path} 无法解析，跳过迁移: {e}")
+            legacy = {}
+        if isinstance(legacy, dict) and legacy:
+            for key, value in legacy.items():
+                if key not in self._data:
+                    self._data[key] = value
+                    self._dirty[key] = True
+            self.flush()
+            logger.info(
+                f"已将 {len(legacy)} 项偏好设置从 {self.json_path} 迁移到数据库。"
+            )
+        os.replace(self.json_path, self.json_path + ".migrated")
+
+    def _take_batch(self) -> List[Tuple[str, Optional[str]]]:
+        """取出并序列化所有脏数据。需要在修改数据的线程(事件循环线程)中调用，以保证得到一致的快照"""
+        batch = []
+        for key, exists in self._dirty.items():
+            if exists and key in self._data:
+                batch.append((key, json.dumps(self._data[key], ensure_ascii=False)))
+            else:
+                batch.append((key, None))
+        self._dirty.clear()
+        return batch
+
+    def _write(self, batch: List[Tuple[str, Optional[str]]]):
+        """在一个事务中写入一批数据"""
+        if not batch:
+            return
+        with self._write_lock:
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO preferences (key, value) VALUES (?, ?)",
+                        [(k, v) for k, v in batch if v is not None],
+                    )
+                    self._conn.executemany(
+                        "DELETE FROM preferences WHERE key = ?",
+                        [(k,) for k, v in batch if v is None],
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"写入偏好设置失败: {e}")
+
+    def _schedule_flush(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 不在事件循环中(如启动阶段)，直接写入
+            self.flush()
+            return
+        if self._flush_handle is not None:
+            if self._flush_loop is loop:
+                return
+            # 之前的事件循环已经结束，定时写入不会再被执行
+            self._flush_handle.cancel()
+        self._flush_loop = loop
+        self._flush_handle = loop.call_later(self.flush_interval, self._flush_later)
+
+    def _flush_later(self):
+        self._flush_handle = None
+        batch = self._take_batch()
+        if batch:
+            self._executor.submit(self._write, batch)
 
-    def _save_preferences(self):
-        with open(self.path, "w") as f:
-            json.dump(self._data, f, indent=4, ensure_ascii=False)
-            f.flush()
+    def flush(self):
+        """立即将所有未写入的数据写入磁盘，并等待写入完成"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch = self._take_batch()
+        try:
+            # 通过同一个线程写入，保证先前提交的写入先完成
+            self._executor.submit(self._write, batch).result()
+        except RuntimeError:
+            # 解释器退出时，线程池已经关闭
+            self._write(batch)
 
     def get(self, key, default: _VT = None) -> _VT:
         return self._data.get(key, default)
 
     def put(self, key, value):
         self._data[key] = value
-        self._save_preferences()
+        self._dirty[key] = True
+        self._schedule_flush()
 
     def remove(self, key):
         if key in self._data:
             del self._data[key]
-            self._save_preferences()
+            self._dirty[key] = False
+            self._schedule_flush()
 
     def clear(self):
+        for key in self._data:
+            self._dirty[key] = False
         self._data.clear()
-        self._save_preferences()
+        self._schedule_flush()
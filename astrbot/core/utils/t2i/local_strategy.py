@@ -1,8 +1,5 @@
 import re
 import os
-import aiohttp
-import ssl
-import certifi
 from io import BytesIO
 from typing import List, Tuple
 from abc import ABC, abstractmethod
@@ -11,6 +8,8 @@ from astrbot.core.config import VERSION
 from . import RenderStrategy
 from PIL import ImageFont, Image, ImageDraw
 from astrbot.core.utils.io import save_temp_img
+from astrbot.core.utils.media_executor import media_executor
+from astrbot.core.utils.http_client import http_client
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
 
 
@@ -635,12 +634,7 @@ class ImageElement(MarkdownElement):
     async def load_image(self):
         """加载图片"""
         try:
-            ssl_context = ssl.create_default_context(cafile=certifi.where())
-            connector = aiohttp.TCPConnector(ssl=ssl_context)
-
-            async with aiohttp.ClientSession(
-                trust_env=True, connector=connector
-            ) as session:
+            async with http_client.session() as session:
                 async with session.get(self.image_url) as resp:
                     if resp.status == 200:
                         image_data = await resp.read()
@@ -928,5 +922,5 @@ class LocalRenderStrategy(RenderStrategy):
         # 渲染Markdown文本
         image = await renderer.render(text)
 
-        # 保存图像并返回路径/URL
-        return save_temp_img(image)
+        # 在媒体处理执行器中编码并保存图像，返回路径/URL
+        return await media_executor.run(save_temp_img, image, name="image_encode")
@@ -1,11 +1,9 @@
-import aiohttp
 import os
-import ssl
-import certifi
 
 from . import RenderStrategy
 from astrbot.core.config import VERSION
 from astrbot.core.utils.io import download_image_by_url
+from astrbot.core.utils.http_client import http_client
 
 ASTRBOT_T2I_DEFAULT_ENDPOINT = "https://t2i.soulter.top/text2img"
 
@@ -52,11 +50,7 @@ class NetworkRenderStrategy(RenderStrategy):
             "options": default_options,
         }
         if return_url:
-            ssl_context = ssl.create_default_context(cafile=certifi.where())
-            connector = aiohttp.TCPConnector(ssl=ssl_context)
-            async with aiohttp.ClientSession(
-                trust_env=True, connector=connector
-            ) as session:
+            async with http_client.session() as session:
                 async with session.post(
                     f"{self.BASE_RENDER_URL}/generate", json=post_data
                 ) as resp:
@@ -7,9 +7,10 @@ import asyncio
 import tempfile
 from astrbot.core import logger
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.media_executor import media_executor
 
 
-async def tencent_silk_to_wav(silk_path: str, output_path: str) -> str:
+def _silk_to_wav(silk_path: str, output_path: str) -> str:
     import pysilk
 
     with open(silk_path, "rb") as f:
@@ -29,10 +30,40 @@ async def tencent_silk_to_wav(silk_path: str, output_path: str) -> str:
     return output_path
 
 
+def _wav_to_silk(wav_path: str, output_path: str) -> float:
+    import pilk
+
+    with wave.open(wav_path, "rb") as wav:
+        rate = wav.getframerate()
+    return pilk.encode(wav_path, output_path, pcm_rate=rate, tencent=True)
+
+
+def pyffmpeg_convert(input_path: str, output_path: str):
+    """使用 pyffmpeg 转换音频格式"""
+    from pyffmpeg import FFmpeg
+
+    ff = FFmpeg()
+    ff.convert(input=input_path, output=output_path)
+
+
+def pydub_convert(input_path: str, output_path: str, format: str) -> str:
+    """使用 pydub(依赖 ffmpeg) 将音频转换为 format 格式"""
+    from pydub import AudioSegment
+
+    AudioSegment.from_file(input_path).export(output_path, format=format)
+    return output_path
+
+
+async def tencent_silk_to_wav(silk_path: str, output_path: str) -> str:
+    return await media_executor.run(
+        _silk_to_wav, silk_path, output_path, name="silk_to_wav"
+    )
+
+
 async def wav_to_tencent_silk(wav_path: str, output_path: str) -> int:
     """返回 duration"""
     try:
-        import pilk
+        import pilk  # noqa: F401
     except (ImportError, ModuleNotFoundError) as _:
         raise Exception(
             "pilk 模块未安装，请前往管理面板->控制台->安装pip库 安装 pilk 这个库"
@@ -53,10 +84,9 @@ async def wav_to_tencent_silk(wav_path: str, output_path: str) -> int:
     #         f.write(silk_data_with_prefix)
 
     #     return 0
-    with wave.open(wav_path, "rb") as wav:
-        rate = wav.getframerate()
-        duration = pilk.encode(wav_path, output_path, pcm_rate=rate, tencent=True)
-        return duration
+    return await media_executor.run(
+        _wav_to_silk, wav_path, output_path, name="wav_to_silk"
+    )
 
 
 async def convert_to_pcm_wav(input_path: str, output_path: str) -> str:
@@ -65,10 +95,9 @@ async def convert_to_pcm_wav(input_path: str, output_path: str) -> str:
     若转换失败则抛出异常。
     """
     try:
-        from pyffmpeg import FFmpeg
-
-        ff = FFmpeg()
-        ff.convert(input=input_path, output=output_path)
+        await media_executor.run(
+            pyffmpeg_convert, input_path, output_path, name="pyffmpeg"
+        )
     except Exception as e:
         logger.debug(f"pyffmpeg 转换失败: {e}, 尝试使用 ffmpeg 命令行进行转换")
 
@@ -115,7 +144,7 @@ async def audio_to_tencent_silk_base64(audio_path: str) -> tuple[str, float]:
     - duration: 音频时长（秒）
     """
     try:
-        import pilk
+        import pilk  # noqa: F401
     except ImportError as e:
         raise Exception("未安装 pilk: pip install pilk") from e
 
@@ -136,16 +165,13 @@ async def audio_to_tencent_silk_base64(audio_path: str) -> tuple[str, float]:
     else:
         wav_path = audio_path
 
-    with wave.open(wav_path, "rb") as wav_file:
-        rate = wav_file.getframerate()
-
     silk_path = tempfile.NamedTemporaryFile(
         suffix=".silk", delete=False, dir=temp_dir
     ).name
 
     try:
-        duration = await asyncio.to_thread(
-            pilk.encode, wav_path, silk_path, pcm_rate=rate, tencent=True
+        duration = await media_executor.run(
+            _wav_to_silk, wav_path, silk_path, name="wav_to_silk"
         )
 
         with open(silk_path, "rb") as f:
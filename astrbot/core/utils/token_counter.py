@@ -0,0 +1,66 @@
+"""
+消息的 token 数量估算
+
+默认使用不依赖任何分词器的粗略估算。可以通过 `register_tokenizer` 为某种类型的提供商注册更准确的分词器:
+
+```
+register_tokenizer("openai_chat_completion", lambda text: len(enc.encode(text)))
+```
+"""
+
+import json
+import re
+from typing import Callable, Dict
+
+Tokenizer = Callable[[str], int]
+"""输入文本，返回 token 数量"""
+
+MESSAGE_OVERHEAD = 4
+"""每条消息的格式开销(role 等)"""
+IMAGE_TOKENS = 765
+"""每张图片按照 OpenAI 高精度模式下一张 1024x1024 图片的 token 数量估算"""
+
+_CJK = re.compile(
+    r"[\u2e80-\u2fdf\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]"
+)
+
+_tokenizers: Dict[str, Tokenizer] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数量: 中日韩字符每个约 1 个 token，其他字符每 4 个约 1 个 token"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def register_tokenizer(provider_type: str, tokenizer: Tokenizer):
+    """为某种类型的提供商(如 openai_chat_completion)注册分词器"""
+    _tokenizers[provider_type] = tokenizer
+
+
+def get_tokenizer(provider_type: str) -> Tokenizer | None:
+    """获取为某种类型的提供商注册的分词器，未注册时返回 None"""
+    return _tokenizers.get(provider_type)
+
+
+def count_message_tokens(message: dict, tokenizer: Tokenizer = estimate_tokens) -> int:
+    """估算一条 OpenAI 格式的消息的 token 数量"""
+    tokens = MESSAGE_OVERHEAD
+    content = message.get("content")
+    if isinstance(content, str):
+        tokens += tokenizer(content)
+    elif isinstance(content, list):
+        for part in content:
+            if not isinstance(part, dict):
+                continue
+            if part.get("type") == "text":
+                tokens += tokenizer(part.get("text") or "")
+            elif part.get("type") == "image_url":
+                tokens += IMAGE_TOKENS
+            else:
+                tokens += tokenizer(json.dumps(part, ensure_ascii=False))
+    for tool_call in message.get("tool_calls") or []:
+        tokens += tokenizer(json.dumps(tool_call, ensure_ascii=False))
+    return tokens
@@ -1,13 +1,10 @@
-import aiohttp
 import os
 import re
 import zipfile
 import shutil
 
-import ssl
-import certifi
-
 from astrbot.core.utils.io import on_error, download_file
+from astrbot.core.utils.http_client import http_client
 from astrbot.core import logger
 from astrbot.core.utils.version_comparator import VersionComparator
 
@@ -39,15 +36,7 @@ class RepoZipUpdator:
         返回一个列表，每个元素是一个字典，包含版本号、发布时间、更新内容、commit hash等信息。
         """
         try:
-            ssl_context = ssl.create_default_context(
-                cafile=certifi.where()
-            )  # 新增：创建基于 certifi 的 SSL 上下文
-            connector = aiohttp.TCPConnector(
-                ssl=ssl_context
-            )  # 新增：使用 TCPConnector 指定 SSL 上下文
-            async with aiohttp.ClientSession(
-                trust_env=True, connector=connector
-            ) as session:
+            async with http_client.session() as session:
                 async with session.get(url) as response:
                     # 检查 HTTP 状态码
                     if response.status != 200:
@@ -135,20 +135,13 @@ class ChatRoute(Route):
         back_queue = webchat_queue_mgr.get_or_create_back_queue(conversation_id)
 
         # append user message
-        conversation = self.db.get_conversation_by_user_id(username, conversation_id)
-        try:
-            history = json.loads(conversation.history)
-        except BaseException as e:
-            logger.error(f"Failed to parse conversation history: {e}")
-            history = []
         new_his = {"type": "user", "message": message}
         if image_url:
             new_his["image_url"] = image_url
         if audio_url:
             new_his["audio_url"] = audio_url
-        history.append(new_his)
-        self.db.update_conversation(
-            username, conversation_id, history=json.dumps(history)
+        await self.db.aio.append_conversation_messages(
+            username, conversation_id, [new_his]
         )
 
         async def stream():
@@ -173,17 +166,8 @@ class ChatRoute(Route):
                         break
                     elif (streaming and type == "complete") or not streaming:
                         # append bot message
-                        conversation = self.db.get_conversation_by_user_id(
-                            username, cid
-                        )
-                        try:
-                            history = json.loads(conversation.history)
-                        except BaseException as e:
-                            logger.error(f"Failed to parse conversation history: {e}")
-                            history = []
-                        history.append({"type": "bot", "message": result_text})
-                        self.db.update_conversation(
-                            username, cid, history=json.dumps(history)
+                        await self.db.aio.append_conversation_messages(
+                            username, cid, [{"type": "bot", "message": result_text}]
                         )
 
             except BaseException as _:
@@ -225,13 +209,13 @@ class ChatRoute(Route):
 
         # Clean up queues when deleting conversation
         webchat_queue_mgr.remove_queues(conversation_id)
-        self.db.delete_conversation(username, conversation_id)
+        await self.db.aio.delete_conversation(username, conversation_id)
         return Response().ok().__dict__
 
     async def new_conversation(self):
         username = g.get("username", "guest")
         conversation_id = str(uuid.uuid4())
-        self.db.new_conversation(username, conversation_id)
+        await self.db.aio.new_conversation(username, conversation_id)
         return Response().ok(data={"conversation_id": conversation_id}).__dict__
 
     async def rename_conversation(self):
@@ -243,12 +227,14 @@ class ChatRoute(Route):
         conversation_id = post_data["conversation_id"]
         title = post_data["title"]
 
-        self.db.update_conversation_title(username, conversation_id, title=title)
+        await self.db.aio.update_conversation_title(
+            username, conversation_id, title=title
+        )
         return Response().ok(message="重命名成功！").__dict__
 
     async def get_conversations(self):
         username = g.get("username", "guest")
-        conversations = self.db.get_conversations(username)
+        conversations = await self.db.aio.get_conversations(username)
         return Response().ok(data=conversations).__dict__
 
     async def get_conversation(self):
@@ -257,6 +243,8 @@ class ChatRoute(Route):
         if not conversation_id:
             return Response().error("Missing key: conversation_id").__dict__
 
-        conversation = self.db.get_conversation_by_user_id(username, conversation_id)
+        conversation = await self.db.aio.get_conversation_by_user_id(
+            username, conversation_id
+        )
 
         return Response().ok(data=conversation).__dict__
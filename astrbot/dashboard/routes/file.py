@@ -1,8 +1,12 @@
 from .route import Route, RouteContext
 from astrbot import logger
 from quart import abort, send_file
+from quart.wrappers.response import FileBody
 from astrbot.core import file_token_service
 
+STREAM_CHUNK_SIZE = 64 * 1024
+"""流式发送文件时每次读取的字节数"""
+
 
 class FileRoute(Route):
     def __init__(
@@ -18,7 +22,11 @@ class FileRoute(Route):
     async def serve_file(self, file_token: str):
         try:
             file_path = await file_token_service.handle_file(file_token)
-            return await send_file(file_path)
+            # 分块流式发送，不将整个文件读入内存；支持 Range 请求和条件请求
+            response = await send_file(file_path, conditional=True)
+            if isinstance(response.response, FileBody):
+                response.response.buffer_size = STREAM_CHUNK_SIZE
+            return response
         except (FileNotFoundError, KeyError) as e:
             logger.warning(str(e))
             return abort(404)
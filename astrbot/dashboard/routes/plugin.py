@@ -1,10 +1,6 @@
 import traceback
-import aiohttp
 import os
 
-import ssl
-import certifi
-
 from .route import Route, Response, RouteContext
 from astrbot.core import logger
 from quart import request
@@ -17,6 +13,7 @@ from astrbot.core.star.filter.permission import PermissionTypeFilter
 from astrbot.core.star.filter.regex import RegexFilter
 from astrbot.core.star.star_handler import EventType
 from astrbot.core import DEMO_MODE
+from astrbot.core.utils.http_client import http_client
 
 
 class PluginRoute(Route):
@@ -81,14 +78,9 @@ class PluginRoute(Route):
         else:
             urls = ["https://api.soulter.top/astrbot/plugins"]
 
-        # 新增：创建 SSL 上下文，使用 certifi 提供的根证书
-        ssl_context = ssl.create_default_context(cafile=certifi.where())
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
         for url in urls:
             try:
-                async with aiohttp.ClientSession(
-                    trust_env=True, connector=connector
-                ) as session:
+                async with http_client.session() as session:
                     async with session.get(url) as response:
                         if response.status == 200:
                             result = await response.json()
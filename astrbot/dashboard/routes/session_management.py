@@ -90,8 +90,8 @@ class SessionManagementRoute(Route):
                 }
 
                 # 获取对话信息
-                conversation = self.db_helper.get_conversation_by_user_id(
-                    session_id, conversation_id
+                conversation = await self.db_helper.aio.get_conversation_by_user_id(
+                    session_id, conversation_id, with_history=False
                 )
                 if conversation:
                     session_info["persona_id"] = conversation.persona_id
@@ -358,8 +358,8 @@ class SessionManagementRoute(Route):
             )
 
             # 获取对话信息
-            conversation = self.db_helper.get_conversation_by_user_id(
-                session_id, conversation_id
+            conversation = await self.db_helper.aio.get_conversation_by_user_id(
+                session_id, conversation_id, with_history=False
             )
             if conversation:
                 session_info["persona_id"] = conversation.persona_id
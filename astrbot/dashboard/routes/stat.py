@@ -1,5 +1,4 @@
 import traceback
-import psutil
 import time
 import threading
 import aiohttp
@@ -8,9 +7,16 @@ from astrbot.core import logger
 from quart import request
 from astrbot.core.core_lifecycle import AstrBotCoreLifecycle
 from astrbot.core.db import BaseDatabase
+from astrbot.core.db.po import Platform
 from astrbot.core.config import VERSION
 from astrbot.core.utils.io import get_dashboard_version
+from astrbot.core.utils.metrics import system_stats_sampler
+from astrbot.core.provider.tool_cache import tool_result_cache
+from astrbot.core.provider.response_cache import llm_response_cache
+from astrbot.core.utils.media_cache import media_cache
+from astrbot.core.utils.media_executor import media_executor
 from astrbot.core import DEMO_MODE
+from astrbot.core.utils.http_client import http_client
 
 
 class StatRoute(Route):
@@ -74,29 +80,43 @@ class StatRoute(Route):
     async def get_start_time(self):
         return Response().ok({"start_time": self.core_lifecycle.start_time}).__dict__
 
+    @staticmethod
+    def _get_bin_size(offset_sec: int) -> int:
+        """根据时间范围选择消息趋势图的分组间隔，使分组数量保持在一千左右"""
+        if offset_sec <= 3 * 86400:
+            return 1800
+        if offset_sec <= 45 * 86400:
+            return 3600
+        return 86400
+
     async def get_stat(self):
         offset_sec = request.args.get("offset_sec", 86400)
         offset_sec = int(offset_sec)
         try:
-            stat = self.db_helper.get_base_stats(offset_sec)
             now = int(time.time())
             start_time = now - offset_sec
-            message_time_based_stats = []
-
-            idx = 0
-            for bucket_end in range(start_time, now, 1800):
-                cnt = 0
-                while (
-                    idx < len(stat.platform)
-                    and stat.platform[idx].timestamp < bucket_end
-                ):
-                    cnt += stat.platform[idx].count
-                    idx += 1
-                message_time_based_stats.append([bucket_end, cnt])
-
-            stat_dict = stat.__dict__
-
-            cpu_percent = psutil.cpu_percent(interval=0.5)
+            bin_size = self._get_bin_size(offset_sec)
+            series = dict(
+                await self.db_helper.aio.get_stat_series(
+                    "platform", start_time, bin_size
+                )
+            )
+            message_time_based_stats = [
+                [bucket, series.get(bucket, 0)]
+                for bucket in range(start_time // bin_size * bin_size, now, bin_size)
+            ]
+
+            grouped = await self.db_helper.aio.get_stat_grouped("platform", start_time)
+            stat_dict = {
+                "platform": [
+                    Platform(name, count, now) for name, count in grouped.items()
+                ],
+                "command": [],
+                "llm": [],
+            }
+
+            if not system_stats_sampler.sampled:
+                system_stats_sampler.sample()
             thread_count = threading.active_count()
 
             # 获取插件信息
@@ -117,10 +137,9 @@ class StatRoute(Route):
 
             stat_dict.update(
                 {
-                    "platform": self.db_helper.get_grouped_base_stats(
-                        offset_sec
-                    ).platform,
-                    "message_count": self.db_helper.get_total_message_count() or 0,
+                    "message_count": await self.db_helper.aio.get_stat_total(
+                        "platform"
+                    ),
                     "platform_count": len(
                         self.core_lifecycle.platform_manager.get_insts()
                     ),
@@ -129,12 +148,37 @@ class StatRoute(Route):
                     "message_time_series": message_time_based_stats,
                     "running": running_time,  # 现在返回时间组件而不是格式化的字符串
                     "memory": {
-                        "process": psutil.Process().memory_info().rss >> 20,
-                        "system": psutil.virtual_memory().total >> 20,
+                        "process": system_stats_sampler.process_memory,
+                        "system": system_stats_sampler.system_memory,
                     },
-                    "cpu_percent": round(cpu_percent, 1),
+                    "cpu_percent": round(system_stats_sampler.cpu_percent, 1),
                     "thread_count": thread_count,
                     "start_time": self.core_lifecycle.start_time,
+                    "event_bus": self.core_lifecycle.event_bus.get_stats(),
+                    "tool_cache": tool_result_cache.stats(),
+                    "response_cache": llm_response_cache.stats(),
+                    "media_cache": media_cache.stats(),
+                    "media_executor": media_executor.stats(),
+                    "key_pools": {
+                        provider.meta().id: provider.key_pool.stats()
+                        for provider in self.core_lifecycle.provider_manager.provider_insts
+                        if getattr(provider, "key_pool", None)
+                    },
+                    "token_usage": {
+                        provider.meta().id: provider.token_usage
+                        for provider in self.core_lifecycle.provider_manager.provider_insts
+                        if getattr(provider, "token_usage", {}).get("requests")
+                    },
+                    "embedding_batches": {
+                        provider.meta().id: provider.batcher.stats()
+                        for provider in self.core_lifecycle.provider_manager.embedding_provider_insts
+                        if getattr(provider, "batcher", None)
+                    },
+                    "routers": {
+                        provider.meta().id: provider.stats()
+                        for provider in self.core_lifecycle.provider_manager.provider_insts
+                        if provider.meta().type == "router"
+                    },
                 }
             )
 
@@ -159,7 +203,7 @@ class StatRoute(Route):
             test_url = f"{proxy_url}/https://github.com/AstrBotDevs/AstrBot/raw/refs/heads/master/.python-version"
             start_time = time.time()
 
-            async with aiohttp.ClientSession() as session:
+            async with http_client.session(direct=True) as session:
                 async with session.get(
                     test_url, timeout=aiohttp.ClientTimeout(total=10)
                 ) as response:
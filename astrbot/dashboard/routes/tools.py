@@ -2,12 +2,12 @@ import json
 import os
 import traceback
 
-import aiohttp
 from quart import request
 
 from astrbot.core import logger
 from astrbot.core.core_lifecycle import AstrBotCoreLifecycle
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.http_client import http_client
 
 from .route import Response, Route, RouteContext
 
@@ -305,7 +305,7 @@ class ToolsRoute(Route):
             )
         )
         try:
-            async with aiohttp.ClientSession() as session:
+            async with http_client.session(direct=True) as session:
                 async with session.get(f"{BASE_URL}") as response:
                     if response.status == 200:
                         data = await response.json()
@@ -0,0 +1,85 @@
+"""
+核心数据库查询的基准测试
+
+生成 100k 个对话(分布在 1000 个会话中)和 100k 条平台统计数据，分别在有索引(迁移后)和无索引的情况下
+测量常用查询的平均耗时。
+
+用法: python benchmarks/bench_db_lookup.py [对话数量]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from astrbot.core.db.sqlite import SQLiteDatabase  # noqa: E402
+
+
+def populate(db: SQLiteDatabase, n: int):
+    now = int(time.time())
+    sessions = [f"aiocqhttp:GroupMessage:{i}" for i in range(max(1, n // 100))]
+    conversations = []
+    with db.transaction() as c:
+        for i in range(n):
+            umo = sessions[i % len(sessions)]
+            cid = str(uuid.uuid4())
+            ts = now - random.randint(0, 86400 * 30)
+            conversations.append((umo, cid))
+            c.execute(
+                "INSERT INTO webchat_conversation(user_id, cid, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (umo, cid, ts, ts),
+            )
+        c.executemany(
+            "INSERT INTO platform(name, count, timestamp) VALUES (?, ?, ?)",
+            [("aiocqhttp", 1, now - random.randint(0, 86400 * 30)) for _ in range(n)],
+        )
+    return sessions, conversations
+
+
+def bench(label: str, func, rounds: int = 200) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    cost = (time.perf_counter() - start) / rounds * 1000
+    print(f"  {label:<40} {cost:8.3f} ms")
+    return cost
+
+
+def run(db: SQLiteDatabase, sessions, conversations):
+    bench(
+        "get_conversation_by_user_id",
+        lambda: db.get_conversation_by_user_id(*random.choice(conversations)),
+    )
+    bench(
+        "get_conversations (ORDER BY updated_at)",
+        lambda: db.get_conversations(random.choice(sessions)),
+    )
+    bench("get_base_stats (1 day)", lambda: db.get_base_stats(86400), rounds=50)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SQLiteDatabase(os.path.join(tmp, "bench.db"))
+        print(f"正在生成 {n} 个对话...")
+        sessions, conversations = populate(db, n)
+
+        print("有索引:")
+        run(db, sessions, conversations)
+
+        indexes = db.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%' AND tbl_name IN ('webchat_conversation', 'platform')"
+        ).fetchall()
+        with db.transaction() as c:
+            for (name,) in indexes:
+                c.execute(f"DROP INDEX {name}")
+        print("无索引:")
+        run(db, sessions, conversations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+工具路由的基准测试
+
+生成若干个带有参数的模拟工具，分别在启用和不启用工具路由的情况下，测量每次请求携带的工具描述的体积
+(JSON 字节数和估算的 token 数量)，以及构建工具描述(包括路由)的平均耗时。
+
+LLM 请求的延迟主要取决于提供商，这里用请求体积和估算的 token 数量来衡量。
+
+用法: python benchmarks/bench_tool_routing.py [工具数量] [每次请求最多携带的工具数量]
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from astrbot.core.provider.func_tool_manager import FuncCall, FuncTool  # noqa: E402
+from astrbot.core.provider.tool_router import ToolRouter  # noqa: E402
+from astrbot.core.utils.token_counter import estimate_tokens  # noqa: E402
+
+TOPICS = [
+    ("weather", "查询城市的天气、气温和空气质量"),
+    ("search", "Search the web and return the most relevant pages"),
+    ("github", "Manage GitHub issues, pull requests and repositories"),
+    ("calendar", "创建、查询和删除日历中的日程"),
+    ("music", "搜索歌曲并返回播放链接"),
+    ("translate", "Translate text between languages"),
+    ("stock", "查询股票的实时行情"),
+    ("email", "Read and send emails"),
+]
+QUERIES = [
+    "明天上海的天气怎么样",
+    "search the web for the latest python release",
+    "帮我看看 astrbot 仓库里有哪些 open issue",
+    "把这句话翻译成英文: 今天很开心",
+    "查询一下腾讯的股票",
+]
+
+
+def make_tools(n: int) -> FuncCall:
+    func_call = FuncCall()
+    for i in range(n):
+        topic, desc = TOPICS[i % len(TOPICS)]
+        params = {
+            "type": "object",
+            "properties": {
+                f"arg_{j}": {"type": "string", "description": f"{topic} 参数 {j}"}
+                for j in range(random.randint(2, 6))
+            },
+        }
+        func_call.func_list.append(
+            FuncTool(
+                name=f"{topic}_{i}",
+                parameters=params,
+                description=f"{desc} (variant {i})",
+                origin="mcp",
+                mcp_server_name=topic,
+            )
+        )
+    return func_call
+
+
+async def bench(label: str, func_call: FuncCall, router: ToolRouter, rounds: int):
+    size = tokens = 0
+    start = time.perf_counter()
+    for i in range(rounds):
+        selected = await router.select(func_call, QUERIES[i % len(QUERIES)])
+        payload = json.dumps(selected.get_func_desc_openai_style(), ensure_ascii=False)
+        size += len(payload.encode())
+        tokens += estimate_tokens(payload)
+    cost = (time.perf_counter() - start) / rounds * 1000
+    print(
+        f"  {label:<20} {size / rounds / 1024:8.1f} KB  {tokens // rounds:8d} tokens  {cost:8.3f} ms"
+    )
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    max_tools = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    random.seed(0)
+    func_call = make_tools(n)
+    print(f"{n} 个工具，每次请求最多携带 {max_tools} 个:")
+    await bench("不启用工具路由", func_call, ToolRouter(max_tools=0), 200)
+    await bench("启用工具路由", func_call, ToolRouter(max_tools=max_tools), 200)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
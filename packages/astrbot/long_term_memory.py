@@ -7,6 +7,7 @@ from astrbot.api.platform import MessageType
 from astrbot.api.provider import ProviderRequest
 from astrbot.api.message_components import Plain, Image
 from astrbot import logger
+from astrbot.core.provider.response_cache import llm_response_cache
 from collections import defaultdict
 
 """
@@ -54,7 +55,8 @@ class LongTermMemory:
                 raise Exception(
                     f"没有找到 ID 为 {self.image_caption_provider_id} 的提供商"
                 )
-        response = await provider.text_chat(
+        response = await llm_response_cache.text_chat(
+            provider,
             prompt=self.image_caption_prompt,
             session_id=uuid.uuid4().hex,
             image_urls=[image_url],
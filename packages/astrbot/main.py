@@ -1,4 +1,3 @@
-import aiohttp
 import datetime
 import builtins
 import traceback
@@ -15,6 +14,7 @@ from astrbot.core.platform.message_type import MessageType
 from astrbot.core.provider.entities import ProviderType
 from astrbot.core.provider.sources.dify_source import ProviderDify
 from astrbot.core.utils.io import download_dashboard, get_dashboard_version
+from astrbot.core.utils.http_client import http_client
 from astrbot.core.star.star_handler import star_handlers_registry, StarHandlerMetadata
 from astrbot.core.star.star import star_map
 from astrbot.core.star.star_manager import PluginManager
@@ -84,7 +84,7 @@ class Main(star.Star):
 
     async def _query_astrbot_notice(self):
         try:
-            async with aiohttp.ClientSession(trust_env=True) as session:
+            async with http_client.session() as session:
                 async with session.get(
                     "https://astrbot.app/notice.json", timeout=2
                 ) as resp:
@@ -1245,22 +1245,6 @@ UID: {user_id} 此 ID 可用于设置管理员。
             user_info = f"\n[User ID: {user_id}, Nickname: {user_nickname}]\n"
             req.prompt = user_info + req.prompt
 
-        # 启用附加时间戳
-        if self.enable_datetime:
-            current_time = None
-            if self.timezone:
-                # 启用时区
-                try:
-                    now = datetime.datetime.now(zoneinfo.ZoneInfo(self.timezone))
-                    current_time = now.strftime("%Y-%m-%d %H:%M (%Z)")
-                except Exception as e:
-                    logger.error(f"时区设置错误: {e}, 使用本地时区")
-            if not current_time:
-                current_time = (
-                    datetime.datetime.now().astimezone().strftime("%Y-%m-%d %H:%M (%Z)")
-                )
-            req.system_prompt += f"\nCurrent datetime: {current_time}\n"
-
         if req.conversation:
             persona_id = req.conversation.persona_id
             if not persona_id and persona_id != "[%None]":  # [%None] 为用户取消人格
@@ -1285,6 +1269,10 @@ UID: {user_id} 此 ID 可用于设置管理员。
                 ) and not req.contexts:
                     req.contexts[:0] = begin_dialogs
 
+        # 以上为每轮对话都不变的部分，以下为每轮都可能变化的部分。
+        # 稳定的部分放在前面，以便提供商缓存提示词前缀
+        req.stable_system_prompt_len = len(req.system_prompt)
+
         if quote:
             sender_info = ""
             if quote.sender_nickname:
@@ -1322,6 +1310,22 @@ UID: {user_id} 此 ID 可用于设置管理员。
             except BaseException as e:
                 logger.error(f"ltm: {e}")
 
+        # 启用附加时间戳。时间每分钟都会变化，放在最后
+        if self.enable_datetime:
+            current_time = None
+            if self.timezone:
+                # 启用时区
+                try:
+                    now = datetime.datetime.now(zoneinfo.ZoneInfo(self.timezone))
+                    current_time = now.strftime("%Y-%m-%d %H:%M (%Z)")
+                except Exception as e:
+                    logger.error(f"时区设置错误: {e}, 使用本地时区")
+            if not current_time:
+                current_time = (
+                    datetime.datetime.now().astimezone().strftime("%Y-%m-%d %H:%M (%Z)")
+                )
+            req.system_prompt += f"\nCurrent datetime: {current_time}\n"
+
     @filter.after_message_sent()
     async def after_llm_req(self, event: AstrMessageEvent):
         """在 LLM 请求后记录对话"""
@@ -1,7 +1,6 @@
 import os
 import json
 import shutil
-import aiohttp
 import uuid
 import asyncio
 import re
@@ -16,6 +15,7 @@ from astrbot.api.provider import ProviderRequest
 from astrbot.api.message_components import Image, File
 from astrbot.core.utils.io import download_image_by_url, download_file
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.http_client import http_client
 
 PROMPT = """
 ## Task
@@ -144,10 +144,10 @@ class Main(star.Star):
 
         s3_file_url = f"{S3_URL}/{uuid.uuid4().hex}{ext}"
 
-        async with aiohttp.ClientSession(
-            headers={"Accept": "application/json"}, trust_env=True
-        ) as session:
-            async with session.put(s3_file_url, data=file) as resp:
+        async with http_client.session() as session:
+            async with session.put(
+                s3_file_url, data=file, headers={"Accept": "application/json"}
+            ) as resp:
                 if resp.status != 200:
                     raise Exception(f"Failed to upload image: {resp.status}")
                 return s3_file_url
@@ -180,7 +180,7 @@ class Main(star.Star):
         self, image_url: str, workplace_path: str, filename: str
     ) -> str:
         """Download image from url to workplace_path"""
-        async with aiohttp.ClientSession(trust_env=True) as session:
+        async with http_client.session() as session:
             async with session.get(image_url) as resp:
                 if resp.status != 200:
                     return ""
@@ -93,7 +93,7 @@ class Waiter(Star):
                         )
                         new_event = copy.copy(event)
                         # 重新推入事件队列
-                        self.context.get_event_queue().put_nowait(new_event)
+                        await self.context.get_event_queue().put(new_event)
                         event.stop_event()
                         controller.stop()
 
@@ -1,9 +1,9 @@
 import random
 from bs4 import BeautifulSoup
-from aiohttp import ClientSession
 from dataclasses import dataclass
 from typing import List
 import urllib.parse
+from astrbot.core.utils.http_client import http_client
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 6.1; rv:84.0) Gecko/20100101 Firefox/84.0",
@@ -58,14 +58,14 @@ class SearchEngine:
         headers["Referer"] = url
         headers["User-Agent"] = random.choice(USER_AGENTS)
         if data:
-            async with ClientSession() as session:
+            async with http_client.session(direct=True) as session:
                 async with session.post(
                     url, headers=headers, data=data, timeout=self.TIMEOUT
                 ) as resp:
                     ret = await resp.text(encoding="utf-8")
                     return ret
         else:
-            async with ClientSession() as session:
+            async with http_client.session(direct=True) as session:
                 async with session.get(
                     url, headers=headers, timeout=self.TIMEOUT
                 ) as resp:
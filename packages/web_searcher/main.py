@@ -1,9 +1,9 @@
-import aiohttp
 import random
 import astrbot.api.star as star
 import astrbot.api.event.filter as filter
 from astrbot.api.event import AstrMessageEvent, MessageEventResult
 from astrbot.api import llm_tool, logger
+from astrbot.core.utils.http_client import http_client
 from .engines.bing import Bing
 from .engines.sogo import Sogo
 from .engines.google import Google
@@ -43,7 +43,7 @@ class Main(star.Star):
         """获取网页内容"""
         header = HEADERS
         header.update({"User-Agent": random.choice(USER_AGENTS)})
-        async with aiohttp.ClientSession(trust_env=True) as session:
+        async with http_client.session() as session:
             async with session.get(url, headers=header, timeout=6) as response:
                 html = await response.text(encoding="utf-8")
                 doc = Document(html)
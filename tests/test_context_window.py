@@ -0,0 +1,65 @@
+from astrbot.core.db.sqlite import SQLiteDatabase
+from astrbot.core.provider.context_window import ContextWindow
+from astrbot.core.utils.token_counter import count_message_tokens
+
+
+def _turn(i, tool=False):
+    turn = [{"role": "user", "content": f"question {i} " + "x" * 400}]
+    if tool:
+        turn.append(
+            {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{i}",
+                        "type": "function",
+                        "function": {"name": "search", "arguments": "{}"},
+                    }
+                ],
+            }
+        )
+        turn.append({"role": "tool", "tool_call_id": f"call_{i}", "content": "y" * 400})
+    turn.append({"role": "assistant", "content": f"answer {i}"})
+    return turn
+
+
+def test_fit_keeps_whole_turns():
+    contexts = _turn(0) + _turn(1, tool=True) + _turn(2)
+    window = ContextWindow(max_tokens=0)
+    assert window.fit(contexts) is contexts
+
+    per_turn = [
+        sum(count_message_tokens(m) for m in _turn(i, i == 1)) for i in range(3)
+    ]
+    window = ContextWindow(max_tokens=per_turn[1] + per_turn[2] + 10)
+    assert window.fit(contexts) == contexts[2:]
+    # 预留本轮输入后，只能保留最后一轮；工具调用和结果被一起丢弃
+    assert window.fit(contexts, reserved=20) == contexts[-2:]
+    assert window.fit(contexts, reserved=window.max_tokens) == []
+
+
+def test_load_window_with_cached_tokens(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "data_v3.db"))
+    db.new_conversation("umo", "cid")
+    messages = _turn(0) + _turn(1, tool=True) + _turn(2)
+    db.append_conversation_messages("umo", "cid", messages)
+
+    window = db.get_conversation_window("umo", "cid")
+    assert [m for m, _ in window] == messages
+    assert [t for _, t in window] == [count_message_tokens(m) for m in messages]
+
+    last_two = window[-1][1] + window[-2][1]
+    assert [
+        m for m, _ in db.get_conversation_window("umo", "cid", max_tokens=last_two)
+    ] == messages[-2:]
+    assert [
+        m for m, _ in db.get_conversation_window("umo", "cid", limit=1)
+    ] == messages[-1:]
+
+    # 迁移前写入的消息没有缓存 token 数量，读取时估算
+    db.conn.execute("UPDATE conversation_message SET tokens = NULL")
+    db.conn.commit()
+    assert [t for _, t in db.get_conversation_window("umo", "cid")] == [
+        count_message_tokens(m) for m in messages
+    ]
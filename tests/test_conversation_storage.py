@@ -0,0 +1,151 @@
+import json
+import sqlite3
+
+import pytest
+from astrbot.core.conversation_mgr import ConversationManager
+from astrbot.core.db.sqlite import SQLiteDatabase
+from astrbot.core.pipeline.process_stage.method.llm_request import LLMRequestSubStage
+from astrbot.core.provider.entities import LLMResponse, ProviderRequest
+
+
+def test_migrate_history_blob(tmp_path):
+    db_path = str(tmp_path / "data_v3.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE webchat_conversation(user_id TEXT, cid TEXT, history TEXT, created_at INTEGER, updated_at INTEGER)"
+    )
+    history = [
+        {"role": "user", "content": "你好"},
+        {"role": "assistant", "content": "hello"},
+    ]
+    conn.execute(
+        "INSERT INTO webchat_conversation VALUES (?, ?, ?, ?, ?)",
+        ("test:FriendMessage:1", "cid1", json.dumps(history), 0, 0),
+    )
+    conn.execute(
+        "INSERT INTO webchat_conversation VALUES (?, ?, ?, ?, ?)",
+        ("test:FriendMessage:1", "broken", "not json", 0, 0),
+    )
+    conn.commit()
+    conn.close()
+
+    db = SQLiteDatabase(db_path)
+    assert db.get_conversation_messages("test:FriendMessage:1", "cid1") == history
+    conv = db.get_conversation_by_user_id("test:FriendMessage:1", "cid1")
+    assert json.loads(conv.history) == history
+    assert db.get_conversation_messages("test:FriendMessage:1", "broken") == []
+
+    # 重复迁移不会产生重复的消息
+    db = SQLiteDatabase(db_path)
+    assert db.count_conversation_messages("test:FriendMessage:1", "cid1") == 2
+
+
+def test_append_and_load_recent(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "data_v3.db"))
+    db.new_conversation("umo", "cid")
+    for i in range(10):
+        db.append_conversation_messages(
+            "umo",
+            "cid",
+            [
+                {"role": "user", "content": str(i)},
+                {"role": "assistant", "content": "ok"},
+            ],
+        )
+    assert db.count_conversation_messages("umo", "cid") == 20
+    recent = db.get_conversation_messages("umo", "cid", limit=4)
+    assert [m["content"] for m in recent] == ["8", "ok", "9", "ok"]
+    assert (
+        db.get_conversation_by_user_id("umo", "cid", with_history=False).history is None
+    )
+
+    # 对话不存在时不会写入
+    db.append_conversation_messages("umo", "missing", [{"role": "user"}])
+    assert db.count_conversation_messages("umo", "missing") == 0
+
+
+def test_replace_search_and_delete(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "data_v3.db"))
+    db.new_conversation("umo", "cid")
+    db.append_conversation_messages("umo", "cid", [{"role": "user", "content": "a"}])
+    db.update_conversation(
+        "umo", "cid", json.dumps([{"role": "user", "content": "天气怎么样"}])
+    )
+    assert db.get_conversation_messages("umo", "cid") == [
+        {"role": "user", "content": "天气怎么样"}
+    ]
+
+    conversations, total = db.get_filtered_conversations(search_query="天气")
+    assert total == 1 and conversations[0]["cid"] == "cid"
+
+    db.delete_conversation("umo", "cid")
+    assert db.get_conversation_by_user_id("umo", "cid") is None
+    assert db.count_conversation_messages("umo", "cid") == 0
+
+
+class _FakeEvent:
+    unified_msg_origin = "umo"
+
+
+def _turns(start, end):
+    messages = []
+    for i in range(start, end):
+        messages.append({"role": "user", "content": f"q{i}"})
+        messages.append({"role": "assistant", "content": f"a{i}"})
+    return messages
+
+
+async def _save(db, contexts, loaded, offset):
+    stage = LLMRequestSubStage.__new__(LLMRequestSubStage)
+    stage.conv_manager = ConversationManager(db)
+    req = ProviderRequest(
+        prompt="new",
+        contexts=contexts,
+        conversation=db.get_conversation_by_user_id("umo", "cid"),
+    )
+    resp = LLMResponse("assistant", completion_text="reply")
+    await stage._save_to_history(_FakeEvent(), req, resp, loaded, offset)
+
+
+@pytest.mark.asyncio
+async def test_save_modified_window_keeps_older_messages(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "data_v3.db"))
+    db.new_conversation("umo", "cid")
+    db.append_conversation_messages("umo", "cid", _turns(0, 5))
+    db.update_conversation_summary("umo", "cid", "summary", 4, 0)
+
+    # 只加载了最近两轮，插件修改了其中一条消息
+    loaded = _turns(3, 5)
+    contexts = [dict(m) for m in loaded]
+    contexts[0]["content"] = "edited"
+    await _save(db, contexts, loaded, 6)
+
+    messages = db.get_conversation_messages("umo", "cid")
+    assert messages[:6] == _turns(0, 3)
+    assert [m["content"] for m in messages[6:]] == [
+        "edited",
+        "a3",
+        "q4",
+        "a4",
+        "new",
+        "reply",
+    ]
+    # 摘要只覆盖窗口之前的消息，保持不变
+    assert db.get_conversation_summary("umo", "cid") == ("summary", 4)
+
+
+@pytest.mark.asyncio
+async def test_save_cleared_contexts_resets_history(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "data_v3.db"))
+    db.new_conversation("umo", "cid")
+    db.append_conversation_messages("umo", "cid", _turns(0, 3))
+
+    await _save(db, [], _turns(1, 3), 2)
+    assert [m["content"] for m in db.get_conversation_messages("umo", "cid")] == [
+        "new",
+        "reply",
+    ]
+
+    # 未修改的上下文只追加新的消息
+    await _save(db, [], [], 0)
+    assert db.count_conversation_messages("umo", "cid") == 4
@@ -0,0 +1,117 @@
+import asyncio
+import sqlite3
+import threading
+import time
+import pytest
+from astrbot.core.db.migration import MIGRATIONS, get_schema_version, run_migrations
+from astrbot.core.db.sqlite import SQLiteDatabase
+
+
+@pytest.mark.asyncio
+async def test_async_calls_run_off_loop(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "data_v3.db"))
+    threads = set()
+    get_conversations = db.get_conversations
+
+    def record_thread(user_id):
+        threads.add(threading.current_thread())
+        return get_conversations(user_id)
+
+    db.get_conversations = record_thread
+
+    await asyncio.gather(
+        *[db.aio.new_conversation("umo", f"cid{i}") for i in range(20)]
+    )
+    results = await asyncio.gather(*[db.aio.get_conversations("umo") for _ in range(8)])
+    assert all(len(r) == 20 for r in results)
+    assert threading.current_thread() not in threads
+
+
+def test_transaction_batch_and_rollback(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "data_v3.db"))
+    with db.transaction():
+        db.insert_platform_metrics({"aiocqhttp": 1})
+        db.insert_platform_metrics({"telegram": 2})
+    assert db.get_total_message_count() == 3
+
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.insert_platform_metrics({"aiocqhttp": 10})
+            raise RuntimeError()
+    assert db.get_total_message_count() == 3
+
+    db.update_llm_history("sid", "a", "openai")
+    db.update_llm_history("sid", "b", "openai")
+    assert [h.content for h in db.get_llm_history("sid", "openai")] == ["b"]
+
+
+def test_migrations(tmp_path):
+    db_path = str(tmp_path / "data_v3.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE webchat_conversation(user_id TEXT, cid TEXT, history TEXT, created_at INTEGER, updated_at INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO webchat_conversation VALUES (?, ?, ?, ?, ?)",
+        [("umo", "cid", "[]", 0, 1), ("umo", "cid", "[]", 0, 2)],
+    )
+    conn.commit()
+    conn.close()
+
+    db = SQLiteDatabase(db_path)
+    assert get_schema_version(db.conn) == MIGRATIONS[-1].version
+    assert len(db.get_conversations("umo")) == 1
+    plan = db.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM webchat_conversation WHERE user_id = ? AND cid = ?",
+        ("umo", "cid"),
+    ).fetchall()
+    assert "idx_webchat_conversation_user_cid" in str(plan)
+
+    # 已经是最新版本时不会重复执行迁移
+    assert run_migrations(db.conn) == 0
+
+
+def test_stat_rollups(tmp_path):
+    db_path = str(tmp_path / "data_v3.db")
+    now = int(time.time())
+    hour = now // 3600 * 3600
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE platform(name VARCHAR(32), count INTEGER, timestamp INTEGER)"
+    )
+    conn.execute(
+        "INSERT INTO platform VALUES ('aiocqhttp', 5, ?)", (hour - 86400 * 10,)
+    )
+    conn.commit()
+    conn.close()
+
+    db = SQLiteDatabase(db_path)
+    db.insert_metrics_batch(
+        {
+            hour - 7200: {
+                "platform_stats": {"aiocqhttp": 2, "telegram": 1},
+                "plugin_stats": {},
+                "command_stats": {},
+                "llm_stats": {},
+            },
+            hour - 7140: {
+                "platform_stats": {"aiocqhttp": 3},
+                "plugin_stats": {},
+                "command_stats": {},
+                "llm_stats": {},
+            },
+        }
+    )
+
+    assert db.get_stat_total("platform") == 11
+    assert db.get_total_message_count() == 11
+    assert db.get_stat_grouped("platform", now - 86400) == {
+        "aiocqhttp": 5,
+        "telegram": 1,
+    }
+    assert db.get_stat_grouped("platform", now - 86400 * 30)["aiocqhttp"] == 10
+    assert db.get_stat_series("platform", now - 86400, 1800) == [(hour - 7200, 6)]
+    assert db.get_stat_series("platform", now - 86400 * 30, 86400)[0] == (
+        (hour - 86400 * 10) // 86400 * 86400,
+        5,
+    )
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+import pytest
+from astrbot.core.pipeline.waking_check.dispatch_index import HandlerDispatchIndex
+from astrbot.core.star.filter.command import CommandFilter
+from astrbot.core.star.filter.command_group import CommandGroupFilter
+from astrbot.core.star.filter.permission import PermissionType, PermissionTypeFilter
+from astrbot.core.star.filter.regex import RegexFilter
+from astrbot.core.star.star import StarMetadata, star_map
+from astrbot.core.star.star_handler import (
+    EventType,
+    StarHandlerMetadata,
+    StarHandlerRegistry,
+)
+
+MODULE_PATH = "tests.fake_plugin.main"
+
+
+async def _handler(self, event, arg: str = ""):
+    pass
+
+
+def _add(registry, name, filters, priority=0):
+    md = StarHandlerMetadata(
+        event_type=EventType.AdapterMessageEvent,
+        handler_full_name=f"{MODULE_PATH}_{name}",
+        handler_name=name,
+        handler_module_path=MODULE_PATH,
+        handler=_handler,
+        event_filters=filters,
+        extras_configs={"priority": priority},
+    )
+    for f in filters:
+        if isinstance(f, CommandFilter):
+            f.init_handler_md(md)
+    registry.append(md)
+    return md
+
+
+def _event(message_str, woken=True):
+    return SimpleNamespace(
+        message_str=message_str,
+        is_at_or_wake_command=woken,
+        get_message_str=lambda: message_str,
+    )
+
+
+def _names(index, message_str, woken=True):
+    return [h.handler_name for h in index.get_candidates(_event(message_str, woken))]
+
+
+@pytest.fixture
+def plugin():
+    md = StarMetadata(name="fake", module_path=MODULE_PATH)
+    star_map[MODULE_PATH] = md
+    yield md
+    star_map.pop(MODULE_PATH, None)
+
+
+def test_candidates(plugin):
+    registry = StarHandlerRegistry()
+    group = CommandGroupFilter("mgr", {"m"})
+    _add(registry, "help", [CommandFilter("help", {"帮助"})])
+    _add(registry, "group", [group])
+    _add(
+        registry,
+        "group_ls",
+        [
+            CommandFilter(
+                "ls", None, parent_command_names=group.get_complete_command_names()
+            )
+        ],
+    )
+    _add(registry, "echo", [RegexFilter(r"echo\s+(.+)")])
+    _add(registry, "backref", [RegexFilter(r"(a)\1")])
+    _add(
+        registry,
+        "admin",
+        [PermissionTypeFilter(PermissionType.ADMIN), CommandFilter("op")],
+        priority=10,
+    )
+    index = HandlerDispatchIndex(registry)
+
+    assert _names(index, "help") == ["help", "backref"]
+    assert _names(index, "帮助 1") == ["help", "backref"]
+    assert _names(index, "m ls") == ["group", "group_ls", "backref"]
+    assert _names(index, "op someone") == ["admin", "backref"]
+    assert _names(index, "echo hi") == ["echo", "backref"]
+    assert _names(index, "help", woken=False) == ["backref"]
+    assert _names(index, "hello") == ["backref"]
+
+    # 插件禁用后索引重新构建
+    plugin.activated = False
+    registry.invalidate()
+    assert _names(index, "帮助") == []
@@ -0,0 +1,81 @@
+import asyncio
+
+import numpy as np
+import pytest
+from astrbot.core.db.vec_db.faiss_impl import FaissVecDB
+from astrbot.core.provider.embedding_batcher import EmbeddingBatcher
+from astrbot.core.provider.provider import EmbeddingProvider
+
+
+class FakeEmbedding(EmbeddingProvider):
+    def __init__(self, fail: bool = False):
+        super().__init__({"id": "emb", "type": "fake"}, {})
+        self.fail = fail
+        self.batches: list[list[str]] = []
+        self.batcher = EmbeddingBatcher(
+            self.get_embeddings, max_batch_size=4, max_wait=0.01
+        )
+
+    async def get_embedding(self, text: str) -> list[float]:
+        return await self.batcher.embed(text)
+
+    async def get_embeddings(self, texts: list[str]) -> list[list[float]]:
+        self.batches.append(texts)
+        await asyncio.sleep(0)
+        if self.fail:
+            raise Exception("embedding down")
+        vectors = []
+        for text in texts:
+            vec = np.zeros(16, dtype=np.float32)
+            for ch in text:
+                vec[ord(ch) % 16] += 1
+            vectors.append((vec / np.linalg.norm(vec)).tolist())
+        return vectors
+
+    def get_dim(self) -> int:
+        return 16
+
+
+@pytest.mark.asyncio
+async def test_coalesce_concurrent_calls():
+    provider = FakeEmbedding()
+    texts = ["a", "b", "a", "c", "d", "e"]
+    vectors = await asyncio.gather(*(provider.get_embedding(t) for t in texts))
+    # 前 4 条达到批次上限立即发送，其余 2 条等待超时后发送；相同的文本只请求一次
+    assert provider.batches == [["a", "b", "c"], ["d", "e"]]
+    assert vectors[0] == vectors[2] == (await provider.get_embeddings(["a"]))[0]
+    assert provider.batcher.stats()["requests"] == 6
+    assert provider.batcher.stats()["batches"] == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_error_propagates():
+    provider = FakeEmbedding(fail=True)
+    results = await asyncio.gather(
+        provider.get_embedding("a"),
+        provider.get_embedding("b"),
+        return_exceptions=True,
+    )
+    assert len(provider.batches) == 1
+    assert all(str(r) == "embedding down" for r in results)
+
+
+@pytest.mark.asyncio
+async def test_insert_many(tmp_path):
+    provider = FakeEmbedding()
+    vec_db = FaissVecDB(
+        str(tmp_path / "doc.db"), str(tmp_path / "index.faiss"), provider
+    )
+    await vec_db.initialize()
+    contents = [f"document {i} " + "xyz"[i % 3] * (i + 1) for i in range(10)]
+    ids = await vec_db.insert_many(
+        contents, metadatas=[{"n": i} for i in range(10)], batch_size=4
+    )
+    assert len(set(ids)) == 10
+    assert [len(b) for b in provider.batches] == [4, 4, 2]
+    assert await vec_db.count_documents() == 10
+    assert vec_db.embedding_storage.index.ntotal == 10
+
+    results = await vec_db.retrieve(contents[7], k=1)
+    assert results[0].data["text"] == contents[7]
+    await vec_db.close()
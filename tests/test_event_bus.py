@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from astrbot.core.event_bus import EventBus, EventQueue
+
+
+class _FakeEvent:
+    def __init__(self, platform_id: str, text: str, platform_name: str = "test"):
+        self.platform_id = platform_id
+        self.platform_name = platform_name
+        self.text = text
+
+    def get_platform_name(self):
+        return self.platform_name
+
+    def get_platform_id(self):
+        return self.platform_id
+
+    def get_sender_id(self):
+        return "123456"
+
+    def get_sender_name(self):
+        return "mika"
+
+    def get_message_outline(self):
+        return self.text
+
+
+def _config(policy: str, platform_policy: str = ""):
+    return {
+        "platform": [{"id": "p1", "overflow_policy": platform_policy}],
+        "platform_settings": {"event_dispatch": {"overflow_policy": policy}},
+    }
+
+
+@pytest.mark.asyncio
+async def test_event_queue_drop_newest():
+    queue = EventQueue(2, _config("drop_newest"))
+    for text in ["a", "b", "c"]:
+        queue.put_nowait(_FakeEvent("p1", text))
+    assert [queue.get_nowait().text for _ in range(2)] == ["a", "b"]
+    assert queue.dropped_count == 1
+
+
+@pytest.mark.asyncio
+async def test_event_queue_platform_policy_overrides_default():
+    queue = EventQueue(2, _config("drop_newest", "drop_oldest"))
+    for text in ["a", "b", "c"]:
+        queue.put_nowait(_FakeEvent("p1", text))
+    assert [queue.get_nowait().text for _ in range(2)] == ["b", "c"]
+    assert queue.dropped_count == 1
+
+
+@pytest.mark.asyncio
+async def test_event_queue_block():
+    queue = EventQueue(1, _config("block"))
+    await queue.put(_FakeEvent("p1", "a"))
+    put_task = asyncio.create_task(queue.put(_FakeEvent("p1", "b")))
+    await asyncio.sleep(0)
+    assert not put_task.done()
+    assert queue.get_nowait().text == "a"
+    await put_task
+    assert queue.get_nowait().text == "b"
+    assert queue.dropped_count == 0
+
+    # 同步提交无法等待，队列满时丢弃新事件而不是在后台入队
+    queue.put_nowait(_FakeEvent("p1", "c"))
+    queue.put_nowait(_FakeEvent("p1", "d"))
+    assert queue.qsize() == 1 and queue.dropped_count == 1
+
+
+@pytest.mark.asyncio
+async def test_event_bus_worker_pool_limits_concurrency():
+    running = 0
+    max_running = 0
+    done = asyncio.Event()
+    handled = []
+
+    class _FakeScheduler:
+        async def execute(self, event):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            handled.append(event.text)
+            if len(handled) == 10:
+                done.set()
+
+    queue = EventQueue(100, _config("block"))
+    bus = EventBus(queue, _FakeScheduler(), {"mode": "worker_pool", "worker_count": 3})
+    for i in range(10):
+        queue.put_nowait(_FakeEvent("p1", str(i)))
+    dispatch_task = asyncio.create_task(bus.dispatch())
+    await asyncio.wait_for(done.wait(), 5)
+    dispatch_task.cancel()
+
+    assert max_running == 3
+    assert sorted(handled, key=int) == [str(i) for i in range(10)]
+    assert bus.get_stats()["queue_depth"] == 0
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+from quart import Quart
+from astrbot.core import file_token_service
+from astrbot.core.file_token_service import FileTokenService
+from astrbot.core.utils import media_cache as media_cache_module
+from astrbot.core.utils.io import link_or_copy
+from astrbot.dashboard.routes.file import FileRoute
+from astrbot.dashboard.routes.route import RouteContext
+
+
+@pytest.mark.asyncio
+async def test_token_reuse(tmp_path):
+    service = FileTokenService()
+    a = tmp_path / "a.bin"
+    b = tmp_path / "b.bin"
+    a.write_bytes(b"a")
+    b.write_bytes(b"b")
+
+    token = await service.register_file(str(a))
+    # 相同的文件复用同一个令牌，令牌在过期前可以多次使用
+    assert await service.register_file(str(a)) == token
+    assert await service.register_file(str(b)) != token
+    assert await service.handle_file(token) == str(a)
+    assert await service.handle_file(token) == str(a)
+
+    # 文件内容变化后使用新的令牌
+    a.write_bytes(b"changed")
+    os.utime(a, (0, 0))
+    assert await service.register_file(str(a)) != token
+
+    c = tmp_path / "c.bin"
+    c.write_bytes(b"c")
+    expired = await service.register_file(str(c), timeout=-1)
+    with pytest.raises(KeyError):
+        await service.handle_file(expired)
+    assert await service.register_file(str(c)) != expired
+
+
+@pytest.mark.asyncio
+async def test_serve_file_range(tmp_path):
+    data = os.urandom(200 * 1024)
+    path = tmp_path / "voice.wav"
+    path.write_bytes(data)
+
+    app = Quart(__name__)
+    FileRoute(RouteContext(None, app))
+    client = app.test_client()
+    token = await file_token_service.register_file(str(path))
+
+    resp = await client.get(f"/api/file/{token}")
+    assert resp.status_code == 200 and await resp.get_data() == data
+    resp = await client.get(f"/api/file/{token}", headers={"Range": "bytes=100-199"})
+    assert resp.status_code == 206 and await resp.get_data() == data[100:200]
+    resp = await client.get("/api/file/invalid")
+    assert resp.status_code == 404
+
+
+def test_link_or_copy(tmp_path):
+    src = tmp_path / "src"
+    src.write_bytes(b"data")
+    dst = link_or_copy(str(src), str(tmp_path / "dst"))
+    with open(dst, "rb") as f:
+        assert f.read() == b"data"
+
+
+@pytest.mark.asyncio
+async def test_token_reuse_for_media_cache_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_cache_module.media_cache, "_root", str(tmp_path))
+    service = FileTokenService()
+    path = media_cache_module.media_cache.store_bytes(b"voice")
+    token = await service.register_file(path)
+    # 再次使用缓存中的文件会更新其修改时间，但仍然复用同一个令牌
+    os.utime(path, (0, 0))
+    assert media_cache_module.media_cache.store_bytes(b"voice") == path
+    assert await service.register_file(path) == token
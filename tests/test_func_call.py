@@ -0,0 +1,63 @@
+from astrbot.core.provider.func_tool_manager import FuncCall, FuncTool
+
+
+async def _handler(event):
+    return "ok"
+
+
+def _func_call(n: int) -> FuncCall:
+    func_call = FuncCall()
+    for i in range(n):
+        func_call.add_func(
+            f"tool_{i}",
+            [{"type": "string", "name": "q", "description": "query"}],
+            f"tool {i}",
+            _handler,
+        )
+    return func_call
+
+
+def test_schema_cache_invalidation():
+    func_call = _func_call(3)
+    desc = func_call.get_func_desc_openai_style()
+    assert [d["function"]["name"] for d in desc] == ["tool_0", "tool_1", "tool_2"]
+    # 工具没有变化时复用缓存的描述
+    assert func_call.get_func_desc_openai_style()[0] is desc[0]
+    google = func_call.get_func_desc_google_genai_style()
+    assert (
+        func_call.get_func_desc_google_genai_style()["function_declarations"]
+        is google["function_declarations"]
+    )
+
+    func_call.get_func("tool_1").active = False
+    assert [d["name"] for d in func_call.get_func_desc_anthropic_style()] == [
+        "tool_0",
+        "tool_2",
+    ]
+    assert (
+        len(func_call.get_func_desc_google_genai_style()["function_declarations"]) == 2
+    )
+
+    func_call.remove_func("tool_0")
+    func_call.add_func("tool_3", [], "tool 3", _handler)
+    assert [d["function"]["name"] for d in func_call.get_func_desc_openai_style()] == [
+        "tool_2",
+        "tool_3",
+    ]
+    assert func_call.get_func("tool_0") is None
+
+    # 直接修改 func_list 也会使缓存失效
+    func_call.func_list.append(FuncTool("mcp_tool", {}, "", origin="mcp"))
+    assert func_call.get_func("mcp_tool").origin == "mcp"
+    func_call.func_list = [f for f in func_call.func_list if f.origin != "mcp"]
+    assert func_call.get_func("mcp_tool") is None
+    assert len(func_call.get_func_desc_openai_style()) == 2
+
+
+def test_get_func_prefers_first_duplicate():
+    func_call = FuncCall()
+    first = FuncTool("search", {}, "local")
+    func_call.func_list = [first, FuncTool("search", {}, "mcp", origin="mcp")]
+    assert func_call.get_func("search") is first
+    func_call.remove_func("search")
+    assert func_call.get_func("search").description == "mcp"
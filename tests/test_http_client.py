@@ -0,0 +1,54 @@
+import aiohttp
+import pytest
+from aiohttp import web
+from astrbot.core.utils.http_client import HttpClientManager
+
+
+@pytest.mark.asyncio
+async def test_shared_session_and_pool():
+    manager = HttpClientManager(limit_per_host=4)
+    session = manager.get_session()
+    async with manager.session() as s:
+        assert s is session
+    direct = manager.get_session(direct=True)
+    # 直连的会话不读取代理环境变量，但共用同一个连接池
+    assert direct is not session and not direct.trust_env and session.trust_env
+    assert direct.connector is session.connector
+    assert session.connector.limit_per_host == 4
+    assert manager.ssl_context is manager.ssl_context
+    # 共享会话不保存 Cookie
+    assert isinstance(session.cookie_jar, aiohttp.DummyCookieJar)
+
+    await manager.close()
+    assert session.closed and direct.closed and session.connector is None
+    assert not manager.get_session().closed
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_connection_reuse():
+    peers = set()
+
+    async def handler(request: web.Request):
+        peers.add(request.transport.get_extra_info("peername"))
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    manager = HttpClientManager()
+    try:
+        for _ in range(5):
+            async with manager.session(direct=True) as session:
+                async with session.get(f"http://127.0.0.1:{port}/") as resp:
+                    assert await resp.text() == "ok"
+        # 多次请求复用同一个连接
+        assert len(peers) == 1
+    finally:
+        await manager.close()
+        await runner.cleanup()
@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import pytest
+from astrbot.core.provider.key_pool import (
+    KeyPool,
+    NoAvailableKeyError,
+    get_retry_after,
+    is_rate_limit_error,
+)
+
+
+class _Response:
+    def __init__(self, headers: dict):
+        self.headers = headers
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, headers: dict = None):
+        super().__init__("Error code: 429")
+        self.response = _Response(headers or {})
+
+
+@pytest.mark.asyncio
+async def test_least_loaded():
+    pool = KeyPool(["a", "b", "c"])
+    keys = [await pool.acquire() for _ in range(3)]
+    # 正在进行的请求平均分配到所有 Key
+    assert sorted(keys) == ["a", "b", "c"]
+    pool.release("b")
+    assert await pool.acquire() == "b"
+    stats = {s["key"]: s for s in pool.stats()}
+    assert stats["b"]["requests"] == 2 and stats["a"]["in_flight"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cooldown_on_rate_limit():
+    assert is_rate_limit_error(RateLimitError())
+    assert get_retry_after(RateLimitError({"retry-after": "2"})) == 2
+    assert get_retry_after(RateLimitError({"retry-after-ms": "500"})) == 0.5
+    assert get_retry_after(Exception("'retryDelay': '7s'")) == 7
+
+    pool = KeyPool(["a", "b"], base_cooldown=0.2, max_wait=1)
+    key = await pool.acquire()
+    pool.release(key, RateLimitError({"retry-after": "10"}))
+    other = await pool.acquire()
+    assert other != key
+    pool.release(other, RateLimitError())
+    # 所有 Key 都在冷却中，等待指数退避的初始冷却时间后可用
+    start = time.monotonic()
+    assert await pool.acquire() == other
+    assert time.monotonic() - start >= 0.15
+
+    pool = KeyPool(["a"], max_wait=0.1)
+    pool.cooldown("a", 5)
+    with pytest.raises(NoAvailableKeyError):
+        await pool.acquire()
+    stats = pool.stats()[0]
+    assert stats["cooldown"] > 4
+
+
+@pytest.mark.asyncio
+async def test_backoff_resets_on_success():
+    pool = KeyPool(["a"], base_cooldown=0.05, max_cooldown=0.2, max_wait=1)
+    for _ in range(4):
+        key = await pool.acquire()
+        pool.release(key, RateLimitError())
+    assert pool._states["a"].backoff == 0.2
+    key = await pool.acquire()
+    pool.release(key)
+    assert pool._states["a"].backoff == 0
+    assert pool.stats()[0]["rate_limited"] == 4
+
+
+@pytest.mark.asyncio
+async def test_token_bucket():
+    pool = KeyPool(["a", "b"], strategy="token_bucket", qps_per_key=10, max_wait=1)
+    start = time.monotonic()
+    for _ in range(22):
+        async with pool.lease():
+            pass
+    # 每个 Key 初始有 10 个令牌，之后每 0.1 秒获得一个
+    assert time.monotonic() - start >= 0.05
+    assert sum(s["requests"] for s in pool.stats()) == 22
+
+
+@pytest.mark.asyncio
+async def test_lease_releases_on_error():
+    pool = KeyPool(["a"])
+    with pytest.raises(ValueError):
+        async with pool.lease():
+            raise ValueError
+    with pytest.raises(asyncio.CancelledError):
+        async with pool.lease():
+            raise asyncio.CancelledError
+    stats = pool.stats()[0]
+    assert stats["in_flight"] == 0 and stats["errors"] == 1
@@ -0,0 +1,117 @@
+import asyncio
+import base64
+import os
+import time
+
+import pytest
+from aiohttp import web
+from astrbot.core.message.components import Image
+from astrbot.core.utils import media_cache as media_cache_module
+from astrbot.core.utils.media_cache import MediaCache
+
+
+@pytest.mark.asyncio
+async def test_dedup_and_encoded_cache(tmp_path):
+    cache = MediaCache(root=str(tmp_path / "cache"))
+    data = b"\x89PNG fake image"
+    bs64 = base64.b64encode(data).decode()
+
+    # 相同的内容只保存一份
+    p1 = await cache.get_path(f"base64://{bs64}")
+    p2 = await cache.get_path(f"base64://{bs64}")
+    assert p1 == p2 and len(os.listdir(tmp_path / "cache")) == 1
+    assert cache.contains(p1) and not cache.contains(str(tmp_path / "other.jpg"))
+
+    assert await cache.get_base64(p1) == bs64
+    assert await cache.get_base64(f"file:///{p1}") == bs64
+    assert cache.encoded_hits == 1 and cache.encoded_misses == 1
+    assert await cache.get_data_uri(p1) == f"data:image/jpeg;base64,{bs64}"
+
+    with pytest.raises(Exception):
+        await cache.get_path(str(tmp_path / "missing.jpg"))
+
+
+@pytest.mark.asyncio
+async def test_url_downloaded_once(tmp_path):
+    requests = []
+
+    async def handler(request: web.Request):
+        requests.append(request.path)
+        await asyncio.sleep(0.05)
+        if request.path == "/random.jpg":
+            return web.Response(body=f"random {len(requests)}".encode())
+        return web.Response(
+            body=b"image bytes", headers={"Cache-Control": "max-age=60"}
+        )
+
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    cache = MediaCache(root=str(tmp_path))
+    try:
+        url = f"http://127.0.0.1:{port}/a.jpg"
+        # 并发请求同一个 URL 时只下载一次
+        paths = await asyncio.gather(*[cache.get_path(url) for _ in range(5)])
+        assert len(set(paths)) == 1 and requests == ["/a.jpg"]
+        assert await cache.get_path(url) == paths[0] and requests == ["/a.jpg"]
+        # 不同的 URL、相同的内容共用同一个文件
+        assert await cache.get_path(f"http://127.0.0.1:{port}/b.jpg") == paths[0]
+        # 没有 max-age 的 URL 每次重新下载，内容变化时得到新的文件
+        random_url = f"http://127.0.0.1:{port}/random.jpg"
+        first = await cache.get_path(random_url)
+        second = await cache.get_path(random_url)
+        assert first != second and requests.count("/random.jpg") == 2
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_evict(tmp_path):
+    cache = MediaCache(root=str(tmp_path), max_size_mb=0, max_age_hours=1)
+    old = cache.store_bytes(b"old")
+    new = cache.store_bytes(b"new")
+    os.utime(old, (time.time() - 7200, time.time() - 7200))
+    cache.evict()
+    assert not os.path.exists(old) and os.path.exists(new)
+
+    # 超过大小上限时删除最久未使用的文件
+    cache.configure(max_size_mb=10 / 1024 / 1024, max_age_hours=0)
+    newer = cache.store_bytes(b"newer data")
+    os.utime(new, (time.time() - 60, time.time() - 60))
+    cache.evict()
+    assert not os.path.exists(new) and os.path.exists(newer)
+
+
+@pytest.mark.asyncio
+async def test_image_component_uses_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_cache_module.media_cache, "_root", str(tmp_path))
+    data = base64.b64encode(b"component image").decode()
+    image = Image.fromBase64(data)
+    path = await image.convert_to_file_path()
+    assert path == await image.convert_to_file_path()
+    assert os.path.dirname(path) == str(tmp_path)
+    with open(path, "rb") as f:
+        assert f.read() == b"component image"
+    assert await image.convert_to_base64() == data
+
+
+@pytest.mark.asyncio
+async def test_encoded_cache_hits_for_url(tmp_path, monkeypatch):
+    cache = MediaCache(root=str(tmp_path))
+
+    async def download(url):
+        return b"remote image", "max-age=60"
+
+    monkeypatch.setattr(cache, "_download", download)
+    url = "http://example.com/a.jpg"
+    # 每次使用都会更新缓存文件的修改时间，但不影响编码缓存的命中
+    results = [await cache.get_base64(url) for _ in range(3)]
+    cache.store_bytes(b"remote image")
+    results.append(await cache.get_base64(url))
+    assert results == [base64.b64encode(b"remote image").decode()] * 4
+    assert cache.encoded_hits == 3 and len(cache._encoded) == 1
@@ -0,0 +1,67 @@
+import asyncio
+import math
+import threading
+import time
+
+import pytest
+from astrbot.core.utils.media_executor import MediaExecutor
+
+
+@pytest.mark.asyncio
+async def test_run_off_loop():
+    executor = MediaExecutor(max_workers=2)
+    loop_thread = threading.get_ident()
+    thread = await executor.run(threading.get_ident, name="ident")
+    assert thread != loop_thread
+
+    # 执行期间事件循环不被阻塞
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(ticker())
+    await executor.run(time.sleep, 0.2, name="sleep")
+    task.cancel()
+    assert ticks >= 5
+
+    with pytest.raises(ZeroDivisionError):
+        await executor.run(divmod, 1, 0, name="div")
+    stats = executor.stats()
+    assert stats["sleep"]["count"] == 1 and stats["sleep"]["avg_ms"] >= 200
+    assert stats["div"]["errors"] == 1
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_timeout_and_bounded_queue():
+    executor = MediaExecutor(max_workers=1, queue_size=0, timeout=0.1)
+    with pytest.raises(asyncio.TimeoutError):
+        await executor.run(time.sleep, 0.3, name="slow")
+    assert executor.stats()["slow"]["timeouts"] == 1
+    # 超时的任务仍在执行，继续占用执行位，新的任务需要等待它结束
+    assert executor.stats()["slow"]["in_flight"] == 1
+    assert executor._get_slots().locked()
+    start = time.monotonic()
+    await executor.run(time.sleep, 0, name="next", timeout=1)
+    assert time.monotonic() - start >= 0.1
+    assert executor.stats()["slow"]["in_flight"] == 0
+
+    # 只有一个执行位时任务依次执行，排队时间计入统计
+    executor.configure(max_workers=1, queue_size=0, timeout=5)
+    await asyncio.gather(
+        *[executor.run(time.sleep, 0.05, name="seq") for _ in range(3)]
+    )
+    assert executor.stats()["seq"]["avg_wait_ms"] > 0
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_mode():
+    executor = MediaExecutor(mode="process", max_workers=1)
+    assert await executor.run(math.factorial, 10) == 3628800
+    assert "factorial" in executor.stats()
+    executor.shutdown()
@@ -0,0 +1,34 @@
+import pytest
+from astrbot.core.db.sqlite import SQLiteDatabase
+from astrbot.core.utils.metrics import MetricsAggregator
+
+
+@pytest.mark.asyncio
+async def test_aggregate_local_metrics(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "data_v3.db"))
+    aggregator = MetricsAggregator(db)
+    for _ in range(100):
+        aggregator.record("platform_stats", "aiocqhttp")
+    aggregator.record("platform_stats", "telegram", 2)
+    await aggregator._flush_local()
+
+    rows = db.conn.execute("SELECT name, count FROM platform ORDER BY name").fetchall()
+    assert rows == [("aiocqhttp", 100), ("telegram", 2)]
+    assert db.get_total_message_count() == 102
+
+    # 没有新的指标时不会写入
+    await aggregator._flush_local()
+    assert db.get_total_message_count() == 102
+
+
+def test_merge_remote_metrics(tmp_path):
+    aggregator = MetricsAggregator(SQLiteDatabase(str(tmp_path / "data_v3.db")))
+    for _ in range(3):
+        aggregator.record_remote({"msg_event_tick": 1, "adapter_name": "aiocqhttp"})
+    aggregator.record_remote(
+        {"llm_tick": 1, "model_name": "gpt", "provider_type": "openai"}
+    )
+    assert aggregator._remote == {
+        (("adapter_name", "aiocqhttp"),): {"msg_event_tick": 3},
+        (("model_name", "gpt"), ("provider_type", "openai")): {"llm_tick": 1},
+    }
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from astrbot.core.provider.sources.anthropic_source import ProviderAnthropic
+
+
+def make_provider(prompt_cache: bool = True) -> ProviderAnthropic:
+    return ProviderAnthropic(
+        {
+            "id": "claude",
+            "type": "anthropic_chat_completion",
+            "key": ["sk-test"],
+            "model_config": {"model": "claude-sonnet"},
+        },
+        {"prompt_cache": prompt_cache},
+    )
+
+
+def test_cache_breakpoints():
+    provider = make_provider()
+    stable = "You are a helpful assistant. " * 10
+    history = {"role": "user", "content": "hello"}
+    messages = [
+        {"role": "system", "content": stable + "\nCurrent datetime: 2025-01-01\n"},
+        history,
+        {"role": "assistant", "content": "hi"},
+        {"role": "user", "content": [{"type": "text", "text": "how are you"}]},
+    ]
+    system, new_messages = provider._prepare_payload(messages, len(stable))
+    # 系统提示词在稳定部分之后断开，只有稳定的部分设置缓存断点
+    assert system[0] == {
+        "type": "text",
+        "text": stable,
+        "cache_control": {"type": "ephemeral"},
+    }
+    assert system[1]["text"].strip() == "Current datetime: 2025-01-01"
+    assert "cache_control" not in system[1]
+    # 最后一条消息设置缓存断点，且不修改原消息
+    assert new_messages[-1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in messages[-1]["content"][-1]
+    assert new_messages[0] is history
+
+    # 关闭后保持原样
+    system, new_messages = make_provider(False)._prepare_payload(messages, len(stable))
+    assert system == messages[0]["content"]
+    assert new_messages[-1] is messages[-1]
+
+
+def test_usage_accounting():
+    provider = make_provider()
+    usage = SimpleNamespace(
+        input_tokens=20,
+        cache_read_input_tokens=1000,
+        cache_creation_input_tokens=0,
+        output_tokens=50,
+    )
+    token_usage = provider._parse_usage(usage)
+    assert token_usage.input_tokens == 1020 and token_usage.cached_tokens == 1000
+    provider._parse_usage(usage)
+    assert provider.token_usage["requests"] == 2
+    assert provider.token_usage["cached_tokens"] == 2000
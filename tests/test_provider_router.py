@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+from astrbot.core.provider.entities import LLMResponse
+from astrbot.core.provider.provider import Provider
+from astrbot.core.provider.sources.router_source import ProviderRouter
+
+
+class FakeProvider(Provider):
+    fail_after_first = False
+
+    def __init__(self, pid: str, delay: float = 0, fail: bool = False, chunks=2):
+        super().__init__({"id": pid, "type": "fake"}, {})
+        self.pid = pid
+        self.delay = delay
+        self.fail = fail
+        self.chunks = chunks
+        self.calls = 0
+        self.set_model(f"{pid}-model")
+
+    async def text_chat(self, prompt, **kwargs) -> LLMResponse:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise Exception(f"{self.pid} down")
+        return LLMResponse("assistant", completion_text=self.pid)
+
+    async def text_chat_stream(self, prompt, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise Exception(f"{self.pid} down")
+        for i in range(self.chunks):
+            yield LLMResponse(
+                "assistant", completion_text=f"{self.pid}{i}", is_chunk=True
+            )
+            if self.fail_after_first and i == 0:
+                raise Exception("broken stream")
+        yield LLMResponse("assistant", completion_text=self.pid)
+
+    def get_current_key(self):
+        return ""
+
+    def set_key(self, key):
+        pass
+
+    async def get_models(self):
+        return []
+
+
+class FakeManager:
+    def __init__(self, *providers):
+        self.inst_map = {p.pid: p for p in providers}
+
+
+def make_router(manager, **config):
+    router = ProviderRouter(
+        {
+            "id": "router",
+            "type": "router",
+            "router_providers": list(manager.inst_map),
+            **config,
+        },
+        {},
+    )
+    router.set_provider_manager(manager)
+    return router
+
+
+@pytest.mark.asyncio
+async def test_failover_and_circuit_breaker():
+    bad, good = FakeProvider("bad", fail=True), FakeProvider("good")
+    router = make_router(
+        FakeManager(bad, good),
+        router_strategy="latency",
+        router_failure_threshold=2,
+        router_recovery_time=60,
+    )
+    for _ in range(4):
+        resp = await router.text_chat("hi")
+        assert resp.completion_text == "good"
+    # 连续失败两次后熔断，不再请求
+    assert bad.calls == 2
+    stats = router.stats()
+    assert stats["bad"]["circuit_open"] and stats["bad"]["errors"] == 2
+    assert stats["good"]["requests"] == 4
+
+
+@pytest.mark.asyncio
+async def test_weighted_distribution():
+    a, b = FakeProvider("a"), FakeProvider("b")
+    router = make_router(FakeManager(a, b))
+    router.members = [("a", 9), ("b", 1)]
+    for _ in range(200):
+        await router.text_chat("hi")
+    assert a.calls > b.calls * 2
+    assert router.get_model() == "a-model"
+
+
+@pytest.mark.asyncio
+async def test_hedge_slow_backend():
+    slow, fast = FakeProvider("slow", delay=1), FakeProvider("fast", delay=0.05)
+    router = make_router(FakeManager(slow, fast), router_hedge_after=0.1)
+    router.members = [("slow", 1), ("fast", 1)]
+    router.strategy = "latency"
+    router._candidates()
+    router._health["fast"].latencies.append(1.0)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    resp = await router.text_chat("hi")
+    assert resp.completion_text == "fast"
+    assert loop.time() - start < 0.5
+    assert router.stats()["fast"]["hedged"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_failover_before_first_chunk():
+    bad, good = FakeProvider("bad", fail=True), FakeProvider("good")
+    router = make_router(FakeManager(bad, good), router_strategy="latency")
+    router.members = [("bad", 1), ("good", 1)]
+    texts = [r.completion_text async for r in router.text_chat_stream("hi")]
+    assert texts == ["good0", "good1", "good"]
+
+    # 已经输出内容后不再切换提供商
+    broken = FakeProvider("broken")
+    broken.fail_after_first = True
+    router = make_router(FakeManager(broken, good), router_strategy="latency")
+    router.members = [("broken", 1), ("good", 1)]
+    texts = []
+    with pytest.raises(Exception, match="broken stream"):
+        async for r in router.text_chat_stream("hi"):
+            texts.append(r.completion_text)
+    assert texts == ["broken0"]
+
+
+@pytest.mark.asyncio
+async def test_skip_nested_routers():
+    good = FakeProvider("good")
+    manager = FakeManager(good)
+    a = make_router(manager)
+    b = make_router(manager)
+    manager.inst_map.update({"a": a, "b": b})
+    # 互相包含的路由不会无限递归
+    a.members = [("b", 1), ("good", 1)]
+    b.members = [("a", 1)]
+    for _ in range(5):
+        assert (await a.text_chat("hi")).completion_text == "good"
+    with pytest.raises(Exception, match="没有可用的提供商"):
+        await b.text_chat("hi")
@@ -0,0 +1,147 @@
+import time
+
+import numpy as np
+import pytest
+from astrbot.core.provider.entities import LLMResponse
+from astrbot.core.provider.provider import EmbeddingProvider, Provider
+from astrbot.core.provider.response_cache import LLMResponseCache
+
+
+class FakeProvider(Provider):
+    def __init__(self):
+        super().__init__({"id": "fake", "type": "fake"}, {})
+        self.set_model("fake-model")
+        self.calls = 0
+
+    async def text_chat(self, prompt, **kwargs) -> LLMResponse:
+        self.calls += 1
+        return LLMResponse("assistant", completion_text=f"answer {self.calls}")
+
+    def get_current_key(self):
+        return ""
+
+    def set_key(self, key):
+        pass
+
+    async def get_models(self):
+        return []
+
+
+class FakeEmbedding(EmbeddingProvider):
+    """按字符计数的 Embedding，字符组成相近的文本向量相近"""
+
+    def __init__(self):
+        super().__init__({"id": "emb", "type": "fake"}, {})
+
+    async def get_embedding(self, text: str) -> list[float]:
+        vec = np.zeros(64, dtype=np.float32)
+        for ch in text:
+            vec[ord(ch) % 64] += 1
+        return (vec / np.linalg.norm(vec)).tolist()
+
+    async def get_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return [await self.get_embedding(text) for text in texts]
+
+    def get_dim(self) -> int:
+        return 64
+
+
+@pytest.mark.asyncio
+async def test_exact_match_and_scope():
+    cache = LLMResponseCache()
+    cache.configure(enable=True, scope="session")
+    provider = FakeProvider()
+    system = "You are a bot.\nCurrent datetime: 2025-01-01 10:00 (CST)\n"
+
+    first = await cache.text_chat(
+        provider, session="s1", prompt="Help", system_prompt=system
+    )
+    # 空白、大小写和系统提示词中的时间不影响匹配
+    again = await cache.text_chat(
+        provider,
+        session="s1",
+        prompt="  help ",
+        system_prompt=system.replace("10:00", "10:05"),
+    )
+    assert again.completion_text == first.completion_text == "answer 1"
+    assert provider.calls == 1
+
+    # 其他会话、不同的上下文和工具调用后续轮次不命中
+    await cache.text_chat(provider, session="s2", prompt="help", system_prompt=system)
+    await cache.text_chat(
+        provider,
+        session="s1",
+        prompt="help",
+        system_prompt=system,
+        contexts=[{"role": "user", "content": "hi"}],
+    )
+    await cache.text_chat(
+        provider, session="s1", prompt="help", tool_calls_result=[object()]
+    )
+    assert provider.calls == 4
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3 and stats["size"] == 3
+
+    # 当前时间精确到小时，跨小时后不再命中
+    await cache.text_chat(
+        provider,
+        session="s1",
+        prompt="help",
+        system_prompt=system.replace("10:00", "11:00"),
+    )
+    assert provider.calls == 5
+
+
+@pytest.mark.asyncio
+async def test_image_keyed_by_content(tmp_path):
+    cache = LLMResponseCache()
+    cache.configure(enable=True)
+    provider = FakeProvider()
+    image = tmp_path / "temp.jpg"
+    image.write_bytes(b"cat")
+    await cache.text_chat(provider, prompt="describe", image_urls=[str(image)])
+    await cache.text_chat(provider, prompt="describe", image_urls=[str(image)])
+    assert provider.calls == 1
+    # 临时路径被复用后，不同的图片不会命中之前的结果
+    image.write_bytes(b"dog")
+    await cache.text_chat(provider, prompt="describe", image_urls=[str(image)])
+    assert provider.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_ttl_and_size_bound():
+    cache = LLMResponseCache()
+    cache.configure(enable=True, max_entries=2, ttl=60)
+    provider = FakeProvider()
+    for prompt in ("a", "b", "c"):
+        await cache.text_chat(provider, prompt=prompt)
+    assert cache.stats()["evictions"] == 1
+    await cache.text_chat(provider, prompt="a")
+    assert provider.calls == 4
+
+    # 过期的回复不再返回
+    key = next(iter(cache._entries))
+    cache._entries[key] = (time.time() - 1, "expired")
+    assert await cache.get(provider, {"prompt": "c"}) is None
+    assert cache.stats()["size"] == 1
+
+    # 未启用时不缓存
+    cache.configure(enable=False)
+    await cache.text_chat(provider, prompt="a")
+    await cache.text_chat(provider, prompt="a")
+    assert provider.calls == 6
+
+
+@pytest.mark.asyncio
+async def test_semantic_tier(tmp_path):
+    cache = LLMResponseCache()
+    cache.configure(enable=True, similarity_threshold=0.9)
+    await cache.init_semantic(FakeEmbedding(), str(tmp_path))
+    provider = FakeProvider()
+    await cache.text_chat(provider, prompt="how do I reset my password")
+    resp = await cache.text_chat(provider, prompt="how do I reset my password?")
+    assert resp.completion_text == "answer 1"
+    await cache.text_chat(provider, prompt="weather today")
+    assert provider.calls == 2
+    assert cache.stats()["semantic_hits"] == 1
+    await cache.close()
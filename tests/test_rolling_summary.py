@@ -0,0 +1,49 @@
+import json
+import pytest
+from astrbot.core.conversation_mgr import ConversationManager
+from astrbot.core.db.sqlite import SQLiteDatabase
+from astrbot.core.pipeline.process_stage.summarizer import RollingSummarizer
+from astrbot.core.provider.entities import LLMResponse
+
+
+class FakeProvider:
+    def __init__(self):
+        self.prompts = []
+
+    async def text_chat(self, prompt: str, system_prompt: str = None, **kwargs):
+        self.prompts.append(prompt)
+        return LLMResponse("assistant", completion_text=f"summary {len(self.prompts)}")
+
+
+def _turns(start, end):
+    messages = []
+    for i in range(start, end):
+        messages.append({"role": "user", "content": f"q{i}"})
+        messages.append({"role": "assistant", "content": f"a{i}"})
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_incremental_summary(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "data_v3.db"))
+    conv_mgr = ConversationManager(db)
+    db.new_conversation("umo", "cid")
+    db.append_conversation_messages("umo", "cid", _turns(0, 10))
+    provider = FakeProvider()
+    summarizer = RollingSummarizer(conv_mgr, min_messages=4, max_batch=6)
+
+    # 新丢弃的消息不足 min_messages 时不更新
+    assert not await summarizer.summarize(provider, "umo", "cid", 2)
+    assert await summarizer.summarize(provider, "umo", "cid", 8)
+    assert db.get_conversation_summary("umo", "cid") == ("summary 2", 8)
+    assert "q3" in provider.prompts[1] and "summary 1" in provider.prompts[1]
+    assert "q2" not in provider.prompts[1]
+
+    # 增量更新只发送上次摘要之后的消息
+    await summarizer.schedule(provider, "umo", "cid", 12)
+    assert db.get_conversation_summary("umo", "cid") == ("summary 3", 12)
+    assert "q4" in provider.prompts[2] and "q3" not in provider.prompts[2]
+
+    # 替换对话历史后摘要被清空
+    db.update_conversation("umo", "cid", json.dumps(_turns(0, 1)))
+    assert db.get_conversation_summary("umo", "cid") == (None, 0)
@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from astrbot.core.message.components import Plain
+from astrbot.core.pipeline.session_lane import SessionLaneScheduler
+from astrbot.core.platform.astr_message_event import AstrMessageEvent
+from astrbot.core.platform.astrbot_message import (
+    AstrBotMessage,
+    MessageMember,
+    MessageType,
+)
+from astrbot.core.platform.platform_metadata import PlatformMetadata
+
+
+class FakeAstrMessageEvent(AstrMessageEvent):
+    @staticmethod
+    def create_fake_event(message_str: str, session_id: str = "test_sid"):
+        abm = AstrBotMessage()
+        abm.message_str = message_str
+        abm.message = [Plain(message_str)]
+        abm.self_id = "bot"
+        abm.sender = MessageMember("123456", "mika")
+        abm.session_id = session_id
+        abm.type = MessageType.FRIEND_MESSAGE
+        return FakeAstrMessageEvent(
+            message_str=message_str,
+            message_obj=abm,
+            platform_meta=PlatformMetadata("test_platform", "test"),
+            session_id=session_id,
+        )
+
+
+@pytest.mark.asyncio
+async def test_same_session_runs_in_order():
+    log = []
+
+    async def runner(event: AstrMessageEvent):
+        log.append(("start", event.message_str))
+        await asyncio.sleep(0.01)
+        log.append(("end", event.message_str))
+
+    lanes = SessionLaneScheduler(runner)
+    await asyncio.gather(
+        *[
+            lanes.submit(FakeAstrMessageEvent.create_fake_event(str(i)))
+            for i in range(3)
+        ]
+    )
+    assert log == [
+        ("start", "0"),
+        ("end", "0"),
+        ("start", "1"),
+        ("end", "1"),
+        ("start", "2"),
+        ("end", "2"),
+    ]
+    assert lanes.active_lanes == 0
+
+
+@pytest.mark.asyncio
+async def test_different_sessions_run_in_parallel():
+    running = 0
+    max_running = 0
+
+    async def runner(event: AstrMessageEvent):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    lanes = SessionLaneScheduler(runner)
+    await asyncio.gather(
+        *[
+            lanes.submit(FakeAstrMessageEvent.create_fake_event("hi", f"sid_{i}"))
+            for i in range(3)
+        ]
+    )
+    assert max_running == 3
+
+
+@pytest.mark.asyncio
+async def test_coalesce_messages():
+    handled = []
+
+    async def runner(event: AstrMessageEvent):
+        handled.append(event.message_str)
+
+    lanes = SessionLaneScheduler(runner, coalesce_window=0.05, wake_prefixes=["/"])
+    events = [
+        FakeAstrMessageEvent.create_fake_event(text) for text in ["a", "b", "/help"]
+    ]
+    tasks = []
+    for event in events:
+        tasks.append(asyncio.create_task(lanes.submit(event)))
+        await asyncio.sleep(0.01)
+    await asyncio.gather(*tasks)
+    assert handled == ["a\nb", "/help"]
+    assert lanes.coalesced_count == 1
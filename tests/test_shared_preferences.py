@@ -0,0 +1,42 @@
+import asyncio
+import json
+import os
+import pytest
+from astrbot.core.utils.shared_preferences import SharedPreferences
+
+
+def test_migrate_from_json(tmp_path):
+    with open(tmp_path / "shared_preferences.json", "w") as f:
+        json.dump({"alter_cmd": {"help": "member"}, "inactivated_plugins": []}, f)
+
+    sp = SharedPreferences(str(tmp_path / "shared_preferences.db"))
+    assert sp.get("alter_cmd") == {"help": "member"}
+    assert not os.path.exists(tmp_path / "shared_preferences.json")
+
+    sp = SharedPreferences(str(tmp_path / "shared_preferences.db"))
+    assert sp.get("inactivated_plugins") == []
+
+
+@pytest.mark.asyncio
+async def test_write_behind(tmp_path):
+    path = str(tmp_path / "shared_preferences.db")
+    sp = SharedPreferences(path, flush_interval=0.05)
+    for i in range(100):
+        sp.put("session_conversation", {"umo": str(i)})
+    sp.put("to_remove", 1)
+    sp.remove("to_remove")
+    assert sp.get("session_conversation") == {"umo": "99"}
+
+    await asyncio.sleep(0.2)
+    reloaded = SharedPreferences(path)
+    assert reloaded.get("session_conversation") == {"umo": "99"}
+    assert reloaded.get("to_remove") is None
+
+
+def test_recover_from_broken_database(tmp_path):
+    path = tmp_path / "shared_preferences.db"
+    path.write_bytes(b"this is not a sqlite database" * 100)
+    sp = SharedPreferences(str(path))
+    assert sp.get("anything") is None
+    sp.put("k", "v")
+    assert SharedPreferences(str(path)).get("k") == "v"
@@ -0,0 +1,69 @@
+from astrbot.core.star.star import StarMetadata, star_map
+from astrbot.core.star.star_handler import (
+    EventType,
+    StarHandlerMetadata,
+    StarHandlerRegistry,
+)
+
+
+async def _handler(self, event):
+    pass
+
+
+def _md(module_path, name, priority=None, event_type=EventType.OnLLMRequestEvent):
+    return StarHandlerMetadata(
+        event_type=event_type,
+        handler_full_name=f"{module_path}_{name}",
+        handler_name=name,
+        handler_module_path=module_path,
+        handler=_handler,
+        event_filters=[],
+        extras_configs={} if priority is None else {"priority": priority},
+    )
+
+
+def test_buckets_and_invalidation():
+    a = StarMetadata(name="a", module_path="tests.plugin_a")
+    b = StarMetadata(name="b", module_path="tests.plugin_b")
+    star_map[a.module_path] = a
+    star_map[b.module_path] = b
+    try:
+        registry = StarHandlerRegistry()
+        registry.append(_md(a.module_path, "first"))
+        registry.append(_md(b.module_path, "high", priority=5))
+        registry.append(_md(a.module_path, "second"))
+        registry.append(_md(b.module_path, "low", priority=-1))
+        registry.append(
+            _md(a.module_path, "msg", event_type=EventType.AdapterMessageEvent)
+        )
+
+        def names(**kwargs):
+            return [
+                h.handler_name
+                for h in registry.get_handlers_by_event_type(
+                    EventType.OnLLMRequestEvent, **kwargs
+                )
+            ]
+
+        assert names() == ["high", "first", "second", "low"]
+        assert registry.get_handlers_by_event_type(
+            EventType.OnLLMRequestEvent
+        ) is registry.get_handlers_by_event_type(EventType.OnLLMRequestEvent)
+
+        # 平台兼容性变化
+        b.supported_platforms["qq"] = False
+        registry.invalidate()
+        assert names(platform_id="qq") == ["first", "second"]
+        assert names(platform_id="tg") == ["high", "first", "second", "low"]
+
+        # 插件禁用
+        a.activated = False
+        registry.invalidate()
+        assert names(platform_id="tg") == ["high", "low"]
+        assert names(only_activated=False) == ["high", "first", "second", "low"]
+
+        registry.remove(registry.get_handler_by_full_name("tests.plugin_b_high"))
+        assert names(platform_id="tg") == ["low"]
+    finally:
+        star_map.pop(a.module_path, None)
+        star_map.pop(b.module_path, None)
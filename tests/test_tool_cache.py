@@ -0,0 +1,102 @@
+import time
+import pytest
+from astrbot.core.pipeline.context import PipelineContext
+from astrbot.core.pipeline.process_stage.agent_runner.tool_loop_agent import (
+    ToolLoopAgent,
+)
+from astrbot.core.provider.entities import LLMResponse, ProviderRequest
+from astrbot.core.provider.func_tool_manager import FuncCall
+from astrbot.core.provider.tool_cache import ToolResultCache, tool_result_cache
+
+
+class FakeEvent:
+    def __init__(self, umo: str = "test:FriendMessage:1"):
+        self.unified_msg_origin = umo
+
+    def get_result(self):
+        return None
+
+    def clear_result(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_lru_and_ttl(monkeypatch):
+    cache = ToolResultCache(max_entries=2)
+    await cache.put("weather", {"city": "北京", "days": 1}, ["晴"], ttl=60)
+    # 参数顺序不影响缓存的键
+    assert await cache.get("weather", {"days": 1, "city": "北京"}) == ["晴"]
+    assert await cache.get("weather", {"city": "上海", "days": 1}) is None
+
+    await cache.put("a", {}, ["1"], ttl=60)
+    await cache.put("b", {}, ["2"], ttl=60)
+    assert await cache.get("weather", {"city": "北京", "days": 1}) is None
+    assert cache.stats()["evictions"] == 1
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert await cache.get("b", {}) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+
+@pytest.mark.asyncio
+async def test_disk_tier(tmp_path):
+    db_path = str(tmp_path / "tool_cache.db")
+    cache = ToolResultCache(db_path=db_path)
+    await cache.put("search", {"q": "astrbot"}, ["result"], ttl=60)
+
+    restarted = ToolResultCache(db_path=db_path)
+    assert await restarted.get("search", {"q": "astrbot"}) == ["result"]
+    assert restarted.stats()["disk_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_agent_uses_cache():
+    calls = []
+
+    async def weather(event, city: str):
+        calls.append(city)
+        return f"{city}: 晴"
+
+    async def roll(event):
+        calls.append("roll")
+        return "6"
+
+    tool_result_cache.clear()
+    func_call = FuncCall()
+    func_call.add_func("weather", [], "", weather, cache_ttl=60)
+    func_call.add_func("roll", [], "", roll)
+    ctx = PipelineContext({"provider_settings": {}}, None)
+    agent = ToolLoopAgent(provider=None, event=FakeEvent(), pipeline_ctx=ctx)
+    req = ProviderRequest(prompt="", func_tool=func_call)
+
+    for i in range(2):
+        resp = LLMResponse(
+            "assistant",
+            tools_call_name=["weather", "roll"],
+            tools_call_args=[{"city": "北京"}, {}],
+            tools_call_ids=[f"call_{i}_0", f"call_{i}_1"],
+        )
+        blocks = []
+        async for result in agent._handle_function_tools(req, resp):
+            if isinstance(result, list):
+                blocks = result
+        assert [b.content for b in blocks] == ["北京: 晴", "6"]
+        assert blocks[0].tool_call_id == f"call_{i}_0"
+
+    # 未声明缓存时间的工具每次都会执行
+    assert calls == ["北京", "roll", "roll"]
+
+    # 插件工具的缓存不在会话之间共享
+    agent = ToolLoopAgent(
+        provider=None, event=FakeEvent("test:FriendMessage:2"), pipeline_ctx=ctx
+    )
+    resp = LLMResponse(
+        "assistant",
+        tools_call_name=["weather"],
+        tools_call_args=[{"city": "北京"}],
+        tools_call_ids=["call_2_0"],
+    )
+    async for _ in agent._handle_function_tools(req, resp):
+        pass
+    assert calls == ["北京", "roll", "roll", "北京"]
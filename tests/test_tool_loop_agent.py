@@ -0,0 +1,146 @@
+import asyncio
+import time
+import pytest
+from astrbot.core.pipeline.context import PipelineContext
+from astrbot.core.pipeline.process_stage.agent_runner.tool_loop_agent import (
+    ToolLoopAgent,
+)
+from astrbot.core.provider.entities import LLMResponse, ProviderRequest
+from astrbot.core.provider.func_tool_manager import FuncCall
+
+
+class FakeEvent:
+    def get_result(self):
+        return None
+
+    def clear_result(self):
+        pass
+
+
+def _make_agent(func_call: FuncCall, **tool_call_cfg):
+    ctx = PipelineContext({"provider_settings": {"tool_call": tool_call_cfg}}, None)
+    agent = ToolLoopAgent(provider=None, event=FakeEvent(), pipeline_ctx=ctx)
+    req = ProviderRequest(prompt="", func_tool=func_call)
+    return agent, req
+
+
+async def _run(agent, req, calls):
+    resp = LLMResponse(
+        "assistant",
+        tools_call_name=[name for name, _ in calls],
+        tools_call_args=[args for _, args in calls],
+        tools_call_ids=[f"call_{i}" for i in range(len(calls))],
+    )
+    blocks = []
+    async for result in agent._handle_function_tools(req, resp):
+        if isinstance(result, list):
+            blocks = result
+    return blocks
+
+
+@pytest.mark.asyncio
+async def test_parallel_tool_calls():
+    running = 0
+    peak = 0
+    order = []
+
+    async def search(event, delay: float):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(delay)
+        running -= 1
+        return f"searched {delay}"
+
+    async def write(event, delay: float):
+        order.append(("write", running))
+        await asyncio.sleep(delay)
+        return "written"
+
+    func_call = FuncCall()
+    func_call.add_func("search", [], "", search, parallel=True, max_concurrency=2)
+    func_call.add_func("write", [], "", write)
+    agent, req = _make_agent(func_call, timeout=0.5)
+
+    start = time.monotonic()
+    blocks = await _run(
+        agent,
+        req,
+        [
+            ("search", {"delay": 0.2}),
+            ("search", {"delay": 0.1}),
+            ("write", {"delay": 0}),
+            ("search", {"delay": 1}),
+        ],
+    )
+    elapsed = time.monotonic() - start
+
+    # 结果按调用顺序返回，超时的调用返回错误
+    assert [b.tool_call_id for b in blocks] == ["call_0", "call_1", "call_2", "call_3"]
+    assert [b.content for b in blocks[:3]] == [
+        "searched 0.2",
+        "searched 0.1",
+        "written",
+    ]
+    assert "超时" in blocks[3].content
+    # 前两个调用并行执行，未声明并行的插件工具不会与其他调用同时执行
+    assert peak == 2
+    assert order == [("write", 0)]
+    assert elapsed < 0.2 + 0.5 + 0.2
+
+
+@pytest.mark.asyncio
+async def test_sequential_when_disabled():
+    running = 0
+    peak = 0
+
+    async def search(event):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "ok"
+
+    func_call = FuncCall()
+    func_call.add_func("search", [], "", search, parallel=True)
+    agent, req = _make_agent(func_call, parallel=False)
+    blocks = await _run(agent, req, [("search", {}), ("search", {})])
+    assert len(blocks) == 2 and peak == 1
+
+    # 插件工具默认依次执行
+    func_call.add_func("search", [], "", search)
+    agent, req = _make_agent(func_call)
+    blocks = await _run(agent, req, [("search", {}), ("search", {})])
+    assert len(blocks) == 2 and peak == 1
+
+
+@pytest.mark.asyncio
+async def test_sequential_tool_streams_messages():
+    finished = False
+
+    async def draw(event):
+        nonlocal finished
+        yield "开始绘制"
+        await asyncio.sleep(0.05)
+        finished = True
+        yield "绘制完成"
+
+    func_call = FuncCall()
+    func_call.add_func("draw", [], "", draw)
+    agent, req = _make_agent(func_call)
+    resp = LLMResponse(
+        "assistant",
+        tools_call_name=["draw"],
+        tools_call_args=[{}],
+        tools_call_ids=["call_0"],
+    )
+    messages = []
+    async for result in agent._handle_function_tools(req, resp):
+        if isinstance(result, list):
+            blocks = result
+        else:
+            messages.append((result.get_plain_text(), finished))
+    # 依次执行的插件工具发送的消息在产生时立即返回，而不是等待工具执行完成
+    assert messages == [("开始绘制", False), ("绘制完成", True)]
+    assert [b.content for b in blocks] == ["开始绘制", "绘制完成"]
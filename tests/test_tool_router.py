@@ -0,0 +1,93 @@
+import pytest
+from astrbot.core.provider.func_tool_manager import FuncCall, FuncTool
+from astrbot.core.provider.tool_router import ToolRouter, parse_keyword_rules
+
+
+async def _handler(event):
+    return "ok"
+
+
+def _func_call() -> FuncCall:
+    func_call = FuncCall()
+    func_call.add_func("get_weather", [], "查询城市的天气预报", _handler)
+    func_call.add_func("web_search", [], "Search the web for a query", _handler)
+    func_call.add_func("send_email", [], "Send an email to someone", _handler)
+    func_call.add_func("roll_dice", [], "掷骰子", _handler)
+    func_call.func_list.append(
+        FuncTool(
+            "list_issues",
+            {},
+            "列出仓库的 issue",
+            origin="mcp",
+            mcp_server_name="github",
+        )
+    )
+    return func_call
+
+
+class FakeEmbeddingProvider:
+    """按照文本中是否包含关键词生成向量"""
+
+    AXES = ["天气", "search", "email", "骰子", "issue"]
+
+    def __init__(self):
+        self.calls = []
+        self.provider_config = {"embedding_batch_size": 4}
+
+    async def get_embeddings(self, texts):
+        self.calls.append(texts)
+        return [[1.0 if axis in t else 0.0 for axis in self.AXES] for t in texts]
+
+
+def _names(func_call):
+    return [f.name for f in func_call.func_list]
+
+
+def test_parse_keyword_rules():
+    assert parse_keyword_rules(["天气, 气温 = get_weather,air", "bad rule"]) == [
+        (["天气", "气温"], ["get_weather", "air"])
+    ]
+
+
+@pytest.mark.asyncio
+async def test_select_by_similarity_and_rules():
+    func_call = _func_call()
+    router = ToolRouter(max_tools=2, keyword_rules=["骰子=roll_dice"])
+
+    # 工具数量不超过上限时不筛选
+    assert await ToolRouter(max_tools=5).select(func_call, "hi") is func_call
+
+    selected = await router.select(func_call, "明天北京天气怎么样")
+    assert _names(selected)[0] == "get_weather" and len(_names(selected)) == 2
+    selected = await router.select(func_call, "扔个骰子，然后 search the web")
+    assert _names(selected) == ["web_search", "roll_dice"]
+    # 相同的子集复用同一个 FuncCall
+    assert await router.select(func_call, "扔个骰子，然后 search the web") is selected
+    assert selected.mcp_client_dict is func_call.mcp_client_dict
+
+    provider = FakeEmbeddingProvider()
+    router = ToolRouter(max_tools=1)
+    selected = await router.select(
+        func_call, "show me open issues", embedding_provider=provider
+    )
+    assert _names(selected) == ["list_issues"]
+    # 按提供商的批量大小分批请求，工具的向量只计算一次
+    await router.select(func_call, "send an email", embedding_provider=provider)
+    assert [len(texts) for texts in provider.calls[:2]] == [4, 2]
+    assert provider.calls[2] == ["send an email"]
+
+
+@pytest.mark.asyncio
+async def test_allowlists():
+    func_call = _func_call()
+    router = ToolRouter(max_tools=0)
+    selected = await router.select(
+        func_call,
+        "",
+        [["get_weather", "mcp:github", "roll_dice"], ["get_weather", "mcp:github"]],
+    )
+    assert _names(selected) == ["get_weather", "list_issues"]
+
+    func_call.get_func("get_weather").active = False
+    selected = await router.select(func_call, "", [["get_weather", "mcp:github"]])
+    assert _names(selected) == ["list_issues"]